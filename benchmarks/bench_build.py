@@ -0,0 +1,259 @@
+"""Сквозная сборка конспекта против локального мока Stepik API
+
+Поднимает benchmarks.mock_stepik отдельным процессом и собирает конспект настоящими
+StepikClient, CourseCrawler и ConspectBuilder: токен берется через client credentials
+у мока, курс обходится по API, шаги рендерятся и пишутся на диск. Каждый сценарий
+идет в своем процессе, чтобы пик RSS мерился честно
+
+Сценарии:
+    cold        - сборка с нуля без кеша
+    incremental - повторная сборка поверх готового конспекта, шаги не качаются
+
+Для каждого печатаются время сборки, запросы в секунду, p50/p99 полного времени
+запроса, число повторов и прирост пикового RSS. С --baseline результаты сравниваются
+с сохраненными через --save-baseline, и если что-то хуже базы больше чем на
+--tolerance, процесс завершается с кодом 1
+
+По умолчанию клиент ограничен тем же лимитом запросов, что и настоящая сборка, и
+время сборки упирается в него. Чтобы мерить сам клиент, лимит поднимают --api-rate
+
+    python -m benchmarks.bench_build --latency 0.01 --rate-429 0.02 --rate-5xx 0.01
+    python -m benchmarks.bench_build --save-baseline build.json
+    python -m benchmarks.bench_build --baseline build.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+import aiohttp
+
+from benchmarks.bench_snapshot import peak_rss, reset_peak_rss
+from benchmarks.mock_stepik import add_mock_arguments, mock_arguments
+from stepik_conspect_helper.conspect import BuildStats, ConspectBuilder
+from stepik_conspect_helper.constants import STEPIK_API_MAX_RATE, STEPIK_API_RATE
+from stepik_conspect_helper.metrics import HTTP_RETRIES, HTTP_SECONDS, Metrics
+from stepik_conspect_helper.stepa import (
+    AdaptiveRateLimiter,
+    StepikClient,
+    request_client_credentials_token,
+)
+
+SCENARIOS = ("cold", "incremental")
+
+# метрика -> больше значит лучше
+REPORTED_METRICS = {
+    "wall": False,
+    "rps": True,
+    "p50": False,
+    "p99": False,
+    "rss": False,
+}
+
+
+class RecordingMetrics(Metrics):
+    """Metrics, которая еще и помнит каждое полное время запроса
+
+    Квантили по корзинам гистограммы слишком грубые для сравнения прогонов
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.latencies: list[float] = []
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        super().observe(name, value, **labels)
+        if name == HTTP_SECONDS and labels.get("phase") == "total":
+            self.latencies.append(value)
+
+
+async def build(
+    args: argparse.Namespace,
+    base_url: str,
+    output_path: Path,
+    scenario: str,
+) -> tuple[RecordingMetrics, BuildStats]:
+    metrics = RecordingMetrics()
+
+    async with aiohttp.ClientSession() as session:
+        token = await request_client_credentials_token(
+            "benchmark",
+            "benchmark",
+            session,
+            token_endpoint=f"{base_url}/oauth2/token/",
+        )
+
+    async with StepikClient(
+        token.access_token,
+        api_url=f"{base_url}/api",
+        rate_limiter=AdaptiveRateLimiter(rate=args.api_rate, max_rate=args.api_max_rate),
+        metrics=metrics,
+    ) as client:
+        stats = await ConspectBuilder(client, workers=args.workers, metrics=metrics).build(
+            1,
+            output_path,
+            incremental=scenario == "incremental",
+        )
+
+    return metrics, stats
+
+
+def run_scenario(
+    args: argparse.Namespace,
+    base_url: str,
+    output_path: Path,
+    scenario: str,
+) -> dict[str, float]:
+    baseline = reset_peak_rss()
+    started_at = time.perf_counter()
+    metrics, stats = asyncio.run(build(args, base_url, output_path, scenario))
+    wall = time.perf_counter() - started_at
+
+    latencies = metrics.latencies
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "wall": wall,
+        "requests": len(latencies),
+        "rps": len(latencies) / wall,
+        "p50": percentiles[49],
+        "p99": percentiles[98],
+        "retries": metrics.value(HTTP_RETRIES),
+        "rss": peak_rss() - baseline,
+        "steps_rendered": stats.steps_rendered,
+        "steps_reused": stats.steps_reused,
+    }
+
+
+def find_regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    """Сравнивает результаты с базой
+
+    Args:
+        results (dict[str, dict[str, float]]): сценарий -> метрика -> значение
+        baseline (dict[str, dict[str, float]]): то же из сохраненного прогона
+        tolerance (float): допустимое ухудшение в долях, 0.2 - на 20%
+
+    Returns:
+        list[str]: описания ухудшений, пустой если их нет
+    """
+
+    regressions = []
+    for scenario, result in results.items():
+        for metric, higher_is_better in REPORTED_METRICS.items():
+            base = baseline.get(scenario, {}).get(metric)
+            if not base:
+                continue
+
+            current = result[metric]
+            change = (current - base) / base
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{scenario} {metric}: {base:.4g} -> {current:.4g}")
+    return regressions
+
+
+def start_mock(args: argparse.Namespace) -> tuple[subprocess.Popen[str], str]:
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_stepik", *mock_arguments(args)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert mock.stdout is not None
+    base_url = mock.stdout.readline().strip()
+    if not base_url:
+        mock.kill()
+        raise SystemExit("mock Stepik API did not start")
+    return mock, base_url
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    add_mock_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--api-rate",
+        type=float,
+        default=STEPIK_API_RATE,
+        help="стартовый лимит клиента, запросов в секунду; по умолчанию как в сборке",
+    )
+    parser.add_argument("--api-max-rate", type=float, default=STEPIK_API_MAX_RATE)
+    parser.add_argument("--baseline", type=Path, help="сравнить с сохраненным прогоном")
+    parser.add_argument("--save-baseline", type=Path, help="сохранить прогон как базу")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--child", nargs=3, metavar=("URL", "SCENARIO", "OUTPUT"))
+    args = parser.parse_args()
+
+    if args.child:
+        base_url, scenario, output = args.child
+        print(json.dumps(run_scenario(args, base_url, Path(output), scenario)))
+        return
+
+    mock, base_url = start_mock(args)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "course.md"
+            for scenario in SCENARIOS:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.bench_build",
+                        f"--workers={args.workers}",
+                        f"--api-rate={args.api_rate}",
+                        f"--api-max-rate={args.api_max_rate}",
+                        "--child",
+                        base_url,
+                        scenario,
+                        str(output_path),
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                results[scenario] = result = json.loads(output)
+                print(
+                    f"{scenario:<12} {result['wall']:>7.2f} s "
+                    f"{result['requests']:>6} req {result['rps']:>8.1f} rps "
+                    f"p50 {result['p50'] * 1000:>6.1f} ms p99 {result['p99'] * 1000:>6.1f} ms "
+                    f"{result['retries']:>4.0f} retries "
+                    f"{result['rss'] / 2**20:>6.1f} MiB peak RSS growth"
+                )
+
+        with urllib.request.urlopen(f"{base_url}/_mock/stats") as response:
+            print(f"mock: {json.load(response)}")
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    if args.save_baseline is not None:
+        args.save_baseline.write_text(json.dumps(results, indent=2))
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.baseline is not None:
+        regressions = find_regressions(
+            results,
+            json.loads(args.baseline.read_text()),
+            args.tolerance,
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regressions over {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
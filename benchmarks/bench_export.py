@@ -0,0 +1,73 @@
+"""Экспорт в несколько форматов: по одному против всех сразу
+
+Синтетический курс сохраняется снимком, и экспорт идет из него, так что сеть не
+мешает мерить самих писателей. Сначала каждый формат экспортируется отдельно, потом
+все вместе одним проходом через ConspectExporter. Параллельный экспорт должен
+стоить примерно как самый медленный формат, а не как сумма всех
+
+    python -m benchmarks.bench_export --sections 10 --formats md,html,epub
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.bench_snapshot import build_course
+from benchmarks.synthetic import build_course_objects
+from stepik_conspect_helper.conspect.export import ConspectExporter
+from stepik_conspect_helper.conspect.writers import WRITERS, export_paths
+from stepik_conspect_helper.stepa import CourseSnapshot, SnapshotCrawler, write_snapshot
+
+
+async def export(snapshot_path: Path, outputs: dict[str, Path], *, processes: bool) -> float:
+    started_at = time.perf_counter()
+    with CourseSnapshot(snapshot_path) as snapshot:
+        if processes:
+            await ConspectExporter(None, crawler=SnapshotCrawler(snapshot)).export(
+                snapshot.course.id,
+                outputs,
+                course=snapshot.course,
+            )
+        else:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                await ConspectExporter(
+                    None,
+                    crawler=SnapshotCrawler(snapshot),
+                    executor=pool,
+                ).export(snapshot.course.id, outputs, course=snapshot.course)
+    return time.perf_counter() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument("--formats", default=",".join(WRITERS))
+    args = parser.parse_args()
+
+    formats = args.formats.split(",")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        snapshot_path = tmp_dir / "course.snap"
+        write_snapshot(build_course(build_course_objects(sections=args.sections)), snapshot_path)
+        outputs = export_paths(tmp_dir / "course", formats)
+
+        alone = {
+            export_format: asyncio.run(
+                export(snapshot_path, {export_format: path}, processes=False)
+            )
+            for export_format, path in outputs.items()
+        }
+        together = asyncio.run(export(snapshot_path, outputs, processes=True))
+
+    for export_format, elapsed in alone.items():
+        print(f"{export_format:<12} {elapsed:>8.2f} s")
+    print(f"{'sum':<12} {sum(alone.values()):>8.2f} s")
+    print(f"{'slowest':<12} {max(alone.values()):>8.2f} s")
+    print(f"{'together':<12} {together:>8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Память и скорость разбора дерева курса: словари из JSON против моделей stepa
+
+Ответы API для синтетического курса сериализуются в JSON пачками по 20 объектов,
+как их отдает Stepik, а потом разбираются двумя способами: в словари, как они
+лежали бы без моделей, и в слотовые модели с выбрасыванием словарей сразу после
+from_api. Память меряется через tracemalloc
+
+    python -m benchmarks.bench_models --steps-per-lesson 20
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from benchmarks.synthetic import build_course_objects
+from stepik_conspect_helper.constants import STEPIK_API_IDS_CHUNK_SIZE
+from stepik_conspect_helper.stepa import codec
+from stepik_conspect_helper.stepa.models import Course, Lesson, Section, Step, Unit
+
+MODELS = {
+    "courses": Course,
+    "sections": Section,
+    "units": Unit,
+    "lessons": Lesson,
+    "steps": Step,
+}
+
+
+def serialize_chunks(
+    objects: dict[str, dict[int, dict[str, Any]]],
+) -> list[tuple[str, bytes]]:
+    chunks = []
+    for resource, collection in objects.items():
+        values = list(collection.values())
+        for start in range(0, len(values), STEPIK_API_IDS_CHUNK_SIZE):
+            body = {resource: values[start : start + STEPIK_API_IDS_CHUNK_SIZE]}
+            chunks.append((resource, json.dumps(body, ensure_ascii=False).encode()))
+    return chunks
+
+
+def decode_to_dicts(chunks: list[tuple[str, bytes]], loads: Callable[[bytes], Any]) -> list:
+    return [obj for resource, body in chunks for obj in loads(body)[resource]]
+
+
+def decode_to_models(chunks: list[tuple[str, bytes]], loads: Callable[[bytes], Any]) -> list:
+    return [
+        MODELS[resource].from_api(obj)
+        for resource, body in chunks
+        for obj in loads(body)[resource]
+    ]
+
+
+def measure(
+    decode: Callable[[list[tuple[str, bytes]], Callable[[bytes], Any]], list],
+    chunks: list[tuple[str, bytes]],
+    loads: Callable[[bytes], Any],
+) -> tuple[int, float]:
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    result = decode(chunks, loads)
+    elapsed = time.perf_counter() - started_at
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert result
+    return size, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--units-per-section", type=int, default=25)
+    parser.add_argument("--steps-per-lesson", type=int, default=20)
+    args = parser.parse_args()
+
+    objects = build_course_objects(
+        sections=args.sections,
+        units_per_section=args.units_per_section,
+        steps_per_lesson=args.steps_per_lesson,
+    )
+    steps = len(objects["steps"])
+    chunks = serialize_chunks(objects)
+    del objects
+
+    print(f"{steps} steps, {sum(len(body) for _, body in chunks) / 2**20:.1f} MiB of JSON")
+    print(f"fast decoder: {codec.DECODER_NAME}")
+
+    decoders = {"json": json.loads, codec.DECODER_NAME: codec.loads}
+    variants = [
+        (f"{kind} ({decoder})", decode, loads)
+        for kind, decode in [("dicts", decode_to_dicts), ("slotted models", decode_to_models)]
+        for decoder, loads in decoders.items()
+    ]
+
+    for name, decode, loads in variants:
+        size, elapsed = measure(decode, chunks, loads)
+        print(
+            f"{name:<28} {size / 2**20:>8.1f} MiB {size / steps:>8.0f} B/step "
+            f"{elapsed * 1000:>8.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
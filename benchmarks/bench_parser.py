@@ -0,0 +1,80 @@
+"""Микробенчмарк парсера запросов token_exchanger
+
+Сравнивает инкрементальный RequestParser со старым построчным разбором через
+StreamReader.readuntil на одном и том же наборе pipelined запросов
+
+    python -m benchmarks.bench_parser --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from stepik_conspect_helper.token_exchanger.parser import RequestParser
+from stepik_conspect_helper.token_exchanger.utils import (
+    extract_request_headers,
+    extract_request_start_line,
+)
+
+REQUEST = (
+    b"GET /auth?code=HZGGlezgHpAgaJ4ByaUYrSiymxzwHQ&state=abc%20def HTTP/1.1\r\n"
+    b"Host: 127.0.0.1:8080\r\n"
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/128.0\r\n"
+    b"Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n"
+    b"Accept-Language: ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3\r\n"
+    b"Accept-Encoding: gzip, deflate, br\r\n"
+    b"Connection: keep-alive\r\n"
+    b"Upgrade-Insecure-Requests: 1\r\n"
+    b"\r\n"
+)
+
+
+def bench_parser(payload: bytes, count: int, chunk_size: int) -> float:
+    parser = RequestParser()
+    parsed = 0
+
+    started_at = time.perf_counter()
+    for offset in range(0, len(payload), chunk_size):
+        parser.feed(payload[offset : offset + chunk_size])
+        while parser.parse() is not None:
+            parsed += 1
+    elapsed = time.perf_counter() - started_at
+
+    assert parsed == count
+    return elapsed
+
+
+async def bench_stream_reader(payload: bytes, count: int) -> float:
+    reader = asyncio.StreamReader(limit=len(payload) + 1)
+    reader.feed_data(payload)
+    reader.feed_eof()
+
+    started_at = time.perf_counter()
+    for _ in range(count):
+        await extract_request_start_line(reader)
+        await extract_request_headers(reader)
+    return time.perf_counter() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    payload = REQUEST * args.requests
+
+    results = {
+        f"RequestParser (chunks of {args.chunk_size}b)": bench_parser(
+            payload, args.requests, args.chunk_size
+        ),
+        "RequestParser (single buffer)": bench_parser(payload, args.requests, len(payload)),
+        "StreamReader.readuntil": asyncio.run(bench_stream_reader(payload, args.requests)),
+    }
+
+    for name, elapsed in results.items():
+        print(f"{name:<40} {args.requests / elapsed:>12,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Скорость рендера шагов по типам
+
+Для каждого типа шага из conspect.plugins рендерит одну и ту же пачку шагов
+синтетического курса, подменив им block.name, и печатает шаги в секунду. Тип
+unknown показывает цену запасного рендера для незарегистрированных типов
+
+    python -m benchmarks.bench_render --steps 5000
+"""
+
+import argparse
+import time
+from dataclasses import replace
+
+from benchmarks.synthetic import build_course_objects
+from stepik_conspect_helper.conspect.plugins import STEP_RENDERERS
+from stepik_conspect_helper.conspect.render import render_steps
+from stepik_conspect_helper.stepa.models import Step
+
+CODE_OPTIONS = {
+    "code_templates": {"python3": "", "java": "", "c++": ""},
+    "samples": [["1 2\n", "3\n"], ["10 -4\n", "6\n"]],
+}
+VIDEO_URL = "https://stepikvideo.blob.core.windows.net/video/1080.mp4"
+
+
+def make_steps(count: int) -> list[Step]:
+    objects = build_course_objects(sections=1, units_per_section=1, steps_per_lesson=count)
+    return [Step.from_api(obj) for obj in objects["steps"].values()]
+
+
+def bench_block(steps: list[Step], block_name: str, repeat: int) -> float:
+    steps = [
+        replace(step, block_name=block_name, options=CODE_OPTIONS, video_url=VIDEO_URL)
+        for step in steps
+    ]
+
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        render_steps(steps)
+        best = min(best, time.perf_counter() - started_at)
+    return len(steps) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    steps = make_steps(args.steps)
+    # по одному типу на плагин, синонимы вроде matching и sorting рендерятся одинаково
+    block_names = {renderer: name for name, renderer in reversed(STEP_RENDERERS.items())}
+
+    for block_name in [*block_names.values(), "unknown"]:
+        rate = bench_block(steps, block_name, args.repeat)
+        print(f"{block_name:<20} {rate:>12,.0f} steps/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Загрузка скачанного курса: JSON против бинарного снимка
+
+Синтетический курс сохраняется двумя способами: деревом моделей в JSON и снимком
+stepa.snapshot. Каждый сценарий запускается в отдельном процессе, чтобы пик RSS
+одного не влиял на другой. Меряется время от открытия файла до результата и прирост
+пикового RSS процесса относительно RSS перед загрузкой
+
+Сценарии:
+    one lesson - нужны скелет курса и шаги одного урока, как в предпросмотре
+    all steps  - обойти все шаги курса по порядку, как при сборке конспекта
+
+    python -m benchmarks.bench_snapshot --steps-per-lesson 20
+"""
+
+import argparse
+import dataclasses
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.synthetic import build_course_objects
+from stepik_conspect_helper.stepa import CourseSnapshot, write_snapshot
+from stepik_conspect_helper.stepa.models import Course, Lesson, Section, Step, Unit
+
+SCENARIOS = ("one lesson", "all steps")
+FORMATS = ("json", "snapshot")
+
+
+def build_course(objects: dict[str, dict[int, dict[str, Any]]]) -> Course:
+    """Собирает дерево моделей из ответов API так же, как это делает краулер"""
+
+    steps = {step_id: Step.from_api(obj) for step_id, obj in objects["steps"].items()}
+    lessons = {}
+    for lesson_id, obj in objects["lessons"].items():
+        lesson = Lesson.from_api(obj)
+        lesson.steps = [steps[step_id] for step_id in lesson.step_ids]
+        lessons[lesson_id] = lesson
+
+    (course_obj,) = objects["courses"].values()
+    course = Course.from_api(course_obj)
+    for section_id in course.section_ids:
+        section = Section.from_api(objects["sections"][section_id])
+        for unit_id in section.unit_ids:
+            unit = Unit.from_api(objects["units"][unit_id])
+            unit.lesson = lessons[unit.lesson_id]
+            section.units.append(unit)
+        course.sections.append(section)
+    return course
+
+
+def course_from_json(data: dict[str, Any]) -> Course:
+    sections = []
+    for section_data in data.pop("sections"):
+        units = []
+        for unit_data in section_data.pop("units"):
+            lesson_data = unit_data.pop("lesson")
+            steps = [Step(**step) for step in lesson_data.pop("steps")]
+            units.append(Unit(**unit_data, lesson=Lesson(**lesson_data, steps=steps)))
+        sections.append(Section(**section_data, units=units))
+    return Course(**data, sections=sections)
+
+
+def reset_peak_rss() -> int:
+    """Сбрасывает пик RSS процесса и возвращает текущий RSS
+
+    Пик после импортов выше, чем RSS перед загрузкой, поэтому без сброса рост
+    от загрузки в ru_maxrss был бы не виден. Сброс через clear_refs есть только
+    в Linux, в остальных системах база - пик на момент вызова
+    """
+
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        return peak_rss()
+    return _status_field("VmRSS")
+
+
+def peak_rss() -> int:
+    try:
+        return _status_field("VmHWM")
+    except OSError:
+        # без /proc: ru_maxrss, в macOS он в байтах
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _status_field(name: str) -> int:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(f"{name}:"):
+            return int(line.split()[1]) * 1024
+    raise OSError(f"{name} is missing in /proc/self/status")
+
+
+def run_scenario(fmt: str, scenario: str, path: Path) -> tuple[float, int]:
+    baseline = reset_peak_rss()
+    started_at = time.perf_counter()
+    decoded = 0
+
+    if fmt == "json":
+        course = course_from_json(json.loads(path.read_bytes()))
+        lessons = list(course.iter_lessons())
+        if scenario == "one lesson":
+            decoded = len(lessons[len(lessons) // 2].steps)
+        else:
+            decoded = sum(len(lesson.steps) for lesson in lessons)
+    else:
+        with CourseSnapshot(path) as snapshot:
+            if scenario == "one lesson":
+                lessons = list(snapshot.course.iter_lessons())
+                decoded = len(snapshot.lesson_steps(lessons[len(lessons) // 2]))
+            else:
+                decoded = sum(len(lesson.steps) for lesson in snapshot.iter_lessons())
+
+    elapsed = time.perf_counter() - started_at
+    assert decoded
+    return elapsed, peak_rss() - baseline
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--units-per-section", type=int, default=25)
+    parser.add_argument("--steps-per-lesson", type=int, default=20)
+    parser.add_argument("--child", nargs=3, metavar=("FORMAT", "SCENARIO", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        fmt, scenario, path = args.child
+        elapsed, rss = run_scenario(fmt, scenario, Path(path))
+        print(json.dumps({"elapsed": elapsed, "rss": rss}))
+        return
+
+    course = build_course(
+        build_course_objects(
+            sections=args.sections,
+            units_per_section=args.units_per_section,
+            steps_per_lesson=args.steps_per_lesson,
+        )
+    )
+    steps = sum(1 for _ in course.iter_steps())
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {
+            "json": Path(tmp_dir) / "course.json",
+            "snapshot": Path(tmp_dir) / "course.snapshot",
+        }
+        paths["json"].write_text(
+            json.dumps(dataclasses.asdict(course), ensure_ascii=False),
+            encoding="utf-8",
+        )
+        write_snapshot(course, paths["snapshot"])
+        del course
+
+        print(f"{steps} steps")
+        for fmt, path in paths.items():
+            print(f"{fmt:<10} {path.stat().st_size / 2**20:>8.1f} MiB on disk")
+
+        for scenario in SCENARIOS:
+            for fmt in FORMATS:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.bench_snapshot",
+                        "--child",
+                        fmt,
+                        scenario,
+                        str(paths[fmt]),
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f"{scenario:<12} {fmt:<10} {result['elapsed'] * 1000:>8.1f} ms "
+                    f"{result['rss'] / 2**20:>8.1f} MiB peak RSS growth"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Локальная замена stepik.org/api и oauth2/token для бенчмарков
+
+Отдает синтетический курс из benchmarks.synthetic так же, как настоящий API:
+?ids[]=... с ETag и If-None-Match, stepics/1 и client credentials токен, а по
+/_mock/stats - сколько запросов пришло и сколько из них сломано нарочно. Каждый
+ответ API можно задержать и с заданной вероятностью заменить на 429 или 5xx,
+случайность детерминирована seed, чтобы прогоны были сравнимы
+
+Запускается отдельным процессом, чтобы не делить CPU и память с измеряемым
+клиентом. Первой строкой в stdout печатает свой адрес
+
+    python -m benchmarks.mock_stepik --latency 0.02 --rate-429 0.02 --rate-5xx 0.01
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from aiohttp import web
+
+from benchmarks.synthetic import build_course_objects
+
+SERVER_ERRORS = (500, 502, 503, 504)
+
+
+@dataclass
+class FaultProfile:
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    # целые секунды, дробные parse_retry_after не понимает, как и RFC 9110
+    retry_after: int = 0
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    throttled: int = 0
+    failed: int = 0
+    not_modified: int = 0
+
+
+class MockStepikAPI:
+    def __init__(
+        self,
+        objects: dict[str, dict[int, dict[str, Any]]],
+        faults: FaultProfile | None = None,
+        seed: int = 0,
+    ) -> None:
+        # объекты сериализуются один раз, чтобы мок не был узким местом бенчмарка
+        self.encoded = {
+            resource: {object_id: json.dumps(obj) for object_id, obj in collection.items()}
+            for resource, collection in objects.items()
+        }
+        self.faults = faults or FaultProfile()
+        self.stats = MockStats()
+        self._random = random.Random(seed)
+
+    async def _delay_or_fail(self) -> web.Response | None:
+        self.stats.requests += 1
+        faults = self.faults
+        if faults.latency or faults.jitter:
+            await asyncio.sleep(faults.latency + self._random.uniform(0, faults.jitter))
+
+        roll = self._random.random()
+        if roll < faults.rate_429:
+            self.stats.throttled += 1
+            return web.Response(status=429, headers={"Retry-After": str(faults.retry_after)})
+        if roll < faults.rate_429 + faults.rate_5xx:
+            self.stats.failed += 1
+            return web.Response(status=self._random.choice(SERVER_ERRORS))
+        return None
+
+    async def handle_collection(self, request: web.Request) -> web.Response:
+        if (failure := await self._delay_or_fail()) is not None:
+            return failure
+
+        resource = request.match_info["resource"]
+        collection = self.encoded.get(resource, {})
+        ids = [int(object_id) for object_id in request.query.getall("ids[]", [])]
+        items = ",".join(collection[i] for i in ids if i in collection)
+        body = (
+            '{"meta": {"page": 1, "has_next": false, "has_previous": false}, '
+            f'"{resource}": [{items}]}}'
+        )
+        etag = f'"{hashlib.md5(body.encode()).hexdigest()}"'
+
+        if request.headers.get("If-None-Match") == etag:
+            self.stats.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    async def handle_stepics(self, request: web.Request) -> web.Response:
+        if (failure := await self._delay_or_fail()) is not None:
+            return failure
+        return web.json_response({"stepics": [{"id": 1, "user": 42}]})
+
+    async def handle_token(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "access_token": "benchmark-token",
+                "token_type": "Bearer",
+                "expires_in": 36000,
+                "scope": "read",
+            }
+        )
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(asdict(self.stats))
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_mock/stats", self.handle_stats)
+        app.router.add_get("/api/stepics/1", self.handle_stepics)
+        app.router.add_get("/api/{resource}", self.handle_collection)
+        app.router.add_post("/oauth2/token/", self.handle_token)
+        return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--units-per-section", type=int, default=25)
+    parser.add_argument("--steps-per-lesson", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка, с")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="доля ответов 5xx")
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def mock_arguments(args: argparse.Namespace) -> list[str]:
+    """Обратно в аргументы командной строки, для запуска мока подпроцессом"""
+
+    return [
+        f"--sections={args.sections}",
+        f"--units-per-section={args.units_per_section}",
+        f"--steps-per-lesson={args.steps_per_lesson}",
+        f"--latency={args.latency}",
+        f"--jitter={args.jitter}",
+        f"--rate-429={args.rate_429}",
+        f"--rate-5xx={args.rate_5xx}",
+        f"--retry-after={args.retry_after}",
+        f"--seed={args.seed}",
+    ]
+
+
+async def serve(args: argparse.Namespace) -> None:
+    api = MockStepikAPI(
+        build_course_objects(
+            sections=args.sections,
+            units_per_section=args.units_per_section,
+            steps_per_lesson=args.steps_per_lesson,
+        ),
+        FaultProfile(
+            latency=args.latency,
+            jitter=args.jitter,
+            rate_429=args.rate_429,
+            rate_5xx=args.rate_5xx,
+            retry_after=args.retry_after,
+        ),
+        seed=args.seed,
+    )
+    runner = web.AppRunner(api.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, args.host, args.port)
+    await site.start()
+
+    host, port = runner.addresses[0][:2]
+    print(f"http://{host}:{port}", flush=True)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
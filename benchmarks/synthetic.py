@@ -0,0 +1,108 @@
+"""Синтетический курс в виде ответов Stepik API для бенчмарков
+
+Похож на фикстуру из tests/conftest.py, но крупнее и с текстом шагов
+реалистичного размера
+"""
+
+from typing import Any
+
+STEP_TEXT = (
+    "<p>Шаг {step_id}: <b>асинхронный</b> обход дерева курса и "
+    "<code>asyncio.TaskGroup</code></p>"
+    "<ul><li>первый пункт списка</li><li>второй пункт со <i>ссылкой</i> "
+    '<a href="https://stepik.org/lesson/{lesson_id}">сюда</a></li></ul>'
+    "<pre><code>async with asyncio.TaskGroup() as tg:\n"
+    "    tg.create_task(crawl({step_id}))</code></pre>"
+)
+
+
+def build_course_objects(
+    course_id: int = 1,
+    sections: int = 20,
+    units_per_section: int = 25,
+    steps_per_lesson: int = 20,
+) -> dict[str, dict[int, dict[str, Any]]]:
+    """Собирает курс, по умолчанию 500 уроков и 10 000 шагов
+
+    Returns:
+        dict[str, dict[int, dict[str, Any]]]: коллекция -> id -> объект API
+    """
+
+    objects: dict[str, dict[int, dict[str, Any]]] = {
+        "courses": {},
+        "sections": {},
+        "units": {},
+        "lessons": {},
+        "steps": {},
+    }
+    section_ids = []
+    unit_id = lesson_id = step_id = 0
+
+    for section_position in range(1, sections + 1):
+        section_id = course_id * 1000 + section_position
+        section_ids.append(section_id)
+        unit_ids = []
+
+        for unit_position in range(1, units_per_section + 1):
+            unit_id += 1
+            lesson_id += 1
+            unit_ids.append(unit_id)
+            step_ids = []
+
+            for step_position in range(1, steps_per_lesson + 1):
+                step_id += 1
+                step_ids.append(step_id)
+                objects["steps"][step_id] = {
+                    "id": step_id,
+                    "lesson": lesson_id,
+                    "position": step_position,
+                    "status": "ready",
+                    "block": {
+                        "name": "text" if step_position % 5 else "choice",
+                        "text": STEP_TEXT.format(step_id=step_id, lesson_id=lesson_id),
+                        "video": None,
+                        "options": {},
+                    },
+                    "actions": {"submit": "#"},
+                    "progress": f"77-{step_id}",
+                    "subscriptions": [f"31-77-{step_id}", "30-77"],
+                    "instruction": None,
+                    "session": None,
+                    "instruction_type": None,
+                    "viewed_by": 1000 + step_id,
+                    "passed_by": 500 + step_id,
+                    "correct_ratio": 0.5,
+                    "worth": 1,
+                    "is_solutions_unlocked": False,
+                    "create_date": "2024-01-01T00:00:00Z",
+                    "update_date": "2025-01-01T00:00:00Z",
+                }
+
+            objects["lessons"][lesson_id] = {
+                "id": lesson_id,
+                "title": f"Урок {lesson_id}",
+                "steps": step_ids,
+                "update_date": "2025-01-01T00:00:00Z",
+            }
+            objects["units"][unit_id] = {
+                "id": unit_id,
+                "section": section_id,
+                "lesson": lesson_id,
+                "position": unit_position,
+            }
+
+        objects["sections"][section_id] = {
+            "id": section_id,
+            "course": course_id,
+            "title": f"Модуль {section_position}",
+            "position": section_position,
+            "units": unit_ids,
+        }
+
+    objects["courses"][course_id] = {
+        "id": course_id,
+        "title": f"Курс {course_id}",
+        "sections": section_ids,
+    }
+
+    return objects
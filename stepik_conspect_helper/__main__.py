@@ -0,0 +1,3 @@
+from stepik_conspect_helper.main import main
+
+main()
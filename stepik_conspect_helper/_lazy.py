@@ -0,0 +1,44 @@
+"""Ленивые реэкспорты пакетов (PEP 562)
+
+from stepik_conspect_helper.stepa import Lesson не должен тянуть за собой
+aiohttp только потому, что в том же пакете лежит клиент. Пакет объявляет, из какого
+подмодуля какое имя, а подмодуль импортируется при первом обращении к имени
+"""
+
+import importlib
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any
+
+
+def lazy_exports(
+    package: str,
+    exports: Mapping[str, Sequence[str]],
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """Делает __getattr__ и __dir__ для пакета
+
+    Args:
+        package (str): __name__ пакета
+        exports (Mapping[str, Sequence[str]]): подмодуль относительно пакета,
+            например .client -> имена, которые пакет отдает из него
+
+    Returns:
+        tuple[Callable[[str], Any], Callable[[], list[str]]]: __getattr__ и __dir__
+    """
+
+    modules = {name: module for module, names in exports.items() for name in names}
+    namespace = importlib.import_module(package).__dict__
+
+    def __getattr__(name: str) -> Any:
+        module = modules.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+        value = getattr(importlib.import_module(module, package), name)
+        # дальше имя находится обычным поиском, без __getattr__
+        namespace[name] = value
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted({*namespace, *modules})
+
+    return __getattr__, __dir__
@@ -0,0 +1,5 @@
+"""Реализации подкоманд CLI
+
+main импортирует отсюда только модуль запущенной команды, поэтому aiohttp, сервер
+и краулер грузятся лишь там, где они действительно нужны
+"""
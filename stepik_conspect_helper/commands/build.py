@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import webbrowser
+from collections.abc import Iterable
+from pathlib import Path
+
+from stepik_conspect_helper.commands.login import authorize
+from stepik_conspect_helper.conspect import (
+    BatchBuilder,
+    BuildStats,
+    ConspectBuilder,
+    ConspectExporter,
+    PreviewRenderer,
+    RenderCache,
+)
+from stepik_conspect_helper.conspect.batch import course_output_path
+from stepik_conspect_helper.conspect.writers import export_paths
+from stepik_conspect_helper.constants import (
+    TOKEN_EXCHANGE_SERVER_HOST,
+    TOKEN_EXCHANGE_SERVER_PORT,
+)
+from stepik_conspect_helper.metrics import registry
+from stepik_conspect_helper.search import SearchIndex
+from stepik_conspect_helper.stepa import (
+    Course,
+    CourseCrawler,
+    CourseSnapshot,
+    CrawlCheckpoint,
+    Lesson,
+    MediaDownloader,
+    MediaStore,
+    OAuthToken,
+    ResponseCache,
+    SnapshotCrawler,
+    StepikClient,
+    collect_media_urls,
+    write_snapshot,
+)
+from stepik_conspect_helper.token_exchanger import TokenExchangeServer
+
+
+def open_render_cache(args: argparse.Namespace) -> RenderCache | None:
+    return None if args.no_render_cache else RenderCache()
+
+
+def open_checkpoint(args: argparse.Namespace, course_id: int, path: Path) -> CrawlCheckpoint:
+    """Чекпоинт обхода для результата в path, с диска если просили --resume"""
+
+    checkpoint_path = CrawlCheckpoint.path_for(path)
+    if args.resume:
+        return CrawlCheckpoint.resume(checkpoint_path, course_id, every=args.checkpoint_every)
+
+    if checkpoint_path.exists():
+        print(
+            f"Есть чекпоинт прерванной сборки {checkpoint_path}, он будет перезаписан. "
+            "Чтобы продолжить ее, запустите с --resume"
+        )
+    return CrawlCheckpoint(checkpoint_path, course_id, every=args.checkpoint_every)
+
+
+def describe_build(stats: BuildStats) -> str:
+    return (
+        f"отрендерено шагов {stats.steps_rendered}, переиспользовано {stats.steps_reused}, "
+        f"одинаковых {stats.dedup_ratio:.0%} (сэкономлено {stats.render_cpu_seconds_saved:.1f} "
+        f"из {stats.render_cpu_seconds + stats.render_cpu_seconds_saved:.1f} с CPU)"
+    )
+
+
+async def export_course(
+    args: argparse.Namespace,
+    course_id: int,
+    output_path: Path,
+    crawler: CourseCrawler | SnapshotCrawler,
+    *,
+    course: Course | None = None,
+) -> None:
+    """Пишет курс во все args.formats за один обход, рядом с output_path"""
+
+    outputs = export_paths(output_path.with_suffix(""), args.formats)
+    result = await ConspectExporter(None, crawler=crawler).export(
+        course_id,
+        outputs,
+        course=course,
+    )
+
+    for file in result.files.values():
+        print(f"{file.path}: {file.size / 2**20:.1f} МиБ, {file.cpu_seconds:.1f} с CPU")
+    for export_format, exc in result.failed.items():
+        print(f"Формат {export_format} не собран: {exc}")
+    print(
+        f"Уроков {result.lessons}, шагов {result.steps}, собрано {len(result.files)} "
+        f"из {len(outputs)} форматов за {result.wall_time:.1f} с"
+    )
+
+
+async def serve_preview(token: OAuthToken, course_id: int) -> None:
+    """Держит сервер предпросмотра, пока процесс не прервут"""
+
+    cache = ResponseCache()
+    index = SearchIndex()
+    try:
+        async with StepikClient(token.access_token, cache=cache) as client:
+            server = TokenExchangeServer(
+                TOKEN_EXCHANGE_SERVER_HOST,
+                TOKEN_EXCHANGE_SERVER_PORT,
+                preview=PreviewRenderer(client),
+                search=index,
+                metrics=registry,
+            )
+            server_task = asyncio.create_task(server.listen())
+            await server.wait_listening()
+
+            url = (
+                f"http://{TOKEN_EXCHANGE_SERVER_HOST}:{TOKEN_EXCHANGE_SERVER_PORT}"
+                f"/course/{course_id}"
+            )
+            print(
+                f"Предпросмотр доступен на {url}, поиск на /search, метрики на /metrics, "
+                "Ctrl+C для выхода"
+            )
+            webbrowser.open_new(url)
+
+            await server_task
+    finally:
+        index.close()
+        cache.close()
+
+
+async def build_batch(token: OAuthToken, args: argparse.Namespace) -> None:
+    """Собирает все курсы из args.course_ids одной сессией и одним лимитом"""
+
+    cache = ResponseCache()
+    render_cache = open_render_cache(args)
+    try:
+        async with StepikClient(token.access_token, cache=cache) as client:
+            result = await BatchBuilder(
+                client,
+                workers=args.workers,
+                parallel_courses=args.parallel_courses,
+                render_cache=render_cache,
+            ).build_all(
+                args.course_ids,
+                args.output_dir,
+                incremental=not args.full,
+            )
+    finally:
+        if render_cache is not None:
+            render_cache.close()
+        cache.close()
+
+    for course_id, stats in result.built.items():
+        print(f"{course_output_path(args.output_dir, course_id)}: {describe_build(stats)}")
+    for course_id, exc in result.failed.items():
+        print(f"Курс {course_id} не собран: {exc}")
+    print(
+        f"Собрано {len(result.built)} из {len(args.course_ids)} курсов "
+        f"за {result.wall_time:.1f} с, общих уроков {result.shared_lessons}"
+    )
+
+
+async def download_media(lessons: Iterable[Lesson], media_dir: Path) -> None:
+    """Качает картинки и вложения шагов в контентно-адресуемое хранилище media_dir"""
+
+    urls = collect_media_urls(lessons)
+    store = MediaStore(media_dir)
+    try:
+        async with MediaDownloader(store) as downloader:
+            results = await downloader.download_all(urls)
+    finally:
+        store.close()
+
+    stats = downloader.stats
+    print(
+        f"Медиа в {media_dir}: ссылок {len(results)}, скачано {stats.downloaded} "
+        f"({stats.bytes_downloaded / 2**20:.1f} МиБ), уже были {stats.url_hits}, "
+        f"повторов содержимого {stats.content_duplicates}, ошибок {stats.failed}"
+    )
+
+
+async def save_snapshot(token: OAuthToken, args: argparse.Namespace) -> None:
+    """Скачивает курс со всеми шагами и сохраняет его снимком в args.save_snapshot"""
+
+    course_id, path = args.course_ids[0], args.save_snapshot
+    cache = ResponseCache()
+    try:
+        async with StepikClient(token.access_token, cache=cache) as client:
+            with open_checkpoint(args, course_id, path) as checkpoint:
+                course = await CourseCrawler(client, checkpoint=checkpoint).crawl(course_id)
+    finally:
+        cache.close()
+
+    size = write_snapshot(course, path)
+    print(f"Снимок курса сохранен в {path}: {size / 2**20:.1f} МиБ")
+
+
+async def build_from_snapshot(args: argparse.Namespace, path: Path) -> None:
+    """Собирает конспект из снимка, сеть и токен при этом не нужны"""
+
+    with CourseSnapshot(path) as snapshot:
+        course_id = snapshot.course.id
+        if args.course_ids and args.course_ids != [course_id]:
+            raise SystemExit(f"В снимке {path} курс {course_id}, а не {args.course_ids[0]}")
+
+        output_path = args.output or Path(f"course-{course_id}.md")
+        stats = None
+        if args.formats != ["md"]:
+            await export_course(
+                args,
+                course_id,
+                output_path,
+                SnapshotCrawler(snapshot),
+                course=snapshot.course,
+            )
+        else:
+            render_cache = open_render_cache(args)
+            try:
+                stats = await ConspectBuilder(
+                    None,
+                    workers=args.workers,
+                    crawler=SnapshotCrawler(snapshot),
+                    render_cache=render_cache,
+                ).build(
+                    course_id,
+                    output_path,
+                    incremental=not args.full,
+                    course=snapshot.course,
+                )
+            finally:
+                if render_cache is not None:
+                    render_cache.close()
+        if args.media_dir is not None:
+            await download_media(snapshot.iter_lessons(), args.media_dir)
+
+    if stats is not None:
+        print(f"Конспект сохранен в {output_path}: {describe_build(stats)}")
+
+
+async def export_from_stepik(
+    token: OAuthToken,
+    args: argparse.Namespace,
+    course_id: int,
+    output_path: Path,
+) -> None:
+    """Экспорт в несколько форматов прямо из Stepik, с чекпоинтом обхода как у сборки"""
+
+    cache = ResponseCache()
+    try:
+        async with StepikClient(token.access_token, cache=cache) as client:
+            with open_checkpoint(args, course_id, output_path) as checkpoint:
+                crawler = CourseCrawler(client, checkpoint=checkpoint)
+                await export_course(args, course_id, output_path, crawler)
+            if args.media_dir is not None:
+                course = await CourseCrawler(client).crawl(course_id)
+                await download_media(course.iter_lessons(), args.media_dir)
+    finally:
+        cache.close()
+
+
+async def run_build(args: argparse.Namespace) -> None:
+    if args.from_snapshot is not None:
+        await build_from_snapshot(args, args.from_snapshot)
+        return
+
+    token = await authorize(relogin=args.relogin)
+
+    if args.preview:
+        await serve_preview(token, args.course_ids[0])
+        return
+
+    if len(args.course_ids) > 1 or args.courses_file is not None:
+        await build_batch(token, args)
+        return
+
+    if args.save_snapshot is not None:
+        await save_snapshot(token, args)
+        await build_from_snapshot(args, args.save_snapshot)
+        return
+
+    course_id = args.course_ids[0]
+    output_path = args.output or Path(f"course-{course_id}.md")
+    if args.formats != ["md"]:
+        await export_from_stepik(token, args, course_id, output_path)
+        return
+
+    cache = ResponseCache()
+    render_cache = open_render_cache(args)
+    try:
+        async with StepikClient(token.access_token, cache=cache) as client:
+            with open_checkpoint(args, course_id, output_path) as checkpoint:
+                stats = await ConspectBuilder(
+                    client,
+                    workers=args.workers,
+                    crawler=CourseCrawler(client, checkpoint=checkpoint),
+                    render_cache=render_cache,
+                ).build(
+                    course_id,
+                    output_path,
+                    incremental=not args.full,
+                )
+            if args.media_dir is not None:
+                # ответы уже в кеше, так что повторный обход почти ничего не качает
+                course = await CourseCrawler(client).crawl(course_id)
+                await download_media(course.iter_lessons(), args.media_dir)
+    finally:
+        if render_cache is not None:
+            render_cache.close()
+        cache.close()
+
+    print(f"Конспект сохранен в {output_path}: {describe_build(stats)}")
@@ -0,0 +1,99 @@
+"""Состояние локальных кешей
+
+Команда для частых проверок из cron: только sqlite и файловая система, без aiohttp,
+и без создания файлов, если кешей еще нет
+"""
+
+import argparse
+import json
+from typing import Any
+
+from stepik_conspect_helper.conspect.rendercache import RENDER_CACHE_FILE_NAME, RenderCache
+from stepik_conspect_helper.dirs import user_cache_dir
+from stepik_conspect_helper.search.index import INDEX_FILE_NAME, SearchIndex
+from stepik_conspect_helper.stepa.cache import CACHE_FILE_NAME, ResponseCache
+
+
+def collect_cache_stats() -> dict[str, Any]:
+    cache_dir = user_cache_dir()
+    stats: dict[str, Any] = {}
+
+    cache_path = cache_dir / CACHE_FILE_NAME
+    stats["api_cache"] = {"path": str(cache_path), "exists": cache_path.exists()}
+    if cache_path.exists():
+        cache = ResponseCache(cache_path)
+        try:
+            stats["api_cache"]["file_size"] = cache_path.stat().st_size
+            stats["api_cache"]["resources"] = {
+                resource: resource_stats._asdict()
+                for resource, resource_stats in cache.resource_stats().items()
+            }
+        finally:
+            cache.close()
+
+    render_path = cache_dir / RENDER_CACHE_FILE_NAME
+    stats["render_cache"] = {"path": str(render_path), "exists": render_path.exists()}
+    if render_path.exists():
+        render_cache = RenderCache(render_path)
+        try:
+            stats["render_cache"]["file_size"] = render_path.stat().st_size
+            stats["render_cache"]["steps"] = len(render_cache)
+            stats["render_cache"]["size"] = render_cache.total_size()
+        finally:
+            render_cache.close()
+
+    index_path = cache_dir / INDEX_FILE_NAME
+    stats["search_index"] = {"path": str(index_path), "exists": index_path.exists()}
+    if index_path.exists():
+        index = SearchIndex(index_path)
+        try:
+            stats["search_index"]["file_size"] = index_path.stat().st_size
+            stats["search_index"]["steps"] = len(index)
+        finally:
+            index.close()
+
+    return stats
+
+
+def print_cache_stats(stats: dict[str, Any]) -> None:
+    api_cache = stats["api_cache"]
+    if not api_cache["exists"]:
+        print(f"Кеш ответов API: нет, {api_cache['path']}")
+    else:
+        print(
+            f"Кеш ответов API: {api_cache['path']}, "
+            f"{api_cache['file_size'] / 2**20:.1f} МиБ на диске"
+        )
+        for resource, resource_stats in api_cache["resources"].items():
+            print(
+                f"  {resource:<10} {resource_stats['objects']:>7} объектов, "
+                f"протухло {resource_stats['stale']:>7}, "
+                f"{resource_stats['size'] / 2**20:>7.1f} МиБ"
+            )
+
+    render_cache = stats["render_cache"]
+    if not render_cache["exists"]:
+        print(f"Кеш рендера шагов: нет, {render_cache['path']}")
+    else:
+        print(
+            f"Кеш рендера шагов: {render_cache['path']}, шагов {render_cache['steps']}, "
+            f"{render_cache['size'] / 2**20:.1f} МиБ Markdown, "
+            f"{render_cache['file_size'] / 2**20:.1f} МиБ на диске"
+        )
+
+    search_index = stats["search_index"]
+    if not search_index["exists"]:
+        print(f"Поисковый индекс: нет, {search_index['path']}")
+    else:
+        print(
+            f"Поисковый индекс: {search_index['path']}, шагов {search_index['steps']}, "
+            f"{search_index['file_size'] / 2**20:.1f} МиБ на диске"
+        )
+
+
+def run_cache(args: argparse.Namespace) -> None:
+    stats = collect_cache_stats()
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    else:
+        print_cache_stats(stats)
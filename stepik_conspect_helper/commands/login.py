@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import webbrowser
+
+import aiohttp
+
+from stepik_conspect_helper.constants import (
+    OAUTH_AUTH_CODE_RESPONSE_TYPE,
+    OAUTH_READ_SCOPE,
+    STEPIK_AUTHORIZATION_ENDPOINT,
+    STEPIK_OATH_REDIRECT_URI,
+    STEPIK_OAUTH_APP_CLIENT_ID,
+    TOKEN_EXCHANGE_LOGIN_TIMEOUT,
+    TOKEN_EXCHANGE_SERVER_HOST,
+    TOKEN_EXCHANGE_SERVER_PORT,
+    TOKEN_EXCHANGE_SERVER_SHUTDOWN_TIMEOUT,
+)
+from stepik_conspect_helper.stepa import OAuthToken, StepikClient, TokenStore, obtain_token
+from stepik_conspect_helper.stepa.constants import STEPICS_RESOURCE
+from stepik_conspect_helper.stepa.tokens import client_credentials_from_env
+from stepik_conspect_helper.token_exchanger import TokenExchangeServer
+
+
+async def login_via_browser() -> OAuthToken:
+    server = TokenExchangeServer(
+        TOKEN_EXCHANGE_SERVER_HOST,
+        TOKEN_EXCHANGE_SERVER_PORT,
+    )
+    server_task = asyncio.create_task(server.listen())
+    await server.wait_listening()
+
+    webbrowser.open_new(
+        (
+            f"{STEPIK_AUTHORIZATION_ENDPOINT}/?response_type={OAUTH_AUTH_CODE_RESPONSE_TYPE}"
+            f"&client_id={STEPIK_OAUTH_APP_CLIENT_ID}"
+            f"&redirect_uri={STEPIK_OATH_REDIRECT_URI}"
+            f"&scope={OAUTH_READ_SCOPE}"
+        )
+    )
+
+    try:
+        token = await server.wait_for_token(TOKEN_EXCHANGE_LOGIN_TIMEOUT)
+    except TimeoutError:
+        server_task.cancel()
+        raise
+
+    # сервер сам закроется, отдав /success, но если браузер туда не дошел - гасим
+    try:
+        await asyncio.wait_for(server_task, TOKEN_EXCHANGE_SERVER_SHUTDOWN_TIMEOUT)
+    except TimeoutError:
+        pass
+
+    return token
+
+
+async def authorize(*, relogin: bool = False) -> OAuthToken:
+    store = TokenStore()
+    if relogin:
+        store.clear()
+
+    async with aiohttp.ClientSession() as session:
+        return await obtain_token(
+            store,
+            session,
+            login_via_browser,
+            client_credentials=client_credentials_from_env(),
+        )
+
+
+async def run_login(args: argparse.Namespace) -> None:
+    """Получает и сохраняет токен, заодно проверяя его запросом к API"""
+
+    token = await authorize(relogin=args.relogin)
+
+    async with StepikClient(token.access_token) as client:
+        data = await client.get(f"{STEPICS_RESOURCE}/1")
+        current_user_id = data[STEPICS_RESOURCE][0]["user"]
+        print(f"Здарова #{current_user_id}!")
@@ -0,0 +1,97 @@
+"""Поиск по индексу
+
+Запрос к готовому индексу - это sqlite и разбор текста, поэтому клиент Stepik с
+aiohttp импортируется только когда надо скачать курсы в индекс
+"""
+
+import argparse
+from typing import TYPE_CHECKING
+
+from stepik_conspect_helper.constants import SEARCH_INDEX_BATCH_LESSONS
+from stepik_conspect_helper.search import IndexStats, SearchIndex, step_url
+from stepik_conspect_helper.stepa import CourseSnapshot
+
+if TYPE_CHECKING:
+    from stepik_conspect_helper.stepa import StepikClient
+
+
+async def update_search_index(
+    index: SearchIndex,
+    client: "StepikClient",
+    course_id: int,
+) -> None:
+    """Обновляет курс в индексе, качая шаги только измененных уроков"""
+
+    from stepik_conspect_helper.stepa import CourseCrawler
+
+    crawler = CourseCrawler(client)
+    course = await crawler.crawl_structure(course_id)
+
+    total = IndexStats()
+    step_ids: set[int] = set()
+    batch = []
+
+    def flush() -> None:
+        stats = index.index_lessons(batch)
+        total.steps_indexed += stats.steps_indexed
+        total.steps_unchanged += stats.steps_unchanged
+        batch.clear()
+
+    async for lesson in crawler.iter_lessons(course, fetch_steps=index.needs_steps):
+        step_ids.update(lesson.step_ids)
+        batch.append(lesson)
+        if len(batch) >= SEARCH_INDEX_BATCH_LESSONS:
+            flush()
+    flush()
+
+    total.steps_removed = index.sync_course(course_id, step_ids).steps_removed
+    print(
+        f"Курс {course_id} в индексе: разобрано шагов {total.steps_indexed}, "
+        f"без изменений {total.steps_unchanged}, удалено {total.steps_removed}"
+    )
+
+
+async def index_courses(index: SearchIndex, args: argparse.Namespace) -> None:
+    from stepik_conspect_helper.stepa import ResponseCache, StepikClient
+
+    cache = ResponseCache()
+    try:
+        if args.offline:
+            client = StepikClient("", cache=cache, offline=True)
+        else:
+            from stepik_conspect_helper.commands.login import authorize
+
+            token = await authorize(relogin=args.relogin)
+            client = StepikClient(token.access_token, cache=cache)
+        async with client:
+            for course_id in args.index_course:
+                await update_search_index(index, client, course_id)
+    finally:
+        cache.close()
+
+
+async def run_search(args: argparse.Namespace) -> None:
+    index = SearchIndex(args.index_file)
+    try:
+        for path in args.index_snapshot:
+            with CourseSnapshot(path) as snapshot:
+                stats = index.update_course(snapshot.course, snapshot.iter_lessons())
+            print(
+                f"Курс {snapshot.course.id} из {path} в индексе: "
+                f"разобрано шагов {stats.steps_indexed}, удалено {stats.steps_removed}"
+            )
+
+        if args.index_course:
+            await index_courses(index, args)
+
+        if args.query:
+            hits = index.search(args.query, limit=args.limit, course_ids=args.course)
+            if not hits:
+                print("Ничего не найдено")
+            for hit in hits:
+                print(
+                    f"{hit.score:6.2f}  {hit.lesson_title}, шаг {hit.position}  "
+                    f"{step_url(hit.lesson_id, hit.position)}"
+                )
+    finally:
+        index.close()
@@ -0,0 +1,42 @@
+"""Сборка и предпросмотр конспектов"""
+
+from typing import TYPE_CHECKING
+
+from stepik_conspect_helper._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .batch import BatchBuilder, BatchResult
+    from .builder import BuildStats, ConspectBuilder
+    from .export import ConspectExporter, ExportResult
+    from .manifest import Manifest
+    from .plugins import StepRenderer, register_step_renderer
+    from .preview import PreviewRenderer, RenderedPageCache
+    from .rendercache import RenderCache
+
+__all__ = [
+    "BatchBuilder",
+    "BatchResult",
+    "BuildStats",
+    "ConspectBuilder",
+    "ConspectExporter",
+    "ExportResult",
+    "Manifest",
+    "PreviewRenderer",
+    "RenderCache",
+    "RenderedPageCache",
+    "StepRenderer",
+    "register_step_renderer",
+]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        ".batch": ("BatchBuilder", "BatchResult"),
+        ".builder": ("BuildStats", "ConspectBuilder"),
+        ".export": ("ConspectExporter", "ExportResult"),
+        ".manifest": ("Manifest",),
+        ".plugins": ("StepRenderer", "register_step_renderer"),
+        ".preview": ("PreviewRenderer", "RenderedPageCache"),
+        ".rendercache": ("RenderCache",),
+    },
+)
@@ -0,0 +1,207 @@
+"""Пакетная сборка конспектов нескольких курсов в одном процессе
+
+Все курсы ходят в API через один клиент, то есть одну сессию с общим пулом
+соединений и общим лимитом частоты. Запросы разных курсов разводит FairScheduler,
+поэтому большой курс не забивает очередь маленьким. Сначала качаются скелеты всех
+курсов, по ним находятся уроки, которые встречаются в нескольких курсах сразу, и
+такие уроки качаются один раз на всех через LessonPool, а одинаковые шаги
+рендерятся один раз через общий RenderCache. Падение одного курса не останавливает
+сборку остальных
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from stepik_conspect_helper.conspect.builder import BuildStats, ConspectBuilder
+from stepik_conspect_helper.conspect.rendercache import RenderCache
+from stepik_conspect_helper.constants import (
+    STEPIK_API_CRAWL_CONCURRENCY,
+    STEPIK_API_CRAWL_WINDOW,
+    STEPIK_BATCH_PARALLEL_COURSES,
+)
+from stepik_conspect_helper.stepa import (
+    Course,
+    CourseCrawler,
+    FairScheduler,
+    LessonPool,
+    StepikClient,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    built: dict[int, BuildStats] = field(default_factory=dict)
+    failed: dict[int, Exception] = field(default_factory=dict)
+    shared_lessons: int = 0
+    lessons_deduplicated: int = 0
+    wall_time: float = 0.0
+
+
+def read_course_ids(path: Path) -> list[int]:
+    """Читает id курсов из файла
+
+    id разделяются пробелами, запятыми или переводами строк, все после # считается
+    комментарием
+
+    Raises:
+        ValueError: если в файле есть что-то кроме чисел
+
+    Returns:
+        list[int]: id в порядке появления
+    """
+
+    course_ids = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line, _, _ = line.partition("#")
+        course_ids.extend(int(token) for token in line.replace(",", " ").split())
+    return course_ids
+
+
+def course_output_path(output_dir: Path, course_id: int) -> Path:
+    return output_dir / f"course-{course_id}.md"
+
+
+class BatchBuilder:
+    def __init__(
+        self,
+        client: StepikClient,
+        *,
+        concurrency: int = STEPIK_API_CRAWL_CONCURRENCY,
+        window: int = STEPIK_API_CRAWL_WINDOW,
+        workers: int = 1,
+        parallel_courses: int = STEPIK_BATCH_PARALLEL_COURSES,
+        render_cache: RenderCache | None = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        if parallel_courses < 1:
+            raise ValueError("parallel_courses must be positive")
+
+        self.client = client
+        self.scheduler = FairScheduler(concurrency)
+        self.window = window
+        self.workers = workers
+        self.parallel_courses = parallel_courses
+        self.render_cache = render_cache
+
+    async def build_all(
+        self,
+        course_ids: Iterable[int],
+        output_dir: Path,
+        *,
+        incremental: bool = True,
+    ) -> BatchResult:
+        """Собирает конспекты всех курсов в output_dir/course-<id>.md
+
+        Args:
+            course_ids (Iterable[int]): id курсов, дубли схлопываются
+            output_dir (Path): папка для конспектов
+            incremental (bool): переиспользовать результаты прошлых сборок
+
+        Returns:
+            BatchResult: статистика по собранным курсам и ошибки по упавшим
+        """
+
+        started_at = time.perf_counter()
+        course_ids = list(dict.fromkeys(course_ids))
+        result = BatchResult()
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        structures = await asyncio.gather(
+            *(
+                CourseCrawler(
+                    self.client,
+                    scheduler=self.scheduler,
+                    flow=course_id,
+                ).crawl_structure(course_id)
+                for course_id in course_ids
+            ),
+            return_exceptions=True,
+        )
+
+        courses: dict[int, Course] = {}
+        for course_id, structure in zip(course_ids, structures):
+            if isinstance(structure, Exception):
+                logger.error("Course %s structure failed: %s", course_id, structure)
+                result.failed[course_id] = structure
+            elif isinstance(structure, BaseException):
+                raise structure
+            else:
+                courses[course_id] = structure
+
+        # урок, который встречается в одном курсе несколько раз, общим не считается
+        lesson_usage = Counter(
+            lesson_id
+            for course in courses.values()
+            for lesson_id in {unit.lesson_id for s in course.sections for unit in s.units}
+        )
+        lesson_pool = LessonPool(
+            lesson_id for lesson_id, usage in lesson_usage.items() if usage > 1
+        )
+        result.shared_lessons = len(lesson_pool.shared_ids)
+
+        semaphore = asyncio.Semaphore(self.parallel_courses)
+
+        async def build_course(executor: Executor | None, course: Course) -> None:
+            builder = ConspectBuilder(
+                self.client,
+                window=self.window,
+                workers=self.workers,
+                crawler=CourseCrawler(
+                    self.client,
+                    scheduler=self.scheduler,
+                    flow=course.id,
+                    lesson_pool=lesson_pool,
+                ),
+                executor=executor,
+                render_cache=self.render_cache,
+            )
+
+            async with semaphore:
+                try:
+                    result.built[course.id] = await builder.build(
+                        course.id,
+                        course_output_path(output_dir, course.id),
+                        incremental=incremental,
+                        course=course,
+                    )
+                except Exception as exc:
+                    logger.error("Course %s build failed: %s", course.id, exc)
+                    result.failed[course.id] = exc
+
+        with self._make_pool() as executor:
+            await asyncio.gather(
+                *(build_course(executor, course) for course in courses.values())
+            )
+
+        result.lessons_deduplicated = lesson_pool.hits
+        result.wall_time = time.perf_counter() - started_at
+        logger.info(
+            "Batch of %s courses done in %.2fs: %s failed, %s lessons shared",
+            len(course_ids),
+            result.wall_time,
+            len(result.failed),
+            result.shared_lessons,
+        )
+
+        return result
+
+    def _make_pool(self) -> Executor | nullcontext[None]:
+        if self.workers == 1:
+            return nullcontext()
+
+        # один пул на все курсы, иначе процессов было бы workers * parallel_courses
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
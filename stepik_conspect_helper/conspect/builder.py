@@ -0,0 +1,396 @@
+"""Сборка конспекта курса в Markdown файл
+
+Конспект пишется потоком: уроки приходят из краулера в порядке курса, рендерятся
+и сбрасываются на диск по одному, так что память не растет вместе с размером курса.
+Рендер HTML упирается в CPU, поэтому при workers > 1 он уезжает в пул процессов:
+каждый урок отправляется туда одной пачкой, а на диск уроки пишутся все равно
+строго по порядку
+
+Если рядом с конспектом лежит манифест прошлой сборки, сборка идет инкрементально:
+шаги уроков с прежним update_date не скачиваются вообще, неизменившиеся шаги
+копируются из старого файла как есть, а рендерятся только новые и измененные.
+Из них в рендер уходят только шаги с новым содержимым: повторы внутри урока и
+шаги, уже лежащие в RenderCache от других курсов и сборок, берутся готовыми
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from stepik_conspect_helper.conspect.manifest import Manifest
+from stepik_conspect_helper.conspect.render import (
+    RENDERER_VERSION,
+    render_course_header,
+    render_lesson_header,
+    render_section_header,
+    render_step_bodies,
+    wrap_step_body,
+)
+from stepik_conspect_helper.conspect.rendercache import RenderCache, RenderedStep, render_key
+from stepik_conspect_helper.constants import (
+    STEPIK_API_CRAWL_CONCURRENCY,
+    STEPIK_API_CRAWL_WINDOW,
+)
+from stepik_conspect_helper.metrics import RENDER_CPU_SECONDS, RENDER_STEPS, Metrics, registry
+from stepik_conspect_helper.stepa import (
+    Course,
+    CourseCrawler,
+    Lesson,
+    SnapshotCrawler,
+    Step,
+    StepikClient,
+)
+
+logger = logging.getLogger(__name__)
+
+_STEP_START_RE = re.compile(rb"^<!-- step (\d+) -->$")
+_STEP_END_RE = re.compile(rb"^<!-- /step (\d+) -->$")
+
+
+@dataclass
+class BuildStats:
+    steps_rendered: int = 0
+    steps_reused: int = 0
+    lessons_skipped: int = 0
+    # из steps_rendered: взяты у одинакового шага, а не отрендерены заново
+    steps_deduplicated: int = 0
+    render_cpu_seconds: float = 0.0
+    render_cpu_seconds_saved: float = 0.0
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Доля новых блоков шагов, которые не пришлось рендерить"""
+
+        return self.steps_deduplicated / self.steps_rendered if self.steps_rendered else 0.0
+
+
+def index_step_blocks(path: Path) -> dict[int, tuple[int, int]]:
+    """Находит блоки шагов в готовом конспекте
+
+    В память читается по одной строке, сами блоки не сохраняются
+
+    Args:
+        path (Path): путь к конспекту
+
+    Returns:
+        dict[int, tuple[int, int]]: id шага -> (смещение начала, смещение конца) блока
+            в байтах, вместе с маркерами и пустой строкой после блока
+    """
+
+    blocks = {}
+    started_at: dict[int, int] = {}
+    offset = 0
+
+    with path.open("rb") as file:
+        for line in file:
+            stripped = line.rstrip(b"\r\n")
+            if match := _STEP_START_RE.match(stripped):
+                started_at[int(match[1])] = offset
+            elif match := _STEP_END_RE.match(stripped):
+                step_id = int(match[1])
+                if step_id in started_at:
+                    # блок включает пустую строку-разделитель после маркера
+                    blocks[step_id] = (started_at.pop(step_id), offset + len(line) + 1)
+            offset += len(line)
+
+    return blocks
+
+
+class ConspectBuilder:
+    def __init__(
+        self,
+        client: StepikClient | None,
+        *,
+        concurrency: int = STEPIK_API_CRAWL_CONCURRENCY,
+        window: int = STEPIK_API_CRAWL_WINDOW,
+        workers: int = 1,
+        crawler: CourseCrawler | SnapshotCrawler | None = None,
+        executor: Executor | None = None,
+        metrics: Metrics | None = None,
+        render_cache: RenderCache | None = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        if client is None and crawler is None:
+            raise ValueError("either client or crawler is required")
+
+        self.client = client
+        self.crawler: CourseCrawler | SnapshotCrawler
+        if crawler is not None:
+            self.crawler = crawler
+        else:
+            assert client is not None
+            self.crawler = CourseCrawler(client, concurrency=concurrency)
+        self.window = window
+        self.workers = workers
+        # чужой пул не закрываем, им владеет тот, кто его передал
+        self.executor = executor
+        self.metrics = metrics or registry
+        # закрывает тот, кто создал, кеш обычно общий на несколько сборок
+        self.render_cache = render_cache
+        self.stats = BuildStats()
+
+        self._previous: Manifest | None = None
+        self._manifest: Manifest | None = None
+        self._blocks: dict[int, tuple[int, int]] = {}
+        self._source: BinaryIO | None = None
+
+    async def build(
+        self,
+        course_id: int,
+        output_path: Path,
+        *,
+        incremental: bool = True,
+        course: Course | None = None,
+    ) -> BuildStats:
+        """Собирает конспект курса и манифест к нему
+
+        Args:
+            course_id (int): id курса
+            output_path (Path): куда положить конспект
+            incremental (bool): переиспользовать результат прошлой сборки, если он есть
+            course (Course | None): уже скачанный скелет курса из crawl_structure
+
+        Returns:
+            BuildStats: сколько шагов отрендерено и сколько переиспользовано
+        """
+
+        self.stats = BuildStats()
+        manifest_path = Manifest.path_for(output_path)
+
+        previous = None
+        if incremental and output_path.exists():
+            previous = Manifest.load(manifest_path)
+            if previous is not None and (
+                previous.course_id != course_id
+                or previous.renderer_version != RENDERER_VERSION
+            ):
+                previous = None
+
+        blocks = index_step_blocks(output_path) if previous is not None else {}
+
+        def needs_steps(lesson: Lesson) -> bool:
+            if previous is None or previous.lessons.get(lesson.id) != lesson.update_date:
+                return True
+            if all(step_id in blocks for step_id in lesson.step_ids):
+                self.stats.lessons_skipped += 1
+                return False
+            return True
+
+        if course is None:
+            with self.metrics.stage("crawl"):
+                course = await self.crawler.crawl_structure(course_id)
+        lesson_sections = {
+            unit.lesson_id: index
+            for index, section in enumerate(course.sections)
+            for unit in section.units
+        }
+
+        manifest = Manifest(course_id=course_id, renderer_version=RENDERER_VERSION)
+        tmp_path = output_path.with_name(output_path.name + ".tmp")
+        self._previous, self._manifest, self._blocks = previous, manifest, blocks
+
+        with (
+            tmp_path.open("wb") as target,
+            output_path.open("rb") if blocks else nullcontext() as source,
+            self._make_pool() as pool,
+        ):
+            self._source = source
+            target.write(render_course_header(course).encode())
+            sections_written = 0
+
+            # уроки, отправленные в рендер, но еще не записанные; пишем только голову
+            pending: deque[tuple[Lesson, list[Step], asyncio.Future[list[str]]]] = deque()
+
+            async def write_head() -> None:
+                nonlocal sections_written
+
+                lesson, steps, rendering = pending.popleft()
+                with self.metrics.stage("render"):
+                    rendered = dict(zip((step.id for step in steps), await rendering))
+
+                with self.metrics.stage("write"):
+                    while sections_written <= lesson_sections[lesson.id]:
+                        section = course.sections[sections_written]
+                        target.write(render_section_header(section).encode())
+                        sections_written += 1
+
+                    target.writelines(self._lesson_chunks(lesson, rendered))
+                    target.flush()
+
+            # стадии идут внахлест, поэтому краул меряем по ожиданию каждого урока
+            lessons = aiter(
+                self.crawler.iter_lessons(
+                    course,
+                    fetch_steps=needs_steps,
+                    window=self.window,
+                )
+            )
+            while True:
+                with self.metrics.stage("crawl"):
+                    lesson = await anext(lessons, None)
+                if lesson is None:
+                    break
+
+                steps = self._steps_to_render(lesson)
+                pending.append((lesson, steps, self._submit(pool, steps)))
+
+                while pending and (
+                    len(pending) > self.workers * 2 or pending[0][2].done()
+                ):
+                    await write_head()
+
+            while pending:
+                await write_head()
+
+            for section in course.sections[sections_written:]:
+                target.write(render_section_header(section).encode())
+
+        self._source = None
+
+        with self.metrics.stage("write"):
+            os.replace(tmp_path, output_path)
+            manifest.save(manifest_path)
+
+        logger.info(
+            "Conspect for course %s written to %s: %s steps rendered "
+            "(%s deduplicated, %.2fs CPU saved), %s reused",
+            course_id,
+            output_path,
+            self.stats.steps_rendered,
+            self.stats.steps_deduplicated,
+            self.stats.render_cpu_seconds_saved,
+            self.stats.steps_reused,
+        )
+
+        return self.stats
+
+    def _make_pool(self) -> Executor | nullcontext[Executor | None]:
+        if self.executor is not None or self.workers == 1:
+            return nullcontext(self.executor)
+
+        # spawn вместо fork: форкать процесс с запущенным event loop небезопасно
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _submit(
+        self,
+        pool: Executor | None,
+        steps: list[Step],
+    ) -> asyncio.Future[list[str]]:
+        """Отправляет шаги в рендер, каждое содержимое рендерится не больше одного раза"""
+
+        loop = asyncio.get_running_loop()
+        keys = [render_key(step) for step in steps]
+        cached = self.render_cache.get_many(set(keys)) if self.render_cache is not None else {}
+        misses = {key: step for key, step in zip(keys, steps) if key not in cached}
+
+        if pool is not None and misses:
+            rendering = loop.run_in_executor(pool, render_step_bodies, list(misses.values()))
+            return asyncio.ensure_future(self._collect(steps, keys, cached, misses, rendering))
+
+        future = loop.create_future()
+        with self.metrics.stage("render"):
+            bodies = render_step_bodies(list(misses.values()))
+        future.set_result(self._assemble(steps, keys, cached, misses, bodies))
+        return future
+
+    async def _collect(
+        self,
+        steps: list[Step],
+        keys: list[str],
+        cached: dict[str, RenderedStep],
+        misses: dict[str, Step],
+        rendering: asyncio.Future[list[tuple[str, float]]],
+    ) -> list[str]:
+        return self._assemble(steps, keys, cached, misses, await rendering)
+
+    def _assemble(
+        self,
+        steps: list[Step],
+        keys: list[str],
+        cached: dict[str, RenderedStep],
+        misses: dict[str, Step],
+        bodies: list[tuple[str, float]],
+    ) -> list[str]:
+        """Раскладывает отрендеренное по шагам и запоминает новое в render_cache
+
+        Returns:
+            list[str]: блоки с маркерами в порядке steps
+        """
+
+        fresh = {key: RenderedStep(*body) for key, body in zip(misses, bodies)}
+        if self.render_cache is not None and fresh:
+            self.render_cache.put_many(fresh.items())
+
+        blocks = []
+        counted: set[str] = set()
+        for key, step in zip(keys, steps):
+            if key in fresh and key not in counted:
+                counted.add(key)
+                entry = fresh[key]
+                self.stats.render_cpu_seconds += entry.cpu_seconds
+                self.metrics.inc(RENDER_STEPS, result="rendered")
+                self.metrics.inc(RENDER_CPU_SECONDS, entry.cpu_seconds, kind="spent")
+            else:
+                entry = fresh.get(key) or cached[key]
+                self.stats.steps_deduplicated += 1
+                self.stats.render_cpu_seconds_saved += entry.cpu_seconds
+                self.metrics.inc(RENDER_STEPS, result="deduplicated")
+                self.metrics.inc(RENDER_CPU_SECONDS, entry.cpu_seconds, kind="saved")
+            blocks.append(wrap_step_body(step.id, entry.body))
+        return blocks
+
+    def _is_reusable(self, step_id: int, step: Step | None) -> bool:
+        if step_id not in self._blocks:
+            return False
+        if step is None:
+            return True
+        return self._previous is not None and (
+            self._previous.steps.get(step_id) == step.update_date
+        )
+
+    def _steps_to_render(self, lesson: Lesson) -> list[Step]:
+        return [step for step in lesson.steps if not self._is_reusable(step.id, step)]
+
+    def _lesson_chunks(
+        self,
+        lesson: Lesson,
+        rendered: dict[int, str],
+    ) -> Iterator[bytes]:
+        """Собирает урок по кускам из свежеотрендеренных и старых блоков"""
+
+        assert self._manifest is not None
+
+        self._manifest.lessons[lesson.id] = lesson.update_date
+        yield render_lesson_header(lesson).encode()
+
+        steps = {step.id: step for step in lesson.steps}
+        for step_id in lesson.step_ids:
+            step = steps.get(step_id)
+
+            if step_id in rendered:
+                assert step is not None
+                yield rendered[step_id].encode()
+                self._manifest.steps[step_id] = step.update_date
+                self.stats.steps_rendered += 1
+            elif self._is_reusable(step_id, step):
+                assert self._source is not None
+                start, end = self._blocks[step_id]
+                self._source.seek(start)
+                yield self._source.read(end - start)
+
+                previous_date = self._previous.steps.get(step_id) if self._previous else None
+                self._manifest.steps[step_id] = previous_date or ""
+                self.stats.steps_reused += 1
@@ -0,0 +1,237 @@
+"""Экспорт курса сразу в несколько форматов за один обход
+
+Курс скачивается и разбирается в дерево stepa один раз, а каждый урок раздается
+всем писателям из conspect.writers сразу. Писатель на формат живет в своем процессе
+пула и читает уроки из своей очереди, так что md, html и epub пишутся параллельно,
+каждый потоком в свой файл. Очереди ограничены: если самый медленный писатель
+отстал на EXPORT_QUEUE_SIZE уроков, обход ждет его, и память не растет вместе с
+курсом. В итоге экспорт в несколько форматов стоит одного обхода плюс самого
+медленного писателя, а не их суммы. На машине с одним ядром писатели живут в
+потоках: обход все равно идет внахлест с ними, а запуск процессов там чистый убыток
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from collections.abc import Mapping
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from stepik_conspect_helper.conspect.writers import (
+    WRITERS,
+    ExportedFile,
+    LessonQueue,
+    init_writer_worker,
+    run_writer,
+    run_writer_in_worker,
+)
+from stepik_conspect_helper.constants import (
+    EXPORT_QUEUE_SIZE,
+    STEPIK_API_CRAWL_CONCURRENCY,
+    STEPIK_API_CRAWL_WINDOW,
+)
+from stepik_conspect_helper.metrics import Metrics, registry
+from stepik_conspect_helper.stepa import (
+    Course,
+    CourseCrawler,
+    Lesson,
+    SnapshotCrawler,
+    StepikClient,
+)
+
+logger = logging.getLogger(__name__)
+
+# вместо урока в очереди: None - курс закончился, _ABORTED - обход упал
+_ABORTED = "aborted"
+
+
+@dataclass
+class ExportResult:
+    files: dict[str, ExportedFile] = field(default_factory=dict)
+    failed: dict[str, Exception] = field(default_factory=dict)
+    lessons: int = 0
+    steps: int = 0
+    wall_time: float = 0.0
+
+
+def _feed(lessons: LessonQueue, writer: Future[ExportedFile], item: Lesson | str | None) -> None:
+    # упавший писатель очередь больше не читает, ждать места в ней бессмысленно
+    while not writer.done():
+        try:
+            lessons.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+class ConspectExporter:
+    def __init__(
+        self,
+        client: StepikClient | None,
+        *,
+        concurrency: int = STEPIK_API_CRAWL_CONCURRENCY,
+        window: int = STEPIK_API_CRAWL_WINDOW,
+        crawler: CourseCrawler | SnapshotCrawler | None = None,
+        executor: Executor | None = None,
+        queue_size: int = EXPORT_QUEUE_SIZE,
+        metrics: Metrics | None = None,
+    ) -> None:
+        if queue_size < 1:
+            raise ValueError("queue_size must be positive")
+        if isinstance(executor, ProcessPoolExecutor):
+            raise ValueError("executor must run writers in threads, processes are started here")
+        if client is None and crawler is None:
+            raise ValueError("either client or crawler is required")
+
+        self.crawler: CourseCrawler | SnapshotCrawler
+        if crawler is not None:
+            self.crawler = crawler
+        else:
+            assert client is not None
+            self.crawler = CourseCrawler(client, concurrency=concurrency)
+        self.window = window
+        # пул потоков вместо своих процессов, например в тестах. Чужой пул не
+        # закрываем; писатель занимает воркер на весь экспорт, так что воркеров в нем
+        # должно быть не меньше, чем форматов
+        self.executor = executor
+        self.queue_size = queue_size
+        self.metrics = metrics or registry
+
+    async def export(
+        self,
+        course_id: int,
+        outputs: Mapping[str, Path],
+        *,
+        course: Course | None = None,
+    ) -> ExportResult:
+        """Скачивает курс один раз и пишет его во все форматы outputs одновременно
+
+        Упавший писатель не останавливает остальные, а упавший обход отменяет все
+
+        Args:
+            course_id (int): id курса
+            outputs (Mapping[str, Path]): формат -> путь к файлу, см. export_paths
+            course (Course | None): уже скачанный скелет курса из crawl_structure
+
+        Raises:
+            ValueError: если формат не из WRITERS
+
+        Returns:
+            ExportResult: готовые и упавшие файлы
+        """
+
+        if unknown := set(outputs) - set(WRITERS):
+            raise ValueError(f"unknown export formats: {', '.join(sorted(unknown))}")
+
+        started_at = time.perf_counter()
+        result = ExportResult()
+        if course is None:
+            with self.metrics.stage("crawl"):
+                course = await self.crawler.crawl_structure(course_id)
+
+        with ExitStack() as stack:
+            queues, writers = self._start_writers(stack, course, outputs)
+
+            async def broadcast(item: Lesson | str | None) -> None:
+                await asyncio.gather(
+                    *(
+                        asyncio.to_thread(_feed, queues[export_format], writer, item)
+                        for export_format, writer in writers.items()
+                    )
+                )
+
+            lessons = aiter(self.crawler.iter_lessons(course, window=self.window))
+            try:
+                while True:
+                    with self.metrics.stage("crawl"):
+                        lesson = await anext(lessons, None)
+                    if lesson is None:
+                        break
+
+                    result.lessons += 1
+                    result.steps += len(lesson.steps)
+                    # ждем тут только если самый медленный писатель отстал на всю очередь
+                    with self.metrics.stage("write"):
+                        await broadcast(lesson)
+            except BaseException:
+                await broadcast(_ABORTED)
+                await asyncio.gather(
+                    *map(asyncio.wrap_future, writers.values()),
+                    return_exceptions=True,
+                )
+                raise
+
+            await broadcast(None)
+            with self.metrics.stage("write"):
+                done = await asyncio.gather(
+                    *map(asyncio.wrap_future, writers.values()),
+                    return_exceptions=True,
+                )
+
+        for export_format, file in zip(writers, done):
+            if isinstance(file, Exception):
+                logger.error(
+                    "Export of course %s to %s failed: %s", course_id, export_format, file
+                )
+                result.failed[export_format] = file
+            elif isinstance(file, BaseException):
+                raise file
+            else:
+                result.files[export_format] = file
+
+        result.wall_time = time.perf_counter() - started_at
+        logger.info(
+            "Course %s exported to %s in %.2fs",
+            course_id,
+            ", ".join(result.files) or "nothing",
+            result.wall_time,
+        )
+        return result
+
+    def _start_writers(
+        self,
+        stack: ExitStack,
+        course: Course,
+        outputs: Mapping[str, Path],
+    ) -> tuple[dict[str, LessonQueue], dict[str, Future[ExportedFile]]]:
+        """Запускает писателей в пуле, у каждого своя очередь уроков"""
+
+        executor = self.executor
+        if executor is None and (os.cpu_count() or 1) < 2:
+            # на одном ядре процессы ничего не распараллелят, только заплатят за запуск
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=len(outputs)))
+
+        if executor is not None:
+            queues: dict[str, LessonQueue] = {
+                export_format: queue.Queue(self.queue_size) for export_format in outputs
+            }
+            return queues, {
+                export_format: executor.submit(
+                    run_writer, export_format, path, course, queues[export_format]
+                )
+                for export_format, path in outputs.items()
+            }
+
+        # spawn вместо fork: форкать процесс с запущенным event loop небезопасно
+        context = multiprocessing.get_context("spawn")
+        queues = {export_format: context.Queue(self.queue_size) for export_format in outputs}
+        for lessons in queues.values():
+            # к выходу все уроки уже прочитаны или читать их некому, ждать тут нечего
+            lessons.cancel_join_thread()
+        pool = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=len(outputs),
+                mp_context=context,
+                initializer=init_writer_worker,
+                initargs=(queues,),
+            )
+        )
+        return queues, {
+            export_format: pool.submit(run_writer_in_worker, export_format, path, course)
+            for export_format, path in outputs.items()
+        }
@@ -0,0 +1,232 @@
+"""Конвертер HTML из block.text шагов в Markdown
+
+Поддерживает только то, что реально встречается в шагах Stepik: абзацы, заголовки,
+выделение, ссылки, картинки, списки, код и простые таблицы. Все незнакомые теги
+выкидываются, их текст остается
+"""
+
+import html
+import re
+from html.parser import HTMLParser
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+_BLOCK_TAGS = {"p", "div", "blockquote", "table", "figure"}
+_HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+
+class _MarkdownConverter(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._lists: list[list] = []
+        self._href_stack: list[str | None] = []
+        self._in_pre = False
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        attributes = dict(attrs)
+
+        match tag:
+            case _ if tag in _BLOCK_TAGS:
+                self._break(2)
+            case _ if tag in _HEADING_TAGS:
+                self._break(2)
+                self.parts.append("#" * _HEADING_TAGS[tag] + " ")
+            case "br":
+                self.parts.append("\n")
+            case "b" | "strong":
+                self.parts.append("**")
+            case "i" | "em":
+                self.parts.append("*")
+            case "code" if not self._in_pre:
+                self.parts.append("`")
+            case "pre":
+                self._break(2)
+                self.parts.append("```\n")
+                self._in_pre = True
+            case "ul" | "ol":
+                if not self._lists:
+                    self._break(2)
+                self._lists.append([tag, 0])
+            case "li":
+                self._break(1)
+                indent = "  " * (len(self._lists) - 1)
+                if self._lists and self._lists[-1][0] == "ol":
+                    self._lists[-1][1] += 1
+                    self.parts.append(f"{indent}{self._lists[-1][1]}. ")
+                else:
+                    self.parts.append(f"{indent}- ")
+            case "a":
+                self._href_stack.append(attributes.get("href"))
+                self.parts.append("[")
+            case "img":
+                alt = attributes.get("alt") or ""
+                self.parts.append(f"![{alt}]({attributes.get('src') or ''})")
+            case "tr":
+                self._break(1)
+                self.parts.append("|")
+            case "td" | "th":
+                self.parts.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        match tag:
+            case _ if tag in _BLOCK_TAGS or tag in _HEADING_TAGS:
+                self._break(2)
+            case "b" | "strong":
+                self.parts.append("**")
+            case "i" | "em":
+                self.parts.append("*")
+            case "code" if not self._in_pre:
+                self.parts.append("`")
+            case "pre":
+                if self.parts and not self.parts[-1].endswith("\n"):
+                    self.parts.append("\n")
+                self.parts.append("```")
+                self._in_pre = False
+                self._break(2)
+            case "ul" | "ol":
+                if self._lists:
+                    self._lists.pop()
+                self._break(2 if not self._lists else 1)
+            case "a":
+                href = self._href_stack.pop() if self._href_stack else None
+                self.parts.append(f"]({href})" if href else "]")
+            case "td" | "th":
+                self.parts.append(" |")
+
+    def handle_data(self, data: str) -> None:
+        if self._in_pre:
+            self.parts.append(data)
+            return
+
+        text = _WHITESPACE_RE.sub(" ", data)
+        if not self.parts or self.parts[-1].endswith("\n"):
+            text = text.lstrip()
+        if text.strip() or (self.parts and not self.parts[-1].endswith((" ", "\n"))):
+            self.parts.append(text)
+
+    def _break(self, lines: int) -> None:
+        self.parts.append("\n" * lines)
+
+
+def html_to_markdown(html: str) -> str:
+    """Переводит HTML шага в Markdown
+
+    Args:
+        html (str): содержимое block.text
+
+    Returns:
+        str: Markdown без ведущих и хвостовых пустых строк
+    """
+
+    converter = _MarkdownConverter()
+    converter.feed(html)
+    converter.close()
+
+    text = "".join(converter.parts)
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+# теги без содержимого, в XHTML они обязаны закрываться сами
+_VOID_TAGS = {"area", "base", "br", "col", "hr", "img", "input", "link", "meta", "source", "wbr"}
+# содержимое этих тегов в экспорт не попадает вообще
+_DROPPED_TAGS = {"script", "style", "iframe", "object", "embed"}
+# открытие этих тегов неявно закрывает предыдущий такой же внутри того же родителя
+_IMPLIED_END_TAGS = {
+    "li": ({"li"}, {"ul", "ol"}),
+    "dt": ({"dt", "dd"}, {"dl"}),
+    "dd": ({"dt", "dd"}, {"dl"}),
+    "tr": ({"tr"}, {"table", "thead", "tbody", "tfoot"}),
+    "td": ({"td", "th"}, {"tr"}),
+    "th": ({"td", "th"}, {"tr"}),
+}
+# а эти закрывают незакрытый абзац, внутри <p> они не бывают
+_CLOSES_PARAGRAPH = {
+    "p", "div", "ul", "ol", "dl", "table", "pre", "blockquote", "figure", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+}
+
+
+class _XhtmlSerializer(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._open: list[str] = []
+        self._dropping = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in _DROPPED_TAGS:
+            self._dropping += 1
+            return
+        if self._dropping:
+            return
+
+        attributes = "".join(
+            f' {name}="{html.escape(value or name)}"'
+            for name, value in attrs
+            if not name.startswith("on")
+        )
+        self._close_implied(tag)
+        if tag in _VOID_TAGS:
+            self.parts.append(f"<{tag}{attributes} />")
+        else:
+            self.parts.append(f"<{tag}{attributes}>")
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS and not self._dropping and self._open[-1:] == [tag]:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _DROPPED_TAGS:
+            self._dropping = max(self._dropping - 1, 0)
+            return
+        if self._dropping or tag not in self._open:
+            return
+
+        # незакрытые внутри теги вроде <p> и <li> закрываются вместе с ним
+        while (opened := self._open.pop()) != tag:
+            self.parts.append(f"</{opened}>")
+        self.parts.append(f"</{tag}>")
+
+    def handle_data(self, data: str) -> None:
+        if not self._dropping:
+            self.parts.append(html.escape(data, quote=False))
+
+    def _close_implied(self, tag: str) -> None:
+        if tag in _CLOSES_PARAGRAPH and self._open[-1:] == ["p"]:
+            self.handle_endtag("p")
+        if tag not in _IMPLIED_END_TAGS:
+            return
+
+        closed, parents = _IMPLIED_END_TAGS[tag]
+        for opened in reversed(self._open):
+            if opened in parents:
+                return
+            if opened in closed:
+                self.handle_endtag(opened)
+                return
+
+
+def html_to_xhtml(text: str) -> str:
+    """Приводит HTML шага к корректному XHTML фрагменту
+
+    Пустые теги самозакрываются, незакрытые закрываются, лишние закрывающие теги,
+    скрипты и обработчики событий выкидываются. Нужен для EPUB, где читалки не
+    прощают того, что прощает браузер
+
+    Args:
+        text (str): содержимое block.text
+
+    Returns:
+        str: фрагмент XHTML без корневого элемента
+    """
+
+    serializer = _XhtmlSerializer()
+    serializer.feed(text)
+    serializer.close()
+    serializer.parts.extend(f"</{tag}>" for tag in reversed(serializer._open))
+    return "".join(serializer.parts)
@@ -0,0 +1,77 @@
+"""Манифест последней сборки конспекта
+
+Хранит update_date всех уроков и шагов, попавших в конспект, чтобы следующая
+сборка могла перекачать и перерендерить только то, что поменялось
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Self
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FORMAT_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+@dataclass
+class Manifest:
+    course_id: int
+    renderer_version: int
+    lessons: dict[int, str] = field(default_factory=dict)
+    steps: dict[int, str] = field(default_factory=dict)
+
+    @staticmethod
+    def path_for(output_path: Path) -> Path:
+        return output_path.with_name(output_path.name + MANIFEST_SUFFIX)
+
+    @classmethod
+    def load(cls, path: Path) -> Self | None:
+        """Читает манифест с диска
+
+        Битый или несовместимый манифест равносилен его отсутствию
+
+        Args:
+            path (Path): путь к файлу манифеста
+
+        Returns:
+            Self | None: манифест или None, если пользоваться нечем
+        """
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data["version"] != MANIFEST_FORMAT_VERSION:
+                return None
+
+            return cls(
+                course_id=data["course_id"],
+                renderer_version=data["renderer_version"],
+                lessons={int(k): v for k, v in data["lessons"].items()},
+                steps={int(k): v for k, v in data["steps"].items()},
+            )
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            logger.warning("Ignoring broken manifest %s: %s", path, exc)
+            return None
+
+    def save(self, path: Path) -> None:
+        """Атомарно пишет манифест на диск"""
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "version": MANIFEST_FORMAT_VERSION,
+                    "course_id": self.course_id,
+                    "renderer_version": self.renderer_version,
+                    "lessons": self.lessons,
+                    "steps": self.steps,
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, path)
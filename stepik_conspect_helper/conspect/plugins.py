@@ -0,0 +1,141 @@
+"""Плагины рендера шагов по типу блока
+
+Stepik отдает тип шага в block.name: text, code, choice, matching, video и еще
+десяток. Для каждого типа здесь зарегистрирована функция, которая превращает шаг
+в Markdown без маркеров. Новый тип добавляется декоратором register_step_renderer,
+а для незарегистрированных типов берется render_unknown_step: та же подпись с типом
+и текст шага, без поиска и исключений
+
+Реестр заполняется при импорте модуля, поэтому рендер работает и в процессах пула
+"""
+
+from collections.abc import Callable, Iterator
+
+from stepik_conspect_helper.conspect.html import html_to_markdown
+from stepik_conspect_helper.conspect.templates import (
+    CODE_LANGUAGES,
+    CODE_SAMPLE,
+    STEP_LABEL,
+    VIDEO_LINK,
+    compile_template,
+)
+from stepik_conspect_helper.stepa.models import Step, StepikObject
+
+type StepRenderer = Callable[[Step], str]
+
+# block.name -> рендер
+STEP_RENDERERS: dict[str, StepRenderer] = {}
+
+# подписи для шагов-заданий, ответы на которые в конспект не попадают
+QUIZ_LABELS = {
+    "choice": "Тест",
+    "matching": "Сопоставление",
+    "sorting": "Сортировка",
+    "number": "Числовой ответ",
+    "string": "Текстовый ответ",
+    "math": "Математический ответ",
+    "free-answer": "Свободный ответ",
+    "fill-blanks": "Пропуски",
+    "table": "Таблица",
+}
+# подписи всех типов, кроме обычного текста, он идет без подписи
+STEP_LABELS = {**QUIZ_LABELS, "video": "Видео", "code": "Задача на программирование"}
+
+_step_label = compile_template(STEP_LABEL)
+_video_link = compile_template(VIDEO_LINK)
+_code_languages = compile_template(CODE_LANGUAGES)
+_code_sample = compile_template(CODE_SAMPLE)
+
+
+def register_step_renderer(*block_names: str) -> Callable[[StepRenderer], StepRenderer]:
+    """Регистрирует рендер для одного или нескольких типов шагов
+
+    Повторная регистрация типа заменяет прежний рендер
+
+    Args:
+        *block_names (str): значения block.name
+
+    Returns:
+        Callable[[StepRenderer], StepRenderer]: декоратор, возвращающий функцию как есть
+    """
+
+    def decorator(renderer: StepRenderer) -> StepRenderer:
+        for block_name in block_names:
+            STEP_RENDERERS[block_name] = renderer
+        return renderer
+
+    return decorator
+
+
+def render_unknown_step(step: Step) -> str:
+    return _step_label(label=step.block_name, body=html_to_markdown(step.text)).rstrip()
+
+
+def get_step_renderer(block_name: str) -> StepRenderer:
+    return STEP_RENDERERS.get(block_name, render_unknown_step)
+
+
+def get_step_label(block_name: str) -> str | None:
+    """Подпись типа шага для экспорта, None для обычного текста"""
+
+    if block_name == "text":
+        return None
+    return STEP_LABELS.get(block_name, block_name)
+
+
+def iter_code_samples(options: StepikObject) -> Iterator[tuple[str, str]]:
+    """Пары ввод-вывод из block.options.samples, битые примеры пропускаются
+
+    Рендер не должен падать на данных API: пример не из двух строк просто не попадает
+    в конспект, как неизвестный тип шага не роняет render_unknown_step
+    """
+
+    for sample in options.get("samples") or ():
+        if (
+            isinstance(sample, (list, tuple))
+            and len(sample) == 2
+            and all(isinstance(part, str) for part in sample)
+        ):
+            yield sample[0], sample[1]
+
+
+@register_step_renderer("text")
+def render_text_step(step: Step) -> str:
+    return html_to_markdown(step.text)
+
+
+@register_step_renderer(*QUIZ_LABELS)
+def render_quiz_step(step: Step) -> str:
+    label = QUIZ_LABELS.get(step.block_name, step.block_name)
+    return _step_label(label=label, body=html_to_markdown(step.text)).rstrip()
+
+
+@register_step_renderer("video")
+def render_video_step(step: Step) -> str:
+    body = html_to_markdown(step.text)
+    if not step.video_url:
+        return _step_label(label=STEP_LABELS["video"], body=body).rstrip()
+    return _video_link(url=step.video_url, body=body).rstrip()
+
+
+@register_step_renderer("code")
+def render_code_step(step: Step) -> str:
+    """Условие задачи, языки и примеры ввода и вывода из block.options"""
+
+    options = step.options or {}
+    parts = [html_to_markdown(step.text)]
+
+    if languages := sorted(options.get("code_templates") or ()):
+        parts.append(_code_languages(languages=", ".join(languages)))
+
+    for number, (sample_input, sample_output) in enumerate(iter_code_samples(options), 1):
+        parts.append(
+            _code_sample(
+                number=number,
+                input=sample_input.rstrip("\n"),
+                output=sample_output.rstrip("\n"),
+            )
+        )
+
+    body = "\n\n".join(filter(None, parts))
+    return _step_label(label=STEP_LABELS["code"], body=body).rstrip()
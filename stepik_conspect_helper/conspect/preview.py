@@ -0,0 +1,181 @@
+"""Предпросмотр конспекта в браузере без полной сборки
+
+Страницы рендерятся по запросу: оглавление курса качает только скелет и заголовки
+уроков, а страница урока - один урок и его шаги. Отрендеренные страницы лежат в
+LRU, ограниченном по суммарному размеру. Ключ страницы урока включает update_date
+каждого шага, а ключ оглавления - заголовки и порядок разделов и уроков, так что
+правка на Stepik сама собой дает промах, а устаревшая страница просто вытесняется
+со временем
+
+Запросы к API на каждом открытии страницы обычно не уходят дальше ResponseCache
+клиента, так что повторное открытие урока стоит пары чтений из sqlite
+"""
+
+import html
+import logging
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+from stepik_conspect_helper.conspect.writers import render_step_html
+from stepik_conspect_helper.constants import PREVIEW_CACHE_MAX_SIZE
+from stepik_conspect_helper.stepa import Course, CourseCrawler, Lesson, Step, StepikClient
+from stepik_conspect_helper.token_exchanger.templates.local_page import render_page
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PageCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evicted: int = 0
+
+
+class RenderedPageCache:
+    """LRU отрендеренных страниц, ограниченный суммарным размером в байтах"""
+
+    def __init__(self, max_size: int = PREVIEW_CACHE_MAX_SIZE) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+
+        self.max_size = max_size
+        self.size = 0
+        self.stats = PageCacheStats()
+        self._pages: OrderedDict[Hashable, bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, key: Hashable) -> bytes | None:
+        page = self._pages.get(key)
+        if page is None:
+            self.stats.misses += 1
+            return None
+
+        self._pages.move_to_end(key)
+        self.stats.hits += 1
+        return page
+
+    def put(self, key: Hashable, page: bytes) -> None:
+        if len(page) > self.max_size:
+            # страница больше всего кеша вытеснила бы все остальные зря
+            return
+
+        if (previous := self._pages.pop(key, None)) is not None:
+            self.size -= len(previous)
+        self._pages[key] = page
+        self.size += len(page)
+
+        while self.size > self.max_size:
+            _, evicted = self._pages.popitem(last=False)
+            self.size -= len(evicted)
+            self.stats.evicted += 1
+
+
+def render_course_page(course: Course) -> bytes:
+    """Оглавление курса со ссылками на страницы уроков"""
+
+    parts = [f"<h1>{html.escape(course.title)}</h1>"]
+    for section in course.sections:
+        parts.append(f"<h2>{html.escape(section.title)}</h2>")
+        parts.append("<ol>")
+        for unit in section.units:
+            title = unit.lesson.title if unit.lesson is not None else f"Урок {unit.lesson_id}"
+            parts.append(
+                f'<li><a href="/lesson/{unit.lesson_id}">{html.escape(title)}</a></li>'
+            )
+        parts.append("</ol>")
+
+    return render_page(course.title, "\n".join(parts))
+
+
+def render_lesson_page(lesson: Lesson) -> bytes:
+    """Страница урока: шаги в том же HTML, что уходит в экспорт html и epub"""
+
+    steps = "".join(map(render_step_html, lesson.steps))
+    return render_page(lesson.title, f"<h1>{html.escape(lesson.title)}</h1>\n{steps}")
+
+
+class PreviewRenderer:
+    def __init__(
+        self,
+        client: StepikClient,
+        *,
+        cache: RenderedPageCache | None = None,
+    ) -> None:
+        self.client = client
+        self.cache = cache if cache is not None else RenderedPageCache()
+
+    async def render_course(self, course_id: int) -> bytes:
+        """Рендерит оглавление курса или берет его из кеша, шаги при этом не качаются
+
+        Raises:
+            LookupError: если курса нет
+
+        Returns:
+            bytes: HTML страница в UTF-8
+        """
+
+        course = await CourseCrawler(self.client).crawl(
+            course_id,
+            fetch_steps=lambda _: False,
+        )
+
+        key = (
+            "course",
+            course.id,
+            course.title,
+            tuple(
+                (
+                    section.id,
+                    section.title,
+                    tuple(
+                        (unit.lesson_id, unit.lesson.title if unit.lesson else None)
+                        for unit in section.units
+                    ),
+                )
+                for section in course.sections
+            ),
+        )
+        if (page := self.cache.get(key)) is not None:
+            return page
+
+        logger.debug("Rendering preview of course %s", course_id)
+        page = render_course_page(course)
+        self.cache.put(key, page)
+        return page
+
+    async def render_lesson(self, lesson_id: int) -> bytes:
+        """Рендерит урок или берет готовую страницу из кеша
+
+        Raises:
+            LookupError: если урока нет
+
+        Returns:
+            bytes: HTML страница в UTF-8
+        """
+
+        lessons = await self.client.get_lessons([lesson_id])
+        if not lessons:
+            raise LookupError(f"Lesson {lesson_id} not found")
+        lesson = Lesson.from_api(lessons[0])
+
+        steps = {
+            step.id: step
+            for step in map(Step.from_api, await self.client.get_steps(lesson.step_ids))
+        }
+        lesson.steps = [steps[step_id] for step_id in lesson.step_ids if step_id in steps]
+
+        key = (
+            "lesson",
+            lesson.id,
+            lesson.title,
+            tuple((step.id, step.update_date) for step in lesson.steps),
+        )
+        if (page := self.cache.get(key)) is not None:
+            return page
+
+        logger.debug("Rendering preview of lesson %s", lesson_id)
+        page = render_lesson_page(lesson)
+        self.cache.put(key, page)
+        return page
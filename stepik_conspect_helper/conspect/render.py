@@ -0,0 +1,99 @@
+"""Рендер узлов дерева курса в Markdown
+
+Каждый шаг оборачивается в маркеры с его id, чтобы при инкрементальной сборке
+блок можно было найти в старом конспекте и переиспользовать без повторного рендера
+"""
+
+import time
+
+from stepik_conspect_helper.conspect.plugins import get_step_renderer
+from stepik_conspect_helper.conspect.templates import STEP_BLOCK, compile_template
+from stepik_conspect_helper.stepa.models import Course, Lesson, Section, Step
+
+# при любом изменении вывода надо поднимать версию, иначе инкрементальная сборка
+# оставит в конспекте шаги, отрендеренные по-старому
+RENDERER_VERSION = 2
+
+_step_block = compile_template(STEP_BLOCK)
+
+
+def render_course_header(course: Course) -> str:
+    return f"# {course.title}\n\n"
+
+
+def render_section_header(section: Section) -> str:
+    return f"## {section.title}\n\n"
+
+
+def render_lesson_header(lesson: Lesson) -> str:
+    return f"### {lesson.title}\n\n"
+
+
+def render_step_body(step: Step) -> str:
+    """Рендерит содержимое шага в Markdown без маркеров
+
+    Формат зависит от типа шага, см. conspect.plugins
+
+    Args:
+        step (Step): шаг урока
+
+    Returns:
+        str: Markdown без завершающего перевода строки
+    """
+
+    return get_step_renderer(step.block_name)(step)
+
+
+def render_step(step: Step) -> str:
+    """Рендерит шаг в Markdown блок вместе с маркерами
+
+    Args:
+        step (Step): шаг урока
+
+    Returns:
+        str: блок, заканчивающийся пустой строкой
+    """
+
+    return wrap_step_body(step.id, render_step_body(step))
+
+
+def wrap_step_body(step_id: int, body: str) -> str:
+    """Оборачивает готовое содержимое шага в маркеры, как render_step"""
+
+    return _step_block(id=step_id, body=body)
+
+
+def render_steps(steps: list[Step]) -> list[str]:
+    """Рендерит пачку шагов, обычно один урок
+
+    Функция живет на уровне модуля, чтобы ее можно было отправить в процесс пула
+
+    Args:
+        steps (list[Step]): шаги для рендера
+
+    Returns:
+        list[str]: блоки в том же порядке, что и шаги
+    """
+
+    return [render_step(step) for step in steps]
+
+
+def render_step_bodies(steps: list[Step]) -> list[tuple[str, float]]:
+    """Рендерит содержимое шагов без маркеров и меряет CPU на каждый
+
+    Тоже для пула процессов. Время берется по потоку, а не по часам, чтобы в него
+    не попадали ожидание GIL и соседи по машине
+
+    Args:
+        steps (list[Step]): шаги для рендера
+
+    Returns:
+        list[tuple[str, float]]: Markdown и секунды CPU в том же порядке, что и шаги
+    """
+
+    results = []
+    for step in steps:
+        started_at = time.thread_time()
+        body = render_step_body(step)
+        results.append((body, time.thread_time() - started_at))
+    return results
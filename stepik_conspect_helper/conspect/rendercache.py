@@ -0,0 +1,177 @@
+"""Общий кеш отрендеренных шагов по хешу содержимого
+
+Курсы-форки и повторные сборки рендерят одни и те же шаги слово в слово. Ключ
+записи - sha256 от версии рендера, типа шага и его исходника (HTML после
+нормализации, options и ссылки на видео), а не id шага, поэтому одинаковый шаг
+из другого курса или другой сборки берется из кеша без рендера. Вместе с Markdown
+запоминается, сколько CPU стоил его рендер: так видно, сколько времени сэкономил
+каждый попавший в кеш шаг
+
+Кеш лежит в SQLite рядом с кешем ответов API и ограничен по размеру, лишнее
+вытесняется по давности чтения
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+from collections.abc import Collection, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+from stepik_conspect_helper.conspect.render import RENDERER_VERSION
+from stepik_conspect_helper.constants import RENDER_CACHE_MAX_SIZE
+from stepik_conspect_helper.dirs import user_cache_dir
+from stepik_conspect_helper.stepa import codec
+from stepik_conspect_helper.stepa.models import Step
+
+RENDER_CACHE_FILE_NAME = "rendered.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rendered (
+    key TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    cpu_seconds REAL NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rendered_accessed_at ON rendered (accessed_at);
+"""
+
+_BETWEEN_TAGS_RE = re.compile(r">\s+<")
+
+
+class RenderedStep(NamedTuple):
+    body: str
+    cpu_seconds: float
+
+
+@dataclass
+class RenderCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evicted: int = 0
+
+
+def normalize_html(html: str) -> str:
+    """Убирает из HTML шага различия, которые не меняют Markdown
+
+    Переводы строк приводятся к \\n, края обрезаются, а пробелы между тегами
+    схлопываются в один: html_to_markdown все равно превращает их в один пробел.
+    Внутри <pre> пробелы значимы, поэтому в таком HTML их не трогаем
+    """
+
+    html = html.replace("\r\n", "\n").strip()
+    if "<pre" in html:
+        return html
+    return _BETWEEN_TAGS_RE.sub("> <", html)
+
+
+def render_key(step: Step) -> str:
+    """Ключ отрендеренного шага: одинаковый у шагов с одинаковым выводом"""
+
+    digest = hashlib.sha256()
+    for part in (
+        str(RENDERER_VERSION),
+        step.block_name,
+        normalize_html(step.text),
+        codec.dumps(step.options).decode() if step.options else "",
+        step.video_url,
+    ):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RenderCache:
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        *,
+        max_size: int = RENDER_CACHE_MAX_SIZE,
+    ) -> None:
+        if path is None:
+            path = user_cache_dir() / RENDER_CACHE_FILE_NAME
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self.max_size = max_size
+        self.stats = RenderCacheStats()
+
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get_many(self, keys: Collection[str]) -> dict[str, RenderedStep]:
+        """Достает отрендеренные шаги по ключам и отмечает их как недавно прочитанные
+
+        Args:
+            keys (Collection[str]): ключи из render_key
+
+        Returns:
+            dict[str, RenderedStep]: найденные записи, отсутствующих ключей в словаре нет
+        """
+
+        if not keys:
+            return {}
+
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn.execute(
+            f"SELECT key, body, cpu_seconds FROM rendered WHERE key IN ({placeholders})",
+            tuple(keys),
+        ).fetchall()
+
+        if rows:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE rendered SET accessed_at = ? WHERE key = ?",
+                    ((time.time(), key) for key, _, _ in rows),
+                )
+
+        self.stats.hits += len(rows)
+        self.stats.misses += len(keys) - len(rows)
+        return {key: RenderedStep(body, cpu_seconds) for key, body, cpu_seconds in rows}
+
+    def put_many(self, entries: Iterable[tuple[str, RenderedStep]]) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rendered "
+                "(key, body, cpu_seconds, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (key, entry.body, entry.cpu_seconds, now, now, len(entry.body.encode()))
+                    for key, entry in entries
+                ),
+            )
+
+        self._evict()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM rendered").fetchone()[0]
+
+    def total_size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM rendered").fetchone()[0]
+
+    def _evict(self) -> None:
+        excess = self.total_size() - self.max_size
+        if excess <= 0:
+            return
+
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM rendered ORDER BY accessed_at"
+        ):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+        with self._conn:
+            self._conn.executemany("DELETE FROM rendered WHERE key = ?", victims)
+        self.stats.evicted += len(victims)
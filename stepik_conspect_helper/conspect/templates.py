@@ -0,0 +1,41 @@
+"""Шаблоны Markdown для рендера шагов
+
+Шаблон пишется как для str.format, но с одними именованными полями. compile_template
+проверяет поля один раз при импорте и отдает str.format этого шаблона, так что
+ошибка в шаблоне видна сразу, а не на первом шаге нужного типа. Результат кешируется
+по тексту, так что брать один и тот же шаблон в нескольких местах бесплатно
+"""
+
+from collections.abc import Callable
+from functools import cache
+from string import Formatter
+
+type Template = Callable[..., str]
+
+STEP_BLOCK = "<!-- step {id} -->\n{body}\n<!-- /step {id} -->\n\n"
+
+STEP_LABEL = "*[{label}]*\n\n{body}"
+VIDEO_LINK = "[Видео]({url})\n\n{body}"
+CODE_LANGUAGES = "Языки: {languages}"
+CODE_SAMPLE = "Пример {number}\n\nВвод:\n\n```\n{input}\n```\n\nВывод:\n\n```\n{output}\n```"
+
+
+@cache
+def compile_template(source: str) -> Template:
+    """Проверяет шаблон и возвращает функцию, которая принимает поля keyword аргументами
+
+    Args:
+        source (str): шаблон с полями вида {name}
+
+    Raises:
+        ValueError: поле с форматом, конверсией, индексом или без имени
+
+    Returns:
+        Template: функция, возвращающая заполненный шаблон
+    """
+
+    for _, name, format_spec, conversion in Formatter().parse(source):
+        if name is not None and (not name.isidentifier() or format_spec or conversion):
+            raise ValueError(f"Unsupported template field {name!r} in {source!r}")
+
+    return source.format
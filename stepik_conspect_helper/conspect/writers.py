@@ -0,0 +1,474 @@
+"""Писатели экспорта: по одному на формат
+
+Писатель получает скелет курса, а потом уроки по одному в порядке курса, и сразу
+пишет их в свой файл, не держа курс в памяти. Форматы:
+
+    md    - тот же Markdown, что у ConspectBuilder, с маркерами шагов
+    html  - одна страница с HTML шагов как на Stepik
+    pdf   - та же страница, сверстанная под печать: браузер сохраняет ее в PDF
+    epub  - EPUB 3, по файлу на раздел и урок
+
+Все собирается стандартной библиотекой, без движков верстки. Модуль не тянет за
+собой aiohttp, так что процессы пула с писателями поднимаются быстро
+"""
+
+import html
+import os
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import ClassVar, NamedTuple, Protocol, TextIO
+
+from stepik_conspect_helper.conspect.html import html_to_xhtml
+from stepik_conspect_helper.conspect.plugins import get_step_label, iter_code_samples
+from stepik_conspect_helper.conspect.render import (
+    render_course_header,
+    render_lesson_header,
+    render_section_header,
+    render_step,
+)
+from stepik_conspect_helper.conspect.templates import compile_template
+from stepik_conspect_helper.stepa.models import Course, Lesson, Section, Step
+
+HTML_STEP = '<section class="step" id="step-{id}">\n{body}\n</section>\n'
+HTML_LESSON = '<article class="lesson" id="lesson-{id}">\n<h3>{title}</h3>\n{steps}</article>\n'
+HTML_SECTION = '<h2 id="section-{id}">{title}</h2>\n'
+HTML_STEP_LABEL = '<p class="step-label">{label}</p>'
+HTML_VIDEO_LINK = '<p><a href="{url}">Видео</a></p>'
+HTML_CODE_LANGUAGES = "<p>Языки: {languages}</p>"
+HTML_CODE_SAMPLE = (
+    "<p>Пример {number}</p>\n<p>Ввод:</p>\n<pre>{input}</pre>\n<p>Вывод:</p>\n<pre>{output}</pre>"
+)
+
+HTML_HEAD = """<!DOCTYPE html>
+<html lang="ru">
+
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <style>{style}</style>
+</head>
+
+<body>
+<h1>{title}</h1>
+"""
+HTML_TAIL = "</body>\n\n</html>\n"
+
+SCREEN_STYLE = """
+body { max-width: 50em; margin: 0 auto; padding: 1em; font-family: sans-serif; }
+pre { overflow-x: auto; padding: 0.5em; background: #f5f5f5; }
+img { max-width: 100%; }
+.step { margin-bottom: 1.5em; }
+.step-label { font-style: italic; color: #666; }
+"""
+
+# break-* понимают и браузеры при печати, и движки вроде WeasyPrint
+PRINT_STYLE = """
+@page { size: A4; margin: 2cm; }
+body { font-family: serif; font-size: 11pt; line-height: 1.4; }
+h2 { break-before: page; }
+h3 { break-after: avoid; }
+pre, table, img, .step-label { break-inside: avoid; }
+pre { white-space: pre-wrap; padding: 0.5em; border: 1px solid #ccc; }
+img { max-width: 100%; }
+.step-label { font-style: italic; }
+a[href^="http"]::after { content: " (" attr(href) ")"; font-size: 80%; }
+"""
+
+EPUB_MIMETYPE = "application/epub+zip"
+EPUB_CONTAINER = """<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+    <rootfiles>
+        <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+    </rootfiles>
+</container>
+"""
+EPUB_PAGE = """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" \
+lang="ru" xml:lang="ru">
+<head>
+<meta charset="utf-8" />
+<title>{title}</title>
+<link rel="stylesheet" type="text/css" href="style.css" />
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+EPUB_ITEM = '<item id="{id}" href="{href}" media-type="application/xhtml+xml"/>'
+EPUB_PACKAGE = """<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">
+<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:identifier id="book-id">urn:stepik:course:{course_id}</dc:identifier>
+<dc:title>{title}</dc:title>
+<dc:language>ru</dc:language>
+<meta property="dcterms:modified">{modified}</meta>
+</metadata>
+<manifest>
+<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+<item id="style" href="style.css" media-type="text/css"/>
+{items}
+</manifest>
+<spine>
+{itemrefs}
+</spine>
+</package>
+"""
+
+_html_step = compile_template(HTML_STEP)
+_html_lesson = compile_template(HTML_LESSON)
+_html_section = compile_template(HTML_SECTION)
+_html_step_label = compile_template(HTML_STEP_LABEL)
+_html_video_link = compile_template(HTML_VIDEO_LINK)
+_html_code_languages = compile_template(HTML_CODE_LANGUAGES)
+_html_code_sample = compile_template(HTML_CODE_SAMPLE)
+_html_head = compile_template(HTML_HEAD)
+_epub_page = compile_template(EPUB_PAGE)
+_epub_item = compile_template(EPUB_ITEM)
+_epub_package = compile_template(EPUB_PACKAGE)
+
+
+class ExportedFile(NamedTuple):
+    format: str
+    path: Path
+    size: int
+    # CPU самого писателя, без ожидания уроков из очереди
+    cpu_seconds: float
+
+
+class LessonQueue(Protocol):
+    """queue.Queue или прокси очереди менеджера multiprocessing"""
+
+    def put(
+        self,
+        item: Lesson | str | None,
+        block: bool = True,
+        timeout: float | None = None,
+    ) -> None: ...
+
+    def get(self, block: bool = True, timeout: float | None = None) -> Lesson | str | None: ...
+
+
+def ordered_steps(lesson: Lesson) -> Iterator[Step]:
+    """Шаги урока в порядке step_ids, пропуская не скачанные"""
+
+    steps = {step.id: step for step in lesson.steps}
+    for step_id in lesson.step_ids:
+        if (step := steps.get(step_id)) is not None:
+            yield step
+
+
+def render_step_html(step: Step) -> str:
+    """Рендерит шаг в XHTML фрагмент, годный и для страницы, и для EPUB
+
+    Args:
+        step (Step): шаг урока
+
+    Returns:
+        str: секция шага с подписью типа, ссылкой на видео и примерами задачи
+    """
+
+    parts = []
+    if label := get_step_label(step.block_name):
+        parts.append(_html_step_label(label=html.escape(label)))
+    if step.video_url:
+        parts.append(_html_video_link(url=html.escape(step.video_url)))
+    parts.append(html_to_xhtml(step.text))
+
+    options = step.options or {}
+    if languages := sorted(options.get("code_templates") or ()):
+        parts.append(_html_code_languages(languages=html.escape(", ".join(languages))))
+    for number, (sample_input, sample_output) in enumerate(iter_code_samples(options), 1):
+        parts.append(
+            _html_code_sample(
+                number=number,
+                input=html.escape(sample_input.rstrip("\n")),
+                output=html.escape(sample_output.rstrip("\n")),
+            )
+        )
+
+    return _html_step(id=step.id, body="\n".join(filter(None, parts)))
+
+
+def render_lesson_html(lesson: Lesson) -> str:
+    return _html_lesson(
+        id=lesson.id,
+        title=html.escape(lesson.title),
+        steps="".join(map(render_step_html, ordered_steps(lesson))),
+    )
+
+
+class ExportWriter(ABC):
+    """Пишет курс в один файл по мере того, как приходят уроки
+
+    Пишется все во временный файл рядом, на место он встает только в finish, так что
+    упавший экспорт не портит результат прошлого
+    """
+
+    suffix: ClassVar[str]
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".tmp")
+
+    @abstractmethod
+    def begin(self, course: Course) -> None:
+        ...
+
+    @abstractmethod
+    def add_section(self, section: Section) -> None:
+        ...
+
+    @abstractmethod
+    def add_lesson(self, lesson: Lesson) -> None:
+        ...
+
+    @abstractmethod
+    def close(self) -> None:
+        ...
+
+    def finish(self) -> int:
+        """Дописывает файл и ставит его на место
+
+        Returns:
+            int: размер файла в байтах
+        """
+
+        self.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path.stat().st_size
+
+    def abort(self) -> None:
+        self.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class _TextWriter(ExportWriter):
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self._file: TextIO | None = None
+
+    def _open(self) -> TextIO:
+        self._file = self.tmp_path.open("w", encoding="utf-8", newline="\n")
+        return self._file
+
+    def _write(self, text: str) -> None:
+        assert self._file is not None
+        self._file.write(text)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class MarkdownWriter(_TextWriter):
+    suffix = ".md"
+
+    def begin(self, course: Course) -> None:
+        self._open().write(render_course_header(course))
+
+    def add_section(self, section: Section) -> None:
+        self._write(render_section_header(section))
+
+    def add_lesson(self, lesson: Lesson) -> None:
+        self._write(render_lesson_header(lesson))
+        self._write("".join(map(render_step, ordered_steps(lesson))))
+
+
+class HtmlWriter(_TextWriter):
+    suffix = ".html"
+    style: ClassVar[str] = SCREEN_STYLE
+
+    def begin(self, course: Course) -> None:
+        self._open().write(_html_head(title=html.escape(course.title), style=self.style))
+
+    def add_section(self, section: Section) -> None:
+        self._write(_html_section(id=section.id, title=html.escape(section.title)))
+
+    def add_lesson(self, lesson: Lesson) -> None:
+        self._write(render_lesson_html(lesson))
+
+    def finish(self) -> int:
+        self._write(HTML_TAIL)
+        return super().finish()
+
+
+class PrintHtmlWriter(HtmlWriter):
+    """HTML со стилями печати: разделы с новой страницы, код и картинки не рвутся"""
+
+    suffix = ".print.html"
+    style = PRINT_STYLE
+
+
+class EpubWriter(ExportWriter):
+    """EPUB 3: каждый раздел и урок ложатся в архив отдельной страницей сразу по приходу
+
+    Оглавление и манифест пакета знают весь курс, поэтому пишутся последними
+    """
+
+    suffix = ".epub"
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self._zip: zipfile.ZipFile | None = None
+        self._course: Course | None = None
+        # (имя файла, заголовок, уровень в оглавлении) в порядке курса
+        self._pages: list[tuple[str, str, int]] = []
+
+    def begin(self, course: Course) -> None:
+        self._course = course
+        self._zip = zipfile.ZipFile(self.tmp_path, "w", zipfile.ZIP_DEFLATED)
+        # mimetype обязан идти первым и без сжатия, по нему читалки узнают формат
+        self._zip.writestr("mimetype", EPUB_MIMETYPE, compress_type=zipfile.ZIP_STORED)
+        self._zip.writestr("META-INF/container.xml", EPUB_CONTAINER)
+        self._zip.writestr("OEBPS/style.css", SCREEN_STYLE)
+
+    def add_section(self, section: Section) -> None:
+        title = html.escape(section.title)
+        self._add_page(f"section-{section.id}.xhtml", title, 1, f"<h1>{title}</h1>")
+
+    def add_lesson(self, lesson: Lesson) -> None:
+        title = html.escape(lesson.title)
+        self._add_page(f"lesson-{lesson.id}.xhtml", title, 2, render_lesson_html(lesson))
+
+    def finish(self) -> int:
+        assert self._zip is not None and self._course is not None
+
+        title = html.escape(self._course.title)
+        self._zip.writestr("OEBPS/nav.xhtml", _epub_page(title=title, body=self._nav()))
+        self._zip.writestr(
+            "OEBPS/content.opf",
+            _epub_package(
+                course_id=self._course.id,
+                title=title,
+                modified=datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                items="\n".join(
+                    _epub_item(id=name.removesuffix(".xhtml"), href=name)
+                    for name, _, _ in self._pages
+                ),
+                itemrefs="\n".join(
+                    f'<itemref idref="{name.removesuffix(".xhtml")}"/>'
+                    for name, _, _ in self._pages
+                ),
+            ),
+        )
+        return super().finish()
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def _add_page(self, name: str, title: str, level: int, body: str) -> None:
+        assert self._zip is not None
+        self._zip.writestr(f"OEBPS/{name}", _epub_page(title=title, body=body))
+        self._pages.append((name, title, level))
+
+    def _nav(self) -> str:
+        # уроки вложены в свой раздел, раздел закрывается перед следующим
+        parts = ['<nav epub:type="toc" id="toc">', "<ol>"]
+        in_section = False
+        for name, title, level in self._pages:
+            if level == 1:
+                if in_section:
+                    parts.append("</ol></li>")
+                parts.append(f'<li><a href="{name}">{title}</a><ol>')
+                in_section = True
+            else:
+                parts.append(f'<li><a href="{name}">{title}</a></li>')
+        if in_section:
+            parts.append("</ol></li>")
+        parts.extend(["</ol>", "</nav>"])
+        # пустой <ol> в оглавлении EPUB недопустим, у раздела без уроков его просто нет
+        return "\n".join(parts).replace("<ol>\n</ol>", "")
+
+
+WRITERS: dict[str, type[ExportWriter]] = {
+    "md": MarkdownWriter,
+    "html": HtmlWriter,
+    "pdf": PrintHtmlWriter,
+    "epub": EpubWriter,
+}
+
+
+def export_paths(stem: Path, formats: list[str]) -> dict[str, Path]:
+    """Пути файлов для форматов: course-1 -> course-1.md, course-1.epub и так далее"""
+
+    return {
+        export_format: stem.with_name(stem.name + WRITERS[export_format].suffix)
+        for export_format in formats
+    }
+
+
+def run_writer(
+    export_format: str,
+    path: Path,
+    course: Course,
+    lessons: LessonQueue,
+) -> ExportedFile:
+    """Пишет один формат, забирая уроки из очереди, пока не придет None
+
+    Функция живет на уровне модуля, чтобы ее можно было отправить в процесс пула
+
+    Args:
+        export_format (str): ключ WRITERS
+        path (Path): куда положить файл
+        course (Course): скелет курса из crawl_structure
+        lessons (LessonQueue): уроки в порядке курса
+
+    Raises:
+        RuntimeError: если обход курса упал и экспорт отменен
+
+    Returns:
+        ExportedFile: итоговый файл
+    """
+
+    cpu_started_at = time.thread_time()
+    writer = WRITERS[export_format](path)
+    lesson_sections = {
+        unit.lesson_id: index
+        for index, section in enumerate(course.sections)
+        for unit in section.units
+    }
+
+    try:
+        writer.begin(course)
+        sections_written = 0
+
+        while (lesson := lessons.get()) is not None:
+            if isinstance(lesson, str):
+                raise RuntimeError("export aborted")
+
+            while sections_written <= lesson_sections[lesson.id]:
+                writer.add_section(course.sections[sections_written])
+                sections_written += 1
+            writer.add_lesson(lesson)
+
+        for section in course.sections[sections_written:]:
+            writer.add_section(section)
+        size = writer.finish()
+    except BaseException:
+        writer.abort()
+        raise
+
+    return ExportedFile(export_format, path, size, time.thread_time() - cpu_started_at)
+
+
+# очереди уроков в процессе пула, их раздает init_writer_worker при старте процесса
+_worker_queues: dict[str, LessonQueue] = {}
+
+
+def init_writer_worker(queues: dict[str, LessonQueue]) -> None:
+    """Инициализатор процесса пула: multiprocessing.Queue передается только так"""
+
+    _worker_queues.update(queues)
+
+
+def run_writer_in_worker(export_format: str, path: Path, course: Course) -> ExportedFile:
+    return run_writer(export_format, path, course, _worker_queues[export_format])
@@ -1,10 +1,14 @@
 OAUTH_AUTH_CODE_GRANT_TYPE = "authorization_code"
+OAUTH_REFRESH_TOKEN_GRANT_TYPE = "refresh_token"
+OAUTH_CLIENT_CREDENTIALS_GRANT_TYPE = "client_credentials"
 OAUTH_AUTH_CODE_RESPONSE_TYPE = "code"
 OAUTH_BEARER_TOKEN_TYPE = "Bearer"
 OAUTH_READ_SCOPE = "read"
 
 TOKEN_EXCHANGE_SERVER_HOST = "127.0.0.1"
 TOKEN_EXCHANGE_SERVER_PORT = 45678
+TOKEN_EXCHANGE_LOGIN_TIMEOUT = 5 * 60.0
+TOKEN_EXCHANGE_SERVER_SHUTDOWN_TIMEOUT = 5.0
 
 STEPIK_AUTHORIZATION_ENDPOINT = "https://stepik.org/oauth2/authorize/"
 STEPIK_TOKEN_ENDPOINT = "https://stepik.org/oauth2/token/"
@@ -12,3 +16,39 @@ STEPIK_OAUTH_APP_CLIENT_ID = "X2RZBLIMNv1ZvNgI5vblb9jeRC8glC0s2tbdI4uP"
 STEPIK_OATH_REDIRECT_URI = (
     f"http://{TOKEN_EXCHANGE_SERVER_HOST}:{TOKEN_EXCHANGE_SERVER_PORT}/auth"
 )
+STEPIK_CLIENT_ID_ENV = "STEPIK_CLIENT_ID"
+STEPIK_CLIENT_SECRET_ENV = "STEPIK_CLIENT_SECRET"
+
+STEPIK_URL = "https://stepik.org"
+STEPIK_API_URL = "https://stepik.org/api"
+STEPIK_API_IDS_CHUNK_SIZE = 20
+STEPIK_API_CONNECTIONS_LIMIT = 32
+STEPIK_API_CONNECTIONS_LIMIT_PER_HOST = 8
+STEPIK_API_KEEPALIVE_TIMEOUT = 30.0
+STEPIK_API_CRAWL_CONCURRENCY = 8
+STEPIK_API_CACHE_TTL = 60 * 60.0
+STEPIK_API_CACHE_MAX_SIZE = 256 * 1024 * 1024
+STEPIK_API_CRAWL_WINDOW = 4
+STEPIK_API_CRAWL_CHECKPOINT_EVERY = 50
+STEPIK_API_RATE = 10.0
+STEPIK_API_MAX_RATE = 50.0
+STEPIK_API_MAX_RETRIES = 5
+STEPIK_BATCH_PARALLEL_COURSES = 4
+
+MEDIA_DOWNLOAD_CONCURRENCY = 16
+MEDIA_DOWNLOAD_CONCURRENCY_PER_HOST = 4
+MEDIA_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# границы корзин гистограмм задержек в секундах, как у prometheus_client
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREVIEW_CACHE_MAX_SIZE = 32 * 1024 * 1024
+RENDER_CACHE_MAX_SIZE = 128 * 1024 * 1024
+
+EXPORT_FORMATS = ("md", "html", "pdf", "epub")
+# сколько уроков может ждать самого медленного писателя, пока обход не встанет
+EXPORT_QUEUE_SIZE = 16
+
+STEPIK_LESSON_STEP_URL = "https://stepik.org/lesson/{lesson_id}/step/{position}"
+SEARCH_RESULTS_LIMIT = 20
+SEARCH_INDEX_BATCH_LESSONS = 50
@@ -0,0 +1,28 @@
+"""Пользовательские каталоги приложения
+
+Следуем XDG на Linux, на Windows складываем все в %LOCALAPPDATA%
+"""
+
+import os
+import sys
+from pathlib import Path
+
+APP_DIR_NAME = "stepik-conspect-helper"
+
+
+def _base_dir(xdg_env: str, xdg_default: str) -> Path:
+    if sys.platform == "win32":
+        return Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+    return Path(os.environ.get(xdg_env) or Path.home() / xdg_default)
+
+
+def user_cache_dir() -> Path:
+    """Каталог для кешей, которые можно удалить без потерь"""
+
+    return _base_dir("XDG_CACHE_HOME", ".cache") / APP_DIR_NAME
+
+
+def user_config_dir() -> Path:
+    """Каталог для настроек и секретов пользователя"""
+
+    return _base_dir("XDG_CONFIG_HOME", ".config") / APP_DIR_NAME
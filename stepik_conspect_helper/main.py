@@ -1,56 +1,342 @@
-import asyncio
-import logging
-import webbrowser
+"""Командная строка
+
+    login   - авторизоваться и проверить токен
+    build   - собрать конспекты курсов, это же делает вызов без подкоманды
+    search  - обновить поисковый индекс и искать по нему
+    cache   - показать состояние локальных кешей
 
-import aiohttp
+Здесь только разбор аргументов: модуль команды со всеми тяжелыми зависимостями
+импортируется уже после того, как стало ясно, какая команда запущена
+"""
+
+import argparse
+import logging
+import sys
+from collections.abc import Sequence
+from pathlib import Path
 
 from stepik_conspect_helper.constants import (
-    OAUTH_AUTH_CODE_RESPONSE_TYPE,
-    OAUTH_BEARER_TOKEN_TYPE,
-    OAUTH_READ_SCOPE,
-    STEPIK_AUTHORIZATION_ENDPOINT,
-    STEPIK_OATH_REDIRECT_URI,
-    STEPIK_OAUTH_APP_CLIENT_ID,
-    TOKEN_EXCHANGE_SERVER_HOST,
-    TOKEN_EXCHANGE_SERVER_PORT,
+    EXPORT_FORMATS,
+    SEARCH_RESULTS_LIMIT,
+    STEPIK_API_CRAWL_CHECKPOINT_EVERY,
+    STEPIK_BATCH_PARALLEL_COURSES,
 )
-from stepik_conspect_helper.token_exchanger import TokenExchangeServer
 
+PROG = "stepik-conspect-helper"
 
-async def fake_main() -> None:
-    server = TokenExchangeServer(
-        TOKEN_EXCHANGE_SERVER_HOST,
-        TOKEN_EXCHANGE_SERVER_PORT,
+COMMANDS = {
+    "login": "Авторизуется в Stepik и сохраняет токен",
+    "build": "Собирает конспекты курсов Stepik",
+    "search": "Ищет шаги по словам в проиндексированных курсах",
+    "cache": "Показывает, что лежит в локальных кешах",
+}
+
+
+def parse_login_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=f"{PROG} login", description=COMMANDS["login"])
+    parser.add_argument(
+        "--relogin",
+        action="store_true",
+        help="забыть сохраненный токен и пройти авторизацию в браузере заново",
     )
-    asyncio.create_task(server.listen())
 
-    while not server.access_token:
-        await asyncio.sleep(0.5)
+    args = parser.parse_args(argv)
+    args.command = "login"
+    args.metrics = False
+    return args
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            "https://stepik.org/api/stepics/1",
-            headers={
-                "Authorization": f"{OAUTH_BEARER_TOKEN_TYPE} {server.access_token}",
-            },
-        ) as response:
-            response.raise_for_status()
-            data = await response.json()
-            current_user_id = data["stepics"][0]["user"]
-            print(f"Здарова #{current_user_id}!")
 
+def parse_cache_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=f"{PROG} cache", description=COMMANDS["cache"])
+    parser.add_argument("action", choices=["stats"])
+    parser.add_argument("--json", action="store_true", help="вывести сводку в JSON")
 
-if __name__ == "__main__":
-    logging.basicConfig(level=logging.WARN)
+    args = parser.parse_args(argv)
+    args.command = "cache"
+    args.metrics = False
+    return args
+
+
+def parse_search_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog=f"{PROG} search",
+        description=COMMANDS["search"],
+    )
+    parser.add_argument("query", nargs="?", default="", help="что искать")
+    parser.add_argument(
+        "--index-course",
+        type=int,
+        action="append",
+        default=[],
+        metavar="ID",
+        help="скачать курс и обновить его в индексе, можно указать несколько раз",
+    )
+    parser.add_argument(
+        "--index-snapshot",
+        type=Path,
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="обновить в индексе курс из снимка",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="индексировать курсы только из кеша ответов API, без сети и токена",
+    )
+    parser.add_argument(
+        "--course",
+        type=int,
+        action="append",
+        metavar="ID",
+        help="искать только в этих курсах",
+    )
+    parser.add_argument("--limit", type=int, default=SEARCH_RESULTS_LIMIT)
+    parser.add_argument("--index-file", type=Path, help="путь к файлу индекса")
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="напечатать в stderr JSON сводку запросов, кеша и стадий в конце",
+    )
+    parser.add_argument(
+        "--relogin",
+        action="store_true",
+        help="забыть сохраненный токен и пройти авторизацию в браузере заново",
+    )
+
+    args = parser.parse_args(argv)
+    args.command = "search"
+    if not (args.query or args.index_course or args.index_snapshot):
+        parser.error("нужен запрос, --index-course или --index-snapshot")
+    return args
+
+
+def parse_formats(value: str) -> list[str]:
+    """Разбирает --formats md,html,epub в список без повторов"""
 
-    webbrowser.open_new(
-        (
-            f"{STEPIK_AUTHORIZATION_ENDPOINT}/?response_type={OAUTH_AUTH_CODE_RESPONSE_TYPE}"
-            f"&client_id={STEPIK_OAUTH_APP_CLIENT_ID}"
-            f"&redirect_uri={STEPIK_OATH_REDIRECT_URI}"
-            f"&scope={OAUTH_READ_SCOPE}"
+    formats = list(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+    if unknown := [name for name in formats if name not in EXPORT_FORMATS]:
+        raise argparse.ArgumentTypeError(
+            f"неизвестные форматы {', '.join(unknown)}, есть {', '.join(EXPORT_FORMATS)}"
         )
+    if not formats:
+        raise argparse.ArgumentTypeError("нужен хотя бы один формат")
+    return formats
+
+
+def parse_build_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=f"{PROG} build", description=COMMANDS["build"])
+    parser.add_argument("course_ids", type=int, nargs="*", help="id курсов")
+    parser.add_argument(
+        "--courses-file",
+        type=Path,
+        help="файл с id курсов, через пробел, запятую или по одному на строке",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="куда положить конспект одного курса, по умолчанию course-<id>.md",
+    )
+    parser.add_argument(
+        "--formats",
+        type=parse_formats,
+        default=["md"],
+        metavar="LIST",
+        help=(
+            f"форматы через запятую из {', '.join(EXPORT_FORMATS)}: все пишутся за один "
+            "обход курса, расширение -o заменяется на свое у каждого. Инкрементально "
+            "собирается только один md"
+        ),
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("."),
+        help="куда класть конспекты при сборке нескольких курсов",
+    )
+    parser.add_argument(
+        "--parallel-courses",
+        type=int,
+        default=STEPIK_BATCH_PARALLEL_COURSES,
+        help="сколько курсов собирается одновременно при пакетной сборке",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="пересобрать конспект целиком, не глядя на прошлую сборку",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="продолжить прерванную сборку с чекпоинта, не скачивая уже скачанное",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=STEPIK_API_CRAWL_CHECKPOINT_EVERY,
+        metavar="N",
+        help="сохранять чекпоинт обхода каждые N ответов API",
+    )
+    parser.add_argument(
+        "--no-render-cache",
+        action="store_true",
+        help="не брать готовые шаги из общего кеша рендера и не пополнять его",
+    )
+    parser.add_argument(
+        "--relogin",
+        action="store_true",
+        help="забыть сохраненный токен и пройти авторизацию в браузере заново",
+    )
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="не собирать конспект, а открыть его предпросмотр в браузере",
     )
+    parser.add_argument(
+        "--save-snapshot",
+        type=Path,
+        metavar="PATH",
+        help="скачать курс целиком в бинарный снимок и собрать конспект из него",
+    )
+    parser.add_argument(
+        "--from-snapshot",
+        type=Path,
+        metavar="PATH",
+        help="собрать конспект из снимка без обращения к Stepik",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=(
+            "сколько процессов рендерят HTML шагов, по умолчанию 1. С --formats не "
+            "задается: там у каждого формата свой процесс"
+        ),
+    )
+    parser.add_argument(
+        "--media-dir",
+        type=Path,
+        metavar="DIR",
+        help="скачать картинки и вложения шагов в DIR после сборки конспекта",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="напечатать в stderr JSON сводку запросов, кеша и стадий в конце",
+    )
+
+    args = parser.parse_intermixed_args(argv)
+    args.command = "build"
+    if args.courses_file is not None:
+        from stepik_conspect_helper.conspect.batch import read_course_ids
+
+        try:
+            args.course_ids += read_course_ids(args.courses_file)
+        except (OSError, ValueError) as exc:
+            parser.error(f"не удалось прочитать {args.courses_file}: {exc}")
+    args.course_ids = list(dict.fromkeys(args.course_ids))
+
+    if not args.course_ids and args.from_snapshot is None:
+        parser.error("нужен id курса, --courses-file или --from-snapshot")
+
+    if args.output is not None and len(args.course_ids) > 1:
+        parser.error("-o подходит только для одного курса, используйте --output-dir")
+    if args.preview and len(args.course_ids) != 1:
+        parser.error("предпросмотр открывается для одного курса")
+    if args.save_snapshot is not None and args.from_snapshot is not None:
+        parser.error("--save-snapshot и --from-snapshot не совместимы")
+    if args.save_snapshot is not None and len(args.course_ids) != 1:
+        parser.error("снимок сохраняется для одного курса")
+    if args.from_snapshot is not None and (len(args.course_ids) > 1 or args.preview):
+        parser.error("из снимка собирается только конспект одного курса")
+    if args.media_dir is not None and (len(args.course_ids) > 1 or args.preview):
+        parser.error("медиа скачиваются при сборке одного курса")
+    if args.resume and (
+        len(args.course_ids) != 1 or args.preview or args.from_snapshot is not None
+    ):
+        parser.error("продолжить можно только сборку одного курса из Stepik")
+    if args.formats != ["md"] and (len(args.course_ids) > 1 or args.preview):
+        parser.error("в несколько форматов экспортируется только один курс")
+    if args.formats != ["md"] and args.workers is not None:
+        parser.error("--workers не действует с --formats, каждый формат пишется своим процессом")
+    if args.checkpoint_every < 1:
+        parser.error("--checkpoint-every должен быть положительным")
+    if args.parallel_courses < 1:
+        parser.error("--parallel-courses должен быть положительным")
+    if args.workers is None:
+        args.workers = 1
+    elif args.workers < 1:
+        parser.error("--workers должен быть положительным")
+
+    return args
+
+
+COMMAND_PARSERS = {
+    "login": parse_login_args,
+    "build": parse_build_args,
+    "search": parse_search_args,
+    "cache": parse_cache_args,
+}
+
+
+def print_usage() -> None:
+    print(f"usage: {PROG} {{{','.join(COMMANDS)}}} ...\n\ncommands:")
+    for command, description in COMMANDS.items():
+        print(f"  {command:<8} {description}")
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    argv = sys.argv[1:] if argv is None else list(argv)
 
-    main_coro = fake_main()
-    asyncio.run(main_coro)
+    match argv:
+        case []:
+            # без аргументов раньше просто проверялся вход, так и оставляем
+            argv = ["login"]
+        case ["-h" | "--help", *_]:
+            print_usage()
+            raise SystemExit(0)
+        case [command, *_] if command not in COMMAND_PARSERS:
+            # старый вызов без подкоманды: main.py 123 --preview
+            argv = ["build", *argv]
+
+    command, *rest = argv
+    return COMMAND_PARSERS[command](rest)
+
+
+def run(args: argparse.Namespace) -> None:
+    match args.command:
+        case "cache":
+            from stepik_conspect_helper.commands.cache import run_cache
+
+            run_cache(args)
+            return
+        case "login":
+            from stepik_conspect_helper.commands.login import run_login as command
+        case "build":
+            from stepik_conspect_helper.commands.build import run_build as command
+        case "search":
+            from stepik_conspect_helper.commands.search import run_search as command
+
+    # asyncio сам по себе стоит десятки миллисекунд, синхронным командам он не нужен
+    import asyncio
+
+    asyncio.run(command(args))
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    logging.basicConfig(level=logging.WARN)
+    args = parse_args(argv)
+
+    try:
+        run(args)
+    finally:
+        if args.metrics:
+            import json
+
+            from stepik_conspect_helper.metrics import registry
+
+            print(json.dumps(registry.summary(), indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
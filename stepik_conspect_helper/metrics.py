@@ -0,0 +1,276 @@
+"""Счетчики и тайминги сборки
+
+Одна Metrics на процесс (registry) собирает все сразу: фазы каждого HTTP запроса
+через aiohttp TraceConfig, байты, статусы, повторы, попадания в кеш и время стадий
+сборки. Наружу это уходит текстом в формате Prometheus по /metrics локального
+сервера и JSON сводкой в конце запуска main
+
+Все пишется из одного event loop, так что блокировок нет
+"""
+
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+
+from stepik_conspect_helper.constants import METRICS_LATENCY_BUCKETS
+
+type Labels = tuple[tuple[str, str], ...]
+
+HTTP_REQUESTS = "stepik_http_requests_total"
+HTTP_ERRORS = "stepik_http_errors_total"
+HTTP_RETRIES = "stepik_http_retries_total"
+HTTP_BYTES = "stepik_http_bytes_total"
+HTTP_CONNECTIONS = "stepik_http_connections_total"
+HTTP_SECONDS = "stepik_http_request_seconds"
+CACHE_OBJECTS = "stepik_cache_objects_total"
+STAGE_SECONDS = "stepik_stage_seconds_total"
+STAGE_CALLS = "stepik_stage_calls_total"
+RENDER_STEPS = "stepik_render_steps_total"
+RENDER_CPU_SECONDS = "stepik_render_cpu_seconds_total"
+
+METRIC_HELP = {
+    HTTP_REQUESTS: "HTTP responses received, by host and status",
+    HTTP_ERRORS: "HTTP requests failed without a response, by exception type",
+    HTTP_RETRIES: "HTTP requests repeated after a retryable failure",
+    HTTP_BYTES: "HTTP bytes sent (headers and body) and received (body)",
+    HTTP_CONNECTIONS: "Connections taken from the pool, new or reused",
+    HTTP_SECONDS: "HTTP request phases: queue, dns, connect, ttfb and total",
+    CACHE_OBJECTS: "API objects served from cache, revalidated or downloaded",
+    STAGE_SECONDS: "Time spent in build stages on the event loop",
+    STAGE_CALLS: "How many times each build stage was entered",
+    RENDER_STEPS: "Step blocks rendered or taken from an identical step already rendered",
+    RENDER_CPU_SECONDS: "CPU seconds spent rendering steps and saved by deduplication",
+}
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        # последний счетчик - для значений больше всех границ, он же +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценивает квантиль линейно внутри корзины, как histogram_quantile"""
+
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    def __init__(self, buckets: tuple[float, ...] = METRICS_LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self._counters: dict[str, dict[Labels, float]] = defaultdict(dict)
+        self._histograms: dict[str, dict[Labels, Histogram]] = defaultdict(dict)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        series = self._counters[name]
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        series = self._histograms[name]
+        key = _labels(labels)
+        if key not in series:
+            series[key] = Histogram(self.buckets)
+        series[key].observe(value)
+
+    def value(self, name: str, **labels: str) -> float:
+        """Текущее значение счетчика, 0 если его еще не было"""
+
+        return self._counters.get(name, {}).get(_labels(labels), 0)
+
+    def histogram(self, name: str, **labels: str) -> Histogram | None:
+        return self._histograms.get(name, {}).get(_labels(labels))
+
+    def clear(self) -> None:
+        self._counters.clear()
+        self._histograms.clear()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Добавляет время внутри with к стадии сборки name"""
+
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.inc(STAGE_SECONDS, time.perf_counter() - started_at, stage=name)
+            self.inc(STAGE_CALLS, stage=name)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig для ClientSession, который пишет фазы запросов сюда
+
+        queue - ожидание свободного соединения в пуле, connect - установка нового
+        соединения вместе с DNS и TLS, ttfb - от начала запроса до заголовков ответа.
+        Полное время с чтением тела меряет тот, кто читает тело, см. HTTP_SECONDS
+        """
+
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(_, context: SimpleNamespace, params: Any) -> None:
+            context.started_at = time.perf_counter()
+            context.host = params.url.host or ""
+
+        async def on_queued_start(_, context: SimpleNamespace, __: Any) -> None:
+            context.queued_at = time.perf_counter()
+
+        async def on_queued_end(_, context: SimpleNamespace, __: Any) -> None:
+            self.observe(HTTP_SECONDS, time.perf_counter() - context.queued_at, phase="queue")
+
+        async def on_dns_start(_, context: SimpleNamespace, __: Any) -> None:
+            context.dns_started_at = time.perf_counter()
+
+        async def on_dns_end(_, context: SimpleNamespace, __: Any) -> None:
+            self.observe(
+                HTTP_SECONDS,
+                time.perf_counter() - context.dns_started_at,
+                phase="dns",
+            )
+
+        async def on_connection_start(_, context: SimpleNamespace, __: Any) -> None:
+            context.connecting_at = time.perf_counter()
+
+        async def on_connection_end(_, context: SimpleNamespace, __: Any) -> None:
+            self.observe(
+                HTTP_SECONDS,
+                time.perf_counter() - context.connecting_at,
+                phase="connect",
+            )
+            self.inc(HTTP_CONNECTIONS, kind="new")
+
+        async def on_connection_reused(_, __: SimpleNamespace, ___: Any) -> None:
+            self.inc(HTTP_CONNECTIONS, kind="reused")
+
+        async def on_headers_sent(_, context: SimpleNamespace, params: Any) -> None:
+            # request line не видно, считаем только заголовки
+            size = sum(len(name) + len(value) + 4 for name, value in params.headers.items())
+            self.inc(HTTP_BYTES, size, host=context.host, direction="out")
+
+        async def on_chunk_sent(_, context: SimpleNamespace, params: Any) -> None:
+            self.inc(HTTP_BYTES, len(params.chunk), host=context.host, direction="out")
+
+        async def on_chunk_received(_, context: SimpleNamespace, params: Any) -> None:
+            self.inc(HTTP_BYTES, len(params.chunk), host=context.host, direction="in")
+
+        async def on_request_end(_, context: SimpleNamespace, params: Any) -> None:
+            self.observe(HTTP_SECONDS, time.perf_counter() - context.started_at, phase="ttfb")
+            self.inc(HTTP_REQUESTS, host=context.host, status=str(params.response.status))
+
+        async def on_request_exception(_, __: SimpleNamespace, params: Any) -> None:
+            self.inc(HTTP_ERRORS, error=type(params.exception).__name__)
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_dns_resolvehost_start.append(on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_end)
+        trace_config.on_connection_create_start.append(on_connection_start)
+        trace_config.on_connection_create_end.append(on_connection_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reused)
+        trace_config.on_request_headers_sent.append(on_headers_sent)
+        trace_config.on_request_chunk_sent.append(on_chunk_sent)
+        trace_config.on_response_chunk_received.append(on_chunk_received)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.freeze()
+        return trace_config
+
+    def render_prometheus(self) -> str:
+        """Все метрики в текстовом формате Prometheus 0.0.4"""
+
+        lines = []
+        for name in sorted(self._counters):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(self._counters[name].items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name in sorted(self._histograms):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(self._histograms[name].items()):
+                cumulative = 0
+                bounds = [*map(repr, histogram.buckets), "+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    bucket_labels = _format_labels((*labels, ("le", bound)))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total!r}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict[str, Any]:
+        """Сводка для людей: счетчики и квантили гистограмм по сериям
+
+        Серия называется значениями своих меток через запятую, без меток - total
+        """
+
+        def series_name(labels: Labels) -> str:
+            return ",".join(value for _, value in labels) or "total"
+
+        summary: dict[str, Any] = {}
+        for name, series in sorted(self._counters.items()):
+            summary[name] = {
+                series_name(labels): round(value, 6) for labels, value in sorted(series.items())
+            }
+        for name, histograms in sorted(self._histograms.items()):
+            summary[name] = {
+                series_name(labels): {
+                    "count": histogram.count,
+                    "mean": round(histogram.total / histogram.count, 6),
+                    "p50": round(histogram.quantile(0.5), 6),
+                    "p99": round(histogram.quantile(0.99), 6),
+                }
+                for labels, histogram in sorted(histograms.items())
+            }
+        return summary
+
+
+registry = Metrics()
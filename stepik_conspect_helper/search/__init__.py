@@ -0,0 +1,25 @@
+"""Полнотекстовый поиск по шагам"""
+
+from typing import TYPE_CHECKING
+
+from stepik_conspect_helper._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .index import IndexStats, SearchHit, SearchIndex
+    from .page import render_results_page, step_url
+
+__all__ = [
+    "IndexStats",
+    "SearchHit",
+    "SearchIndex",
+    "render_results_page",
+    "step_url",
+]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        ".index": ("IndexStats", "SearchHit", "SearchIndex"),
+        ".page": ("render_results_page", "step_url"),
+    },
+)
@@ -0,0 +1,438 @@
+"""Полнотекстовый индекс по шагам скачанных курсов
+
+Индекс лежит в SQLite рядом с кешем ответов API. Для каждого терма хранится
+закодированный список вхождений (см. postings.py), для каждого шага - update_date,
+длина в термах и сами термы, чтобы при правке шага знать, из каких списков его
+вычеркнуть. Поэтому обновление инкрементальное: шаг с прежним update_date не
+разбирается заново, а переписываются только списки термов измененных шагов,
+каждый по одному разу на пачку уроков
+
+Один шаг может входить в несколько курсов, принадлежность хранится отдельно.
+Выдача ранжируется по BM25
+"""
+
+import heapq
+import math
+import sqlite3
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from stepik_conspect_helper.constants import SEARCH_RESULTS_LIMIT
+from stepik_conspect_helper.dirs import user_cache_dir
+from stepik_conspect_helper.search.postings import decode_postings, merge_postings
+from stepik_conspect_helper.search.text import term_frequencies, tokenize
+from stepik_conspect_helper.stepa import Course, Lesson
+
+INDEX_FILE_NAME = "search.sqlite3"
+
+# параметры BM25, обычные значения из литературы
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# sqlite по умолчанию принимает не больше 32766 параметров в запросе
+_SQL_CHUNK_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS steps (
+    step_id INTEGER PRIMARY KEY,
+    lesson_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    update_date TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    terms TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    lesson_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    update_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS course_steps (
+    course_id INTEGER NOT NULL,
+    step_id INTEGER NOT NULL,
+    PRIMARY KEY (course_id, step_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS course_steps_step_id ON course_steps (step_id);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    postings BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class IndexStats:
+    steps_indexed: int = 0
+    steps_unchanged: int = 0
+    steps_removed: int = 0
+    terms_updated: int = 0
+
+
+@dataclass
+class SearchHit:
+    step_id: int
+    lesson_id: int
+    position: int
+    lesson_title: str
+    course_ids: list[int]
+    score: float
+
+
+def _chunks[T](items: Sequence[T]) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), _SQL_CHUNK_SIZE):
+        yield items[start : start + _SQL_CHUNK_SIZE]
+
+
+class SearchIndex:
+    def __init__(self, path: Path | str | None = None) -> None:
+        if path is None:
+            path = user_cache_dir() / INDEX_FILE_NAME
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def needs_steps(self, lesson: Lesson) -> bool:
+        """Нужно ли качать шаги урока, чтобы индекс стал актуальным
+
+        Подходит как fetch_steps для CourseCrawler.iter_lessons
+        """
+
+        row = self._conn.execute(
+            "SELECT update_date FROM lessons WHERE lesson_id = ?",
+            (lesson.id,),
+        ).fetchone()
+        if row is None or row[0] != lesson.update_date:
+            return True
+
+        indexed = sum(
+            self._conn.execute(
+                f"SELECT COUNT(*) FROM steps WHERE step_id IN ({','.join('?' * len(ids))})",
+                ids,
+            ).fetchone()[0]
+            for ids in _chunks(lesson.step_ids)
+        )
+        return indexed != len(lesson.step_ids)
+
+    def index_lessons(self, lessons: Iterable[Lesson]) -> IndexStats:
+        """Добавляет в индекс шаги уроков, переразбирая только измененные
+
+        Уроки без скачанных шагов пропускаются, их шаги в индексе остаются как были
+
+        Args:
+            lessons (Iterable[Lesson]): уроки вместе с шагами
+
+        Returns:
+            IndexStats: сколько шагов разобрано и сколько пропущено
+        """
+
+        stats = IndexStats()
+        removed: defaultdict[str, set[int]] = defaultdict(set)
+        added: defaultdict[str, dict[int, int]] = defaultdict(dict)
+        step_rows = []
+        lesson_rows = []
+
+        for lesson in lessons:
+            if not lesson.steps:
+                continue
+            lesson_rows.append((lesson.id, lesson.title, lesson.update_date))
+
+            previous = self._step_rows([step.id for step in lesson.steps])
+            for step in lesson.steps:
+                if (row := previous.get(step.id)) is not None:
+                    update_date, terms = row
+                    if update_date == step.update_date:
+                        stats.steps_unchanged += 1
+                        continue
+                    for term in terms.split():
+                        removed[term].add(step.id)
+
+                frequencies = term_frequencies(step.text)
+                for term, frequency in frequencies.items():
+                    added[term][step.id] = frequency
+                step_rows.append(
+                    (
+                        step.id,
+                        lesson.id,
+                        step.position,
+                        step.update_date,
+                        frequencies.total(),
+                        " ".join(frequencies),
+                    )
+                )
+                stats.steps_indexed += 1
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO lessons (lesson_id, title, update_date) "
+                "VALUES (?, ?, ?)",
+                lesson_rows,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO steps "
+                "(step_id, lesson_id, position, update_date, length, terms) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                step_rows,
+            )
+            stats.terms_updated = self._update_postings(removed, added)
+
+        return stats
+
+    def sync_course(self, course_id: int, step_ids: Iterable[int]) -> IndexStats:
+        """Запоминает, какие шаги входят в курс, и выкидывает шаги, которых нигде нет
+
+        Args:
+            course_id (int): id курса
+            step_ids (Iterable[int]): все шаги курса, в том числе не скачанные
+
+        Returns:
+            IndexStats: сколько шагов удалено из индекса
+        """
+
+        stats = IndexStats()
+        step_ids = set(step_ids)
+
+        with self._conn:
+            current = {
+                step_id
+                for (step_id,) in self._conn.execute(
+                    "SELECT step_id FROM course_steps WHERE course_id = ?",
+                    (course_id,),
+                )
+            }
+            self._conn.executemany(
+                "DELETE FROM course_steps WHERE course_id = ? AND step_id = ?",
+                ((course_id, step_id) for step_id in current - step_ids),
+            )
+            self._conn.executemany(
+                "INSERT INTO course_steps (course_id, step_id) VALUES (?, ?)",
+                ((course_id, step_id) for step_id in step_ids - current),
+            )
+
+            orphans = self._conn.execute(
+                "SELECT step_id, terms FROM steps WHERE step_id NOT IN "
+                "(SELECT step_id FROM course_steps)"
+            ).fetchall()
+            removed: defaultdict[str, set[int]] = defaultdict(set)
+            for step_id, terms in orphans:
+                for term in terms.split():
+                    removed[term].add(step_id)
+
+            self._conn.executemany(
+                "DELETE FROM steps WHERE step_id = ?",
+                ((step_id,) for step_id, _ in orphans),
+            )
+            self._conn.execute(
+                "DELETE FROM lessons WHERE lesson_id NOT IN (SELECT lesson_id FROM steps)"
+            )
+            stats.terms_updated = self._update_postings(removed, {})
+            stats.steps_removed = len(orphans)
+
+        return stats
+
+    def update_course(
+        self,
+        course: Course,
+        lessons: Iterable[Lesson] | None = None,
+    ) -> IndexStats:
+        """Приводит индекс курса в соответствие с его уроками
+
+        Args:
+            course (Course): курс
+            lessons (Iterable[Lesson] | None): все уроки курса, по умолчанию из дерева
+                course. Шаги нужны только у изменившихся уроков
+
+        Returns:
+            IndexStats: общая статистика обновления
+        """
+
+        step_ids: set[int] = set()
+
+        def collect(lessons: Iterable[Lesson]) -> Iterator[Lesson]:
+            for lesson in lessons:
+                step_ids.update(lesson.step_ids)
+                yield lesson
+
+        stats = self.index_lessons(
+            collect(course.iter_lessons() if lessons is None else lessons)
+        )
+        synced = self.sync_course(course.id, step_ids)
+        stats.steps_removed = synced.steps_removed
+        stats.terms_updated += synced.terms_updated
+        return stats
+
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int = SEARCH_RESULTS_LIMIT,
+        course_ids: Iterable[int] | None = None,
+    ) -> list[SearchHit]:
+        """Ищет шаги, в которых встречаются слова запроса
+
+        Шаги с любым из слов попадают в выдачу, но те, где есть все слова и где
+        редкие слова встречаются чаще, оказываются выше
+
+        Args:
+            query (str): запрос, разбирается так же, как текст шагов
+            limit (int): сколько результатов вернуть
+            course_ids (Iterable[int] | None): искать только в этих курсах
+
+        Returns:
+            list[SearchHit]: найденные шаги от лучшего к худшему
+        """
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit < 1:
+            return []
+
+        allowed = None
+        if course_ids is not None:
+            course_ids = list(course_ids)
+            allowed = {
+                step_id
+                for (step_id,) in self._conn.execute(
+                    "SELECT step_id FROM course_steps "
+                    f"WHERE course_id IN ({','.join('?' * len(course_ids))})",
+                    course_ids,
+                )
+            }
+
+        count, average_length = self._conn.execute(
+            "SELECT COUNT(*), AVG(length) FROM steps"
+        ).fetchone()
+        if not count:
+            return []
+        average_length = average_length or 1.0
+
+        matches: list[tuple[float, list[tuple[int, int]]]] = []
+        for term in terms:
+            row = self._conn.execute(
+                "SELECT postings FROM terms WHERE term = ?",
+                (term,),
+            ).fetchone()
+            if row is None:
+                continue
+
+            postings = [
+                posting
+                for posting in decode_postings(row[0])
+                if allowed is None or posting[0] in allowed
+            ]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            matches.append((idf, postings))
+
+        lengths = self._step_lengths(
+            list({step_id for _, postings in matches for step_id, _ in postings})
+        )
+        scores: defaultdict[int, float] = defaultdict(float)
+        for idf, postings in matches:
+            for step_id, frequency in postings:
+                norm = 1 - BM25_B + BM25_B * lengths[step_id] / average_length
+                scores[step_id] += (
+                    idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+                )
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return self._hits(best)
+
+    def _step_rows(self, step_ids: Sequence[int]) -> dict[int, tuple[str, str]]:
+        rows = {}
+        for ids in _chunks(step_ids):
+            rows.update(
+                (step_id, (update_date, terms))
+                for step_id, update_date, terms in self._conn.execute(
+                    "SELECT step_id, update_date, terms FROM steps "
+                    f"WHERE step_id IN ({','.join('?' * len(ids))})",
+                    ids,
+                )
+            )
+        return rows
+
+    def _step_lengths(self, step_ids: Sequence[int]) -> dict[int, int]:
+        lengths = {}
+        for ids in _chunks(step_ids):
+            lengths.update(
+                self._conn.execute(
+                    "SELECT step_id, length FROM steps "
+                    f"WHERE step_id IN ({','.join('?' * len(ids))})",
+                    ids,
+                )
+            )
+        return lengths
+
+    def _update_postings(
+        self,
+        removed: dict[str, set[int]],
+        added: dict[str, dict[int, int]],
+    ) -> int:
+        """Переписывает списки вхождений затронутых термов, каждый по разу"""
+
+        terms = sorted(removed.keys() | added.keys())
+        current = {}
+        for chunk in _chunks(terms):
+            current.update(
+                self._conn.execute(
+                    "SELECT term, postings FROM terms "
+                    f"WHERE term IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+
+        updated = []
+        emptied = []
+        for term in terms:
+            postings = merge_postings(
+                current.get(term, b""),
+                removed.get(term, ()),
+                added.get(term),
+            )
+            if postings:
+                updated.append((term, postings))
+            else:
+                emptied.append((term,))
+
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO terms (term, postings) VALUES (?, ?)",
+            updated,
+        )
+        self._conn.executemany("DELETE FROM terms WHERE term = ?", emptied)
+        return len(terms)
+
+    def _hits(self, best: list[tuple[int, float]]) -> list[SearchHit]:
+        step_ids = [step_id for step_id, _ in best]
+        details = {}
+        courses: defaultdict[int, list[int]] = defaultdict(list)
+
+        for ids in _chunks(step_ids):
+            placeholders = ",".join("?" * len(ids))
+            details.update(
+                (step_id, (lesson_id, position, title))
+                for step_id, lesson_id, position, title in self._conn.execute(
+                    "SELECT steps.step_id, steps.lesson_id, steps.position, "
+                    "COALESCE(lessons.title, '') FROM steps "
+                    "LEFT JOIN lessons ON lessons.lesson_id = steps.lesson_id "
+                    f"WHERE steps.step_id IN ({placeholders})",
+                    ids,
+                )
+            )
+            for course_id, step_id in self._conn.execute(
+                "SELECT course_id, step_id FROM course_steps "
+                f"WHERE step_id IN ({placeholders}) ORDER BY course_id",
+                ids,
+            ):
+                courses[step_id].append(course_id)
+
+        return [
+            SearchHit(step_id, *details[step_id], courses[step_id], score)
+            for step_id, score in best
+        ]
@@ -0,0 +1,39 @@
+"""HTML страница с результатами поиска для локального сервера"""
+
+import html
+
+from stepik_conspect_helper.constants import STEPIK_LESSON_STEP_URL
+from stepik_conspect_helper.search.index import SearchHit
+from stepik_conspect_helper.token_exchanger.templates.local_page import render_page
+
+SEARCH_FORM = (
+    '<form action="/search" method="get">'
+    '<input type="search" name="q" value="{query}" autofocus> '
+    '<button type="submit">Найти</button>'
+    "</form>"
+)
+
+
+def step_url(lesson_id: int, position: int) -> str:
+    return STEPIK_LESSON_STEP_URL.format(lesson_id=lesson_id, position=position)
+
+
+def render_results_page(query: str, hits: list[SearchHit]) -> bytes:
+    """Форма поиска и список найденных шагов со ссылками на Stepik"""
+
+    parts = [SEARCH_FORM.format(query=html.escape(query))]
+    if query and not hits:
+        parts.append("<p>Ничего не найдено</p>")
+    elif hits:
+        parts.append("<ol>")
+        for hit in hits:
+            url = html.escape(step_url(hit.lesson_id, hit.position))
+            courses = ", ".join(str(course_id) for course_id in hit.course_ids)
+            parts.append(
+                f'<li><a href="{url}">{html.escape(hit.lesson_title)}, '
+                f"шаг {hit.position}</a> (курс {courses})</li>"
+            )
+        parts.append("</ol>")
+
+    title = f"Поиск: {query}" if query else "Поиск"
+    return render_page(title, "\n".join(parts))
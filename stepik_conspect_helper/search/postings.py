@@ -0,0 +1,88 @@
+"""Компактная запись списков вхождений терма
+
+Список вхождений - пары (id шага, сколько раз терм в нем встретился), отсортированные
+по id. В байтах он хранится как разности соседних id и частоты, каждое число в
+varint: 7 бит на байт, старший бит - есть ли продолжение. id шагов в одном курсе
+идут плотно, так что на разность обычно хватает одного-двух байт вместо восьми
+"""
+
+from collections.abc import Iterable, Iterator, Mapping
+
+type Posting = tuple[int, int]
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    if value < 0:
+        raise ValueError("varint must be non-negative")
+
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(data: bytes) -> Iterator[int]:
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+    if shift:
+        raise ValueError("truncated varint")
+
+
+def encode_postings(postings: Iterable[Posting]) -> bytes:
+    """Кодирует пары (id шага, частота), отсортированные по id
+
+    Raises:
+        ValueError: если id не строго возрастают
+    """
+
+    out = bytearray()
+    previous = 0
+    for step_id, frequency in postings:
+        if out and step_id <= previous:
+            raise ValueError("step ids must be strictly increasing")
+        encode_varint(step_id - previous, out)
+        encode_varint(frequency, out)
+        previous = step_id
+    return bytes(out)
+
+
+def decode_postings(data: bytes) -> Iterator[Posting]:
+    step_id = 0
+    numbers = decode_varints(data)
+    for delta in numbers:
+        # у последнего id может не оказаться частоты, если список обрезан
+        if (frequency := next(numbers, None)) is None:
+            raise ValueError("truncated postings")
+        step_id += delta
+        yield step_id, frequency
+
+
+def merge_postings(
+    data: bytes,
+    removed: Iterable[int] = (),
+    added: Mapping[int, int] | None = None,
+) -> bytes:
+    """Обновляет закодированный список: выкидывает removed и дописывает added
+
+    Args:
+        data (bytes): текущий список
+        removed (Iterable[int]): id шагов, которые больше не содержат терм
+        added (Mapping[int, int] | None): id шага -> новая частота терма
+
+    Returns:
+        bytes: новый список, пустой если вхождений не осталось
+    """
+
+    postings = dict(decode_postings(data))
+    for step_id in removed:
+        postings.pop(step_id, None)
+    if added:
+        postings.update(added)
+    return encode_postings(sorted(postings.items()))
@@ -0,0 +1,131 @@
+"""Разбор текста шагов на термы для поискового индекса
+
+HTML шага превращается в плоский текст, режется на слова, слова приводятся к нижнему
+регистру, ё заменяется на е, а русские слова обрезаются до основы стеммером
+Портера (Snowball) для русского языка. Латиница не стеммится: в шагах это в основном
+идентификаторы из кода, и asyncio.gather должен находиться по gather, а не по gath
+"""
+
+import html
+import re
+from collections import Counter
+
+_TAG_RE = re.compile(r"<[^>]*>")
+_WORD_RE = re.compile(r"\w+")
+_CYRILLIC_RE = re.compile(r"[а-я]+")
+
+_VOWELS = "аеиоуыэюя"
+
+STOP_WORDS = frozenset(
+    (
+        "а без бы был была были было быть в вам вас во вот все всех вы да для до его "
+        "ее ей если есть еще же за и из или им их к как ко когда кто ли либо мы на над "
+        "не нет но о об от по под при с со так там то того тоже только у уже что это "
+        "эта эти этот я "
+        "a an and are as at be by for from in is it of on or that the this to with"
+    ).split()
+)
+
+# окончания из описания Snowball, после (?<=[ая]) идут окончания первой группы,
+# которые снимаются, только если перед ними а или я
+_PERFECTIVE_GERUND_RE = re.compile(
+    r"(?:(?<=[ая])(?:в|вши|вшись)|ив|ивши|ившись|ыв|ывши|ывшись)$"
+)
+_REFLEXIVE_RE = re.compile(r"(?:ся|сь)$")
+_ADJECTIVE = (
+    r"(?:ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых"
+    r"|ую|юю|ая|яя|ою|ею)"
+)
+_PARTICIPLE = r"(?:(?<=[ая])(?:ем|нн|вш|ющ|щ)|ивш|ывш|ующ)"
+_ADJECTIVAL_RE = re.compile(rf"{_PARTICIPLE}?{_ADJECTIVE}$")
+_VERB_RE = re.compile(
+    r"(?:(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)"
+    r"|ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят"
+    r"|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)$"
+)
+_NOUN_RE = re.compile(
+    r"(?:а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом"
+    r"|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$"
+)
+_DERIVATIONAL_RE = re.compile(r"ость?$")
+_SUPERLATIVE_RE = re.compile(r"ейше?$")
+
+
+def _region_start(word: str, start: int) -> int:
+    """Начало области после первой согласной, идущей за гласной, начиная со start"""
+
+    for index in range(start + 1, len(word)):
+        if word[index] not in _VOWELS and word[index - 1] in _VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _strip(regex: re.Pattern[str], word: str) -> str | None:
+    """Снимает самое длинное окончание из regex или возвращает None"""
+
+    match = regex.search(word)
+    return word[: match.start()] if match else None
+
+
+def stem_russian(word: str) -> str:
+    """Основа русского слова по алгоритму Snowball
+
+    Args:
+        word (str): слово в нижнем регистре, без ё
+
+    Returns:
+        str: основа слова
+    """
+
+    rv_start = next(
+        (index + 1 for index, char in enumerate(word) if char in _VOWELS),
+        len(word),
+    )
+    prefix, rv = word[:rv_start], word[rv_start:]
+    r2_start = _region_start(word, _region_start(word, 0)) - rv_start
+
+    if (stripped := _strip(_PERFECTIVE_GERUND_RE, rv)) is not None:
+        rv = stripped
+    else:
+        if (stripped := _strip(_REFLEXIVE_RE, rv)) is not None:
+            rv = stripped
+        for regex in (_ADJECTIVAL_RE, _VERB_RE, _NOUN_RE):
+            if (stripped := _strip(regex, rv)) is not None:
+                rv = stripped
+                break
+
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    if (match := _DERIVATIONAL_RE.search(rv)) and match.start() >= r2_start:
+        rv = rv[: match.start()]
+
+    if (stripped := _strip(_SUPERLATIVE_RE, rv)) is not None:
+        rv = stripped[:-1] if stripped.endswith("нн") else stripped
+    elif rv.endswith("нн"):
+        rv = rv[:-1]
+    elif rv.endswith("ь"):
+        rv = rv[:-1]
+
+    return prefix + rv
+
+
+def html_to_text(text: str) -> str:
+    return html.unescape(_TAG_RE.sub(" ", text))
+
+
+def tokenize(text: str) -> list[str]:
+    """Режет плоский текст на термы, стоп-слова выбрасываются"""
+
+    terms = []
+    for word in _WORD_RE.findall(text):
+        word = word.lower().replace("ё", "е")
+        if word not in STOP_WORDS:
+            terms.append(stem_russian(word) if _CYRILLIC_RE.fullmatch(word) else word)
+    return terms
+
+
+def term_frequencies(step_html: str) -> Counter[str]:
+    """Сколько раз каждый терм встречается в HTML шага"""
+
+    return Counter(tokenize(html_to_text(step_html)))
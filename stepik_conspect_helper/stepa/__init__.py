@@ -1,5 +1,108 @@
-from .oauth import exchange_code_for_token
+"""Клиент, краулер и модели Stepik API
+
+Подмодули грузятся при первом обращении к имени, так что импорт моделей или кеша
+не тянет aiohttp
+"""
+
+from typing import TYPE_CHECKING
+
+from stepik_conspect_helper._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .cache import CacheStats, OfflineCacheMissError, ResponseCache
+    from .checkpoint import CrawlCheckpoint
+    from .client import StepikClient
+    from .crawler import CourseCrawler, CrawlStats, LessonPool
+    from .media import (
+        MediaDownloader,
+        MediaObject,
+        MediaStats,
+        MediaStore,
+        collect_media_urls,
+        extract_media_urls,
+    )
+    from .models import Course, Lesson, Section, Step, Unit
+    from .oauth import (
+        OAuthToken,
+        exchange_code_for_token,
+        refresh_access_token,
+        request_client_credentials_token,
+    )
+    from .ratelimit import AdaptiveRateLimiter, RetryPolicy
+    from .scheduler import FairScheduler
+    from .snapshot import (
+        CourseSnapshot,
+        SnapshotCrawler,
+        SnapshotFormatError,
+        write_snapshot,
+    )
+    from .tokens import TokenStore, obtain_token
 
 __all__ = [
+    "AdaptiveRateLimiter",
+    "CacheStats",
+    "Course",
+    "CourseCrawler",
+    "CourseSnapshot",
+    "CrawlCheckpoint",
+    "CrawlStats",
+    "FairScheduler",
+    "Lesson",
+    "LessonPool",
+    "MediaDownloader",
+    "MediaObject",
+    "MediaStats",
+    "MediaStore",
+    "OAuthToken",
+    "OfflineCacheMissError",
+    "ResponseCache",
+    "RetryPolicy",
+    "Section",
+    "SnapshotCrawler",
+    "SnapshotFormatError",
+    "Step",
+    "StepikClient",
+    "TokenStore",
+    "Unit",
+    "collect_media_urls",
     "exchange_code_for_token",
+    "extract_media_urls",
+    "obtain_token",
+    "refresh_access_token",
+    "request_client_credentials_token",
+    "write_snapshot",
 ]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        ".cache": ("CacheStats", "OfflineCacheMissError", "ResponseCache"),
+        ".checkpoint": ("CrawlCheckpoint",),
+        ".client": ("StepikClient",),
+        ".crawler": ("CourseCrawler", "CrawlStats", "LessonPool"),
+        ".media": (
+            "MediaDownloader",
+            "MediaObject",
+            "MediaStats",
+            "MediaStore",
+            "collect_media_urls",
+            "extract_media_urls",
+        ),
+        ".models": ("Course", "Lesson", "Section", "Step", "Unit"),
+        ".oauth": (
+            "OAuthToken",
+            "exchange_code_for_token",
+            "refresh_access_token",
+            "request_client_credentials_token",
+        ),
+        ".ratelimit": ("AdaptiveRateLimiter", "RetryPolicy"),
+        ".scheduler": ("FairScheduler",),
+        ".snapshot": (
+            "CourseSnapshot",
+            "SnapshotCrawler",
+            "SnapshotFormatError",
+            "write_snapshot",
+        ),
+        ".tokens": ("TokenStore", "obtain_token"),
+    },
+)
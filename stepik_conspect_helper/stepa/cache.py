@@ -0,0 +1,241 @@
+"""Персистентный кеш ответов Stepik API
+
+Кеш хранится в SQLite, ключ - коллекция и id объекта. Вместе с объектом запоминаются
+ETag и Last-Modified ответа, в котором он пришел, и id всего запроса: ETag относится
+к телу ответа целиком и годится для условного запроса только с тем же набором id.
+Так протухшие записи можно перепроверить, а не скачивать заново. При превышении
+размера выкидываются давно не читавшиеся записи
+"""
+
+import sqlite3
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+from stepik_conspect_helper.constants import (
+    STEPIK_API_CACHE_MAX_SIZE,
+    STEPIK_API_CACHE_TTL,
+)
+from stepik_conspect_helper.dirs import user_cache_dir
+
+CACHE_FILE_NAME = "api.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    resource TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    chunk_ids TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (resource, object_id)
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+# колонки, которых нет в кешах старых версий; записям без них ETag не доверяем
+_ADDED_COLUMNS = {"chunk_ids": "TEXT"}
+
+
+class OfflineCacheMissError(LookupError):
+    """В офлайн режиме запросили объект, которого нет в кеше"""
+
+
+class CacheEntry(NamedTuple):
+    object_id: int
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+    # id запроса, из ответа на который пришли etag и last_modified, в том же порядке
+    chunk_ids: tuple[int, ...] = ()
+
+
+class ResourceStats(NamedTuple):
+    objects: int
+    stale: int
+    size: int
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    evicted: int = 0
+    bytes_from_cache: int = 0
+    bytes_from_network: int = 0
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        *,
+        ttl: float = STEPIK_API_CACHE_TTL,
+        max_size: int = STEPIK_API_CACHE_MAX_SIZE,
+    ) -> None:
+        if path is None:
+            path = user_cache_dir() / CACHE_FILE_NAME
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = CacheStats()
+
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _migrate(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        with self._conn:
+            for name, column_type in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE responses ADD COLUMN {name} {column_type}")
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.ttl
+
+    def get_many(
+        self,
+        resource: str,
+        ids: Sequence[int],
+    ) -> dict[int, CacheEntry]:
+        """Достает записи по id и отмечает их как недавно использованные
+
+        Args:
+            resource (str): название коллекции
+            ids (Sequence[int]): id объектов
+
+        Returns:
+            dict[int, CacheEntry]: найденные записи, отсутствующих id в словаре нет
+        """
+
+        if not ids:
+            return {}
+
+        placeholders = ",".join("?" * len(ids))
+        rows = self._conn.execute(
+            "SELECT object_id, body, etag, last_modified, stored_at, chunk_ids FROM responses "
+            f"WHERE resource = ? AND object_id IN ({placeholders})",
+            (resource, *ids),
+        ).fetchall()
+
+        with self._conn:
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? "
+                f"WHERE resource = ? AND object_id IN ({placeholders})",
+                (time.time(), resource, *ids),
+            )
+
+        return {
+            object_id: CacheEntry(
+                object_id,
+                body,
+                etag,
+                last_modified,
+                stored_at,
+                tuple(map(int, chunk_ids.split(","))) if chunk_ids else (),
+            )
+            for object_id, body, etag, last_modified, stored_at, chunk_ids in rows
+        }
+
+    def put_many(
+        self,
+        resource: str,
+        bodies: Iterable[tuple[int, bytes]],
+        etag: str | None,
+        last_modified: str | None,
+        *,
+        chunk_ids: Sequence[int] = (),
+    ) -> None:
+        """Сохраняет объекты одного ответа вместе с его валидаторами
+
+        Args:
+            resource (str): название коллекции
+            bodies (Iterable[tuple[int, bytes]]): пары id и сериализованный объект
+            etag (str | None): ETag ответа
+            last_modified (str | None): Last-Modified ответа
+            chunk_ids (Sequence[int]): id запроса, на который пришел ответ, в его порядке
+        """
+
+        now = time.time()
+        chunk = ",".join(map(str, chunk_ids)) or None
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO responses "
+                "(resource, object_id, body, etag, last_modified, chunk_ids, "
+                "stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (resource, object_id, body, etag, last_modified, chunk, now, now, len(body))
+                    for object_id, body in bodies
+                ),
+            )
+
+        self._evict()
+
+    def touch_many(self, resource: str, ids: Sequence[int]) -> None:
+        """Продлевает жизнь записям, которые сервер подтвердил ответом 304"""
+
+        if not ids:
+            return
+
+        now = time.time()
+        placeholders = ",".join("?" * len(ids))
+        with self._conn:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? "
+                f"WHERE resource = ? AND object_id IN ({placeholders})",
+                (now, now, resource, *ids),
+            )
+
+    def total_size(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def resource_stats(self) -> dict[str, ResourceStats]:
+        """Сколько объектов, из них протухших, и байт лежит в кеше по коллекциям"""
+
+        rows = self._conn.execute(
+            "SELECT resource, COUNT(*), COALESCE(SUM(stored_at < ?), 0), SUM(size) "
+            "FROM responses GROUP BY resource ORDER BY resource",
+            (time.time() - self.ttl,),
+        )
+        return {
+            resource: ResourceStats(objects, stale, size)
+            for resource, objects, stale, size in rows
+        }
+
+    def _evict(self) -> None:
+        excess = self.total_size() - self.max_size
+        if excess <= 0:
+            return
+
+        victims = []
+        for resource, object_id, size in self._conn.execute(
+            "SELECT resource, object_id, size FROM responses ORDER BY accessed_at"
+        ):
+            victims.append((resource, object_id))
+            excess -= size
+            if excess <= 0:
+                break
+
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM responses WHERE resource = ? AND object_id = ?",
+                victims,
+            )
+        self.stats.evicted += len(victims)
@@ -0,0 +1,157 @@
+"""Чекпоинт обхода курса, чтобы упавшую сборку можно было продолжить
+
+Чекпоинт помнит по каждой коллекции, какие id уже скачаны, и когда начался обход.
+Сами объекты в нем не лежат: все, что обход скачал, и так попадает в ResponseCache
+клиента. Продолженный обход заново проходит дерево от курса, но скачанные id берет
+из кеша без перепроверки, если кеш получил или подтвердил их уже после начала
+прерванного обхода. Более старые записи перепроверяются как обычно, так что курс,
+изменившийся между запусками, не застрянет в конспекте старым. Файл маленький, и его
+не жалко переписывать целиком каждые every ответов. Пишется он атомарно, так что
+процесс можно убить в любой момент, хоть по OOM
+
+Как контекстный менеджер чекпоинт сохраняется, если внутри with вылетело
+исключение, и удаляется, если все прошло успешно
+"""
+
+import json
+import logging
+import os
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+from stepik_conspect_helper.constants import STEPIK_API_CRAWL_CHECKPOINT_EVERY
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FORMAT_VERSION = 2
+CHECKPOINT_SUFFIX = ".crawl.json"
+
+
+class CrawlCheckpoint:
+    def __init__(
+        self,
+        path: Path,
+        course_id: int,
+        *,
+        every: int = STEPIK_API_CRAWL_CHECKPOINT_EVERY,
+    ) -> None:
+        if every < 1:
+            raise ValueError("every must be positive")
+
+        self.path = path
+        self.course_id = course_id
+        self.every = every
+        self.completed: dict[str, set[int]] = {}
+        # начало этого обхода и того, чьи объекты можно брать из кеша без перепроверки;
+        # у продолженного обхода это начало прерванного
+        self.started_at = time.time()
+        self.trusted_since = self.started_at
+        self._unsaved = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.discard()
+        else:
+            self.save()
+            logger.info(
+                "Crawl checkpoint saved to %s: %s objects done",
+                self.path,
+                self.completed_count,
+            )
+
+    @staticmethod
+    def path_for(output_path: Path) -> Path:
+        return output_path.with_name(output_path.name + CHECKPOINT_SUFFIX)
+
+    @classmethod
+    def resume(
+        cls,
+        path: Path,
+        course_id: int,
+        *,
+        every: int = STEPIK_API_CRAWL_CHECKPOINT_EVERY,
+    ) -> Self:
+        """Поднимает чекпоинт с диска
+
+        Битый чекпоинт или чекпоинт другого курса равносилен его отсутствию: обход
+        просто начнется с нуля
+
+        Args:
+            path (Path): путь к файлу чекпоинта
+            course_id (int): курс, который обходится сейчас
+            every (int): через сколько ответов сохранять чекпоинт дальше
+
+        Returns:
+            Self: чекпоинт, пустой если продолжать нечего
+        """
+
+        checkpoint = cls(path, course_id, every=every)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data["version"] != CHECKPOINT_FORMAT_VERSION or data["course_id"] != course_id:
+                return checkpoint
+
+            checkpoint.completed = {
+                resource: set(ids) for resource, ids in data["completed"].items()
+            }
+            checkpoint.trusted_since = float(data["started_at"])
+        except FileNotFoundError:
+            return checkpoint
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            logger.warning("Ignoring broken crawl checkpoint %s: %s", path, exc)
+            return cls(path, course_id, every=every)
+
+        logger.info(
+            "Resuming crawl of course %s: %s objects done",
+            course_id,
+            checkpoint.completed_count,
+        )
+        return checkpoint
+
+    @property
+    def completed_count(self) -> int:
+        return sum(map(len, self.completed.values()))
+
+    def completed_ids(self, resource: str) -> set[int]:
+        return self.completed.get(resource, set())
+
+    def add_completed(self, resource: str, ids: Iterable[int]) -> None:
+        """Отмечает ответ с объектами ids и сохраняет чекпоинт каждые every ответов"""
+
+        self.completed.setdefault(resource, set()).update(ids)
+
+        self._unsaved += 1
+        if self._unsaved >= self.every:
+            self.save()
+
+    def save(self) -> None:
+        """Атомарно пишет чекпоинт на диск"""
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "version": CHECKPOINT_FORMAT_VERSION,
+                    "course_id": self.course_id,
+                    "started_at": self.started_at,
+                    "completed": {k: sorted(v) for k, v in self.completed.items()},
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,494 @@
+"""Клиент Stepik API
+
+Все запросы идут через одну ClientSession с общим пулом keep-alive соединений,
+а объекты запрашиваются пачками через ids[]=... вместо одного запроса на каждый id
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Collection, Iterable, Iterator, Mapping, Sequence
+from http import HTTPStatus
+from typing import Any, NamedTuple, Self
+
+import aiohttp
+
+from stepik_conspect_helper.constants import (
+    OAUTH_BEARER_TOKEN_TYPE,
+    STEPIK_API_CONNECTIONS_LIMIT,
+    STEPIK_API_CONNECTIONS_LIMIT_PER_HOST,
+    STEPIK_API_IDS_CHUNK_SIZE,
+    STEPIK_API_KEEPALIVE_TIMEOUT,
+    STEPIK_API_URL,
+)
+from stepik_conspect_helper.metrics import (
+    CACHE_OBJECTS,
+    HTTP_RETRIES,
+    HTTP_SECONDS,
+    Metrics,
+    registry,
+)
+from stepik_conspect_helper.stepa import codec
+from stepik_conspect_helper.stepa.cache import (
+    CacheEntry,
+    OfflineCacheMissError,
+    ResponseCache,
+)
+from stepik_conspect_helper.stepa.constants import (
+    COURSES_RESOURCE,
+    ETAG_HEADER,
+    IDS_QUERY_PARAM,
+    IF_MODIFIED_SINCE_HEADER,
+    IF_NONE_MATCH_HEADER,
+    LAST_MODIFIED_HEADER,
+    LESSONS_RESOURCE,
+    PAGE_QUERY_PARAM,
+    RETRY_AFTER_HEADER,
+    SECTIONS_RESOURCE,
+    STEPS_RESOURCE,
+    UNITS_RESOURCE,
+)
+from stepik_conspect_helper.stepa.models import StepikObject
+from stepik_conspect_helper.stepa.ratelimit import (
+    AdaptiveRateLimiter,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset(
+    {
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    }
+)
+THROTTLING_STATUSES = frozenset(
+    {
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+    }
+)
+
+
+class RawResponse(NamedTuple):
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+
+class ChunkResponse(NamedTuple):
+    not_modified: bool
+    objects: list[StepikObject]
+    etag: str | None
+    last_modified: str | None
+    size: int
+
+
+def chunked(items: Sequence[int], size: int) -> Iterator[Sequence[int]]:
+    """Режет последовательность на куски длиной не больше size
+
+    Args:
+        items (Sequence[int]): последовательность id
+        size (int): максимальный размер куска
+
+    Yields:
+        Sequence[int]: очередной кусок
+    """
+
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class StepikClient:
+    def __init__(
+        self,
+        access_token: str,
+        *,
+        api_url: str = STEPIK_API_URL,
+        chunk_size: int = STEPIK_API_IDS_CHUNK_SIZE,
+        connections_limit: int = STEPIK_API_CONNECTIONS_LIMIT,
+        connections_limit_per_host: int = STEPIK_API_CONNECTIONS_LIMIT_PER_HOST,
+        keepalive_timeout: float = STEPIK_API_KEEPALIVE_TIMEOUT,
+        cache: ResponseCache | None = None,
+        offline: bool = False,
+        rate_limiter: AdaptiveRateLimiter | None = None,
+        retry_policy: RetryPolicy | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        if offline and cache is None:
+            raise ValueError("offline mode requires cache")
+
+        self.access_token = access_token
+        self.api_url = api_url.rstrip("/")
+        self.chunk_size = chunk_size
+        self.connections_limit = connections_limit
+        self.connections_limit_per_host = connections_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.cache = cache
+        self.offline = offline
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.metrics = metrics or registry
+
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> Self:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            raise RuntimeError("StepikClient session is not opened")
+        return self._session
+
+    async def open(self) -> None:
+        """Создает общую сессию с пулом соединений
+
+        Сессию надо создавать внутри запущенного event loop, поэтому не в __init__
+        """
+
+        if self._session is not None:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.connections_limit,
+            limit_per_host=self.connections_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                "Authorization": f"{OAUTH_BEARER_TOKEN_TYPE} {self.access_token}",
+            },
+            trace_configs=[self.metrics.trace_config()],
+        )
+
+    async def close(self) -> None:
+        if self._session is None:
+            return
+
+        await self._session.close()
+        self._session = None
+
+    async def get(
+        self,
+        path: str,
+        params: Iterable[tuple[str, str]] | None = None,
+    ) -> dict[str, Any]:
+        """Делает GET запрос к API и возвращает распаршенный JSON
+
+        Если что-то пошло не так, рейзит aiohttp эксепшен
+
+        Args:
+            path (str): путь относительно api_url, например stepics/1
+            params (Iterable[tuple[str, str]] | None): query params
+
+        Returns:
+            dict[str, Any]: тело ответа
+        """
+
+        response = await self._send(path, params)
+        return codec.loads(response.body)
+
+    async def get_chunk(
+        self,
+        resource: str,
+        ids: Sequence[int],
+        *,
+        trusted: Collection[int] = (),
+        trusted_since: float = 0.0,
+    ) -> list[StepikObject]:
+        """Забирает объекты одним запросом вида ?ids[]=1&ids[]=2
+
+        Если подключен кеш, свежие объекты отдаются из него, протухшие перепроверяются
+        условным запросом, а в сеть за телом идем только за отсутствующими и измененными
+
+        Args:
+            resource (str): название коллекции, например lessons
+            ids (Sequence[int]): id объектов, не больше chunk_size штук
+            trusted (Collection[int]): id, которые отдаются из кеша даже протухшими,
+                без перепроверки; так продолженный обход не ходит за уже скачанным
+            trusted_since (float): момент по time.time(), раньше которого записи из
+                trusted считаются обычными и перепроверяются, если протухли
+
+        Raises:
+            OfflineCacheMissError: если в офлайн режиме части объектов нет в кеше
+
+        Returns:
+            list[StepikObject]: объекты в произвольном порядке
+        """
+
+        if self.cache is None:
+            return (await self._download_chunk(resource, ids)).objects
+
+        entries = self.cache.get_many(resource, ids)
+
+        if self.offline:
+            missing = [object_id for object_id in ids if object_id not in entries]
+            if missing:
+                raise OfflineCacheMissError(f"{resource} {missing} are not cached")
+            return self._serve_from_cache(entries.values())
+
+        fresh, stale_groups = [], defaultdict(list)
+        for entry in entries.values():
+            if (
+                entry.object_id in trusted and entry.stored_at >= trusted_since
+            ) or self.cache.is_fresh(entry):
+                fresh.append(entry)
+            else:
+                stale_groups[entry.chunk_ids, entry.etag, entry.last_modified].append(entry)
+
+        objects = self._serve_from_cache(fresh)
+        for stale in stale_groups.values():
+            objects.extend(await self._revalidate(resource, stale))
+
+        missing = [object_id for object_id in ids if object_id not in entries]
+        if missing:
+            objects.extend(await self._download_to_cache(resource, missing))
+
+        return objects
+
+    async def _send(
+        self,
+        path: str,
+        params: Iterable[tuple[str, str]] | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> RawResponse:
+        """Единственное место, где клиент ходит в сеть
+
+        Каждая попытка занимает слот в лимитере. 429 и 5xx, а также сетевые ошибки
+        повторяются по retry_policy, после последней попытки эксепшен летит наружу
+        """
+
+        params = list(params or ())
+        attempt = 0
+
+        while True:
+            retry_after = None
+
+            async with self.rate_limiter.slot():
+                started_at = time.perf_counter()
+                try:
+                    async with self.session.get(
+                        f"{self.api_url}/{path}",
+                        params=params,
+                        headers=headers,
+                    ) as response:
+                        retryable = response.status in RETRYABLE_STATUSES
+                        if retryable and attempt < self.retry_policy.max_retries:
+                            retry_after = parse_retry_after(
+                                response.headers.get(RETRY_AFTER_HEADER)
+                            )
+                            if response.status in THROTTLING_STATUSES:
+                                self.rate_limiter.on_throttle(retry_after)
+                        else:
+                            if response.status != HTTPStatus.NOT_MODIFIED:
+                                response.raise_for_status()
+                            body = await response.read()
+                            self.metrics.observe(
+                                HTTP_SECONDS,
+                                time.perf_counter() - started_at,
+                                phase="total",
+                            )
+                            self.rate_limiter.on_success()
+                            return RawResponse(response.status, response.headers, body)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                    if attempt >= self.retry_policy.max_retries:
+                        raise
+                    logger.warning("Request to %s failed: %r", path, exc)
+
+            delay = self.retry_policy.delay(attempt, retry_after)
+            logger.info("Retrying %s in %.2fs (attempt %s)", path, delay, attempt + 1)
+            self.rate_limiter.stats.retries += 1
+            self.metrics.inc(HTTP_RETRIES)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _download_chunk(
+        self,
+        resource: str,
+        ids: Sequence[int],
+        headers: dict[str, str] | None = None,
+    ) -> ChunkResponse:
+        """Качает пачку объектов, если API разбило ответ на страницы - дочитывает остальные
+
+        Условные заголовки отправляются только с первой страницей
+        """
+
+        params = [(IDS_QUERY_PARAM, str(object_id)) for object_id in ids]
+        objects: list[StepikObject] = []
+        validators: Mapping[str, str] = {}
+        size = 0
+        page = 1
+
+        while True:
+            if page == 1:
+                response = await self._send(resource, params, headers)
+                if response.status == HTTPStatus.NOT_MODIFIED:
+                    return ChunkResponse(True, [], None, None, 0)
+                validators = response.headers
+            else:
+                response = await self._send(
+                    resource,
+                    [*params, (PAGE_QUERY_PARAM, str(page))],
+                )
+
+            data = codec.loads(response.body)
+            objects.extend(data[resource])
+            size += len(response.body)
+
+            if not data.get("meta", {}).get("has_next"):
+                break
+            page += 1
+
+        return ChunkResponse(
+            False,
+            objects,
+            validators.get(ETAG_HEADER),
+            validators.get(LAST_MODIFIED_HEADER),
+            size,
+        )
+
+    async def _download_to_cache(
+        self,
+        resource: str,
+        ids: Sequence[int],
+    ) -> list[StepikObject]:
+        return self._store_chunk(resource, ids, await self._download_chunk(resource, ids))
+
+    async def _revalidate(
+        self,
+        resource: str,
+        entries: list[CacheEntry],
+    ) -> list[StepikObject]:
+        """Перепроверяет протухшие записи с общими валидаторами одним условным запросом
+
+        ETag описывает тело ответа на конкретный набор id, поэтому If-None-Match
+        отправляется, только если протух ровно тот запрос, из которого пришли записи,
+        и в том же порядке id. Для части запроса остается только If-Modified-Since
+        """
+
+        assert self.cache is not None
+
+        ids = [entry.object_id for entry in entries]
+        chunk_ids, etag, last_modified = (
+            entries[0].chunk_ids,
+            entries[0].etag,
+            entries[0].last_modified,
+        )
+
+        headers = {}
+        if etag and len(chunk_ids) == len(ids) and set(chunk_ids) == set(ids):
+            ids = list(chunk_ids)
+            headers[IF_NONE_MATCH_HEADER] = etag
+        if last_modified:
+            headers[IF_MODIFIED_SINCE_HEADER] = last_modified
+        if not headers:
+            return await self._download_to_cache(resource, ids)
+
+        chunk = await self._download_chunk(resource, ids, headers)
+        if not chunk.not_modified:
+            return self._store_chunk(resource, ids, chunk)
+
+        self.cache.touch_many(resource, ids)
+        self.cache.stats.revalidated += len(entries)
+        self.metrics.inc(CACHE_OBJECTS, len(entries), result="revalidated")
+        self.cache.stats.bytes_from_cache += sum(len(entry.body) for entry in entries)
+        return [codec.loads(entry.body) for entry in entries]
+
+    def _store_chunk(
+        self,
+        resource: str,
+        ids: Sequence[int],
+        chunk: ChunkResponse,
+    ) -> list[StepikObject]:
+        assert self.cache is not None
+
+        self.cache.stats.misses += len(ids)
+        self.metrics.inc(CACHE_OBJECTS, len(ids), result="miss")
+        self.cache.stats.bytes_from_network += chunk.size
+        self.cache.put_many(
+            resource,
+            (
+                (obj["id"], codec.dumps(obj))
+                for obj in chunk.objects
+            ),
+            chunk.etag,
+            chunk.last_modified,
+            chunk_ids=ids,
+        )
+
+        return chunk.objects
+
+    def _serve_from_cache(self, entries: Iterable[CacheEntry]) -> list[StepikObject]:
+        assert self.cache is not None
+
+        objects = []
+        for entry in entries:
+            self.cache.stats.hits += 1
+            self.cache.stats.bytes_from_cache += len(entry.body)
+            objects.append(codec.loads(entry.body))
+        self.metrics.inc(CACHE_OBJECTS, len(objects), result="hit")
+
+        return objects
+
+    async def get_objects(
+        self,
+        resource: str,
+        ids: Iterable[int],
+    ) -> list[StepikObject]:
+        """Забирает любое количество объектов пачками по chunk_size
+
+        Дубли id схлопываются, пачки запрашиваются параллельно
+
+        Args:
+            resource (str): название коллекции, например lessons
+            ids (Iterable[int]): id объектов
+
+        Returns:
+            list[StepikObject]: найденные объекты в порядке ids
+        """
+
+        unique_ids = list(dict.fromkeys(ids))
+        if not unique_ids:
+            return []
+
+        chunks = await asyncio.gather(
+            *(
+                self.get_chunk(resource, chunk)
+                for chunk in chunked(unique_ids, self.chunk_size)
+            )
+        )
+
+        by_id = {obj["id"]: obj for chunk in chunks for obj in chunk}
+        missing = len(unique_ids) - len(by_id)
+        if missing:
+            logger.warning("%s %s were not returned by API", missing, resource)
+
+        return [by_id[object_id] for object_id in unique_ids if object_id in by_id]
+
+    async def get_courses(self, ids: Iterable[int]) -> list[StepikObject]:
+        return await self.get_objects(COURSES_RESOURCE, ids)
+
+    async def get_sections(self, ids: Iterable[int]) -> list[StepikObject]:
+        return await self.get_objects(SECTIONS_RESOURCE, ids)
+
+    async def get_units(self, ids: Iterable[int]) -> list[StepikObject]:
+        return await self.get_objects(UNITS_RESOURCE, ids)
+
+    async def get_lessons(self, ids: Iterable[int]) -> list[StepikObject]:
+        return await self.get_objects(LESSONS_RESOURCE, ids)
+
+    async def get_steps(self, ids: Iterable[int]) -> list[StepikObject]:
+        return await self.get_objects(STEPS_RESOURCE, ids)
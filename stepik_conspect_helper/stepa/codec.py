@@ -0,0 +1,41 @@
+"""JSON кодек для ответов API и записей кеша
+
+Если установлен orjson или msgspec, JSON разбирается ими прямо из bytes, без
+промежуточного декодирования в str, и в несколько раз быстрее стандартного json.
+Обязательными зависимостями они не являются, без них работает stdlib
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _stdlib_loads(data: bytes | str) -> Any:
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+if orjson is not None:
+    DECODER_NAME = "orjson"
+    loads = orjson.loads
+    dumps = orjson.dumps
+elif msgspec is not None:
+    DECODER_NAME = "msgspec"
+    loads = msgspec.json.decode
+    dumps = msgspec.json.encode
+else:
+    DECODER_NAME = "json"
+    loads = _stdlib_loads
+    dumps = _stdlib_dumps
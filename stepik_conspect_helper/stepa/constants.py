@@ -0,0 +1,29 @@
+IDS_QUERY_PARAM = "ids[]"
+PAGE_QUERY_PARAM = "page"
+
+COURSES_RESOURCE = "courses"
+SECTIONS_RESOURCE = "sections"
+UNITS_RESOURCE = "units"
+LESSONS_RESOURCE = "lessons"
+STEPS_RESOURCE = "steps"
+STEPICS_RESOURCE = "stepics"
+
+ETAG_HEADER = "ETag"
+LAST_MODIFIED_HEADER = "Last-Modified"
+IF_NONE_MATCH_HEADER = "If-None-Match"
+IF_MODIFIED_SINCE_HEADER = "If-Modified-Since"
+RETRY_AFTER_HEADER = "Retry-After"
+
+RANGE_HEADER = "Range"
+IF_RANGE_HEADER = "If-Range"
+CONTENT_RANGE_HEADER = "Content-Range"
+# слабый ETag годится для кеша, но не для If-Range (RFC 9110, 13.1.5)
+WEAK_ETAG_PREFIX = "W/"
+
+# расширения ссылок <a href>, которые считаются вложениями шага, а не переходами
+ATTACHMENT_SUFFIXES = frozenset(
+    (
+        ".pdf .zip .tar .gz .rar .7z .py .ipynb .txt .csv .json .xlsx .docx .pptx "
+        ".png .jpg .jpeg .gif .svg .webp"
+    ).split()
+)
@@ -0,0 +1,385 @@
+"""Конкурентный обход дерева курса
+
+Каждый уровень (sections -> units -> lessons -> steps) запрашивается пачками,
+и следующий уровень для пачки начинает качаться сразу, как только пришли id родителей,
+не дожидаясь остальных пачек своего уровня. Количество одновременных запросов
+ограничено семафором
+
+Для больших курсов есть потоковый режим: сначала качается легкий скелет курса
+(sections и units), а потом уроки вместе с шагами отдаются по одному в порядке курса,
+так что в памяти одновременно живет только окно из нескольких пачек уроков
+
+С CrawlCheckpoint обход переживает падение: каждый ответ отмечается в чекпоинте,
+а перезапущенный с тем же чекпоинтом обход берет скачанное прерванным обходом из
+кеша клиента без перепроверки
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import (
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Hashable,
+    Iterable,
+    Sequence,
+)
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any
+
+from stepik_conspect_helper.constants import (
+    STEPIK_API_CRAWL_CONCURRENCY,
+    STEPIK_API_CRAWL_WINDOW,
+)
+from stepik_conspect_helper.stepa.checkpoint import CrawlCheckpoint
+from stepik_conspect_helper.stepa.client import StepikClient, StepikObject, chunked
+from stepik_conspect_helper.stepa.constants import (
+    COURSES_RESOURCE,
+    LESSONS_RESOURCE,
+    SECTIONS_RESOURCE,
+    STEPS_RESOURCE,
+    UNITS_RESOURCE,
+)
+from stepik_conspect_helper.stepa.models import Course, Lesson, Section, Step, Unit
+from stepik_conspect_helper.stepa.scheduler import FairScheduler
+
+logger = logging.getLogger(__name__)
+
+type ChunkCrawler = Callable[
+    [asyncio.TaskGroup, Sequence[int]],
+    Coroutine[Any, Any, None],
+]
+
+
+@dataclass
+class CrawlStats:
+    requests: int = 0
+    objects: int = 0
+    wall_time: float = 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        if not self.wall_time:
+            return 0.0
+        return self.requests / self.wall_time
+
+
+class LessonPool:
+    """Уроки, общие для нескольких курсов, которые качаются один раз на всех
+
+    Урок из shared_ids качается вместе с шагами первым обходом, который до него
+    дошел, остальные ждут ту же таску. Таска не принадлежит ни одному обходу, так что
+    отмена одного из них не ломает остальных. Уроки живут в пуле до конца сборки,
+    поэтому в shared_ids стоит класть только действительно общие уроки
+    """
+
+    def __init__(self, shared_ids: Iterable[int]) -> None:
+        self.shared_ids = set(shared_ids)
+        self.hits = 0
+        self._tasks: dict[int, asyncio.Task[dict[int, Lesson]]] = {}
+
+    async def get(
+        self,
+        ids: Sequence[int],
+        fetch: Callable[[Sequence[int]], Coroutine[Any, Any, dict[int, Lesson]]],
+    ) -> dict[int, Lesson]:
+        """Отдает уроки ids, через fetch качаются только те, за которыми еще не ходили"""
+
+        missing = [lesson_id for lesson_id in ids if lesson_id not in self._tasks]
+        self.hits += len(ids) - len(missing)
+        if missing:
+            task = asyncio.create_task(fetch(missing))
+            for lesson_id in missing:
+                self._tasks[lesson_id] = task
+
+        lessons = {}
+        for task in {self._tasks[lesson_id] for lesson_id in ids}:
+            lessons.update(await asyncio.shield(task))
+        return {lesson_id: lessons[lesson_id] for lesson_id in ids if lesson_id in lessons}
+
+
+class CourseCrawler:
+    def __init__(
+        self,
+        client: StepikClient,
+        *,
+        concurrency: int = STEPIK_API_CRAWL_CONCURRENCY,
+        scheduler: FairScheduler | None = None,
+        flow: Hashable = None,
+        lesson_pool: LessonPool | None = None,
+        checkpoint: CrawlCheckpoint | None = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be positive")
+        if checkpoint is not None and client.cache is None:
+            raise ValueError("checkpoint requires a client with cache")
+
+        self.client = client
+        self.concurrency = concurrency
+        self.scheduler = scheduler
+        self.flow = flow
+        self.lesson_pool = lesson_pool
+        self.checkpoint = checkpoint
+        self.stats = CrawlStats()
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._sections: dict[int, Section] = {}
+        self._units: dict[int, Unit] = {}
+        self._lessons: dict[int, Lesson] = {}
+        self._steps: dict[int, Step] = {}
+        self._fetch_steps: Callable[[Lesson], bool] | None = None
+        self._with_lessons = True
+
+    async def crawl(
+        self,
+        course_id: int,
+        *,
+        fetch_steps: Callable[[Lesson], bool] | None = None,
+    ) -> Course:
+        """Скачивает курс целиком и собирает из него дерево
+
+        Args:
+            course_id (int): id курса
+            fetch_steps (Callable[[Lesson], bool] | None): решает, качать ли шаги урока;
+                у пропущенных уроков список steps остается пустым
+
+        Raises:
+            LookupError: если API не вернуло такой курс
+
+        Returns:
+            Course: дерево курса с проставленными дочерними узлами
+        """
+
+        return await self._crawl_tree(course_id, fetch_steps, with_lessons=True)
+
+    async def crawl_structure(self, course_id: int) -> Course:
+        """Скачивает только скелет курса: sections и units без уроков
+
+        Args:
+            course_id (int): id курса
+
+        Raises:
+            LookupError: если API не вернуло такой курс
+
+        Returns:
+            Course: дерево курса, у всех units lesson равен None
+        """
+
+        return await self._crawl_tree(course_id, None, with_lessons=False)
+
+    async def iter_lessons(
+        self,
+        course: Course,
+        *,
+        fetch_steps: Callable[[Lesson], bool] | None = None,
+        window: int = STEPIK_API_CRAWL_WINDOW,
+    ) -> AsyncIterator[Lesson]:
+        """Отдает уроки курса вместе с шагами строго в порядке курса
+
+        Пачки уроков качаются параллельно, но вперед уходит не больше window пачек:
+        готовые раньше времени пачки ждут своей очереди в небольшом буфере
+
+        Args:
+            course (Course): скелет курса из crawl_structure
+            fetch_steps (Callable[[Lesson], bool] | None): решает, качать ли шаги урока
+            window (int): сколько пачек уроков может быть в работе одновременно
+
+        Yields:
+            Lesson: очередной урок, к дереву курса он не привязывается
+        """
+
+        if window < 1:
+            raise ValueError("window must be positive")
+
+        started_at = time.perf_counter()
+        lesson_ids = [unit.lesson_id for section in course.sections for unit in section.units]
+        chunks = chunked(lesson_ids, self.client.chunk_size)
+        pending = deque(
+            asyncio.create_task(self._fetch_lessons_with_steps(chunk, fetch_steps))
+            for chunk in islice(chunks, window)
+        )
+
+        try:
+            while pending:
+                lessons = await pending.popleft()
+                for chunk in islice(chunks, 1):
+                    pending.append(
+                        asyncio.create_task(
+                            self._fetch_lessons_with_steps(chunk, fetch_steps)
+                        )
+                    )
+
+                for lesson in lessons:
+                    yield lesson
+        finally:
+            for task in pending:
+                task.cancel()
+            self.stats.wall_time += time.perf_counter() - started_at
+
+    async def _crawl_tree(
+        self,
+        course_id: int,
+        fetch_steps: Callable[[Lesson], bool] | None,
+        *,
+        with_lessons: bool,
+    ) -> Course:
+        self.stats = CrawlStats()
+        self._sections, self._units, self._lessons, self._steps = {}, {}, {}, {}
+        self._fetch_steps = fetch_steps
+        self._with_lessons = with_lessons
+        started_at = time.perf_counter()
+
+        courses = await self._fetch(COURSES_RESOURCE, [course_id])
+        if not courses:
+            raise LookupError(f"Course {course_id} not found")
+        course = Course.from_api(courses[0])
+
+        async with asyncio.TaskGroup() as tg:
+            for chunk in chunked(course.section_ids, self.client.chunk_size):
+                tg.create_task(self._crawl_sections(tg, chunk))
+
+        self._assemble(course)
+
+        self.stats.wall_time = time.perf_counter() - started_at
+        logger.info(
+            "Course %s crawled: %s requests, %s objects in %.2fs (%.1f req/s)",
+            course_id,
+            self.stats.requests,
+            self.stats.objects,
+            self.stats.wall_time,
+            self.stats.requests_per_second,
+        )
+
+        return course
+
+    async def _fetch(self, resource: str, ids: Sequence[int]) -> list[StepikObject]:
+        # общий планировщик заменяет собственный семафор обхода
+        slot = self.scheduler.slot(self.flow) if self.scheduler else self._semaphore
+        checkpoint = self.checkpoint
+        if checkpoint is None:
+            async with slot:
+                objects = await self.client.get_chunk(resource, ids)
+        else:
+            async with slot:
+                objects = await self.client.get_chunk(
+                    resource,
+                    ids,
+                    trusted=checkpoint.completed_ids(resource),
+                    trusted_since=checkpoint.trusted_since,
+                )
+            checkpoint.add_completed(resource, ids)
+
+        self.stats.requests += 1
+        self.stats.objects += len(objects)
+        return objects
+
+    def _spawn_chunks(
+        self,
+        tg: asyncio.TaskGroup,
+        chunk_crawler: ChunkCrawler,
+        ids: list[int],
+    ) -> None:
+        for chunk in chunked(ids, self.client.chunk_size):
+            tg.create_task(chunk_crawler(tg, chunk))
+
+    async def _crawl_sections(self, tg: asyncio.TaskGroup, ids: Sequence[int]) -> None:
+        unit_ids = []
+        for data in await self._fetch(SECTIONS_RESOURCE, ids):
+            section = Section.from_api(data)
+            self._sections[section.id] = section
+            unit_ids.extend(section.unit_ids)
+
+        self._spawn_chunks(tg, self._crawl_units, unit_ids)
+
+    async def _crawl_units(self, tg: asyncio.TaskGroup, ids: Sequence[int]) -> None:
+        lesson_ids = []
+        for data in await self._fetch(UNITS_RESOURCE, ids):
+            unit = Unit.from_api(data)
+            self._units[unit.id] = unit
+            lesson_ids.append(unit.lesson_id)
+
+        if self._with_lessons:
+            self._spawn_chunks(tg, self._crawl_lessons, lesson_ids)
+
+    async def _crawl_lessons(self, tg: asyncio.TaskGroup, ids: Sequence[int]) -> None:
+        step_ids = []
+        for data in await self._fetch(LESSONS_RESOURCE, ids):
+            lesson = Lesson.from_api(data)
+            self._lessons[lesson.id] = lesson
+            if self._fetch_steps is None or self._fetch_steps(lesson):
+                step_ids.extend(lesson.step_ids)
+
+        self._spawn_chunks(tg, self._crawl_steps, step_ids)
+
+    async def _crawl_steps(self, _: asyncio.TaskGroup, ids: Sequence[int]) -> None:
+        for data in await self._fetch(STEPS_RESOURCE, ids):
+            step = Step.from_api(data)
+            self._steps[step.id] = step
+
+    async def _fetch_lessons_with_steps(
+        self,
+        ids: Sequence[int],
+        fetch_steps: Callable[[Lesson], bool] | None,
+    ) -> list[Lesson]:
+        pool = self.lesson_pool
+        if pool is None:
+            lessons = await self._load_lessons(ids, fetch_steps)
+            return [lessons[lesson_id] for lesson_id in ids if lesson_id in lessons]
+
+        # общие уроки всегда качаются с шагами: другому курсу они могут понадобиться
+        own_ids = [lesson_id for lesson_id in ids if lesson_id not in pool.shared_ids]
+        shared_ids = [lesson_id for lesson_id in ids if lesson_id in pool.shared_ids]
+        own, shared = await asyncio.gather(
+            self._load_lessons(own_ids, fetch_steps),
+            pool.get(shared_ids, lambda chunk: self._load_lessons(chunk, None)),
+        )
+
+        lessons = own | shared
+        return [lessons[lesson_id] for lesson_id in ids if lesson_id in lessons]
+
+    async def _load_lessons(
+        self,
+        ids: Sequence[int],
+        fetch_steps: Callable[[Lesson], bool] | None,
+    ) -> dict[int, Lesson]:
+        if not ids:
+            return {}
+
+        lessons = {
+            data["id"]: Lesson.from_api(data)
+            for data in await self._fetch(LESSONS_RESOURCE, ids)
+        }
+
+        step_ids = [
+            step_id
+            for lesson in lessons.values()
+            if fetch_steps is None or fetch_steps(lesson)
+            for step_id in lesson.step_ids
+        ]
+        step_chunks = await asyncio.gather(
+            *(
+                self._fetch(STEPS_RESOURCE, chunk)
+                for chunk in chunked(step_ids, self.client.chunk_size)
+            )
+        )
+
+        steps = {data["id"]: Step.from_api(data) for chunk in step_chunks for data in chunk}
+        for lesson in lessons.values():
+            lesson.steps = [steps[i] for i in lesson.step_ids if i in steps]
+
+        return lessons
+
+    def _assemble(self, course: Course) -> None:
+        course.sections = [
+            self._sections[i] for i in course.section_ids if i in self._sections
+        ]
+        for section in course.sections:
+            section.units = [self._units[i] for i in section.unit_ids if i in self._units]
+            for unit in section.units:
+                unit.lesson = self._lessons.get(unit.lesson_id)
+
+        for lesson in self._lessons.values():
+            lesson.steps = [self._steps[i] for i in lesson.step_ids if i in self._steps]
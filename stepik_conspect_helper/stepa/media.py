@@ -0,0 +1,472 @@
+"""Загрузка картинок и вложений из шагов в контентно-адресуемое хранилище
+
+Файл хранится под sha256 своего содержимого, поэтому одна и та же схема,
+вставленная в сотню шагов по разным адресам, лежит на диске один раз. Повторы
+отсекаются дважды: адрес, который уже качали, не запрашивается вовсе, а скачанный
+файл с уже известным содержимым просто выбрасывается
+
+Тело ответа пишется на диск кусками и целиком в памяти не бывает. Недокачанный файл
+остается в partial/ вместе с сильным ETag или Last-Modified ответа и при повторе
+дозапрашивается через Range с If-Range: если файл на сервере поменялся, сервер пришлет
+его целиком заново. Без такого валидатора файл качается с нуля. Одновременных загрузок
+ограниченное число, и отдельно - на каждый хост, чтобы не долбить один CDN всеми
+соединениями сразу
+
+Токен API в эти запросы не передается: ссылки в шагах ведут куда угодно
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from http import HTTPStatus
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple, Self
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+
+from stepik_conspect_helper.constants import (
+    MEDIA_DOWNLOAD_CHUNK_SIZE,
+    MEDIA_DOWNLOAD_CONCURRENCY,
+    MEDIA_DOWNLOAD_CONCURRENCY_PER_HOST,
+    STEPIK_URL,
+)
+from stepik_conspect_helper.metrics import HTTP_RETRIES, HTTP_SECONDS, Metrics, registry
+from stepik_conspect_helper.stepa.client import RETRYABLE_STATUSES
+from stepik_conspect_helper.stepa.constants import (
+    ATTACHMENT_SUFFIXES,
+    CONTENT_RANGE_HEADER,
+    ETAG_HEADER,
+    IF_RANGE_HEADER,
+    LAST_MODIFIED_HEADER,
+    RANGE_HEADER,
+    RETRY_AFTER_HEADER,
+    WEAK_ETAG_PREFIX,
+)
+from stepik_conspect_helper.stepa.models import Lesson
+from stepik_conspect_helper.stepa.ratelimit import RetryPolicy, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+STORE_INDEX_FILE_NAME = "media.sqlite3"
+OBJECTS_DIR_NAME = "objects"
+PARTIAL_DIR_NAME = "partial"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS partials (
+    url TEXT PRIMARY KEY,
+    validator TEXT NOT NULL
+);
+"""
+
+
+class _MediaLinkParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.links: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        attributes = dict(attrs)
+        match tag:
+            case "img" | "source" | "video" | "audio" if src := attributes.get("src"):
+                self.links.append(src)
+            case "a" if (href := attributes.get("href")) and (
+                PurePosixPath(urlsplit(href).path).suffix.lower() in ATTACHMENT_SUFFIXES
+            ):
+                self.links.append(href)
+
+
+def extract_media_urls(step_html: str, base_url: str = STEPIK_URL) -> list[str]:
+    """Находит в HTML шага картинки, видео и ссылки на файлы
+
+    Args:
+        step_html (str): block.text шага
+        base_url (str): относительно чего разрешать относительные ссылки
+
+    Returns:
+        list[str]: абсолютные http(s) адреса в порядке появления, без повторов
+    """
+
+    parser = _MediaLinkParser()
+    parser.feed(step_html)
+    parser.close()
+
+    urls = (urljoin(base_url + "/", link.strip()) for link in parser.links)
+    return list(dict.fromkeys(url for url in urls if urlsplit(url).scheme in ("http", "https")))
+
+
+def collect_media_urls(lessons: Iterable[Lesson], base_url: str = STEPIK_URL) -> list[str]:
+    """Адреса медиа всех шагов уроков без повторов"""
+
+    urls: dict[str, None] = {}
+    for lesson in lessons:
+        for step in lesson.steps:
+            urls.update(dict.fromkeys(extract_media_urls(step.text, base_url)))
+    return list(urls)
+
+
+class MediaObject(NamedTuple):
+    url: str
+    sha256: str
+    path: Path
+    size: int
+
+
+@dataclass
+class MediaStats:
+    downloaded: int = 0
+    bytes_downloaded: int = 0
+    url_hits: int = 0
+    content_duplicates: int = 0
+    resumed: int = 0
+    failed: int = 0
+
+
+class MediaStore:
+    """Файлы по sha256 в objects/, недокачанные - в partial/, индекс - в sqlite"""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.objects_dir = root / OBJECTS_DIR_NAME
+        self.partial_dir = root / PARTIAL_DIR_NAME
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(root / STORE_INDEX_FILE_NAME)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def lookup(self, url: str) -> MediaObject | None:
+        """Ищет уже скачанный файл по адресу"""
+
+        row = self._conn.execute(
+            "SELECT objects.sha256, objects.name, objects.size FROM urls "
+            "JOIN objects ON objects.sha256 = urls.sha256 WHERE urls.url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        sha256, name, size = row
+        path = self.objects_dir / name
+        if not path.exists():
+            # файл удалили руками - забываем его, чтобы скачать заново
+            with self._conn:
+                self._conn.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+            return None
+        return MediaObject(url, sha256, path, size)
+
+    def partial_path(self, url: str) -> Path:
+        return self.partial_dir / (hashlib.sha256(url.encode()).hexdigest() + ".part")
+
+    def partial_validator(self, url: str) -> str | None:
+        row = self._conn.execute(
+            "SELECT validator FROM partials WHERE url = ?",
+            (url,),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_partial_validator(self, url: str, validator: str | None) -> None:
+        with self._conn:
+            if validator is None:
+                self._conn.execute("DELETE FROM partials WHERE url = ?", (url,))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO partials (url, validator) VALUES (?, ?)",
+                    (url, validator),
+                )
+
+    def commit(self, url: str, path: Path, sha256: str) -> tuple[MediaObject, bool]:
+        """Переносит докачанный файл в хранилище
+
+        Args:
+            url (str): откуда файл скачан
+            path (Path): докачанный файл, после вызова его нет
+            sha256 (str): хеш содержимого
+
+        Returns:
+            tuple[MediaObject, bool]: объект хранилища и был ли такой файл уже
+        """
+
+        size = path.stat().st_size
+        row = self._conn.execute(
+            "SELECT name FROM objects WHERE sha256 = ?",
+            (sha256,),
+        ).fetchone()
+
+        duplicate = row is not None and (self.objects_dir / row[0]).exists()
+        if duplicate:
+            name = row[0]
+            path.unlink()
+        else:
+            suffix = PurePosixPath(urlsplit(url).path).suffix.lower()[:16]
+            name = f"{sha256[:2]}/{sha256}{suffix}"
+            (self.objects_dir / sha256[:2]).mkdir(exist_ok=True)
+            os.replace(path, self.objects_dir / name)
+
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO objects (sha256, name, size) VALUES (?, ?, ?)",
+                (sha256, name, size),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls (url, sha256) VALUES (?, ?)",
+                (url, sha256),
+            )
+            self._conn.execute("DELETE FROM partials WHERE url = ?", (url,))
+
+        return MediaObject(url, sha256, self.objects_dir / name, size), duplicate
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(MEDIA_DOWNLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _if_range_validator(etag: str | None, last_modified: str | None) -> str | None:
+    # со слабым ETag сервер вернет весь файл или, хуже, не тот кусок
+    if etag and not etag.startswith(WEAK_ETAG_PREFIX):
+        return etag
+    return last_modified or None
+
+
+def _range_start(content_range: str | None) -> int | None:
+    # bytes 100-199/200
+    if not content_range:
+        return None
+    unit, _, spec = content_range.partition(" ")
+    start, _, _ = spec.partition("-")
+    if unit.strip().lower() != "bytes" or not start.isdigit():
+        return None
+    return int(start)
+
+
+class MediaDownloader:
+    def __init__(
+        self,
+        store: MediaStore,
+        *,
+        concurrency: int = MEDIA_DOWNLOAD_CONCURRENCY,
+        concurrency_per_host: int = MEDIA_DOWNLOAD_CONCURRENCY_PER_HOST,
+        chunk_size: int = MEDIA_DOWNLOAD_CHUNK_SIZE,
+        retry_policy: RetryPolicy | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        if concurrency < 1 or concurrency_per_host < 1:
+            raise ValueError("concurrency must be positive")
+
+        self.store = store
+        self.concurrency = concurrency
+        self.concurrency_per_host = concurrency_per_host
+        self.chunk_size = chunk_size
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.metrics = metrics or registry
+        self.stats = MediaStats()
+
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._in_flight: dict[str, asyncio.Task[MediaObject]] = {}
+
+    async def __aenter__(self) -> Self:
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.concurrency,
+                limit_per_host=self.concurrency_per_host,
+            ),
+            trace_configs=[self.metrics.trace_config()],
+        )
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            raise RuntimeError("MediaDownloader session is not opened")
+        return self._session
+
+    async def download(self, url: str) -> MediaObject:
+        """Скачивает файл по адресу или отдает уже скачанный
+
+        Одновременные вызовы с одним адресом ждут одну загрузку
+
+        Raises:
+            aiohttp.ClientError: если файл так и не удалось скачать
+
+        Returns:
+            MediaObject: файл в хранилище
+        """
+
+        if (media := self.store.lookup(url)) is not None:
+            self.stats.url_hits += 1
+            return media
+
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.create_task(self._download(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        else:
+            self.stats.url_hits += 1
+
+        # отмена одного ждущего не должна отменять загрузку для остальных
+        return await asyncio.shield(task)
+
+    async def download_all(
+        self,
+        urls: Iterable[str],
+    ) -> dict[str, MediaObject | Exception]:
+        """Качает все адреса параллельно, ошибки возвращаются, а не летят наружу"""
+
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(
+            *(self.download(url) for url in urls),
+            return_exceptions=True,
+        )
+
+        outcome: dict[str, MediaObject | Exception] = {}
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to download %s: %s", url, result)
+                self.stats.failed += 1
+            elif isinstance(result, BaseException):
+                raise result
+            outcome[url] = result
+        return outcome
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.concurrency_per_host)
+        return self._host_semaphores[host]
+
+    async def _download(self, url: str) -> MediaObject:
+        part_path = self.store.partial_path(url)
+        attempt = 0
+
+        while True:
+            retry_after = None
+
+            async with self._semaphore, self._host_semaphore(url):
+                try:
+                    done, retry_after = await self._fetch_to_part(
+                        url,
+                        part_path,
+                        retryable=attempt < self.retry_policy.max_retries,
+                    )
+                    if done:
+                        break
+                except (
+                    aiohttp.ClientConnectionError,
+                    aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError,
+                ) as exc:
+                    # недокачанное остается в partial и дозапрашивается через Range
+                    if attempt >= self.retry_policy.max_retries:
+                        raise
+                    logger.warning("Download of %s failed: %r", url, exc)
+
+            delay = self.retry_policy.delay(attempt, retry_after)
+            logger.info("Retrying %s in %.2fs (attempt %s)", url, delay, attempt + 1)
+            self.metrics.inc(HTTP_RETRIES)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        sha256 = await asyncio.to_thread(_file_sha256, part_path)
+        media, duplicate = self.store.commit(url, part_path, sha256)
+        if duplicate:
+            self.stats.content_duplicates += 1
+        else:
+            self.stats.downloaded += 1
+        return media
+
+    async def _fetch_to_part(
+        self,
+        url: str,
+        part_path: Path,
+        *,
+        retryable: bool,
+    ) -> tuple[bool, float | None]:
+        """Одна попытка докачать файл в part_path
+
+        Args:
+            url (str): что качать
+            part_path (Path): куда дописывать
+            retryable (bool): можно ли еще повторить, если нет - 5xx и 429 летят наружу
+
+        Returns:
+            tuple[bool, float | None]: докачан ли файл и Retry-After, если надо повторить
+        """
+
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        validator = self.store.partial_validator(url)
+        headers = {}
+        # слабый ETag мог остаться от старых версий, с ним кусок на диске не докачать
+        if offset and validator and not validator.startswith(WEAK_ETAG_PREFIX):
+            headers[RANGE_HEADER] = f"bytes={offset}-"
+            headers[IF_RANGE_HEADER] = validator
+
+        started_at = time.perf_counter()
+        async with self.session.get(url, headers=headers) as response:
+            if response.status in RETRYABLE_STATUSES and retryable:
+                return False, parse_retry_after(response.headers.get(RETRY_AFTER_HEADER))
+
+            if response.status == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE and retryable:
+                # кусок на диске не сходится с файлом на сервере, начинаем заново
+                part_path.unlink(missing_ok=True)
+                self.store.set_partial_validator(url, None)
+                return False, 0.0
+
+            response.raise_for_status()
+
+            resumed = response.status == HTTPStatus.PARTIAL_CONTENT
+            if resumed and _range_start(response.headers.get(CONTENT_RANGE_HEADER)) != offset:
+                # прислали не тот кусок - дописывать его нельзя
+                part_path.unlink(missing_ok=True)
+                self.store.set_partial_validator(url, None)
+                if not retryable:
+                    raise aiohttp.ClientPayloadError(f"unexpected range for {url}")
+                return False, 0.0
+
+            if resumed:
+                self.stats.resumed += 1
+            else:
+                self.store.set_partial_validator(
+                    url,
+                    _if_range_validator(
+                        response.headers.get(ETAG_HEADER),
+                        response.headers.get(LAST_MODIFIED_HEADER),
+                    ),
+                )
+
+            with part_path.open("ab" if resumed else "wb") as file:
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    file.write(chunk)
+                    self.stats.bytes_downloaded += len(chunk)
+
+        self.metrics.observe(HTTP_SECONDS, time.perf_counter() - started_at, phase="total")
+        return True, None
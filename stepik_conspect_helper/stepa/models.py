@@ -0,0 +1,144 @@
+"""Типизированное дерево курса: Course -> Section -> Unit -> Lesson -> Step
+
+Объекты собираются из ответов API, дочерние узлы проставляет краулер. Классы
+со __slots__: у экземпляра нет своего __dict__, и на курсе в десятки тысяч шагов
+дерево занимает в разы меньше памяти, чем те же ответы API в виде словарей
+(см. benchmarks/bench_models.py)
+"""
+
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any, Self
+
+# объект в том виде, в каком он пришел из API
+type StepikObject = dict[str, Any]
+
+_QUALITY_RE = re.compile(r"\d+")
+
+
+def _video_quality(item: StepikObject) -> int:
+    """Высота кадра из quality вида "720", "1080p60"; 0 для "hd", "auto" и прочего"""
+
+    match = _QUALITY_RE.match(str(item.get("quality", "")))
+    return int(match.group()) if match else 0
+
+
+def _best_video_url(video: StepikObject | None) -> str:
+    """Ссылка на видео шага в самом высоком качестве, пустая если видео нет"""
+
+    urls = (video or {}).get("urls") or []
+    if not urls:
+        return ""
+    best = max(urls, key=_video_quality)
+    return best.get("url", "")
+
+
+@dataclass(slots=True)
+class Step:
+    id: int
+    lesson_id: int
+    position: int
+    block_name: str
+    text: str
+    update_date: str
+    # block.options как есть: примеры и шаблоны кода у задач на программирование.
+    # У большинства шагов их нет, None вместо пустого словаря на каждый шаг
+    options: StepikObject | None = None
+    video_url: str = ""
+
+    @classmethod
+    def from_api(cls, data: StepikObject) -> Self:
+        block = data.get("block") or {}
+        return cls(
+            id=data["id"],
+            lesson_id=data["lesson"],
+            position=data["position"],
+            block_name=block.get("name", ""),
+            text=block.get("text", ""),
+            update_date=data.get("update_date", ""),
+            options=block.get("options") or None,
+            video_url=_best_video_url(block.get("video")),
+        )
+
+
+@dataclass(slots=True)
+class Lesson:
+    id: int
+    title: str
+    step_ids: list[int]
+    update_date: str
+    steps: list[Step] = field(default_factory=list)
+
+    @classmethod
+    def from_api(cls, data: StepikObject) -> Self:
+        return cls(
+            id=data["id"],
+            title=data["title"],
+            step_ids=list(data["steps"]),
+            update_date=data.get("update_date", ""),
+        )
+
+
+@dataclass(slots=True)
+class Unit:
+    id: int
+    section_id: int
+    lesson_id: int
+    position: int
+    lesson: Lesson | None = None
+
+    @classmethod
+    def from_api(cls, data: StepikObject) -> Self:
+        return cls(
+            id=data["id"],
+            section_id=data["section"],
+            lesson_id=data["lesson"],
+            position=data["position"],
+        )
+
+
+@dataclass(slots=True)
+class Section:
+    id: int
+    title: str
+    position: int
+    unit_ids: list[int]
+    units: list[Unit] = field(default_factory=list)
+
+    @classmethod
+    def from_api(cls, data: StepikObject) -> Self:
+        return cls(
+            id=data["id"],
+            title=data["title"],
+            position=data["position"],
+            unit_ids=list(data["units"]),
+        )
+
+
+@dataclass(slots=True)
+class Course:
+    id: int
+    title: str
+    section_ids: list[int]
+    sections: list[Section] = field(default_factory=list)
+
+    @classmethod
+    def from_api(cls, data: StepikObject) -> Self:
+        return cls(
+            id=data["id"],
+            title=data["title"],
+            section_ids=list(data["sections"]),
+        )
+
+    def iter_lessons(self) -> Iterator[Lesson]:
+        """Обходит уроки курса в порядке прохождения"""
+
+        for section in self.sections:
+            for unit in section.units:
+                if unit.lesson is not None:
+                    yield unit.lesson
+
+    def iter_steps(self) -> Iterator[Step]:
+        for lesson in self.iter_lessons():
+            yield from lesson.steps
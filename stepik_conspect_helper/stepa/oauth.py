@@ -1,17 +1,72 @@
+import base64
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Self
+
 import aiohttp
 
 from stepik_conspect_helper.constants import (
     OAUTH_AUTH_CODE_GRANT_TYPE,
+    OAUTH_BEARER_TOKEN_TYPE,
+    OAUTH_CLIENT_CREDENTIALS_GRANT_TYPE,
+    OAUTH_REFRESH_TOKEN_GRANT_TYPE,
     STEPIK_OATH_REDIRECT_URI,
     STEPIK_OAUTH_APP_CLIENT_ID,
     STEPIK_TOKEN_ENDPOINT,
 )
 
+# токен считается протухшим чуть раньше срока, чтобы не умереть посреди краула
+TOKEN_EXPIRY_LEEWAY = 60.0
+
+
+@dataclass
+class OAuthToken:
+    access_token: str
+    token_type: str = OAUTH_BEARER_TOKEN_TYPE
+    expires_at: float | None = None
+    refresh_token: str | None = None
+    scope: str | None = None
+
+    @classmethod
+    def from_response(cls, data: dict[str, Any]) -> Self:
+        expires_in = data.get("expires_in")
+        return cls(
+            access_token=data["access_token"],
+            token_type=data.get("token_type", OAUTH_BEARER_TOKEN_TYPE),
+            expires_at=time.time() + expires_in if expires_in else None,
+            refresh_token=data.get("refresh_token"),
+            scope=data.get("scope"),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        return cls(**data)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    def is_expired(self, leeway: float = TOKEN_EXPIRY_LEEWAY) -> bool:
+        if self.expires_at is None:
+            return False
+        return time.time() + leeway >= self.expires_at
+
+
+async def _request_token(
+    client_session: "aiohttp.ClientSession",
+    data: dict[str, str],
+    headers: dict[str, str] | None = None,
+    token_endpoint: str = STEPIK_TOKEN_ENDPOINT,
+) -> OAuthToken:
+    kwargs = {"headers": headers} if headers is not None else {}
+    async with client_session.post(token_endpoint, data=data, **kwargs) as response:
+        response.raise_for_status()
+        return OAuthToken.from_response(await response.json())
+
 
 async def exchange_code_for_token(
     authorization_code: str,
     client_session: "aiohttp.ClientSession",
-) -> str:
+) -> OAuthToken:
     """Пытается обменять authorization_code на acces_token
 
     Если что-то пошло не так, просто рейзит aiohttp эксепшен :)
@@ -20,18 +75,78 @@ async def exchange_code_for_token(
         authorization_code (str): authorization_code
 
     Returns:
-        str: acces_token
+        OAuthToken: acces_token вместе со сроком жизни и refresh_token
     """
 
-    async with client_session.post(
-        STEPIK_TOKEN_ENDPOINT,
-        data={
+    return await _request_token(
+        client_session,
+        {
             "grant_type": OAUTH_AUTH_CODE_GRANT_TYPE,
             "code": authorization_code,
             "redirect_uri": STEPIK_OATH_REDIRECT_URI,
             "client_id": STEPIK_OAUTH_APP_CLIENT_ID,
         },
-    ) as response:
-        response.raise_for_status()
-        data = await response.json()
-        return data["access_token"]
+    )
+
+
+async def refresh_access_token(
+    token: OAuthToken,
+    client_session: "aiohttp.ClientSession",
+) -> OAuthToken:
+    """Обновляет access_token по refresh_token
+
+    Если сервер не выдал новый refresh_token, остается старый
+
+    Args:
+        token (OAuthToken): токен с refresh_token
+
+    Raises:
+        ValueError: если у токена нет refresh_token
+
+    Returns:
+        OAuthToken: свежий токен
+    """
+
+    if not token.refresh_token:
+        raise ValueError("token has no refresh_token")
+
+    refreshed = await _request_token(
+        client_session,
+        {
+            "grant_type": OAUTH_REFRESH_TOKEN_GRANT_TYPE,
+            "refresh_token": token.refresh_token,
+            "client_id": STEPIK_OAUTH_APP_CLIENT_ID,
+        },
+    )
+    if refreshed.refresh_token is None:
+        refreshed.refresh_token = token.refresh_token
+
+    return refreshed
+
+
+async def request_client_credentials_token(
+    client_id: str,
+    client_secret: str,
+    client_session: "aiohttp.ClientSession",
+    *,
+    token_endpoint: str = STEPIK_TOKEN_ENDPOINT,
+) -> OAuthToken:
+    """Получает токен по Client Credentials Grant, без браузера
+
+    Args:
+        client_id (str): id confidential приложения Stepik
+        client_secret (str): секрет приложения
+        client_session (aiohttp.ClientSession): сессия для запроса
+        token_endpoint (str): куда идти за токеном, подменяется в бенчмарках
+
+    Returns:
+        OAuthToken: токен приложения
+    """
+
+    credentials = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
+    return await _request_token(
+        client_session,
+        {"grant_type": OAUTH_CLIENT_CREDENTIALS_GRANT_TYPE},
+        {"Authorization": f"Basic {credentials}"},
+        token_endpoint,
+    )
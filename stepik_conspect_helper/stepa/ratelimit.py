@@ -0,0 +1,164 @@
+"""Адаптивное ограничение частоты запросов и расписание повторов
+
+Лимитер совмещает token bucket по частоте и ограничение на число одновременных
+запросов, и оба лимита подстраиваются по AIMD: после каждого успешного ответа
+понемногу растут, а на 429/503 резко падают. Так краулер держится около реального
+лимита API, а не далеко под ним и не в постоянном троттлинге
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+from stepik_conspect_helper.constants import (
+    STEPIK_API_CONNECTIONS_LIMIT_PER_HOST,
+    STEPIK_API_MAX_RATE,
+    STEPIK_API_MAX_RETRIES,
+    STEPIK_API_RATE,
+)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Парсит Retry-After в секунды ожидания
+
+    Заголовок бывает либо числом секунд, либо HTTP датой
+
+    Args:
+        value (str | None): значение заголовка
+
+    Returns:
+        float | None: сколько ждать или None, если заголовка нет или он битый
+    """
+
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = STEPIK_API_MAX_RETRIES
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Сколько ждать перед повтором номер attempt (с нуля)
+
+        Если сервер прислал Retry-After, слушаемся его, иначе экспоненциальный
+        backoff с full jitter, чтобы параллельные запросы не ломились хором
+        """
+
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+@dataclass
+class LimiterStats:
+    requests: int = 0
+    retries: int = 0
+    throttled: int = 0
+
+
+class AdaptiveRateLimiter:
+    def __init__(
+        self,
+        *,
+        rate: float = STEPIK_API_RATE,
+        min_rate: float = 1.0,
+        max_rate: float = STEPIK_API_MAX_RATE,
+        concurrency: float = STEPIK_API_CONNECTIONS_LIMIT_PER_HOST,
+        min_concurrency: float = 1.0,
+        max_concurrency: float = STEPIK_API_CONNECTIONS_LIMIT_PER_HOST * 4,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+    ) -> None:
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.stats = LimiterStats()
+
+        self._tokens = max(1.0, rate)
+        self._refilled_at = time.monotonic()
+        self._resume_at = 0.0
+        self._in_flight = 0
+        self._bucket_lock = asyncio.Lock()
+        self._slots = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Ждет свободного места по обоим лимитам и держит его на время запроса"""
+
+        async with self._slots:
+            await self._slots.wait_for(lambda: self._in_flight < int(self.concurrency))
+            self._in_flight += 1
+
+        try:
+            await self._take_token()
+            self.stats.requests += 1
+            yield
+        finally:
+            async with self._slots:
+                self._in_flight -= 1
+                self._slots.notify_all()
+
+    def on_success(self) -> None:
+        """Аддитивный рост: примерно +increase к лимитам за каждые rate успехов"""
+
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+        self.concurrency = min(
+            self.max_concurrency,
+            self.concurrency + self.increase / self.concurrency,
+        )
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        """Мультипликативное падение и общая пауза, если сервер сказал сколько ждать"""
+
+        self.stats.throttled += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease)
+
+        if retry_after is not None:
+            self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+
+    async def _take_token(self) -> None:
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                if now < self._resume_at:
+                    await asyncio.sleep(self._resume_at - now)
+                    continue
+
+                burst = max(1.0, self.rate)
+                self._tokens = min(burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
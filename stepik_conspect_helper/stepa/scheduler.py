@@ -0,0 +1,102 @@
+"""Честное распределение запросов между несколькими обходами
+
+Когда в одном процессе собирается много курсов, у всех один клиент, один пул
+соединений и один лимит частоты. Простой семафор отдавал бы места в порядке
+прихода, и огромный курс, накидавший сотни запросов в очередь, задерживал бы
+все остальные. FairScheduler держит отдельную очередь на каждый поток (обычно
+курс) и раздает освободившиеся места по кругу: каждый ждущий поток получает
+по одному месту за оборот
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Hashable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from stepik_conspect_helper.constants import STEPIK_API_CRAWL_CONCURRENCY
+
+
+@dataclass
+class SchedulerStats:
+    granted: dict[Hashable, int] = field(default_factory=dict)
+    max_waiting: int = 0
+
+
+class FairScheduler:
+    def __init__(self, concurrency: int = STEPIK_API_CRAWL_CONCURRENCY) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be positive")
+
+        self.concurrency = concurrency
+        self.stats = SchedulerStats()
+
+        self._in_flight = 0
+        self._waiting = 0
+        self._queues: OrderedDict[Hashable, deque[asyncio.Future[None]]] = OrderedDict()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self, flow: Hashable = None) -> AsyncIterator[None]:
+        """Ждет своей очереди в потоке flow и держит место на время запроса"""
+
+        await self._acquire(flow)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, flow: Hashable) -> None:
+        if self._in_flight < self.concurrency and not self._waiting:
+            self._grant(flow)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(flow, deque()).append(waiter)
+        self._waiting += 1
+        self.stats.max_waiting = max(self.stats.max_waiting, self._waiting)
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # место уже выдали, но забрать его не успели - отдаем следующему
+                self._release()
+            else:
+                self._discard(flow, waiter)
+            raise
+
+    def _grant(self, flow: Hashable) -> None:
+        self._in_flight += 1
+        self.stats.granted[flow] = self.stats.granted.get(flow, 0) + 1
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+
+        while self._queues and self._in_flight < self.concurrency:
+            flow, queue = self._queues.popitem(last=False)
+            waiter = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                # поток уходит в конец круга, даже если ждет еще
+                self._queues[flow] = queue
+            if waiter.done():
+                # ждущего отменили вместе с держателем места, его задача еще не
+                # дошла до _discard; место ему не выдаем, иначе оно потеряется
+                continue
+
+            self._grant(flow)
+            waiter.set_result(None)
+
+    def _discard(self, flow: Hashable, waiter: asyncio.Future[None]) -> None:
+        queue = self._queues.get(flow)
+        if queue is None or waiter not in queue:
+            return
+
+        queue.remove(waiter)
+        self._waiting -= 1
+        if not queue:
+            del self._queues[flow]
@@ -0,0 +1,438 @@
+"""Бинарный снимок скачанного курса
+
+Снимок - один файл, из которого курс можно перерендерить без сети и без разбора
+JSON. Внутри заголовок, таблицы записей фиксированного размера и арена строк:
+
+    header | course | sections | units | lessons | step ids | steps | step index | arena
+
+Все строки (заголовки, тексты шагов, даты) лежат в арене в UTF-8 и в таблицах
+представлены парой (смещение, длина), одинаковые строки хранятся один раз.
+Числа little-endian. Файл открывается через mmap: скелет курса (sections, units,
+lessons) читается сразу, он маленький, а шаги декодируются только при обращении.
+Шаг по id находится двоичным поиском по отсортированному индексу прямо в mmap
+"""
+
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import replace
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Self
+
+from stepik_conspect_helper.constants import STEPIK_API_CRAWL_WINDOW
+from stepik_conspect_helper.stepa import codec
+from stepik_conspect_helper.stepa.models import Course, Lesson, Section, Step, Unit
+
+SNAPSHOT_MAGIC = b"STPKSNAP"
+SNAPSHOT_FORMAT_VERSION = 2
+
+# magic, version, reserved, sections, units, lessons, step ids, steps, arena offset
+_HEADER = struct.Struct("<8sHHIIIIIQ")
+# id, title
+_COURSE = struct.Struct("<qQI")
+# id, position, title, первый unit, количество units
+_SECTION = struct.Struct("<qiQIII")
+# id, section_id, lesson_id, position
+_UNIT = struct.Struct("<qqqi")
+# id, title, update_date, первый step id, количество step ids, первый шаг, количество шагов
+_LESSON = struct.Struct("<qQIQIIIII")
+_STEP_ID = struct.Struct("<q")
+# id, lesson_id, position, block_name, text, update_date, options в JSON, video_url
+_STEP = struct.Struct("<qqiQIQIQIQIQI")
+# id, номер шага в таблице steps
+_STEP_INDEX = struct.Struct("<qI")
+
+
+class SnapshotFormatError(ValueError):
+    """Файл не является снимком или записан несовместимой версией"""
+
+
+class _Arena:
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self._offsets: dict[str, tuple[int, int]] = {}
+
+    def add(self, value: str) -> tuple[int, int]:
+        if (ref := self._offsets.get(value)) is None:
+            encoded = value.encode("utf-8")
+            ref = (len(self.data), len(encoded))
+            self.data += encoded
+            self._offsets[value] = ref
+        return ref
+
+
+class SnapshotWriter:
+    """Пишет снимок потоком: уроки с шагами добавляются по одному в порядке курса
+
+    В памяти копятся только записи фиксированного размера и арена строк
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._arena = _Arena()
+        self._lessons: list[bytes] = []
+        self._step_ids: list[bytes] = []
+        self._steps: list[bytes] = []
+        self._step_index: list[tuple[int, int]] = []
+
+    def add_lesson(self, lesson: Lesson) -> None:
+        title = self._arena.add(lesson.title)
+        update_date = self._arena.add(lesson.update_date)
+
+        self._lessons.append(
+            _LESSON.pack(
+                lesson.id,
+                *title,
+                *update_date,
+                len(self._step_ids),
+                len(lesson.step_ids),
+                len(self._steps),
+                len(lesson.steps),
+            )
+        )
+        self._step_ids.extend(_STEP_ID.pack(step_id) for step_id in lesson.step_ids)
+
+        for step in lesson.steps:
+            self._step_index.append((step.id, len(self._steps)))
+            self._steps.append(
+                _STEP.pack(
+                    step.id,
+                    step.lesson_id,
+                    step.position,
+                    *self._arena.add(step.block_name),
+                    *self._arena.add(step.text),
+                    *self._arena.add(step.update_date),
+                    *self._arena.add(
+                        codec.dumps(step.options).decode() if step.options else ""
+                    ),
+                    *self._arena.add(step.video_url),
+                )
+            )
+
+    def finish(self, course: Course) -> int:
+        """Дописывает скелет курса и атомарно сохраняет файл
+
+        Args:
+            course (Course): дерево курса, уроки и шаги в нем не нужны
+
+        Returns:
+            int: размер снимка в байтах
+        """
+
+        sections = []
+        units = []
+        for section in course.sections:
+            sections.append(
+                _SECTION.pack(
+                    section.id,
+                    section.position,
+                    *self._arena.add(section.title),
+                    len(units),
+                    len(section.units),
+                )
+            )
+            units.extend(
+                _UNIT.pack(unit.id, unit.section_id, unit.lesson_id, unit.position)
+                for unit in section.units
+            )
+
+        course_record = _COURSE.pack(course.id, *self._arena.add(course.title))
+        step_index = [_STEP_INDEX.pack(*item) for item in sorted(self._step_index)]
+
+        tables = [
+            course_record,
+            *sections,
+            *units,
+            *self._lessons,
+            *self._step_ids,
+            *self._steps,
+            *step_index,
+        ]
+        arena_offset = _HEADER.size + sum(map(len, tables))
+        header = _HEADER.pack(
+            SNAPSHOT_MAGIC,
+            SNAPSHOT_FORMAT_VERSION,
+            0,
+            len(sections),
+            len(units),
+            len(self._lessons),
+            len(self._step_ids),
+            len(self._steps),
+            arena_offset,
+        )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("wb") as file:
+            file.write(header)
+            file.writelines(tables)
+            file.write(self._arena.data)
+        os.replace(tmp_path, self.path)
+
+        return arena_offset + len(self._arena.data)
+
+
+def write_snapshot(course: Course, path: Path) -> int:
+    """Сохраняет дерево курса вместе с шагами в снимок
+
+    Returns:
+        int: размер снимка в байтах
+    """
+
+    writer = SnapshotWriter(path)
+    for lesson in course.iter_lessons():
+        writer.add_lesson(lesson)
+    return writer.finish(course)
+
+
+class CourseSnapshot:
+    def __init__(self, path: Path) -> None:
+        """Открывает снимок и читает скелет курса
+
+        Raises:
+            SnapshotFormatError: если файл не снимок или версия не та
+        """
+
+        self.path = path
+        self._file: BinaryIO = path.open("rb")
+        try:
+            if os.fstat(self._file.fileno()).st_size < _HEADER.size:
+                raise SnapshotFormatError(f"{path} is too short to be a snapshot")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        try:
+            self._read_header()
+            self.course = self._read_course()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    @property
+    def step_count(self) -> int:
+        return self._steps_count
+
+    def step(self, step_id: int) -> Step | None:
+        """Находит и декодирует один шаг по id"""
+
+        index = bisect_left(_IndexView(self), step_id)
+        if index == self._steps_count:
+            return None
+
+        found_id, step_index = _STEP_INDEX.unpack_from(
+            self._map,
+            self._step_index_offset + index * _STEP_INDEX.size,
+        )
+        return self._read_step(step_index) if found_id == step_id else None
+
+    def lesson_steps(self, lesson: Lesson) -> list[Step]:
+        """Декодирует шаги одного урока"""
+
+        start, count = self._lesson_steps[lesson.id]
+        return [self._read_step(index) for index in range(start, start + count)]
+
+    def iter_lessons(self) -> Iterator[Lesson]:
+        """Отдает уроки курса по одному вместе с шагами
+
+        Шаги каждого урока декодируются только когда до него дошла очередь, а сам
+        урок в дереве course остается без шагов
+        """
+
+        for lesson in self.course.iter_lessons():
+            yield replace(lesson, steps=self.lesson_steps(lesson))
+
+    def _read_header(self) -> None:
+        (
+            magic,
+            version,
+            _,
+            self._sections_count,
+            self._units_count,
+            self._lessons_count,
+            self._step_ids_count,
+            self._steps_count,
+            self._arena_offset,
+        ) = _HEADER.unpack_from(self._map)
+
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotFormatError(f"{self.path} is not a course snapshot")
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotFormatError(f"Unsupported snapshot version {version}")
+
+        self._sections_offset = _HEADER.size + _COURSE.size
+        self._units_offset = self._sections_offset + self._sections_count * _SECTION.size
+        self._lessons_offset = self._units_offset + self._units_count * _UNIT.size
+        self._step_ids_offset = self._lessons_offset + self._lessons_count * _LESSON.size
+        self._steps_offset = self._step_ids_offset + self._step_ids_count * _STEP_ID.size
+        self._step_index_offset = self._steps_offset + self._steps_count * _STEP.size
+
+        expected_arena_offset = (
+            self._step_index_offset + self._steps_count * _STEP_INDEX.size
+        )
+        if expected_arena_offset != self._arena_offset or self._arena_offset > len(self._map):
+            raise SnapshotFormatError(f"{self.path} is truncated or corrupted")
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._arena_offset + offset
+        return str(self._map[start : start + length], "utf-8")
+
+    def _records(self, record: struct.Struct, offset: int, count: int) -> Iterator[tuple]:
+        return record.iter_unpack(self._map[offset : offset + count * record.size])
+
+    def _read_course(self) -> Course:
+        course_id, *title = _COURSE.unpack_from(self._map, _HEADER.size)
+
+        units = [
+            Unit(unit_id, section_id, lesson_id, position)
+            for unit_id, section_id, lesson_id, position in self._records(
+                _UNIT, self._units_offset, self._units_count
+            )
+        ]
+
+        self._lesson_steps: dict[int, tuple[int, int]] = {}
+        lessons = {}
+        for (
+            lesson_id,
+            title_offset,
+            title_length,
+            update_offset,
+            update_length,
+            step_ids_start,
+            step_ids_count,
+            steps_start,
+            steps_count,
+        ) in self._records(_LESSON, self._lessons_offset, self._lessons_count):
+            step_ids_offset = self._step_ids_offset + step_ids_start * _STEP_ID.size
+            lessons[lesson_id] = Lesson(
+                lesson_id,
+                self._string(title_offset, title_length),
+                [
+                    step_id
+                    for (step_id,) in self._records(_STEP_ID, step_ids_offset, step_ids_count)
+                ],
+                self._string(update_offset, update_length),
+            )
+            self._lesson_steps[lesson_id] = (steps_start, steps_count)
+
+        for unit in units:
+            unit.lesson = lessons.get(unit.lesson_id)
+
+        sections = []
+        for (
+            section_id,
+            position,
+            title_offset,
+            title_length,
+            units_start,
+            units_count,
+        ) in self._records(_SECTION, self._sections_offset, self._sections_count):
+            section_units = units[units_start : units_start + units_count]
+            sections.append(
+                Section(
+                    section_id,
+                    self._string(title_offset, title_length),
+                    position,
+                    [unit.id for unit in section_units],
+                    section_units,
+                )
+            )
+
+        return Course(
+            course_id,
+            self._string(*title),
+            [section.id for section in sections],
+            sections,
+        )
+
+    def _read_step(self, index: int) -> Step:
+        (
+            step_id,
+            lesson_id,
+            position,
+            block_offset,
+            block_length,
+            text_offset,
+            text_length,
+            update_offset,
+            update_length,
+            options_offset,
+            options_length,
+            video_offset,
+            video_length,
+        ) = _STEP.unpack_from(self._map, self._steps_offset + index * _STEP.size)
+
+        return Step(
+            step_id,
+            lesson_id,
+            position,
+            self._string(block_offset, block_length),
+            self._string(text_offset, text_length),
+            self._string(update_offset, update_length),
+            codec.loads(self._string(options_offset, options_length)) if options_length else None,
+            self._string(video_offset, video_length),
+        )
+
+
+class _IndexView:
+    """Последовательность id шагов поверх индекса в mmap, чтобы отдать ее в bisect"""
+
+    def __init__(self, snapshot: CourseSnapshot) -> None:
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return self._snapshot._steps_count
+
+    def __getitem__(self, index: int) -> int:
+        snapshot = self._snapshot
+        return _STEP_INDEX.unpack_from(
+            snapshot._map,
+            snapshot._step_index_offset + index * _STEP_INDEX.size,
+        )[0]
+
+
+class SnapshotCrawler:
+    """Отдает курс из снимка через тот же интерфейс, что и CourseCrawler
+
+    Так ConspectBuilder собирает конспект из снимка без сети
+    """
+
+    def __init__(self, snapshot: CourseSnapshot) -> None:
+        self.snapshot = snapshot
+
+    async def crawl_structure(self, course_id: int) -> Course:
+        if course_id != self.snapshot.course.id:
+            raise LookupError(f"Snapshot contains course {self.snapshot.course.id}")
+        return self.snapshot.course
+
+    async def iter_lessons(
+        self,
+        course: Course,
+        *,
+        fetch_steps: Callable[[Lesson], bool] | None = None,
+        window: int = STEPIK_API_CRAWL_WINDOW,
+    ) -> AsyncIterator[Lesson]:
+        for lesson in course.iter_lessons():
+            if fetch_steps is None or fetch_steps(lesson):
+                yield replace(lesson, steps=self.snapshot.lesson_steps(lesson))
+            else:
+                yield replace(lesson, steps=[])
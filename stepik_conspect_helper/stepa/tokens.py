@@ -0,0 +1,111 @@
+"""Хранилище access_token между запусками
+
+Токен лежит в конфиге пользователя. Пока он жив, браузер вообще не нужен, протухший
+сначала пытаемся обновить по refresh_token, и только если не вышло, идем
+в интерактивный Authorization Code флоу. Для безголовых запусков есть
+Client Credentials Grant по ключам приложения из окружения
+"""
+
+import json
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import aiohttp
+
+from stepik_conspect_helper.constants import (
+    STEPIK_CLIENT_ID_ENV,
+    STEPIK_CLIENT_SECRET_ENV,
+)
+from stepik_conspect_helper.dirs import user_config_dir
+from stepik_conspect_helper.stepa.oauth import (
+    OAuthToken,
+    refresh_access_token,
+    request_client_credentials_token,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_FILE_NAME = "token.json"
+
+
+class TokenStore:
+    def __init__(self, path: Path | str | None = None) -> None:
+        self.path = Path(path) if path is not None else user_config_dir() / TOKEN_FILE_NAME
+
+    def load(self) -> OAuthToken | None:
+        try:
+            return OAuthToken.from_dict(json.loads(self.path.read_text(encoding="utf-8")))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as exc:
+            logger.warning("Ignoring broken token file %s: %s", self.path, exc)
+            return None
+
+    def save(self, token: OAuthToken) -> None:
+        """Атомарно сохраняет токен, файл доступен только владельцу"""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(token.to_dict(), file)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def client_credentials_from_env() -> tuple[str, str] | None:
+    client_id = os.environ.get(STEPIK_CLIENT_ID_ENV)
+    client_secret = os.environ.get(STEPIK_CLIENT_SECRET_ENV)
+    if client_id and client_secret:
+        return client_id, client_secret
+    return None
+
+
+async def obtain_token(
+    store: TokenStore,
+    client_session: aiohttp.ClientSession,
+    interactive_login: Callable[[], Awaitable[OAuthToken]],
+    *,
+    client_credentials: tuple[str, str] | None = None,
+) -> OAuthToken:
+    """Достает рабочий токен самым дешевым из доступных способов
+
+    Порядок такой: живой токен из хранилища, refresh_token, client credentials,
+    и только потом interactive_login. Любой новый токен сразу сохраняется
+
+    Args:
+        store (TokenStore): хранилище токена
+        client_session (aiohttp.ClientSession): сессия для запросов к OAuth серверу
+        interactive_login (Callable[[], Awaitable[OAuthToken]]): браузерный флоу
+        client_credentials (tuple[str, str] | None): client_id и client_secret
+
+    Returns:
+        OAuthToken: токен, которым можно пользоваться прямо сейчас
+    """
+
+    cached = store.load()
+    if cached is not None and not cached.is_expired():
+        logger.debug("Using cached token")
+        return cached
+
+    token = None
+    if cached is not None and cached.refresh_token:
+        try:
+            token = await refresh_access_token(cached, client_session)
+            logger.debug("Token was refreshed")
+        except aiohttp.ClientError as exc:
+            logger.warning("Token refresh failed: %s", exc)
+
+    if token is None and client_credentials is not None:
+        token = await request_client_credentials_token(*client_credentials, client_session)
+
+    if token is None:
+        token = await interactive_login()
+
+    store.save(token)
+    return token
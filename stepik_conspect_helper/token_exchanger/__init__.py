@@ -1,5 +1,22 @@
-from .server import TokenExchangeServer
+"""Локальный HTTP сервер для OAuth, предпросмотра и поиска"""
+
+from typing import TYPE_CHECKING
+
+from stepik_conspect_helper._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .endpoint import LocalHTTPEndpoint
+    from .server import TokenExchangeServer
 
 __all__ = [
+    "LocalHTTPEndpoint",
     "TokenExchangeServer",
 ]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        ".endpoint": ("LocalHTTPEndpoint",),
+        ".server": ("TokenExchangeServer",),
+    },
+)
@@ -1,15 +1,31 @@
 HTTP_LINE_TERMINATOR = b"\r\n"
 
 HTTP_VERSION = "HTTP/1.1"
+HTTP_VERSION_1_0 = "HTTP/1.0"
 PATH_QUERY_SEPARATOR = "?"
-QUERY_ELEMENTS_SEPARATOR = "&"
-QUERY_ELEMENT_KEY_VALUE_SEPARATOR = "="
 
+ACCEPT_ENCODING_HEADER = "accept-encoding"
 CONNECTION_HEADER = "connection"
+CONTENT_ENCODING_HEADER = "content-encoding"
 CONTENT_TYPE_HEADER = "content-type"
 CONTENT_LENGTH_HEADER = "content-length"
 LOCATION_HEADER = "location"
+TRANSFER_ENCODING_HEADER = "transfer-encoding"
+VARY_HEADER = "vary"
 
 CONNECTION_HEADER_CLOSE = "close"
+CONNECTION_HEADER_KEEP_ALIVE = "keep-alive"
 CONTENT_TYPE_HEADER_JSON = "application/json"
 CONTENT_TYPE_HEADER_HTML = "text/html; charset=utf-8"
+CONTENT_TYPE_HEADER_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_VERSION_PREFIX = "HTTP/1."
+MAX_START_LINE_SIZE = 8 * 1024
+MAX_HEADERS_SIZE = 16 * 1024
+MAX_HEADER_COUNT = 100
+READ_CHUNK_SIZE = 64 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+MIN_COMPRESS_SIZE = 256
+
+KEEP_ALIVE_TIMEOUT = 5.0
+KEEP_ALIVE_MAX_REQUESTS = 100
@@ -0,0 +1,257 @@
+"""Локальный HTTP/1.1 эндпоинт с постоянными соединениями
+
+Браузер держит соединение открытым и шлет по нему запросы один за другим, в том числе
+pipelined, не дожидаясь ответов. Эндпоинт читает их по очереди одним RequestParser
+на соединение, дочитывает тела по Content-Length и отвечает строго по порядку.
+Соединение закрывается, если клиент попросил Connection: close, если он молчит
+дольше idle_timeout или если по соединению обслужено max_requests запросов
+
+Маршрутизация остается наследникам: им достается разобранный запрос и решение,
+держать ли соединение после ответа
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from http import HTTPStatus
+
+from .constants import (
+    CONNECTION_HEADER,
+    CONNECTION_HEADER_CLOSE,
+    CONNECTION_HEADER_KEEP_ALIVE,
+    CONTENT_LENGTH_HEADER,
+    HTTP_VERSION_1_0,
+    KEEP_ALIVE_MAX_REQUESTS,
+    KEEP_ALIVE_TIMEOUT,
+    MAX_BODY_SIZE,
+    READ_CHUNK_SIZE,
+    TRANSFER_ENCODING_HEADER,
+)
+from .parser import HTTPParseError, Request, RequestParser, read_request
+from .utils import reply_with_error
+
+logger = logging.getLogger(__name__)
+
+
+def wants_keep_alive(request: Request) -> bool:
+    """Хочет ли клиент оставить соединение открытым после ответа
+
+    В HTTP/1.1 соединение постоянное по умолчанию, в HTTP/1.0 - только по
+    явному Connection: keep-alive
+
+    Args:
+        request (Request): разобранный запрос
+
+    Returns:
+        bool: True, если соединение можно не закрывать
+    """
+
+    options = {
+        option.strip().lower()
+        for option in request.headers.get(CONNECTION_HEADER, "").split(",")
+    }
+
+    if CONNECTION_HEADER_CLOSE in options:
+        return False
+    if request.start_line.protocol == HTTP_VERSION_1_0:
+        return CONNECTION_HEADER_KEEP_ALIVE in options
+    return True
+
+
+def request_body_size(request: Request) -> int:
+    """Достает размер тела запроса из Content-Length
+
+    Raises:
+        HTTPParseError: если тело передается чанками, Content-Length битый или
+            тело больше MAX_BODY_SIZE
+
+    Returns:
+        int: размер тела в байтах, 0 если тела нет
+    """
+
+    if TRANSFER_ENCODING_HEADER in request.headers:
+        raise HTTPParseError(
+            "Transfer-Encoding is not supported",
+            HTTPStatus.NOT_IMPLEMENTED,
+        )
+
+    raw_size = request.headers.get(CONTENT_LENGTH_HEADER)
+    if raw_size is None:
+        return 0
+
+    # повторный Content-Length склеивается парсером через запятую и сюда не пройдет
+    if not raw_size.isdigit():
+        raise HTTPParseError("Malformed Content-Length")
+
+    size = int(raw_size)
+    if size > MAX_BODY_SIZE:
+        raise HTTPParseError("Request body too large", HTTPStatus.CONTENT_TOO_LARGE)
+    return size
+
+
+async def read_body(
+    reader: asyncio.StreamReader,
+    parser: RequestParser,
+    size: int,
+) -> bytes:
+    """Дочитывает тело запроса: сначала из буфера парсера, потом из сокета
+
+    Raises:
+        asyncio.IncompleteReadError: если клиент закрыл соединение раньше времени
+
+    Returns:
+        bytes: тело запроса
+    """
+
+    body = parser.take(size)
+    if len(body) == size:
+        return body
+    return body + await reader.readexactly(size - len(body))
+
+
+class LocalHTTPEndpoint(ABC):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        idle_timeout: float = KEEP_ALIVE_TIMEOUT,
+        max_requests: int = KEEP_ALIVE_MAX_REQUESTS,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.max_requests = max_requests
+
+        self._listening = asyncio.Event()
+        self._shutdown = asyncio.Event()
+        self._connections: set[asyncio.StreamWriter] = set()
+
+    async def listen(
+        self,
+    ) -> None:
+        """Обслуживает клиентов, пока не вызван stop() или таску не отменили"""
+
+        aserver = await asyncio.start_server(
+            self.handle_client_conn,
+            self.host,
+            self.port,
+        )
+
+        logger.info("Server listening on %s:%s", self.host, self.port)
+        self._listening.set()
+
+        try:
+            await self._shutdown.wait()
+        finally:
+            aserver.close()
+            # простаивающие keep-alive соединения иначе держали бы wait_closed
+            for writer in list(self._connections):
+                writer.close()
+            await aserver.wait_closed()
+            self._listening.clear()
+            logger.info("Server stopped")
+
+    async def wait_listening(self) -> None:
+        """Ждет, пока сервер начнет принимать соединения"""
+
+        await self._listening.wait()
+
+    def stop(self) -> None:
+        """Просит listen() закрыть сервер и все открытые соединения"""
+
+        self._shutdown.set()
+
+    async def handle_client_conn(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        logger.debug("New client connection established")
+        self._connections.add(writer)
+
+        parser = RequestParser()
+        try:
+            for served in range(1, self.max_requests + 1):
+                keep_alive = await self.process_single_request(
+                    reader,
+                    writer,
+                    parser,
+                    last=served == self.max_requests,
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError as exc:
+            logger.debug("Client connection lost: %s", exc)
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+        logger.debug("Client connection closed")
+        self.on_connection_closed()
+
+    async def process_single_request(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        parser: RequestParser,
+        *,
+        last: bool = False,
+    ) -> bool:
+        """Читает, дочитывает и обслуживает один запрос соединения
+
+        Args:
+            reader (asyncio.StreamReader): буфер данных клиентского сокета на чтение
+            writer (asyncio.StreamWriter): буфер данных клиентского сокета на запись
+            parser (RequestParser): парсер соединения
+            last (bool): запрос последний из разрешенных на соединение
+
+        Returns:
+            bool: True, если соединение можно держать дальше
+        """
+
+        try:
+            async with asyncio.timeout(self.idle_timeout):
+                request = await read_request(reader, parser)
+                if request is not None:
+                    await read_body(reader, parser, request_body_size(request))
+        except HTTPParseError as exc:
+            logger.warning("Malformed request: %s", exc)
+            await reply_with_error(writer, exc.status)
+            return False
+        except (TimeoutError, asyncio.IncompleteReadError):
+            return False
+
+        if request is None:
+            return False
+
+        keep_alive = (
+            not last and not self._shutdown.is_set() and wants_keep_alive(request)
+        )
+        return await self.dispatch(writer, request, keep_alive)
+
+    @abstractmethod
+    async def dispatch(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Request,
+        keep_alive: bool,
+    ) -> bool:
+        """Отвечает на запрос, реализуется наследниками
+
+        Args:
+            writer (asyncio.StreamWriter): буфер данных клиентского сокета на запись
+            request (Request): разобранный запрос
+            keep_alive (bool): можно ли оставить соединение открытым
+
+        Returns:
+            bool: осталось ли соединение открытым, то есть что ушло в Connection
+        """
+
+    def on_connection_closed(self) -> None:
+        """Хук на закрытие клиентского соединения"""
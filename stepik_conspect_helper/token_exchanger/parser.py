@@ -0,0 +1,284 @@
+"""Инкрементальный парсер HTTP/1.1 запросов
+
+Байты из сокета складываются в один bytearray, а строки ищутся и разбираются прямо
+в нем по смещениям через find и memoryview, без промежуточных bytes на каждую
+строку. Парсер - это конечный автомат: start line -> headers -> done, его можно
+кормить данными любыми кусками. Все, что пришло после заголовков (тело или следующий pipelined
+запрос), остается в буфере
+
+Размер start line, заголовков и их количество ограничены, битый ввод превращается
+в HTTPParseError, а не в случайный ValueError из недр split
+"""
+
+import asyncio
+import re
+from enum import Enum, auto
+from http import HTTPMethod, HTTPStatus
+from typing import NamedTuple
+
+from .constants import (
+    HTTP_LINE_TERMINATOR,
+    HTTP_VERSION_PREFIX,
+    MAX_HEADER_COUNT,
+    MAX_HEADERS_SIZE,
+    MAX_START_LINE_SIZE,
+    READ_CHUNK_SIZE,
+)
+
+_SPACE = ord(" ")
+_HTAB = ord("\t")
+_TOKEN_RE = re.compile(rb"[!#$%&'*+\-.^_`|~0-9A-Za-z]+")
+_METHODS = {method.value: method for method in HTTPMethod}
+
+
+class RequestStartLine(NamedTuple):
+    method: HTTPMethod
+    target: str
+    protocol: str
+
+
+class Request(NamedTuple):
+    start_line: RequestStartLine
+    headers: dict[str, str]
+
+
+class HTTPParseError(ValueError):
+    """Запрос не удалось разобрать, клиенту надо ответить status"""
+
+    def __init__(self, message: str, status: HTTPStatus = HTTPStatus.BAD_REQUEST) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def parse_start_line(line: bytes) -> RequestStartLine:
+    """Разбирает start line без CRLF
+
+    Args:
+        line (bytes): строка запроса
+
+    Raises:
+        HTTPParseError: если строка не вида METHOD SP target SP HTTP/1.x
+
+    Returns:
+        RequestStartLine: кортеж значений start line
+    """
+
+    return _parse_start_line(line, 0, len(line))
+
+
+def parse_header_line(line: bytes) -> tuple[str, str]:
+    """Разбирает строку заголовка без CRLF
+
+    Имя приводится к нижнему регистру, у значения отрезаются пробелы по краям
+
+    Raises:
+        HTTPParseError: если нет двоеточия или в имени недопустимые символы
+
+    Returns:
+        tuple[str, str]: имя и значение
+    """
+
+    return _parse_header_line(line, 0, len(line))
+
+
+def _parse_start_line(
+    buffer: bytes | bytearray,
+    start: int,
+    end: int,
+) -> RequestStartLine:
+    first_space = buffer.find(b" ", start, end)
+    second_space = buffer.find(b" ", first_space + 1, end) if first_space != -1 else -1
+    if (
+        first_space <= start
+        or second_space == -1
+        or second_space == first_space + 1
+        or buffer.find(b" ", second_space + 1, end) != -1
+    ):
+        raise HTTPParseError("Malformed request line")
+
+    with memoryview(buffer) as view:
+        method = _METHODS.get(str(view[start:first_space], "latin-1"))
+        target = str(view[first_space + 1 : second_space], "latin-1")
+        protocol = str(view[second_space + 1 : end], "latin-1")
+
+    if method is None:
+        raise HTTPParseError("Unknown method", HTTPStatus.NOT_IMPLEMENTED)
+    if not protocol.startswith(HTTP_VERSION_PREFIX):
+        raise HTTPParseError(
+            "Unsupported protocol",
+            HTTPStatus.HTTP_VERSION_NOT_SUPPORTED,
+        )
+
+    return RequestStartLine(method, target, protocol)
+
+
+def _parse_header_line(
+    buffer: bytes | bytearray,
+    start: int,
+    end: int,
+) -> tuple[str, str]:
+    if buffer[start] in (_SPACE, _HTAB):
+        raise HTTPParseError("Obsolete header folding is not supported")
+
+    colon = buffer.find(b":", start, end)
+    if colon == -1 or not _TOKEN_RE.fullmatch(buffer, start, colon):
+        raise HTTPParseError("Malformed header line")
+
+    with memoryview(buffer) as view:
+        name = str(view[start:colon], "ascii").lower()
+        value = str(view[colon + 1 : end], "latin-1").strip(" \t")
+
+    return name, value
+
+
+class _State(Enum):
+    START_LINE = auto()
+    HEADERS = auto()
+    DONE = auto()
+
+
+class RequestParser:
+    def __init__(
+        self,
+        *,
+        max_start_line_size: int = MAX_START_LINE_SIZE,
+        max_headers_size: int = MAX_HEADERS_SIZE,
+        max_header_count: int = MAX_HEADER_COUNT,
+    ) -> None:
+        self.max_start_line_size = max_start_line_size
+        self.max_headers_size = max_headers_size
+        self.max_header_count = max_header_count
+
+        self.buffer = bytearray()
+        self._pos = 0
+        self._reset_request()
+
+    def feed(self, data: bytes) -> None:
+        self.buffer += data
+
+    def parse(self) -> Request | None:
+        """Продвигает автомат по накопленным данным
+
+        Raises:
+            HTTPParseError: если запрос битый или превышает лимиты
+
+        Returns:
+            Request | None: разобранный запрос или None, если данных пока мало
+        """
+
+        buffer = self.buffer
+
+        while self._state is not _State.DONE:
+            start = self._pos
+            end = buffer.find(HTTP_LINE_TERMINATOR, start)
+            limit = (
+                self.max_start_line_size
+                if self._state is _State.START_LINE
+                else self.max_headers_size - self._headers_size
+            )
+
+            if end == -1:
+                if len(buffer) - start > limit:
+                    raise self._too_large()
+                return None
+            if end - start > limit:
+                raise self._too_large()
+
+            self._pos = end + len(HTTP_LINE_TERMINATOR)
+
+            if self._state is _State.START_LINE:
+                if start == end:
+                    # RFC 9112 разрешает пустые строки перед запросом
+                    continue
+                self._start_line = _parse_start_line(buffer, start, end)
+                self._state = _State.HEADERS
+            elif start == end:
+                self._state = _State.DONE
+            else:
+                self._add_header(start, end)
+
+        assert self._start_line is not None
+        request = Request(self._start_line, self._headers)
+        self._compact()
+        self._reset_request()
+        return request
+
+    def take(self, size: int) -> bytes:
+        """Забирает из буфера до size байт, оставшихся после заголовков"""
+
+        with memoryview(self.buffer) as view:
+            data = bytes(view[self._pos : self._pos + size])
+        self._pos += len(data)
+        self._compact()
+        return data
+
+    @property
+    def buffered(self) -> int:
+        return len(self.buffer) - self._pos
+
+    def _add_header(self, start: int, end: int) -> None:
+        self._headers_size += end - start + len(HTTP_LINE_TERMINATOR)
+        self._header_count += 1
+        if self._header_count > self.max_header_count:
+            raise HTTPParseError(
+                "Too many headers",
+                HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+            )
+
+        name, value = _parse_header_line(self.buffer, start, end)
+        if name in self._headers:
+            # повторяющиеся заголовки по RFC 9110 склеиваются через запятую
+            self._headers[name] = f"{self._headers[name]}, {value}"
+        else:
+            self._headers[name] = value
+
+    def _too_large(self) -> HTTPParseError:
+        if self._state is _State.START_LINE:
+            return HTTPParseError("Request line too long", HTTPStatus.REQUEST_URI_TOO_LONG)
+        return HTTPParseError(
+            "Request headers too large",
+            HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+        )
+
+    def _compact(self) -> None:
+        # сдвигаем буфер, только когда прочитанное занимает больше половины,
+        # иначе пачка pipelined запросов стоила бы квадрат от размера буфера
+        if self._pos and self._pos * 2 >= len(self.buffer):
+            del self.buffer[: self._pos]
+            self._pos = 0
+
+    def _reset_request(self) -> None:
+        self._state = _State.START_LINE
+        self._start_line: RequestStartLine | None = None
+        self._headers: dict[str, str] = {}
+        self._headers_size = 0
+        self._header_count = 0
+
+
+async def read_request(
+    reader: asyncio.StreamReader,
+    parser: RequestParser,
+) -> Request | None:
+    """Читает из сокета ровно один запрос без тела
+
+    Args:
+        reader (asyncio.StreamReader): буфер данных клиентского сокета на чтение
+        parser (RequestParser): парсер соединения, хранит недочитанные данные
+
+    Raises:
+        HTTPParseError: если запрос битый
+        asyncio.IncompleteReadError: если клиент закрыл соединение посреди запроса
+
+    Returns:
+        Request | None: запрос или None, если клиент закрыл соединение между запросами
+    """
+
+    while (request := parser.parse()) is None:
+        data = await reader.read(READ_CHUNK_SIZE)
+        if not data:
+            if parser.buffered:
+                raise asyncio.IncompleteReadError(parser.take(parser.buffered), None)
+            return None
+        parser.feed(data)
+
+    return request
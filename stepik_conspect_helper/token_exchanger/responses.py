@@ -0,0 +1,223 @@
+"""Заранее сериализованные ответы
+
+Ответы статических маршрутов не меняются за время жизни сервера, поэтому start line,
+заголовки и тело склеиваются в один неизменяемый bytes при старте, и ответ уходит
+в сокет одним writer.write. Для каждого ответа держится по варианту на
+keep-alive/close и на каждое поддерживаемое сжатие, нужный выбирается по
+Connection и Accept-Encoding запроса
+
+Динамические ответы собирают заголовки одним join и отправляются через writelines,
+чтобы не копировать большое тело ради склейки с заголовками
+"""
+
+import asyncio
+import functools
+import gzip
+from collections.abc import Iterable
+from http import HTTPStatus
+
+from .constants import (
+    ACCEPT_ENCODING_HEADER,
+    CONNECTION_HEADER,
+    CONNECTION_HEADER_CLOSE,
+    CONNECTION_HEADER_KEEP_ALIVE,
+    CONTENT_ENCODING_HEADER,
+    CONTENT_LENGTH_HEADER,
+    CONTENT_TYPE_HEADER,
+    HTTP_LINE_TERMINATOR,
+    HTTP_VERSION,
+    LOCATION_HEADER,
+    MIN_COMPRESS_SIZE,
+    VARY_HEADER,
+)
+from .parser import Request
+
+try:
+    # brotli приезжает вместе с aiohttp[speedups], но обязательным не является
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY_ENCODING = "identity"
+GZIP_ENCODING = "gzip"
+BROTLI_ENCODING = "br"
+
+
+def _compress_gzip(data: bytes) -> bytes:
+    # mtime=0, чтобы один и тот же ответ всегда сжимался в одинаковые байты
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compress_brotli(data: bytes) -> bytes:
+    assert brotli is not None
+    return brotli.compress(data, quality=11)
+
+
+# в порядке предпочтения при равном q
+COMPRESSORS = {BROTLI_ENCODING: _compress_brotli} if brotli is not None else {}
+COMPRESSORS[GZIP_ENCODING] = _compress_gzip
+
+
+def choose_encoding(accept_encoding: str | None, available: Iterable[str]) -> str:
+    """Выбирает сжатие по Accept-Encoding
+
+    При равном q побеждает то, что раньше в available, а identity всегда идет
+    последним: "*" или "gzip, identity" означают, что сжатый ответ клиенту подходит
+
+    Args:
+        accept_encoding (str | None): значение заголовка
+        available (Iterable[str]): доступные сжатия в порядке предпочтения
+
+    Returns:
+        str: выбранное сжатие или identity
+    """
+
+    if not accept_encoding:
+        return IDENTITY_ENCODING
+
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+
+    best, best_quality = IDENTITY_ENCODING, 0.0
+    for coding in sorted(available, key=lambda coding: coding == IDENTITY_ENCODING):
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def serialize_head(
+    status: HTTPStatus,
+    headers: Iterable[tuple[str, str]],
+) -> bytes:
+    """Собирает start line и заголовки ответа одним куском вместе с пустой строкой"""
+
+    lines = [f"{HTTP_VERSION} {status} {status.phrase}"]
+    lines.extend(f"{key}: {value}" for key, value in headers)
+    lines.append("")
+    return "\r\n".join(lines).encode("latin-1") + HTTP_LINE_TERMINATOR
+
+
+def _connection_value(keep_alive: bool) -> str:
+    return CONNECTION_HEADER_KEEP_ALIVE if keep_alive else CONNECTION_HEADER_CLOSE
+
+
+class PreparedResponse:
+    """Неизменяемый ответ, сериализованный во все варианты заранее"""
+
+    __slots__ = ("status", "_variants")
+
+    def __init__(
+        self,
+        status: HTTPStatus,
+        headers: Iterable[tuple[str, str]] = (),
+        body: bytes = b"",
+        *,
+        compress: bool = False,
+    ) -> None:
+        self.status = status
+        headers = tuple(headers)
+
+        bodies = {IDENTITY_ENCODING: body}
+        if compress and len(body) >= MIN_COMPRESS_SIZE:
+            for coding, compressor in COMPRESSORS.items():
+                compressed = compressor(body)
+                if len(compressed) < len(body):
+                    bodies[coding] = compressed
+
+        self._variants: dict[tuple[str, bool], bytes] = {}
+        for coding, encoded in bodies.items():
+            variant_headers = list(headers)
+            if coding != IDENTITY_ENCODING:
+                variant_headers.append((CONTENT_ENCODING_HEADER, coding))
+            if len(bodies) > 1:
+                variant_headers.append((VARY_HEADER, ACCEPT_ENCODING_HEADER))
+            variant_headers.append((CONTENT_LENGTH_HEADER, str(len(encoded))))
+
+            for keep_alive in (False, True):
+                head = serialize_head(
+                    status,
+                    [(CONNECTION_HEADER, _connection_value(keep_alive)), *variant_headers],
+                )
+                self._variants[coding, keep_alive] = head + encoded
+
+    @property
+    def encodings(self) -> list[str]:
+        """Варианты тела: сжатия в порядке COMPRESSORS, identity последним"""
+
+        codings = [coding for coding, keep_alive in self._variants if keep_alive]
+        return sorted(codings, key=lambda coding: coding == IDENTITY_ENCODING)
+
+    def serialize(
+        self,
+        *,
+        keep_alive: bool = False,
+        accept_encoding: str | None = None,
+    ) -> bytes:
+        """Возвращает готовые байты ответа под конкретный запрос"""
+
+        coding = choose_encoding(accept_encoding, self.encodings)
+        return self._variants[coding, keep_alive]
+
+    def send(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Request | None = None,
+        *,
+        keep_alive: bool = False,
+    ) -> None:
+        """Пишет ответ в сокет одним write
+
+        Args:
+            writer (asyncio.StreamWriter): буфер данных клиентского сокета на запись
+            request (Request | None): запрос, из него берется Accept-Encoding
+            keep_alive (bool): оставить соединение открытым
+        """
+
+        accept_encoding = (
+            request.headers.get(ACCEPT_ENCODING_HEADER) if request is not None else None
+        )
+        writer.write(self.serialize(keep_alive=keep_alive, accept_encoding=accept_encoding))
+
+
+@functools.cache
+def error_response(status: HTTPStatus) -> PreparedResponse:
+    """Ответ без тела с кодом status, собирается один раз на код"""
+
+    return PreparedResponse(status)
+
+
+@functools.lru_cache(maxsize=64)
+def redirect_response(target: str) -> PreparedResponse:
+    """Редирект на target, собирается один раз на адрес"""
+
+    return PreparedResponse(HTTPStatus.FOUND, [(LOCATION_HEADER, target)])
+
+
+def ok_response_head(
+    content_type: str,
+    size: int,
+    *,
+    keep_alive: bool = False,
+    content_encoding: str | None = None,
+) -> bytes:
+    """Заголовки 200 для динамического тела размера size"""
+
+    headers = [
+        (CONNECTION_HEADER, _connection_value(keep_alive)),
+        (CONTENT_TYPE_HEADER, content_type),
+    ]
+    if content_encoding is not None:
+        headers.append((CONTENT_ENCODING_HEADER, content_encoding))
+    headers.append((CONTENT_LENGTH_HEADER, str(size)))
+    return serialize_head(HTTPStatus.OK, headers)
+
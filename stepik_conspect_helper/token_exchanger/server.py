@@ -1,145 +1,268 @@
 """Простейшая реализация HTTP/1.1 протокола на сервере
 
-Сервер служит единственной цели - реализовать клиетскую часть OAuth Authorization Code Grant Flow
+Сервер в первую очередь служит одной цели - реализовать клиетскую часть OAuth Authorization Code Grant Flow
 Если работа выполнена, сервер возвращет access_token и успешно схлопывается
 Если работа не выполнена, он все равно схлопывается
+
+Токен отдается через await wait_for_token(), а сам сервер закрывается, как только
+браузеру отдана страница /success. Соединения постоянные, см. LocalHTTPEndpoint
+
+Если передать preview, тот же сервер отдает предпросмотр конспекта по
+/course/<id> и /lesson/<id>, а если search - поиск по шагам по /search?q=.
+С metrics по /metrics отдаются счетчики сборки в формате Prometheus
 """
 
 import asyncio
 import logging
-from http import HTTPMethod
+import re
+from http import HTTPMethod, HTTPStatus
+from typing import TYPE_CHECKING
 
 import aiohttp
 
-from stepik_conspect_helper.stepa import exchange_code_for_token
-from stepik_conspect_helper.token_exchanger.constants import CONTENT_TYPE_HEADER_HTML
+from stepik_conspect_helper.search.page import render_results_page
+from stepik_conspect_helper.stepa import OAuthToken, exchange_code_for_token
+from stepik_conspect_helper.token_exchanger.constants import (
+    CONTENT_TYPE_HEADER,
+    CONTENT_TYPE_HEADER_HTML,
+    CONTENT_TYPE_HEADER_PROMETHEUS,
+    KEEP_ALIVE_MAX_REQUESTS,
+    KEEP_ALIVE_TIMEOUT,
+    PATH_QUERY_SEPARATOR,
+)
+from stepik_conspect_helper.token_exchanger.endpoint import LocalHTTPEndpoint
+from stepik_conspect_helper.token_exchanger.parser import Request
+from stepik_conspect_helper.token_exchanger.responses import PreparedResponse
 from stepik_conspect_helper.token_exchanger.templates import error_page, success_page
 from stepik_conspect_helper.token_exchanger.utils import (
-    RequestStartLine,
     extract_request_query,
-    extract_request_start_line,
     reply_with_bad_request,
+    reply_with_error,
     reply_with_not_found,
     reply_with_ok,
     reply_with_redirect,
 )
 
+if TYPE_CHECKING:
+    from stepik_conspect_helper.conspect.preview import PreviewRenderer
+    from stepik_conspect_helper.metrics import Metrics
+    from stepik_conspect_helper.search.index import SearchIndex
+
 logger = logging.getLogger(__name__)
 
+PREVIEW_ROUTE_RE = re.compile(r"/(?P<kind>course|lesson)/(?P<id>\d+)/?")
+SEARCH_ROUTE_RE = re.compile(r"/search/?")
+METRICS_ROUTE_RE = re.compile(r"/metrics/?")
+
+SUCCESS_PAGE_RESPONSE = PreparedResponse(
+    HTTPStatus.OK,
+    [(CONTENT_TYPE_HEADER, CONTENT_TYPE_HEADER_HTML)],
+    success_page.PAGE_HTML_IN_UTF_8,
+    compress=True,
+)
+ERROR_PAGE_RESPONSE = PreparedResponse(
+    HTTPStatus.OK,
+    [(CONTENT_TYPE_HEADER, CONTENT_TYPE_HEADER_HTML)],
+    error_page.PAGE_HTML_IN_UTF_8,
+    compress=True,
+)
 
-class TokenExchangeServer:
-    def __init__(self, host: str, port: int) -> None:
-        self.host = host
-        self.port = port
-        self.access_token = ""
 
-    async def listen(
+class TokenExchangeServer(LocalHTTPEndpoint):
+    def __init__(
         self,
+        host: str,
+        port: int,
+        *,
+        idle_timeout: float = KEEP_ALIVE_TIMEOUT,
+        max_requests: int = KEEP_ALIVE_MAX_REQUESTS,
+        preview: "PreviewRenderer | None" = None,
+        search: "SearchIndex | None" = None,
+        metrics: "Metrics | None" = None,
     ) -> None:
-        aserver = await asyncio.start_server(
-            self.handle_client_conn,
-            self.host,
-            self.port,
+        super().__init__(
+            host,
+            port,
+            idle_timeout=idle_timeout,
+            max_requests=max_requests,
         )
+        self.access_token = ""
+        self.token: OAuthToken | None = None
+        self.preview = preview
+        self.search = search
+        self.metrics = metrics
 
-        logger.info("Server listening on %s:%s", self.host, self.port)
+        self._token_obtained = asyncio.Event()
+        self._success_served = False
 
-        try:
-            await aserver.serve_forever()
-        except asyncio.CancelledError:
-            aserver.close()
-            await aserver.wait_closed()
-
-    # FIXME: надо подумать, действительно ли я хочу поддерживать keep-alive
-    # если нет, то и цикл тут вообще не нужен
-    async def handle_client_conn(
-        self,
-        reader: asyncio.StreamReader,
-        writer: asyncio.StreamWriter,
-    ) -> None:
-        logger.info("New client connection established")
+    async def wait_for_token(self, timeout: float | None = None) -> OAuthToken:
+        """Ждет, пока браузер вернется с кодом и тот обменяется на токен
+
+        Args:
+            timeout (float | None): сколько секунд ждать, None - бесконечно
+
+        Raises:
+            TimeoutError: если токен не получен за timeout
+
+        Returns:
+            OAuthToken: полученный токен
+        """
 
-        should_close_conn = False
-        while not should_close_conn:
-            should_close_conn = await self.process_single_request(reader, writer)
-            await writer.drain()
+        async with asyncio.timeout(timeout):
+            await self._token_obtained.wait()
 
-        writer.close()
-        await writer.wait_closed()
+        assert self.token is not None
+        return self.token
 
-        logger.info("Client connection closed")
+    def on_connection_closed(self) -> None:
+        if self._success_served:
+            self.stop()
 
-    # FIXME: надо порефакторить флоу этой функции, а то return True
-    # выглядит всратенько
-    async def process_single_request(
+    async def dispatch(
         self,
-        reader: asyncio.StreamReader,
         writer: asyncio.StreamWriter,
+        request: Request,
+        keep_alive: bool,
     ) -> bool:
-        start_line = await extract_request_start_line(reader)
+        start_line = request.start_line
 
         if start_line.method != HTTPMethod.GET:
-            await reply_with_bad_request(writer)
-            return True
+            await reply_with_bad_request(writer, keep_alive=keep_alive)
+            return keep_alive
+
+        path, _, _ = start_line.target.partition(PATH_QUERY_SEPARATOR)
 
         match start_line.target:
             case _ if start_line.target.startswith("/auth"):
-                await self.handle_auth_route(writer, start_line)
+                await self.handle_auth_route(writer, request, keep_alive)
             case _ if start_line.target.startswith("/success"):
-                await self.handle_success_route(writer, start_line)
+                # после страницы успеха сервер больше не нужен, соединение не держим
+                keep_alive = keep_alive and self.token is None
+                await self.handle_success_route(writer, request, keep_alive)
             case _ if start_line.target.startswith("/error"):
-                await self.handle_error_route(writer, start_line)
+                await self.handle_error_route(writer, request, keep_alive)
+            case _ if preview_match := PREVIEW_ROUTE_RE.fullmatch(path):
+                await self.handle_preview_route(
+                    writer,
+                    preview_match["kind"],
+                    int(preview_match["id"]),
+                    keep_alive,
+                )
+            case _ if SEARCH_ROUTE_RE.fullmatch(path):
+                await self.handle_search_route(writer, request, keep_alive)
+            case _ if METRICS_ROUTE_RE.fullmatch(path):
+                await self.handle_metrics_route(writer, keep_alive)
             case _:
-                await reply_with_not_found(writer)
+                await reply_with_not_found(writer, keep_alive=keep_alive)
 
-        return True
+        return keep_alive
 
     async def handle_auth_route(
         self,
         writer: asyncio.StreamWriter,
-        start_line: RequestStartLine,
+        request: Request,
+        keep_alive: bool = False,
     ) -> None:
-        query_dict = extract_request_query(start_line)
+        query_dict = extract_request_query(request.start_line)
 
         if "error" in query_dict:
-            return await reply_with_redirect(writer, "/error")
+            return await reply_with_redirect(writer, "/error", keep_alive=keep_alive)
 
         if "code" not in query_dict:
-            return await reply_with_bad_request(writer)
+            return await reply_with_bad_request(writer, keep_alive=keep_alive)
 
         async with aiohttp.ClientSession() as client_session:
             try:
-                access_token = await exchange_code_for_token(
+                token = await exchange_code_for_token(
                     query_dict["code"],
                     client_session,
                 )
 
                 logger.debug("Token was exchanged succesfully")
-                self.access_token = access_token
+                self.token = token
+                self.access_token = token.access_token
+                self._token_obtained.set()
 
-                await reply_with_redirect(writer, "/success")
+                await reply_with_redirect(writer, "/success", keep_alive=keep_alive)
             except aiohttp.ClientError as exc:
                 logger.error("Error during token exchange: %s", exc)
-                await reply_with_redirect(writer, "/error")
+                await reply_with_redirect(writer, "/error", keep_alive=keep_alive)
 
-    async def handle_success_route(
+    async def handle_preview_route(
         self,
         writer: asyncio.StreamWriter,
-        _: RequestStartLine,
+        kind: str,
+        object_id: int,
+        keep_alive: bool = False,
     ) -> None:
+        if self.preview is None:
+            return await reply_with_not_found(writer, keep_alive=keep_alive)
+
+        try:
+            if kind == "course":
+                page = await self.preview.render_course(object_id)
+            else:
+                page = await self.preview.render_lesson(object_id)
+        except LookupError:
+            return await reply_with_not_found(writer, keep_alive=keep_alive)
+        except aiohttp.ClientError as exc:
+            logger.error("Error during preview of %s %s: %s", kind, object_id, exc)
+            return await reply_with_error(
+                writer,
+                HTTPStatus.BAD_GATEWAY,
+                keep_alive=keep_alive,
+            )
+
+        await reply_with_ok(writer, CONTENT_TYPE_HEADER_HTML, page, keep_alive=keep_alive)
+
+    async def handle_search_route(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Request,
+        keep_alive: bool = False,
+    ) -> None:
+        if self.search is None:
+            return await reply_with_not_found(writer, keep_alive=keep_alive)
+
+        query = extract_request_query(request.start_line).get("q", "").strip()
+        hits = self.search.search(query) if query else []
         await reply_with_ok(
             writer,
             CONTENT_TYPE_HEADER_HTML,
-            success_page.PAGE_HTML_IN_UTF_8,
+            render_results_page(query, hits),
+            keep_alive=keep_alive,
         )
 
-    async def handle_error_route(
+    async def handle_metrics_route(
         self,
         writer: asyncio.StreamWriter,
-        _: RequestStartLine,
+        keep_alive: bool = False,
     ) -> None:
+        if self.metrics is None:
+            return await reply_with_not_found(writer, keep_alive=keep_alive)
+
         await reply_with_ok(
             writer,
-            CONTENT_TYPE_HEADER_HTML,
-            error_page.PAGE_HTML_IN_UTF_8,
+            CONTENT_TYPE_HEADER_PROMETHEUS,
+            self.metrics.render_prometheus().encode(),
+            keep_alive=keep_alive,
         )
+
+    async def handle_success_route(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Request,
+        keep_alive: bool = False,
+    ) -> None:
+        SUCCESS_PAGE_RESPONSE.send(writer, request, keep_alive=keep_alive)
+
+        if self.token is not None:
+            self._success_served = True
+
+    async def handle_error_route(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Request,
+        keep_alive: bool = False,
+    ) -> None:
+        ERROR_PAGE_RESPONSE.send(writer, request, keep_alive=keep_alive)
@@ -0,0 +1,23 @@
+"""Общий каркас страниц локального сервера: предпросмотра и поиска"""
+
+import html
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+</head>
+
+<body>
+{body}
+</body>
+
+</html>"""
+
+
+def render_page(title: str, body: str) -> bytes:
+    """Оборачивает готовый HTML body в страницу, заголовок экранируется здесь"""
+
+    return PAGE_TEMPLATE.format(title=html.escape(title), body=body).encode("utf-8")
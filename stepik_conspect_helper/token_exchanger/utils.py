@@ -1,97 +1,110 @@
 import asyncio
-from http import HTTPMethod, HTTPStatus
-from typing import NamedTuple
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+from .constants import HTTP_LINE_TERMINATOR, PATH_QUERY_SEPARATOR
+from .parser import RequestStartLine, parse_header_line, parse_start_line
+from .responses import error_response, ok_response_head, redirect_response
+
+__all__ = [
+    "RequestStartLine",
+    "extract_request_headers",
+    "extract_request_query",
+    "extract_request_query_lists",
+    "extract_request_start_line",
+    "reply_with_bad_request",
+    "reply_with_error",
+    "reply_with_not_found",
+    "reply_with_ok",
+    "reply_with_redirect",
+]
 
-from .constants import (
-    CONNECTION_HEADER,
-    CONNECTION_HEADER_CLOSE,
-    CONTENT_LENGTH_HEADER,
-    CONTENT_TYPE_HEADER,
-    HTTP_LINE_TERMINATOR,
-    HTTP_VERSION,
-    LOCATION_HEADER,
-    PATH_QUERY_SEPARATOR,
-    QUERY_ELEMENT_KEY_VALUE_SEPARATOR,
-    QUERY_ELEMENTS_SEPARATOR,
-)
 
+async def reply_with_bad_request(
+    writer: asyncio.StreamWriter,
+    *,
+    keep_alive: bool = False,
+) -> None:
+    """Отправляет 400
+
+    Args:
+        writer (asyncio.StreamWriter): буфер данных клиентского сокета на запись
+        keep_alive (bool): оставить соединение открытым
+    """
 
-class RequestStartLine(NamedTuple):
-    method: HTTPMethod
-    target: str
-    protocol: str
+    await reply_with_error(writer, HTTPStatus.BAD_REQUEST, keep_alive=keep_alive)
 
 
-async def reply_with_bad_request(
+async def reply_with_error(
     writer: asyncio.StreamWriter,
+    status: HTTPStatus,
+    *,
+    keep_alive: bool = False,
 ) -> None:
-    """Отправляет 400 и указание закрыть соединение
+    """Отправляет произвольный код ошибки без тела
 
     Args:
         writer (asyncio.StreamWriter): буфер данных клиентского сокета на запись
+        status (HTTPStatus): код ответа
+        keep_alive (bool): оставить соединение открытым
     """
 
-    _add_response_start_line(writer, HTTPStatus.BAD_REQUEST)
-
-    _add_response_header(writer, CONNECTION_HEADER, CONNECTION_HEADER_CLOSE)
-    writer.write(HTTP_LINE_TERMINATOR)
+    error_response(status).send(writer, keep_alive=keep_alive)
 
 
 async def reply_with_not_found(
     writer: asyncio.StreamWriter,
+    *,
+    keep_alive: bool = False,
 ) -> None:
-    """Отправляет 404 и указание закрыть соединение
+    """Отправляет 404
 
     Args:
         writer (asyncio.StreamWriter): буфер данных клиентского сокета на запись
+        keep_alive (bool): оставить соединение открытым
     """
 
-    _add_response_start_line(writer, HTTPStatus.NOT_FOUND)
-
-    _add_response_header(writer, CONNECTION_HEADER, CONNECTION_HEADER_CLOSE)
-    writer.write(HTTP_LINE_TERMINATOR)
+    await reply_with_error(writer, HTTPStatus.NOT_FOUND, keep_alive=keep_alive)
 
 
 async def reply_with_ok(
     writer: asyncio.StreamWriter,
     content_type: str,
     data: bytes,
+    *,
+    keep_alive: bool = False,
 ) -> None:
     """Отправляет 200 и тело ответного сообщения
 
-    В теле можно передать только JSON строку
+    Заголовки и тело уходят одним writelines, без склейки в новый буфер. Для
+    неизменных ответов лучше завести PreparedResponse
 
     Args:
         writer (asyncio.StreamWriter): буфер данных клиентского сокета на запись
+        content_type (str): значение Content-Type
         data (bytes): данные для отправки клиенту
+        keep_alive (bool): оставить соединение открытым
     """
 
-    _add_response_start_line(writer, HTTPStatus.OK)
-
-    _add_response_header(writer, CONNECTION_HEADER, CONNECTION_HEADER_CLOSE)
-    _add_response_header(writer, CONTENT_LENGTH_HEADER, str(len(data)))
-    _add_response_header(writer, CONTENT_TYPE_HEADER, content_type)
-    writer.write(HTTP_LINE_TERMINATOR)
-
-    writer.write(data)
+    head = ok_response_head(content_type, len(data), keep_alive=keep_alive)
+    writer.writelines((head, data))
 
 
 async def reply_with_redirect(
     writer: asyncio.StreamWriter,
     target: str,
+    *,
+    keep_alive: bool = False,
 ) -> None:
     """Отправляет 302 и новый адрес
 
     Args:
         writer (asyncio.StreamWriter): буфер данных клиентского сокета на запись
-        data (bytes): данные для отправки клиенту
+        target (str): куда перенаправить клиента
+        keep_alive (bool): оставить соединение открытым
     """
 
-    _add_response_start_line(writer, HTTPStatus.FOUND)
-
-    _add_response_header(writer, CONNECTION_HEADER, CONNECTION_HEADER_CLOSE)
-    _add_response_header(writer, LOCATION_HEADER, target)
-    writer.write(HTTP_LINE_TERMINATOR)
+    redirect_response(target).send(writer, keep_alive=keep_alive)
 
 
 async def extract_request_start_line(
@@ -102,18 +115,15 @@ async def extract_request_start_line(
     Args:
         reader (asyncio.StreamReader): буфер данных клиентского сокета на чтение
 
+    Raises:
+        HTTPParseError: если строка битая
+
     Returns:
         RequestStartLine: кортеж значений heading line
     """
 
     raw_start_line = await reader.readuntil(HTTP_LINE_TERMINATOR)
-    method, target, protocol = raw_start_line.rstrip(HTTP_LINE_TERMINATOR).split(b" ")
-
-    return RequestStartLine(
-        HTTPMethod(method.decode()),
-        target.decode(),
-        protocol.decode(),
-    )
+    return parse_start_line(raw_start_line[: -len(HTTP_LINE_TERMINATOR)])
 
 
 async def extract_request_headers(
@@ -124,7 +134,10 @@ async def extract_request_headers(
     Ключи хедеров приводятся к нижнему кейсу, значения хедерова парсятся as is
 
     Args:
-        start_line (RequestStartLine): heading line запрсоа
+        reader (asyncio.StreamReader): буфер данных клиентского сокета на чтение
+
+    Raises:
+        HTTPParseError: если строка заголовка битая
 
     Returns:
         dict[str, str]: словарь хедерова
@@ -135,53 +148,52 @@ async def extract_request_headers(
     while header_line := await reader.readuntil(HTTP_LINE_TERMINATOR):
         if header_line == HTTP_LINE_TERMINATOR:
             break
-        head, tail = header_line.rstrip(HTTP_LINE_TERMINATOR).split(b": ")
-        headers[head.decode().lower()] = tail.decode()
+        head, tail = parse_header_line(header_line[: -len(HTTP_LINE_TERMINATOR)])
+        headers[head] = tail
 
     return headers
 
 
-def extract_request_query(
+def extract_request_query_lists(
     start_line: RequestStartLine,
-) -> dict[str, str]:
-    """Парсит query params из строки запроса в словарь
+) -> dict[str, list[str]]:
+    """Парсит query params из строки запроса со всеми значениями каждого ключа
 
-    Ключи вида val[] тупо игнорируются
+    Ключи и значения percent-декодируются, + превращается в пробел
 
     Args:
         start_line (RequestStartLine): heading line запрсоа
 
     Returns:
-        dict[str, str]: словарь query params
+        dict[str, list[str]]: ключ -> значения в порядке появления
     """
 
-    _, query_line = start_line.target.split(PATH_QUERY_SEPARATOR)
-    query_elements = query_line.split(QUERY_ELEMENTS_SEPARATOR)
+    _, _, query_line = start_line.target.partition(PATH_QUERY_SEPARATOR)
 
-    query_dict = {}
-    for elem in query_elements:
-        key, value = elem.split(QUERY_ELEMENT_KEY_VALUE_SEPARATOR)
+    query_dict: dict[str, list[str]] = {}
+    for key, value in parse_qsl(query_line, keep_blank_values=True):
+        query_dict.setdefault(key, []).append(value)
 
-        if key.endswith("[]"):
-            continue
+    return query_dict
 
-        query_dict[key] = value
 
-    return query_dict
+def extract_request_query(
+    start_line: RequestStartLine,
+) -> dict[str, str]:
+    """Парсит query params из строки запроса в словарь
 
+    Ключи вида val[] тупо игнорируются, для повторяющихся ключей берется первое
+    значение. Все значения доступны через extract_request_query_lists
 
-def _add_response_start_line(
-    writer: asyncio.StreamWriter,
-    status_code: HTTPStatus,
-    http_version: str = HTTP_VERSION,
-) -> None:
-    start_line = f"{http_version} {status_code} {status_code.phrase}"
-    writer.write(start_line.encode() + HTTP_LINE_TERMINATOR)
+    Args:
+        start_line (RequestStartLine): heading line запрсоа
 
+    Returns:
+        dict[str, str]: словарь query params
+    """
 
-def _add_response_header(
-    writer: asyncio.StreamWriter,
-    key: str,
-    value: str,
-) -> None:
-    writer.write(f"{key}: {value}".encode() + HTTP_LINE_TERMINATOR)
+    return {
+        key: values[0]
+        for key, values in extract_request_query_lists(start_line).items()
+        if not key.endswith("[]")
+    }
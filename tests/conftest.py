@@ -0,0 +1,150 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+def build_course_objects(
+    course_id: int = 1,
+    sections: int = 2,
+    units_per_section: int = 2,
+    steps_per_lesson: int = 3,
+) -> dict[str, dict[int, dict[str, Any]]]:
+    """Собирает синтетический курс в виде ответов Stepik API
+
+    id у всех объектов уникальные внутри своей коллекции и идут подряд
+    """
+
+    objects: dict[str, dict[int, dict[str, Any]]] = {
+        "courses": {},
+        "sections": {},
+        "units": {},
+        "lessons": {},
+        "steps": {},
+    }
+    section_ids = []
+    unit_id = lesson_id = step_id = 0
+
+    for section_position in range(1, sections + 1):
+        section_id = course_id * 100 + section_position
+        section_ids.append(section_id)
+        unit_ids = []
+
+        for unit_position in range(1, units_per_section + 1):
+            unit_id += 1
+            lesson_id += 1
+            unit_ids.append(unit_id)
+            step_ids = []
+
+            for step_position in range(1, steps_per_lesson + 1):
+                step_id += 1
+                step_ids.append(step_id)
+                objects["steps"][step_id] = {
+                    "id": step_id,
+                    "lesson": lesson_id,
+                    "position": step_position,
+                    "block": {
+                        "name": "text",
+                        "text": f"<p>Step <b>{step_id}</b> of lesson {lesson_id}</p>",
+                    },
+                    "update_date": "2025-01-01T00:00:00Z",
+                }
+
+            objects["lessons"][lesson_id] = {
+                "id": lesson_id,
+                "title": f"Lesson {lesson_id}",
+                "steps": step_ids,
+                "update_date": "2025-01-01T00:00:00Z",
+            }
+            objects["units"][unit_id] = {
+                "id": unit_id,
+                "section": section_id,
+                "lesson": lesson_id,
+                "position": unit_position,
+            }
+
+        objects["sections"][section_id] = {
+            "id": section_id,
+            "course": course_id,
+            "title": f"Section {section_position}",
+            "position": section_position,
+            "units": unit_ids,
+        }
+
+    objects["courses"][course_id] = {
+        "id": course_id,
+        "title": f"Course {course_id}",
+        "sections": section_ids,
+    }
+
+    return objects
+
+
+@dataclass
+class FakeStepikAPI:
+    """Минимальная замена stepik.org/api для тестов
+
+    Отдает объекты из objects по ?ids[]=... с ETag, понимает If-None-Match
+    и запоминает каждый запрос вместе с присланным If-None-Match. Статусы из
+    failures отдаются вместо ответа на ближайшие запросы
+    """
+
+    objects: dict[str, dict[int, dict[str, Any]]]
+    requests: list[tuple[str, list[int]]] = field(default_factory=list)
+    failures: list[tuple[int, dict[str, str]]] = field(default_factory=list)
+    if_none_match: list[str | None] = field(default_factory=list)
+    url: str = ""
+
+    async def handle_collection(self, request: web.Request) -> web.Response:
+        resource = request.match_info["resource"]
+        ids = [int(object_id) for object_id in request.query.getall("ids[]", [])]
+        self.requests.append((resource, ids))
+        self.if_none_match.append(request.headers.get("If-None-Match"))
+
+        if self.failures:
+            status, headers = self.failures.pop(0)
+            return web.Response(status=status, headers=headers)
+
+        collection = self.objects.get(resource, {})
+        body = json.dumps(
+            {
+                "meta": {"page": 1, "has_next": False, "has_previous": False},
+                resource: [collection[i] for i in ids if i in collection],
+            }
+        )
+        etag = f'"{hashlib.md5(body.encode()).hexdigest()}"'
+
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=body,
+            content_type="application/json",
+            headers={"ETag": etag},
+        )
+
+    async def handle_stepics(self, request: web.Request) -> web.Response:
+        self.requests.append(("stepics", [1]))
+        return web.json_response({"stepics": [{"id": 1, "user": 42}]})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/stepics/1", self.handle_stepics)
+        app.router.add_get("/api/{resource}", self.handle_collection)
+        return app
+
+
+@pytest_asyncio.fixture
+async def stepik_api():
+    api = FakeStepikAPI(build_course_objects())
+    server = TestServer(api.make_app(), host="127.0.0.1")
+    await server.start_server()
+    api.url = str(server.make_url("/api"))
+
+    try:
+        yield api
+    finally:
+        await server.close()
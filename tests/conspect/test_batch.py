@@ -0,0 +1,68 @@
+import pytest
+
+from stepik_conspect_helper.conspect import BatchBuilder
+from stepik_conspect_helper.conspect.batch import course_output_path, read_course_ids
+from stepik_conspect_helper.stepa import StepikClient
+
+
+def add_course_sharing_lessons(objects):
+    """Добавляет курс 2, в котором есть уроки 1 и 2 из курса 1"""
+
+    objects["courses"][2] = {"id": 2, "title": "Course 2", "sections": [201]}
+    objects["sections"][201] = {
+        "id": 201,
+        "course": 2,
+        "title": "Shared",
+        "position": 1,
+        "units": [5, 6],
+    }
+    objects["units"][5] = {"id": 5, "section": 201, "lesson": 1, "position": 1}
+    objects["units"][6] = {"id": 6, "section": 201, "lesson": 2, "position": 2}
+
+
+class TestBatchBuilder:
+    @pytest.mark.asyncio
+    async def test_build_all(self, stepik_api, tmp_path):
+        add_course_sharing_lessons(stepik_api.objects)
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            result = await BatchBuilder(client).build_all([1, 2, 1, 999], tmp_path)
+
+        assert set(result.built) == {1, 2}
+        assert isinstance(result.failed[999], LookupError)
+        assert result.built[1].steps_rendered == 12
+        assert result.built[2].steps_rendered == 6
+        assert result.shared_lessons == 2
+        assert result.lessons_deduplicated == 2
+
+        text = course_output_path(tmp_path, 2).read_text()
+        assert text.startswith("# Course 2\n\n## Shared\n\n### Lesson 1\n\n")
+        assert "Step **6** of lesson 2" in text
+
+        step_ids = [i for resource, ids in stepik_api.requests if resource == "steps" for i in ids]
+        assert sorted(step_ids) == list(range(1, 13))
+
+    @pytest.mark.asyncio
+    async def test_build_all_is_incremental(self, stepik_api, tmp_path):
+        add_course_sharing_lessons(stepik_api.objects)
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            await BatchBuilder(client).build_all([1, 2], tmp_path)
+            result = await BatchBuilder(client).build_all([1, 2], tmp_path)
+
+        assert result.built[1].steps_reused == 12
+        assert result.built[2].steps_rendered == 0
+
+    def test_invalid_parallel_courses(self):
+        with pytest.raises(ValueError):
+            BatchBuilder(StepikClient("token"), parallel_courses=0)
+
+    def test_read_course_ids(self, tmp_path):
+        path = tmp_path / "courses.txt"
+        path.write_text("# nightly\n1, 2\n\n3 4  # tail\n")
+
+        assert read_course_ids(path) == [1, 2, 3, 4]
+
+        path.write_text("1 two\n")
+        with pytest.raises(ValueError):
+            read_course_ids(path)
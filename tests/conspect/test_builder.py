@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from stepik_conspect_helper.conspect import ConspectBuilder, Manifest
+from stepik_conspect_helper.conspect.builder import index_step_blocks
+from stepik_conspect_helper.stepa import StepikClient
+
+
+class TestBuilder:
+    @pytest.mark.asyncio
+    async def test_full_build(self, stepik_api, tmp_path):
+        output_path = tmp_path / "course.md"
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            stats = await ConspectBuilder(client).build(1, output_path)
+
+        text = output_path.read_text()
+        assert text.startswith("# Course 1\n\n## Section 1\n\n### Lesson 1\n\n")
+        assert "Step **12** of lesson 4" in text
+        assert stats.steps_rendered == 12
+        assert stats.steps_reused == 0
+
+        manifest = Manifest.load(Manifest.path_for(output_path))
+        assert manifest.course_id == 1
+        assert set(manifest.steps) == set(range(1, 13))
+        assert set(index_step_blocks(output_path)) == set(range(1, 13))
+
+    @pytest.mark.asyncio
+    async def test_lessons_are_flushed_while_crawling(self, stepik_api, tmp_path, mocker):
+        output_path = tmp_path / "course.md"
+        tmp_output_path = tmp_path / "course.md.tmp"
+        written_before_last_lesson = ""
+
+        async with StepikClient("token", api_url=stepik_api.url, chunk_size=1) as client:
+            original_get_chunk = client.get_chunk
+
+            async def get_chunk(resource, ids):
+                nonlocal written_before_last_lesson
+                if resource == "lessons" and ids == [4]:
+                    await asyncio.sleep(0.05)
+                    written_before_last_lesson = tmp_output_path.read_text()
+                return await original_get_chunk(resource, ids)
+
+            mocker.patch.object(client, "get_chunk", side_effect=get_chunk)
+            await ConspectBuilder(client, window=1).build(1, output_path)
+
+        assert "### Lesson 1" in written_before_last_lesson
+        assert "### Lesson 4" not in written_before_last_lesson
+        assert "### Lesson 4" in output_path.read_text()
+
+    @pytest.mark.asyncio
+    async def test_incremental_build_touches_only_changed_steps(
+        self,
+        stepik_api,
+        tmp_path,
+    ):
+        output_path = tmp_path / "course.md"
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            await ConspectBuilder(client).build(1, output_path)
+            full_text = output_path.read_text()
+
+            step = stepik_api.objects["steps"][5]
+            step["block"]["text"] = "<p>Changed</p>"
+            step["update_date"] = "2025-02-01T00:00:00Z"
+            stepik_api.objects["lessons"][2]["update_date"] = "2025-02-01T00:00:00Z"
+            stepik_api.requests.clear()
+
+            stats = await ConspectBuilder(client).build(1, output_path)
+
+        assert ("steps", [4, 5, 6]) in stepik_api.requests
+        assert all(ids == [4, 5, 6] for res, ids in stepik_api.requests if res == "steps")
+        assert stats.steps_rendered == 1
+        assert stats.steps_reused == 11
+        assert stats.lessons_skipped == 3
+
+        text = output_path.read_text()
+        assert "Changed" in text
+        assert "Step **5** of lesson 2" not in text
+        assert text.replace("Changed", "Step **5** of lesson 2") == full_text
+
+    @pytest.mark.asyncio
+    async def test_unchanged_course_is_not_rerendered(self, stepik_api, tmp_path):
+        output_path = tmp_path / "course.md"
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            await ConspectBuilder(client).build(1, output_path)
+            stepik_api.requests.clear()
+            stats = await ConspectBuilder(client).build(1, output_path)
+
+        assert not any(resource == "steps" for resource, _ in stepik_api.requests)
+        assert stats.steps_rendered == 0
+        assert stats.steps_reused == 12
+
+    @pytest.mark.asyncio
+    async def test_full_rebuild_ignores_manifest(self, stepik_api, tmp_path):
+        output_path = tmp_path / "course.md"
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            await ConspectBuilder(client).build(1, output_path)
+            stats = await ConspectBuilder(client).build(1, output_path, incremental=False)
+
+        assert stats.steps_rendered == 12
+
+    @pytest.mark.asyncio
+    async def test_process_pool_keeps_output_identical(self, stepik_api, tmp_path):
+        single_path = tmp_path / "single.md"
+        pooled_path = tmp_path / "pooled.md"
+
+        async with StepikClient("token", api_url=stepik_api.url, chunk_size=1) as client:
+            await ConspectBuilder(client).build(1, single_path)
+            stats = await ConspectBuilder(client, workers=2).build(1, pooled_path)
+
+        assert stats.steps_rendered == 12
+        assert pooled_path.read_bytes() == single_path.read_bytes()
+
+    def test_invalid_workers(self):
+        with pytest.raises(ValueError):
+            ConspectBuilder(StepikClient("token"), workers=0)
+
+    def test_broken_manifest(self, tmp_path):
+        path = tmp_path / "course.md.manifest.json"
+        path.write_text("{not json")
+
+        assert Manifest.load(path) is None
+        assert Manifest.load(tmp_path / "missing.json") is None
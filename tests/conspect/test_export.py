@@ -0,0 +1,233 @@
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from stepik_conspect_helper.conspect.export import ConspectExporter
+from stepik_conspect_helper.conspect.html import html_to_xhtml
+from stepik_conspect_helper.conspect.writers import (
+    WRITERS,
+    ExportWriter,
+    MarkdownWriter,
+    export_paths,
+    render_step_html,
+)
+from stepik_conspect_helper.stepa import Step, StepikClient
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=len(WRITERS)) as pool:
+        yield pool
+
+
+class TestHtmlToXhtml:
+    def test_closes_void_and_implied_tags(self):
+        assert html_to_xhtml("<p>a<br>b<ul><li>1<li>2</ul>") == (
+            "<p>a<br />b</p><ul><li>1</li><li>2</li></ul>"
+        )
+
+    def test_drops_scripts_handlers_and_stray_end_tags(self):
+        text = '<div onclick="x()">a</span><script>alert(1)</script>&amp;</div></div>'
+        assert html_to_xhtml(text) == "<div>a&amp;</div>"
+
+    def test_result_is_well_formed(self):
+        text = '<table><tr><td>1<td><img src="a.png"><tr><td>&nbsp;<b>x</table><p>tail'
+        ET.fromstring(f"<root>{html_to_xhtml(text)}</root>")
+
+
+class TestRenderStepHtml:
+    def test_code_step(self):
+        step = Step(
+            id=5,
+            lesson_id=1,
+            position=1,
+            block_name="code",
+            text="<p>Сложите <b>a</b> и b",
+            update_date="",
+            options={"code_templates": {"python3": ""}, "samples": [["1 2\n", "3\n"]]},
+        )
+
+        rendered = render_step_html(step)
+
+        assert rendered.startswith('<section class="step" id="step-5">')
+        assert "Задача на программирование" in rendered
+        assert "<p>Сложите <b>a</b> и b</p>" in rendered
+        assert "<pre>1 2</pre>" in rendered
+        ET.fromstring(rendered)
+
+    def test_malformed_samples_are_skipped(self):
+        step = Step(5, 1, 1, "code", "", "", options={"samples": [[], ["1\n"], ["2\n", "3\n"]]})
+
+        rendered = render_step_html(step)
+
+        assert "Пример 1" in rendered
+        assert "<pre>2</pre>" in rendered
+        assert "Пример 2" not in rendered
+
+
+class TestExport:
+    @pytest.mark.asyncio
+    async def test_one_crawl_feeds_every_format(self, stepik_api, tmp_path, executor):
+        outputs = export_paths(tmp_path / "course-1", list(WRITERS))
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            result = await ConspectExporter(client, executor=executor).export(1, outputs)
+
+        assert set(result.files) == set(WRITERS)
+        assert not result.failed
+        assert (result.lessons, result.steps) == (4, 12)
+        # каждый урок и шаг скачан один раз, сколько бы форматов ни писалось
+        fetched = [ids for resource, ids in stepik_api.requests if resource == "steps"]
+        assert sorted(sum(fetched, [])) == list(range(1, 13))
+
+        markdown = outputs["md"].read_text()
+        assert markdown.startswith("# Course 1\n\n## Section 1\n\n### Lesson 1\n\n")
+        assert "<!-- step 12 -->\nStep **12** of lesson 4" in markdown
+
+        page = outputs["html"].read_text()
+        assert '<h2 id="section-102">Section 2</h2>' in page
+        assert "<p>Step <b>12</b> of lesson 4</p>" in page
+        assert "break-before: page" in outputs["pdf"].read_text()
+        assert not list(tmp_path.glob("*.tmp"))
+
+    @pytest.mark.asyncio
+    async def test_epub_is_valid_package(self, stepik_api, tmp_path, executor):
+        outputs = export_paths(tmp_path / "course-1", ["epub"])
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            await ConspectExporter(client, executor=executor).export(1, outputs)
+
+        with zipfile.ZipFile(outputs["epub"]) as book:
+            first = book.infolist()[0]
+            assert (first.filename, first.compress_type) == ("mimetype", zipfile.ZIP_STORED)
+            assert book.read("mimetype") == b"application/epub+zip"
+
+            package = ET.fromstring(book.read("OEBPS/content.opf"))
+            namespace = {"opf": "http://www.idpf.org/2007/opf"}
+            spine = package.iterfind("opf:spine/opf:itemref", namespace)
+            assert [ref.get("idref") for ref in spine] == [
+                "section-101",
+                "lesson-1",
+                "lesson-2",
+                "section-102",
+                "lesson-3",
+                "lesson-4",
+            ]
+
+            for name in book.namelist():
+                if name.endswith((".xhtml", ".opf", ".xml")):
+                    ET.fromstring(book.read(name))
+
+    @pytest.mark.asyncio
+    async def test_writers_run_in_parallel(self, stepik_api, tmp_path, executor, mocker):
+        # каждый писатель ждет остальных на первом уроке: последовательно это зависло бы
+        barrier = threading.Barrier(2, timeout=5)
+        original_add_lesson = MarkdownWriter.add_lesson
+
+        def add_lesson(writer, lesson):
+            if lesson.id == 1:
+                barrier.wait()
+            original_add_lesson(writer, lesson)
+
+        mocker.patch.object(MarkdownWriter, "add_lesson", add_lesson)
+        mocker.patch.object(
+            WRITERS["html"],
+            "add_lesson",
+            lambda writer, lesson: barrier.wait() if lesson.id == 1 else None,
+        )
+        outputs = export_paths(tmp_path / "course-1", ["md", "html"])
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            result = await ConspectExporter(client, executor=executor).export(1, outputs)
+
+        assert set(result.files) == {"md", "html"}
+
+    @pytest.mark.asyncio
+    async def test_failed_writer_does_not_stop_others(
+        self,
+        stepik_api,
+        tmp_path,
+        executor,
+        mocker,
+    ):
+        mocker.patch.object(WRITERS["epub"], "add_lesson", side_effect=OSError("disk full"))
+        outputs = export_paths(tmp_path / "course-1", ["md", "epub"])
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            result = await ConspectExporter(client, executor=executor, queue_size=1).export(
+                1, outputs
+            )
+
+        assert set(result.files) == {"md"}
+        assert isinstance(result.failed["epub"], OSError)
+        assert outputs["md"].exists()
+        assert not outputs["epub"].exists()
+        assert not list(tmp_path.glob("*.tmp"))
+
+    @pytest.mark.asyncio
+    async def test_failed_crawl_aborts_writers(self, stepik_api, tmp_path, executor, mocker):
+        outputs = export_paths(tmp_path / "course-1", ["md", "epub"])
+        outputs["md"].write_text("previous")
+
+        async with StepikClient("token", api_url=stepik_api.url, chunk_size=1) as client:
+            original_get_chunk = client.get_chunk
+
+            async def get_chunk(resource, ids):
+                if resource == "lessons" and ids == [3]:
+                    raise ConnectionError("network is down")
+                return await original_get_chunk(resource, ids)
+
+            mocker.patch.object(client, "get_chunk", side_effect=get_chunk)
+            with pytest.raises(ConnectionError):
+                await ConspectExporter(client, executor=executor, window=1).export(1, outputs)
+
+        assert outputs["md"].read_text() == "previous"
+        assert not outputs["epub"].exists()
+        assert not list(tmp_path.glob("*.tmp"))
+
+    @pytest.mark.asyncio
+    async def test_process_pool(self, stepik_api, tmp_path, mocker):
+        mocker.patch("os.cpu_count", return_value=4)
+        outputs = export_paths(tmp_path / "course-1", ["md", "epub"])
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            result = await ConspectExporter(client).export(1, outputs)
+
+        assert set(result.files) == {"md", "epub"}
+        assert "Step **7** of lesson 3" in outputs["md"].read_text()
+        assert result.files["epub"].size == outputs["epub"].stat().st_size
+
+    def test_process_pool_is_started_by_exporter(self):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            with pytest.raises(ValueError):
+                ConspectExporter(None, crawler=object(), executor=pool)
+
+    @pytest.mark.asyncio
+    async def test_unknown_format(self, stepik_api, tmp_path, executor):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            with pytest.raises(ValueError):
+                await ConspectExporter(client, executor=executor).export(
+                    1, {"docx": tmp_path / "course.docx"}
+                )
+
+
+def test_writer_without_overrides_is_not_created(tmp_path):
+    class HalfWriter(ExportWriter):
+        suffix = ".txt"
+
+        def begin(self, course):
+            pass
+
+    with pytest.raises(TypeError):
+        HalfWriter(tmp_path / "course.txt")
+
+
+def test_export_paths(tmp_path):
+    assert export_paths(tmp_path / "course-1", ["md", "pdf", "epub"]) == {
+        "md": tmp_path / "course-1.md",
+        "pdf": tmp_path / "course-1.print.html",
+        "epub": tmp_path / "course-1.epub",
+    }
@@ -0,0 +1,26 @@
+from stepik_conspect_helper.conspect.html import html_to_markdown
+
+
+class TestHtml:
+    def test_inline_markup(self):
+        markdown = html_to_markdown(
+            '<p>Hello <b>bold</b>, <em>it</em>, <code>x</code> &amp; <a href="/a">link</a></p>'
+        )
+
+        assert markdown == "Hello **bold**, *it*, `x` & [link](/a)"
+
+    def test_blocks(self):
+        markdown = html_to_markdown(
+            "<h2>Title</h2>\n<p>\n  first</p><p>second</p>"
+            "<ul><li>one</li><li>two<ol><li>a</li></ol></li></ul>"
+        )
+
+        assert markdown == "## Title\n\nfirst\n\nsecond\n\n- one\n- two\n  1. a"
+
+    def test_code_block_keeps_whitespace(self):
+        markdown = html_to_markdown("<pre><code>def f():\n    return 1</code></pre>")
+
+        assert markdown == "```\ndef f():\n    return 1\n```"
+
+    def test_image(self):
+        assert html_to_markdown('<img src="a.png" alt="A">') == "![A](a.png)"
@@ -0,0 +1,110 @@
+import pytest
+
+from stepik_conspect_helper.conspect.plugins import (
+    STEP_RENDERERS,
+    get_step_renderer,
+    register_step_renderer,
+    render_unknown_step,
+)
+from stepik_conspect_helper.conspect.render import render_step
+from stepik_conspect_helper.conspect.templates import compile_template
+from stepik_conspect_helper.stepa.models import Step
+
+DATE = "2025-01-01T00:00:00Z"
+
+
+def make_step(block: dict) -> Step:
+    return Step.from_api({"id": 7, "lesson": 1, "position": 1, "block": block})
+
+
+class TestTemplates:
+    def test_compile(self):
+        template = compile_template("{{literal}} '{name}' \\ {name}: {value}\n")
+
+        assert template(name="a", value=1) == "{literal} 'a' \\ a: 1\n"
+        assert compile_template("{{literal}} '{name}' \\ {name}: {value}\n") is template
+        assert compile_template("no fields")() == "no fields"
+
+    @pytest.mark.parametrize("source", ["{}", "{0}", "{name!r}", "{name:>4}", "{a.b}"])
+    def test_rejects_complex_fields(self, source):
+        with pytest.raises(ValueError):
+            compile_template(source)
+
+
+class TestPlugins:
+    def test_text_step_is_unchanged(self):
+        step = make_step({"name": "text", "text": "<p>Hello <b>world</b></p>"})
+
+        assert render_step(step) == "<!-- step 7 -->\nHello **world**\n<!-- /step 7 -->\n\n"
+
+    def test_quiz_step(self):
+        step = make_step({"name": "choice", "text": "<p>Что выведет код?</p>"})
+
+        assert render_step(step) == (
+            "<!-- step 7 -->\n*[Тест]*\n\nЧто выведет код?\n<!-- /step 7 -->\n\n"
+        )
+
+    def test_video_step_links_best_quality(self):
+        step = make_step(
+            {
+                "name": "video",
+                "text": "",
+                "video": {
+                    "urls": [
+                        {"quality": "360", "url": "https://v/360.mp4"},
+                        {"quality": "1080", "url": "https://v/1080.mp4"},
+                        {"quality": "720", "url": "https://v/720.mp4"},
+                    ]
+                },
+            }
+        )
+
+        assert get_step_renderer("video")(step) == "[Видео](https://v/1080.mp4)"
+        assert get_step_renderer("video")(make_step({"name": "video"})) == "*[Видео]*"
+
+    def test_code_step_samples(self):
+        step = make_step(
+            {
+                "name": "code",
+                "text": "<p>Сложите два числа</p>",
+                "options": {
+                    "code_templates": {"python3": "", "java": ""},
+                    "samples": [["1 2\n", "3\n"]],
+                },
+            }
+        )
+
+        assert get_step_renderer("code")(step) == (
+            "*[Задача на программирование]*\n\n"
+            "Сложите два числа\n\n"
+            "Языки: java, python3\n\n"
+            "Пример 1\n\nВвод:\n\n```\n1 2\n```\n\nВывод:\n\n```\n3\n```"
+        )
+
+    def test_code_step_skips_malformed_samples(self):
+        step = make_step(
+            {
+                "name": "code",
+                "text": "",
+                "options": {"samples": [[], ["1\n"], None, ["1", 2], ["1 2\n", "3\n", ""], "12"]},
+            }
+        )
+
+        assert get_step_renderer("code")(step) == "*[Задача на программирование]*"
+
+    def test_unknown_step_falls_back(self):
+        step = Step(1, 1, 1, "puzzle", "<p>x</p>", DATE)
+
+        assert get_step_renderer("puzzle") is render_unknown_step
+        assert render_unknown_step(step) == "*[puzzle]*\n\nx"
+
+    def test_register(self, mocker):
+        mocker.patch.dict(STEP_RENDERERS)
+
+        @register_step_renderer("puzzle", "dataset")
+        def render_puzzle(step: Step) -> str:
+            return "puzzle"
+
+        assert get_step_renderer("puzzle") is render_puzzle
+        assert get_step_renderer("dataset") is render_puzzle
+        assert render_step(Step(1, 1, 1, "dataset", "", DATE)).count("puzzle") == 1
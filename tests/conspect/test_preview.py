@@ -0,0 +1,104 @@
+import pytest
+
+from stepik_conspect_helper.conspect import PreviewRenderer, RenderedPageCache
+from stepik_conspect_helper.stepa import StepikClient
+
+
+class TestRenderedPageCache:
+    def test_lru_eviction_by_size(self):
+        cache = RenderedPageCache(max_size=10)
+        cache.put("a", b"aaaa")
+        cache.put("b", b"bbbb")
+        assert cache.get("a") == b"aaaa"
+
+        cache.put("c", b"cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"aaaa"
+        assert cache.get("c") == b"cccc"
+        assert cache.size == 8
+        assert cache.stats.evicted == 1
+
+    def test_oversized_page_is_not_cached(self):
+        cache = RenderedPageCache(max_size=4)
+        cache.put("a", b"aa")
+        cache.put("big", b"x" * 5)
+
+        assert cache.get("big") is None
+        assert cache.get("a") == b"aa"
+
+    def test_replace_keeps_size(self):
+        cache = RenderedPageCache(max_size=10)
+        cache.put("a", b"aaaa")
+        cache.put("a", b"aa")
+
+        assert len(cache) == 1
+        assert cache.size == 2
+
+
+class TestPreviewRenderer:
+    @pytest.mark.asyncio
+    async def test_render_course_lists_lessons(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            page = (await PreviewRenderer(client).render_course(1)).decode()
+
+        assert "<h1>Course 1</h1>" in page
+        assert '<a href="/lesson/4">Lesson 4</a>' in page
+        assert "steps" not in {resource for resource, _ in stepik_api.requests}
+
+    @pytest.mark.asyncio
+    async def test_render_lesson(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            page = (await PreviewRenderer(client).render_lesson(2)).decode()
+
+        assert "<h1>Lesson 2</h1>" in page
+        assert '<section class="step" id="step-4">\n<p>Step <b>4</b> of lesson 2</p>' in page
+        assert "**" not in page
+
+    @pytest.mark.asyncio
+    async def test_render_lesson_uses_cache(self, stepik_api, mocker):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            renderer = PreviewRenderer(client)
+            render = mocker.patch(
+                "stepik_conspect_helper.conspect.preview.render_lesson_page",
+                return_value=b"page",
+            )
+
+            await renderer.render_lesson(1)
+            await renderer.render_lesson(1)
+            assert render.call_count == 1
+
+            stepik_api.objects["steps"][2]["update_date"] = "2025-02-01T00:00:00Z"
+            await renderer.render_lesson(1)
+
+        assert render.call_count == 2
+        assert renderer.cache.stats.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_render_course_uses_cache(self, stepik_api, mocker):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            renderer = PreviewRenderer(client)
+            render = mocker.patch(
+                "stepik_conspect_helper.conspect.preview.render_course_page",
+                return_value=b"page",
+            )
+
+            await renderer.render_course(1)
+            await renderer.render_course(1)
+            assert render.call_count == 1
+
+            stepik_api.objects["lessons"][3]["title"] = "Renamed"
+            await renderer.render_course(1)
+
+        assert render.call_count == 2
+        assert renderer.cache.stats.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_objects(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            renderer = PreviewRenderer(client)
+
+            with pytest.raises(LookupError):
+                await renderer.render_lesson(999)
+            with pytest.raises(LookupError):
+                await renderer.render_course(999)
@@ -0,0 +1,110 @@
+import pytest
+
+from stepik_conspect_helper.conspect import ConspectBuilder, RenderCache, rendercache
+from stepik_conspect_helper.conspect.rendercache import RenderedStep, normalize_html, render_key
+from stepik_conspect_helper.metrics import RENDER_CPU_SECONDS, RENDER_STEPS, Metrics
+from stepik_conspect_helper.stepa import StepikClient
+from stepik_conspect_helper.stepa.models import Step
+
+DATE = "2025-01-01T00:00:00Z"
+
+
+@pytest.fixture
+def render_cache(tmp_path):
+    cache = RenderCache(tmp_path / "rendered.sqlite3")
+    yield cache
+    cache.close()
+
+
+class TestRenderKey:
+    def test_formatting_does_not_matter(self):
+        step = Step(1, 1, 1, "text", "<p>a <b>b</b></p>\n<p>c</p>", DATE)
+        fork = Step(2, 9, 3, "text", "\r\n  <p>a <b>b</b></p>\r\n    <p>c</p>  ", "2026-01-01")
+
+        assert normalize_html(fork.text) == "<p>a <b>b</b></p> <p>c</p>"
+        assert render_key(step) == render_key(fork)
+
+    def test_content_matters(self, monkeypatch):
+        step = Step(1, 1, 1, "text", "<p>x</p>", DATE)
+        key = render_key(step)
+
+        assert render_key(Step(1, 1, 1, "choice", "<p>x</p>", DATE)) != key
+        assert render_key(Step(1, 1, 1, "text", "<p>y</p>", DATE)) != key
+        assert render_key(Step(1, 1, 1, "text", "<p>x</p>", DATE, {"samples": []})) != key
+        monkeypatch.setattr(rendercache, "RENDERER_VERSION", -1)
+        assert render_key(step) != key
+
+    def test_preformatted_html_is_kept(self):
+        html = "<pre>a\n    b</pre>\n  <p>c</p>"
+
+        assert normalize_html(html) == html
+
+
+class TestRenderCache:
+    def test_put_and_get(self, render_cache):
+        render_cache.put_many([("a", RenderedStep("Шаг", 0.5))])
+
+        assert render_cache.get_many(["a", "b"]) == {"a": RenderedStep("Шаг", 0.5)}
+        assert render_cache.get_many([]) == {}
+        assert render_cache.stats.hits == 1
+        assert render_cache.stats.misses == 1
+        assert len(render_cache) == 1
+        assert render_cache.total_size() == len("Шаг".encode())
+
+    def test_lru_eviction(self, tmp_path):
+        cache = RenderCache(tmp_path / "rendered.sqlite3", max_size=20)
+        cache.put_many([("a", RenderedStep("x" * 10, 0.1))])
+        cache.put_many([("b", RenderedStep("x" * 10, 0.1))])
+        cache.get_many(["a"])
+        cache.put_many([("c", RenderedStep("x" * 10, 0.1))])
+
+        assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+        assert cache.stats.evicted == 1
+        cache.close()
+
+
+class TestBuilderDedup:
+    @pytest.mark.asyncio
+    async def test_identical_steps_are_rendered_once(self, stepik_api, tmp_path):
+        for step in stepik_api.objects["steps"].values():
+            step["block"]["text"] = "<p>Один и тот же шаг</p>"
+        metrics = Metrics()
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            stats = await ConspectBuilder(client, metrics=metrics).build(
+                1, tmp_path / "course.md"
+            )
+
+        # без общего кеша повторы находятся только внутри урока: 4 урока по 3 шага
+        assert stats.steps_rendered == 12
+        assert stats.steps_deduplicated == 8
+        assert stats.dedup_ratio == pytest.approx(8 / 12)
+        assert metrics.value(RENDER_STEPS, result="rendered") == 4
+        assert metrics.value(RENDER_STEPS, result="deduplicated") == 8
+        assert (tmp_path / "course.md").read_text().count("Один и тот же шаг") == 12
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("workers", [1, 2])
+    async def test_second_build_comes_from_cache(
+        self, stepik_api, tmp_path, render_cache, workers
+    ):
+        metrics = Metrics()
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            first = await ConspectBuilder(
+                client, render_cache=render_cache, workers=workers
+            ).build(1, tmp_path / "first.md")
+            second = await ConspectBuilder(
+                client, render_cache=render_cache, metrics=metrics
+            ).build(1, tmp_path / "fork.md")
+
+        assert first.steps_deduplicated == 0
+        assert len(render_cache) == 12
+        assert second.steps_rendered == 12
+        assert second.steps_deduplicated == 12
+        assert second.render_cpu_seconds == 0
+        assert second.render_cpu_seconds_saved == pytest.approx(first.render_cpu_seconds)
+        assert metrics.value(RENDER_CPU_SECONDS, kind="saved") == pytest.approx(
+            first.render_cpu_seconds
+        )
+        assert (tmp_path / "fork.md").read_bytes() == (tmp_path / "first.md").read_bytes()
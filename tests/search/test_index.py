@@ -0,0 +1,162 @@
+import pytest
+
+import stepik_conspect_helper.search.index as search_index
+from stepik_conspect_helper.search import SearchIndex
+from stepik_conspect_helper.stepa import (
+    Course,
+    CourseCrawler,
+    Lesson,
+    Section,
+    Step,
+    StepikClient,
+    Unit,
+)
+
+DATE = "2025-01-01T00:00:00Z"
+NEW_DATE = "2025-02-01T00:00:00Z"
+
+
+def make_course(course_id: int, lessons: dict[int, dict[int, str]]) -> Course:
+    """Курс из одной секции, lessons: id урока -> id шага -> HTML шага"""
+
+    units = []
+    for position, (lesson_id, steps) in enumerate(lessons.items(), start=1):
+        lesson = Lesson(
+            lesson_id,
+            f"Lesson {lesson_id}",
+            list(steps),
+            DATE,
+            steps=[
+                Step(step_id, lesson_id, step_position, "text", text, DATE)
+                for step_position, (step_id, text) in enumerate(steps.items(), start=1)
+            ],
+        )
+        units.append(Unit(lesson_id, course_id, lesson_id, position, lesson))
+
+    section = Section(course_id, "Section", 1, [unit.id for unit in units], units)
+    return Course(course_id, f"Course {course_id}", [section.id], [section])
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(tmp_path / "search.sqlite3")
+    yield index
+    index.close()
+
+
+class TestSearchIndex:
+    def test_search_ranks_matching_steps(self, index):
+        course = make_course(
+            1,
+            {
+                10: {
+                    1: "<p>Асинхронный обход дерева курса</p>",
+                    2: "<p>Синхронный код</p>",
+                },
+                11: {3: "<p>Обходы и обход, обходом по дереву</p>"},
+            },
+        )
+
+        stats = index.update_course(course)
+        hits = index.search("асинхронные обходы")
+
+        assert stats.steps_indexed == 3
+        assert len(index) == 3
+        assert [hit.step_id for hit in hits] == [1, 3]
+        assert hits[0].lesson_title == "Lesson 10"
+        assert hits[0].course_ids == [1]
+        assert hits[1].position == 1
+        assert index.search("python") == []
+        assert index.search("и") == []
+
+    def test_unchanged_steps_are_not_reparsed(self, index, mocker):
+        course = make_course(1, {10: {1: "<p>старый текст</p>", 2: "<p>другой</p>"}})
+        index.update_course(course)
+        step = course.sections[0].units[0].lesson.steps[0]
+        step.text = "<p>новый текст</p>"
+        step.update_date = NEW_DATE
+        frequencies = mocker.spy(search_index, "term_frequencies")
+
+        stats = index.update_course(course)
+
+        assert stats.steps_indexed == 1
+        assert stats.steps_unchanged == 1
+        assert frequencies.call_count == 1
+        assert index.search("старый") == []
+        assert [hit.step_id for hit in index.search("новый")] == [1]
+        assert [hit.step_id for hit in index.search("текст")] == [1]
+
+    def test_removed_steps_leave_index(self, index):
+        index.update_course(make_course(1, {10: {1: "<p>корутина</p>", 2: "<p>таск</p>"}}))
+
+        stats = index.update_course(make_course(1, {10: {2: "<p>таск</p>"}}))
+
+        assert stats.steps_removed == 1
+        assert len(index) == 1
+        assert index.search("корутина") == []
+
+    def test_shared_steps_and_course_filter(self, index):
+        index.update_course(make_course(1, {10: {1: "<p>общий урок</p>"}}))
+        index.update_course(
+            make_course(2, {10: {1: "<p>общий урок</p>"}, 20: {2: "<p>свой урок</p>"}})
+        )
+
+        assert [hit.course_ids for hit in index.search("урок")] == [[1, 2], [2]]
+        assert [hit.step_id for hit in index.search("урок", course_ids=[1])] == [1]
+
+        # из первого курса урок ушел, но во втором он остался
+        index.update_course(make_course(1, {}))
+        assert [hit.course_ids for hit in index.search("общий")] == [[2]]
+
+    def test_needs_steps(self, index):
+        course = make_course(1, {10: {1: "<p>текст</p>"}})
+        lesson = course.sections[0].units[0].lesson
+
+        assert index.needs_steps(lesson)
+        index.update_course(course)
+        assert not index.needs_steps(lesson)
+
+        lesson.update_date = NEW_DATE
+        assert index.needs_steps(lesson)
+
+    def test_index_survives_reopen(self, tmp_path):
+        path = tmp_path / "search.sqlite3"
+        index = SearchIndex(path)
+        index.update_course(make_course(1, {10: {1: "<p>персистентный индекс</p>"}}))
+        index.close()
+
+        index = SearchIndex(path)
+        try:
+            assert [hit.step_id for hit in index.search("индекс")] == [1]
+        finally:
+            index.close()
+
+    @pytest.mark.asyncio
+    async def test_incremental_update_from_crawler(self, index, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            crawler = CourseCrawler(client)
+            course = await crawler.crawl_structure(1)
+            lessons = [
+                lesson
+                async for lesson in crawler.iter_lessons(course, fetch_steps=index.needs_steps)
+            ]
+            index.update_course(course, lessons)
+            stepik_api.objects["steps"][7]["block"]["text"] = "<p>Правка</p>"
+            stepik_api.objects["steps"][7]["update_date"] = NEW_DATE
+            stepik_api.objects["lessons"][3]["update_date"] = NEW_DATE
+
+            stepik_api.requests.clear()
+            lessons = [
+                lesson
+                async for lesson in crawler.iter_lessons(course, fetch_steps=index.needs_steps)
+            ]
+            stats = index.update_course(course, lessons)
+
+        # шаги качались только у измененного урока
+        assert [ids for resource, ids in stepik_api.requests if resource == "steps"] == [
+            [7, 8, 9]
+        ]
+        assert stats.steps_indexed == 1
+        assert stats.steps_unchanged == 2
+        assert len(index) == 12
+        assert [hit.step_id for hit in index.search("правка")] == [7]
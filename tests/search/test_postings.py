@@ -0,0 +1,54 @@
+import pytest
+
+from stepik_conspect_helper.search.postings import (
+    decode_postings,
+    decode_varints,
+    encode_postings,
+    encode_varint,
+    merge_postings,
+)
+
+
+class TestPostings:
+    @pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2**35])
+    def test_varint_roundtrip(self, value):
+        out = bytearray()
+        encode_varint(value, out)
+
+        assert list(decode_varints(bytes(out))) == [value]
+        assert len(out) == max(1, (value.bit_length() + 6) // 7)
+
+    def test_negative_varint(self):
+        with pytest.raises(ValueError):
+            encode_varint(-1, bytearray())
+
+    def test_truncated_varint(self):
+        with pytest.raises(ValueError):
+            list(decode_varints(b"\x80"))
+
+    def test_postings_are_delta_encoded(self):
+        postings = [(1000000, 2), (1000001, 1), (1000130, 5)]
+
+        data = encode_postings(postings)
+
+        assert list(decode_postings(data)) == postings
+        # 3 байта на первый id, дальше по байту на разность и на частоту
+        assert len(data) == 3 + 1 + 1 + 1 + 2 + 1
+
+    def test_truncated_postings(self):
+        data = encode_postings([(1, 1), (5, 2)])
+
+        with pytest.raises(ValueError, match="truncated postings"):
+            list(decode_postings(data[:-1]))
+
+    def test_postings_must_increase(self):
+        with pytest.raises(ValueError):
+            encode_postings([(2, 1), (2, 1)])
+
+    def test_merge(self):
+        data = encode_postings([(1, 1), (5, 2), (9, 3)])
+
+        merged = merge_postings(data, removed=[5, 100], added={3: 4, 9: 1})
+
+        assert list(decode_postings(merged)) == [(1, 1), (3, 4), (9, 1)]
+        assert merge_postings(merged, removed=[1, 3, 9]) == b""
@@ -0,0 +1,47 @@
+import pytest
+
+from stepik_conspect_helper.search.text import (
+    html_to_text,
+    stem_russian,
+    term_frequencies,
+    tokenize,
+)
+
+
+class TestText:
+    @pytest.mark.parametrize(
+        "words",
+        [
+            ("асинхронный", "асинхронные", "асинхронная", "асинхронного"),
+            ("обход", "обходы", "обхода", "обходом"),
+            ("программа", "программы", "программой"),
+            ("функция", "функции", "функций"),
+        ],
+    )
+    def test_word_forms_share_stem(self, words):
+        assert len({stem_russian(word) for word in words}) == 1
+
+    def test_stem_keeps_short_words(self):
+        assert stem_russian("да") == "да"
+        assert stem_russian("тс") == "тс"
+
+    def test_tokenize(self):
+        assert tokenize("Ёжик и asyncio.TaskGroup в Python 3") == [
+            "ежик",
+            "asyncio",
+            "taskgroup",
+            "python",
+            "3",
+        ]
+
+    def test_html_to_text_drops_tags_and_attributes(self):
+        text = html_to_text('<p>Ссылка <a href="https://stepik.org">сюда</a> &amp; код</p>')
+
+        assert "stepik" not in text
+        assert "&" in text
+        assert tokenize(text) == ["ссылк", "сюд", "код"]
+
+    def test_term_frequencies(self):
+        frequencies = term_frequencies("<p>Курс о курсах</p><p>курсы!</p>")
+
+        assert frequencies == {"курс": 3}
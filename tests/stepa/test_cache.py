@@ -0,0 +1,172 @@
+import sqlite3
+
+import pytest
+
+from stepik_conspect_helper.stepa import (
+    OfflineCacheMissError,
+    ResponseCache,
+    StepikClient,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    response_cache = ResponseCache(tmp_path / "api.sqlite3")
+    yield response_cache
+    response_cache.close()
+
+
+class TestResponseCache:
+    def test_put_and_get(self, cache: ResponseCache):
+        cache.put_many("steps", [(1, b'{"id": 1}'), (2, b'{"id": 2}')], '"abc"', None)
+
+        entries = cache.get_many("steps", [1, 2, 3])
+
+        assert set(entries) == {1, 2}
+        assert entries[1].body == b'{"id": 1}'
+        assert entries[1].etag == '"abc"'
+        assert cache.is_fresh(entries[1])
+        assert cache.get_many("lessons", [1]) == {}
+
+    def test_chunk_ids(self, cache: ResponseCache):
+        cache.put_many("steps", [(2, b"{}"), (1, b"{}")], '"abc"', None, chunk_ids=[2, 1])
+        cache.put_many("steps", [(3, b"{}")], None, None)
+
+        entries = cache.get_many("steps", [1, 3])
+
+        assert entries[1].chunk_ids == (2, 1)
+        assert entries[3].chunk_ids == ()
+
+    def test_old_cache_is_migrated(self, tmp_path):
+        path = tmp_path / "api.sqlite3"
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE responses (resource TEXT NOT NULL, object_id INTEGER NOT NULL, "
+                "body BLOB NOT NULL, etag TEXT, last_modified TEXT, stored_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, size INTEGER NOT NULL, "
+                "PRIMARY KEY (resource, object_id))"
+            )
+            conn.execute(
+                "INSERT INTO responses VALUES ('steps', 1, x'7b7d', '\"a\"', NULL, 0, 0, 2)"
+            )
+        conn.close()
+
+        cache = ResponseCache(path)
+        try:
+            assert cache.get_many("steps", [1])[1].chunk_ids == ()
+        finally:
+            cache.close()
+
+    def test_ttl(self, tmp_path):
+        cache = ResponseCache(tmp_path / "api.sqlite3", ttl=0)
+        cache.put_many("steps", [(1, b"{}")], None, None)
+
+        assert not cache.is_fresh(cache.get_many("steps", [1])[1])
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ResponseCache(tmp_path / "api.sqlite3", max_size=20)
+        cache.put_many("steps", [(1, b"x" * 10)], None, None)
+        cache.put_many("steps", [(2, b"x" * 10)], None, None)
+        cache.get_many("steps", [1])
+        cache.put_many("steps", [(3, b"x" * 10)], None, None)
+
+        assert set(cache.get_many("steps", [1, 2, 3])) == {1, 3}
+        assert cache.total_size() == 20
+        assert cache.stats.evicted == 1
+
+    def test_resource_stats(self, tmp_path):
+        cache = ResponseCache(tmp_path / "api.sqlite3", ttl=0)
+        cache.put_many("steps", [(1, b"x" * 10), (2, b"x" * 5)], None, None)
+        cache.put_many("lessons", [(1, b"{}")], None, None)
+
+        stats = cache.resource_stats()
+
+        assert list(stats) == ["lessons", "steps"]
+        assert stats["steps"] == (2, 2, 15)
+        assert stats["lessons"].size == 2
+
+
+class TestClientWithCache:
+    @pytest.mark.asyncio
+    async def test_fresh_entries_skip_network(self, stepik_api, cache):
+        async with StepikClient("token", api_url=stepik_api.url, cache=cache) as client:
+            first = await client.get_steps([1, 2, 3])
+            second = await client.get_steps([1, 2, 3, 4])
+
+        assert first == second[:3]
+        assert stepik_api.requests == [("steps", [1, 2, 3]), ("steps", [4])]
+        assert cache.stats.hits == 3
+        assert cache.stats.misses == 4
+        assert cache.stats.bytes_from_network > 0
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_are_revalidated(self, stepik_api, tmp_path):
+        cache = ResponseCache(tmp_path / "api.sqlite3", ttl=0)
+
+        async with StepikClient("token", api_url=stepik_api.url, cache=cache) as client:
+            await client.get_lessons([1, 2])
+            lessons = await client.get_lessons([1, 2])
+
+        assert [lesson["id"] for lesson in lessons] == [1, 2]
+        assert len(stepik_api.requests) == 2
+        assert cache.stats.revalidated == 2
+        assert cache.stats.misses == 2
+
+    @pytest.mark.asyncio
+    async def test_partly_stale_chunk_is_not_matched_by_etag(self, stepik_api, cache):
+        async with StepikClient("token", api_url=stepik_api.url, cache=cache) as client:
+            await client.get_lessons([1, 2, 3])
+            # протух только второй урок, ETag ответа на [1, 2, 3] к запросу [2] не подходит
+            with cache._conn:
+                cache._conn.execute("UPDATE responses SET stored_at = 0 WHERE object_id = 2")
+            lessons = await client.get_lessons([1, 2, 3])
+
+        assert sorted(lesson["id"] for lesson in lessons) == [1, 2, 3]
+        assert stepik_api.requests[-1] == ("lessons", [2])
+        assert stepik_api.if_none_match[-1] is None
+        assert cache.stats.revalidated == 0
+
+    @pytest.mark.asyncio
+    async def test_whole_stale_chunk_is_revalidated_in_original_order(self, stepik_api, tmp_path):
+        cache = ResponseCache(tmp_path / "api.sqlite3", ttl=0)
+
+        async with StepikClient("token", api_url=stepik_api.url, cache=cache) as client:
+            await client.get_lessons([2, 1])
+            await client.get_lessons([1, 2])
+
+        assert stepik_api.requests == [("lessons", [2, 1]), ("lessons", [2, 1])]
+        assert stepik_api.if_none_match[-1] is not None
+        assert cache.stats.revalidated == 2
+
+    @pytest.mark.asyncio
+    async def test_changed_entries_are_refetched(self, stepik_api, tmp_path):
+        cache = ResponseCache(tmp_path / "api.sqlite3", ttl=0)
+
+        async with StepikClient("token", api_url=stepik_api.url, cache=cache) as client:
+            await client.get_lessons([1])
+            stepik_api.objects["lessons"][1]["title"] = "Renamed"
+            lessons = await client.get_lessons([1])
+
+        assert lessons[0]["title"] == "Renamed"
+        assert cache.stats.revalidated == 0
+        assert cache.stats.misses == 2
+
+    @pytest.mark.asyncio
+    async def test_offline_mode(self, stepik_api, cache):
+        async with StepikClient("token", api_url=stepik_api.url, cache=cache) as client:
+            await client.get_units([1, 2])
+
+        async with StepikClient(
+            "token", api_url=stepik_api.url, cache=cache, offline=True
+        ) as client:
+            units = await client.get_units([2, 1])
+
+            with pytest.raises(OfflineCacheMissError):
+                await client.get_units([3])
+
+        assert [unit["id"] for unit in units] == [2, 1]
+        assert len(stepik_api.requests) == 1
+
+    def test_offline_requires_cache(self):
+        with pytest.raises(ValueError):
+            StepikClient("token", offline=True)
@@ -0,0 +1,148 @@
+import pytest
+
+from stepik_conspect_helper.stepa import (
+    CourseCrawler,
+    CrawlCheckpoint,
+    ResponseCache,
+    StepikClient,
+)
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return CrawlCheckpoint.path_for(tmp_path / "course.md")
+
+
+class TestCrawlCheckpoint:
+    def test_save_and_resume(self, checkpoint_path):
+        checkpoint = CrawlCheckpoint(checkpoint_path, 1)
+        checkpoint.add_completed("steps", [1, 2])
+        checkpoint.save()
+
+        resumed = CrawlCheckpoint.resume(checkpoint_path, 1)
+
+        assert checkpoint_path.name == "course.md.crawl.json"
+        assert resumed.completed == {"steps": {1, 2}}
+        assert resumed.completed_count == 2
+        # верить без перепроверки можно только тому, что получено с начала прерванного обхода
+        assert resumed.trusted_since == checkpoint.started_at
+        assert resumed.started_at >= checkpoint.started_at
+
+    def test_resume_ignores_other_course_and_garbage(self, checkpoint_path):
+        checkpoint = CrawlCheckpoint(checkpoint_path, 1)
+        checkpoint.add_completed("steps", [1])
+        checkpoint.save()
+
+        assert CrawlCheckpoint.resume(checkpoint_path, 2).completed == {}
+
+        checkpoint_path.write_text("{not json")
+        assert CrawlCheckpoint.resume(checkpoint_path, 1).completed == {}
+        assert CrawlCheckpoint.resume(checkpoint_path.with_name("missing"), 1).completed == {}
+
+    def test_saves_every_n_responses(self, checkpoint_path):
+        checkpoint = CrawlCheckpoint(checkpoint_path, 1, every=2)
+
+        checkpoint.add_completed("steps", [1])
+        assert not checkpoint_path.exists()
+        checkpoint.add_completed("steps", [2])
+        assert CrawlCheckpoint.resume(checkpoint_path, 1).completed == {"steps": {1, 2}}
+
+    def test_context_manager(self, checkpoint_path):
+        with pytest.raises(RuntimeError):
+            with CrawlCheckpoint(checkpoint_path, 1) as checkpoint:
+                checkpoint.add_completed("steps", [1])
+                raise RuntimeError
+        assert checkpoint_path.exists()
+
+        with CrawlCheckpoint.resume(checkpoint_path, 1):
+            pass
+        assert not checkpoint_path.exists()
+
+
+class TestResumedCrawl:
+    @pytest.mark.asyncio
+    async def test_resumed_crawl_skips_fetched_objects(
+        self, stepik_api, tmp_path, checkpoint_path, mocker
+    ):
+        # ttl=0: без чекпоинта каждый объект из кеша ушел бы на перепроверку
+        cache = ResponseCache(tmp_path / "api.sqlite3", ttl=0)
+        try:
+            async with StepikClient(
+                "token", api_url=stepik_api.url, cache=cache, chunk_size=1
+            ) as client:
+                original_get_chunk = client.get_chunk
+
+                async def get_chunk(resource, ids, **kwargs):
+                    if resource == "steps" and ids == [8]:
+                        raise ConnectionResetError("network blip")
+                    return await original_get_chunk(resource, ids, **kwargs)
+
+                patched = mocker.patch.object(client, "get_chunk", side_effect=get_chunk)
+                with pytest.raises(ExceptionGroup):
+                    with CrawlCheckpoint(checkpoint_path, 1, every=1000) as checkpoint:
+                        await CourseCrawler(client, concurrency=1, checkpoint=checkpoint).crawl(1)
+                mocker.stop(patched)
+
+                completed = CrawlCheckpoint.resume(checkpoint_path, 1).completed
+                assert 8 not in completed["steps"]
+                assert 7 in completed["steps"]
+
+                stepik_api.requests.clear()
+                with CrawlCheckpoint.resume(checkpoint_path, 1) as checkpoint:
+                    course = await CourseCrawler(client, checkpoint=checkpoint).crawl(1)
+        finally:
+            cache.close()
+
+        assert len(list(course.iter_steps())) == 12
+        assert not checkpoint_path.exists()
+        refetched = {(resource, ids[0]) for resource, ids in stepik_api.requests}
+        assert ("steps", 8) in refetched
+        assert not refetched & {
+            (resource, object_id)
+            for resource, object_ids in completed.items()
+            for object_id in object_ids
+        }
+
+    @pytest.mark.asyncio
+    async def test_objects_older_than_interrupted_crawl_are_revalidated(
+        self, stepik_api, tmp_path, checkpoint_path, mocker
+    ):
+        cache = ResponseCache(tmp_path / "api.sqlite3", ttl=0)
+        try:
+            async with StepikClient(
+                "token", api_url=stepik_api.url, cache=cache, chunk_size=1
+            ) as client:
+                original_get_chunk = client.get_chunk
+
+                async def get_chunk(resource, ids, **kwargs):
+                    if resource == "steps" and ids == [8]:
+                        raise ConnectionResetError("network blip")
+                    return await original_get_chunk(resource, ids, **kwargs)
+
+                patched = mocker.patch.object(client, "get_chunk", side_effect=get_chunk)
+                with pytest.raises(ExceptionGroup):
+                    with CrawlCheckpoint(checkpoint_path, 1, every=1000) as checkpoint:
+                        await CourseCrawler(client, concurrency=1, checkpoint=checkpoint).crawl(1)
+                mocker.stop(patched)
+
+                # шаг 7 попал в кеш еще до прерванного обхода, тот взял его из кеша
+                with cache._conn:
+                    cache._conn.execute(
+                        "UPDATE responses SET stored_at = 0 "
+                        "WHERE resource = 'steps' AND object_id = 7"
+                    )
+
+                stepik_api.requests.clear()
+                with CrawlCheckpoint.resume(checkpoint_path, 1) as checkpoint:
+                    await CourseCrawler(client, checkpoint=checkpoint).crawl(1)
+        finally:
+            cache.close()
+
+        refetched = {(resource, ids[0]) for resource, ids in stepik_api.requests}
+        assert ("steps", 7) in refetched
+        assert ("steps", 6) not in refetched
+        assert cache.stats.revalidated >= 1
+
+    def test_checkpoint_requires_cache(self, checkpoint_path):
+        with pytest.raises(ValueError):
+            CourseCrawler(StepikClient("token"), checkpoint=CrawlCheckpoint(checkpoint_path, 1))
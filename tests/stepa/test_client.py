@@ -0,0 +1,68 @@
+import aiohttp
+import pytest
+
+from stepik_conspect_helper.stepa import StepikClient
+from stepik_conspect_helper.stepa.client import chunked
+
+
+class TestClient:
+    def test_chunked(self):
+        assert list(chunked([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+        assert list(chunked([], 2)) == []
+
+    @pytest.mark.asyncio
+    async def test_get_objects_batches_ids(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url, chunk_size=5) as client:
+            steps = await client.get_steps(range(1, 13))
+
+        assert [step["id"] for step in steps] == list(range(1, 13))
+        assert sorted(stepik_api.requests) == [
+            ("steps", [1, 2, 3, 4, 5]),
+            ("steps", [6, 7, 8, 9, 10]),
+            ("steps", [11, 12]),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_objects_keeps_order_and_drops_duplicates(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            lessons = await client.get_lessons([3, 1, 3, 2])
+
+        assert [lesson["id"] for lesson in lessons] == [3, 1, 2]
+        assert stepik_api.requests == [("lessons", [3, 1, 2])]
+
+    @pytest.mark.asyncio
+    async def test_get_objects_empty(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            assert await client.get_units([]) == []
+
+        assert stepik_api.requests == []
+
+    @pytest.mark.asyncio
+    async def test_get_objects_skips_missing(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            courses = await client.get_courses([1, 999])
+
+        assert [course["id"] for course in courses] == [1]
+
+    @pytest.mark.asyncio
+    async def test_session_is_shared(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            session = client.session
+            await client.get_courses([1])
+            await client.get("stepics/1")
+
+            assert client.session is session
+            assert session.headers["Authorization"] == "Bearer token"
+
+        with pytest.raises(RuntimeError):
+            _ = client.session
+
+    @pytest.mark.asyncio
+    async def test_get_raises_on_error_status(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url + "/nope") as client:
+            with pytest.raises(aiohttp.ClientResponseError):
+                await client.get("stepics/2")
+
+    def test_invalid_chunk_size(self):
+        with pytest.raises(ValueError):
+            StepikClient("token", chunk_size=0)
@@ -0,0 +1,158 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from stepik_conspect_helper.stepa import (
+    CourseCrawler,
+    FairScheduler,
+    LessonPool,
+    StepikClient,
+)
+
+
+async def collect(lessons):
+    return [lesson async for lesson in lessons]
+
+
+class TestCrawler:
+    @pytest.mark.asyncio
+    async def test_crawl_builds_tree_in_course_order(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            course = await CourseCrawler(client).crawl(1)
+
+        assert course.title == "Course 1"
+        assert [section.position for section in course.sections] == [1, 2]
+        assert [lesson.id for lesson in course.iter_lessons()] == [1, 2, 3, 4]
+        assert [step.id for step in course.iter_steps()] == list(range(1, 13))
+
+        step = course.sections[1].units[0].lesson.steps[0]
+        assert step.block_name == "text"
+        assert step.lesson_id == 3
+
+    @pytest.mark.asyncio
+    async def test_crawl_stats(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            crawler = CourseCrawler(client)
+            await crawler.crawl(1)
+
+        assert crawler.stats.requests == len(stepik_api.requests)
+        assert crawler.stats.objects == 1 + 2 + 4 + 4 + 12
+        assert crawler.stats.wall_time > 0
+        assert crawler.stats.requests_per_second > 0
+
+    @pytest.mark.asyncio
+    async def test_crawl_respects_concurrency(self, stepik_api, mocker):
+        in_flight = max_in_flight = 0
+
+        async with StepikClient("token", api_url=stepik_api.url, chunk_size=1) as client:
+            original_get_chunk = client.get_chunk
+
+            async def get_chunk(resource, ids):
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                try:
+                    return await original_get_chunk(resource, ids)
+                finally:
+                    in_flight -= 1
+
+            mocker.patch.object(client, "get_chunk", side_effect=get_chunk)
+            course = await CourseCrawler(client, concurrency=2).crawl(1)
+
+        assert max_in_flight == 2
+        assert len(list(course.iter_steps())) == 12
+
+    @pytest.mark.asyncio
+    async def test_crawl_structure_skips_lessons(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            course = await CourseCrawler(client).crawl_structure(1)
+
+        assert [unit.lesson_id for s in course.sections for unit in s.units] == [1, 2, 3, 4]
+        assert list(course.iter_lessons()) == []
+        assert {resource for resource, _ in stepik_api.requests} == {
+            "courses",
+            "sections",
+            "units",
+        }
+
+    @pytest.mark.asyncio
+    async def test_iter_lessons_keeps_course_order(self, stepik_api, mocker):
+        async with StepikClient("token", api_url=stepik_api.url, chunk_size=1) as client:
+            crawler = CourseCrawler(client)
+            course = await crawler.crawl_structure(1)
+            original_get_chunk = client.get_chunk
+
+            async def get_chunk(resource, ids):
+                # первый урок приходит последним
+                if resource == "lessons" and ids == [1]:
+                    await asyncio.sleep(0.05)
+                return await original_get_chunk(resource, ids)
+
+            mocker.patch.object(client, "get_chunk", side_effect=get_chunk)
+            lessons = [lesson async for lesson in crawler.iter_lessons(course, window=2)]
+
+        assert [lesson.id for lesson in lessons] == [1, 2, 3, 4]
+        assert [step.id for step in lessons[3].steps] == [10, 11, 12]
+
+    @pytest.mark.asyncio
+    async def test_iter_lessons_window(self, stepik_api, mocker):
+        async with StepikClient("token", api_url=stepik_api.url, chunk_size=1) as client:
+            crawler = CourseCrawler(client)
+            course = await crawler.crawl_structure(1)
+            spy = mocker.spy(client, "get_chunk")
+
+            async with aclosing(crawler.iter_lessons(course, window=2)) as lessons:
+                lesson = await anext(lessons)
+
+        requested_lessons = [c.args[1] for c in spy.call_args_list if c.args[0] == "lessons"]
+        assert lesson.id == 1
+        assert len(requested_lessons) <= 3
+
+    @pytest.mark.asyncio
+    async def test_crawl_unknown_course(self, stepik_api):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            with pytest.raises(LookupError):
+                await CourseCrawler(client).crawl(999)
+
+    def test_invalid_concurrency(self):
+        with pytest.raises(ValueError):
+            CourseCrawler(StepikClient("token"), concurrency=0)
+
+    @pytest.mark.asyncio
+    async def test_lesson_pool_fetches_shared_lessons_once(self, stepik_api):
+        pool = LessonPool([1, 2])
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            first = CourseCrawler(client, lesson_pool=pool)
+            second = CourseCrawler(client, lesson_pool=pool)
+            course = await first.crawl_structure(1)
+
+            lessons = await asyncio.gather(
+                *(
+                    collect(crawler.iter_lessons(course, fetch_steps=lambda _: False))
+                    for crawler in (first, second)
+                )
+            )
+
+        for crawled in lessons:
+            assert [lesson.id for lesson in crawled] == [1, 2, 3, 4]
+            # общие уроки качаются с шагами, даже если обходу они не нужны
+            assert [len(lesson.steps) for lesson in crawled] == [3, 3, 0, 0]
+        assert lessons[0][0] is lessons[1][0]
+        assert pool.hits == 2
+
+        step_requests = [ids for resource, ids in stepik_api.requests if resource == "steps"]
+        assert sorted(i for ids in step_requests for i in ids) == list(range(1, 7))
+
+    @pytest.mark.asyncio
+    async def test_crawl_with_scheduler(self, stepik_api):
+        scheduler = FairScheduler(concurrency=1)
+
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            crawler = CourseCrawler(client, scheduler=scheduler, flow=1)
+            course = await crawler.crawl(1)
+
+        assert len(list(course.iter_steps())) == 12
+        assert scheduler.stats.granted[1] == crawler.stats.requests
@@ -0,0 +1,273 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from stepik_conspect_helper.stepa import (
+    Lesson,
+    MediaDownloader,
+    MediaStore,
+    RetryPolicy,
+    Step,
+    collect_media_urls,
+    extract_media_urls,
+)
+
+DATE = "2025-01-01T00:00:00Z"
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+@dataclass
+class FakeMediaHost:
+    """Раздает files с ETag и Last-Modified и понимает Range с If-Range"""
+
+    files: dict[str, bytes]
+    requests: list[tuple[str, str | None]] = field(default_factory=list)
+    failures: list[int] = field(default_factory=list)
+    delay: float = 0
+    weak_etag: bool = False
+    active: int = 0
+    max_active: int = 0
+    url: str = ""
+
+    async def handle(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        self.requests.append((name, request.headers.get("Range")))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+
+        if self.failures:
+            return web.Response(status=self.failures.pop(0), headers={"Retry-After": "0"})
+        if name not in self.files:
+            raise web.HTTPNotFound()
+
+        body = self.files[name]
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.weak_etag:
+            etag = f"W/{etag}"
+        validators = {"ETag": etag, "Last-Modified": LAST_MODIFIED}
+        range_header = request.headers.get("Range")
+        if range_header and request.headers.get("If-Range") in (etag, LAST_MODIFIED):
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            return web.Response(
+                status=206,
+                body=body[start:],
+                headers={
+                    **validators,
+                    "Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}",
+                },
+            )
+        return web.Response(body=body, headers=validators)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/media/{name}", self.handle)
+        return app
+
+
+@pytest_asyncio.fixture
+async def media_host():
+    host = FakeMediaHost({"a.png": b"A" * 1000, "b.pdf": b"B" * 3000, "copy.png": b"A" * 1000})
+    server = TestServer(host.make_app(), host="127.0.0.1")
+    await server.start_server()
+    host.url = str(server.make_url("/media"))
+
+    try:
+        yield host
+    finally:
+        await server.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MediaStore(tmp_path / "media")
+    yield store
+    store.close()
+
+
+class TestExtractMediaUrls:
+    def test_images_and_attachments(self):
+        html = (
+            '<p><img src="/media/a.png"><img src="data:image/png;base64,AAAA">'
+            '<a href="https://example.com/notes.PDF">конспект</a>'
+            '<a href="https://example.com/page">не файл</a>'
+            '<img src="/media/a.png"></p>'
+        )
+
+        assert extract_media_urls(html) == [
+            "https://stepik.org/media/a.png",
+            "https://example.com/notes.PDF",
+        ]
+
+    def test_collect_across_lessons(self):
+        lessons = [
+            Lesson(
+                lesson_id,
+                "Lesson",
+                [lesson_id],
+                DATE,
+                steps=[Step(lesson_id, lesson_id, 1, "text", text, DATE)],
+            )
+            for lesson_id, text in [
+                (1, '<img src="https://cdn.example/x.png">'),
+                (2, '<img src="https://cdn.example/x.png"><img src="/y.gif">'),
+            ]
+        ]
+
+        assert collect_media_urls(lessons) == [
+            "https://cdn.example/x.png",
+            "https://stepik.org/y.gif",
+        ]
+
+
+class TestMediaDownloader:
+    @pytest.mark.asyncio
+    async def test_download_and_url_dedup(self, media_host, store):
+        url = f"{media_host.url}/b.pdf"
+        async with MediaDownloader(store, chunk_size=256) as downloader:
+            media = await downloader.download(url)
+            again = await downloader.download(url)
+
+        assert media.path.read_bytes() == b"B" * 3000
+        assert media.path.suffix == ".pdf"
+        assert media.sha256 == hashlib.sha256(b"B" * 3000).hexdigest()
+        assert again == media
+        assert media_host.requests == [("b.pdf", None)]
+        assert downloader.stats.url_hits == 1
+        assert downloader.stats.bytes_downloaded == 3000
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_download(self, media_host, store):
+        media_host.delay = 0.05
+        url = f"{media_host.url}/a.png"
+        async with MediaDownloader(store) as downloader:
+            first, second = await asyncio.gather(
+                downloader.download(url), downloader.download(url)
+            )
+
+        assert first == second
+        assert len(media_host.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_same_content_stored_once(self, media_host, store):
+        urls = [f"{media_host.url}/a.png", f"{media_host.url}/copy.png"]
+        async with MediaDownloader(store) as downloader:
+            results = await downloader.download_all(urls)
+
+        assert results[urls[0]].path == results[urls[1]].path
+        assert downloader.stats.downloaded == 1
+        assert downloader.stats.content_duplicates == 1
+        assert len(list(store.objects_dir.rglob("*.png"))) == 1
+        assert list(store.partial_dir.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_resume_partial_download(self, media_host, store):
+        url = f"{media_host.url}/b.pdf"
+        body = media_host.files["b.pdf"]
+        store.partial_path(url).write_bytes(body[:1200])
+        store.set_partial_validator(url, f'"{hashlib.md5(body).hexdigest()}"')
+
+        async with MediaDownloader(store) as downloader:
+            media = await downloader.download(url)
+
+        assert media_host.requests == [("b.pdf", "bytes=1200-")]
+        assert media.path.read_bytes() == body
+        assert downloader.stats.resumed == 1
+        assert downloader.stats.bytes_downloaded == 1800
+
+    @pytest.mark.asyncio
+    async def test_changed_file_is_downloaded_again(self, media_host, store):
+        url = f"{media_host.url}/b.pdf"
+        store.partial_path(url).write_bytes(b"X" * 1200)
+        store.set_partial_validator(url, '"stale"')
+
+        async with MediaDownloader(store) as downloader:
+            media = await downloader.download(url)
+
+        assert media.path.read_bytes() == media_host.files["b.pdf"]
+        assert downloader.stats.resumed == 0
+
+    @pytest.mark.asyncio
+    async def test_weak_etag_is_not_used_for_if_range(self, media_host, store):
+        url = f"{media_host.url}/b.pdf"
+        body = media_host.files["b.pdf"]
+        store.partial_path(url).write_bytes(body[:1200])
+        store.set_partial_validator(url, f'W/"{hashlib.md5(body).hexdigest()}"')
+
+        async with MediaDownloader(store) as downloader:
+            media = await downloader.download(url)
+
+        # без сильного валидатора кусок на диске не докачивается, а качается заново
+        assert media_host.requests == [("b.pdf", None)]
+        assert media.path.read_bytes() == body
+        assert downloader.stats.resumed == 0
+
+    @pytest.mark.asyncio
+    async def test_weak_etag_falls_back_to_last_modified(self, media_host, store, mocker):
+        media_host.weak_etag = True
+        url = f"{media_host.url}/b.pdf"
+        body = media_host.files["b.pdf"]
+        set_partial_validator = mocker.spy(store, "set_partial_validator")
+
+        async with MediaDownloader(store) as downloader:
+            await downloader.download(f"{media_host.url}/a.png")
+            store.partial_path(url).write_bytes(body[:1200])
+            store.set_partial_validator(url, LAST_MODIFIED)
+            media = await downloader.download(url)
+
+        assert set_partial_validator.call_args_list[0] == mocker.call(
+            f"{media_host.url}/a.png", LAST_MODIFIED
+        )
+        assert media_host.requests[-1] == ("b.pdf", "bytes=1200-")
+        assert media.path.read_bytes() == body
+        assert downloader.stats.resumed == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_and_failures(self, media_host, store):
+        media_host.failures = [503]
+        policy = RetryPolicy(max_retries=1, base_delay=0)
+        async with MediaDownloader(store, retry_policy=policy) as downloader:
+            results = await downloader.download_all(
+                [f"{media_host.url}/a.png", f"{media_host.url}/missing.png"]
+            )
+
+        assert results[f"{media_host.url}/a.png"].size == 1000
+        error = results[f"{media_host.url}/missing.png"]
+        assert isinstance(error, aiohttp.ClientResponseError)
+        assert error.status == 404
+        assert downloader.stats.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit(self, media_host, store):
+        media_host.delay = 0.02
+        media_host.files.update({f"{i}.png": bytes([i]) * 10 for i in range(10)})
+        urls = [f"{media_host.url}/{i}.png" for i in range(10)]
+
+        async with MediaDownloader(store, concurrency_per_host=2) as downloader:
+            results = await downloader.download_all(urls)
+
+        assert len(results) == 10
+        assert media_host.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_store_survives_reopen(self, media_host, tmp_path):
+        url = f"{media_host.url}/a.png"
+        store = MediaStore(tmp_path / "media")
+        async with MediaDownloader(store) as downloader:
+            await downloader.download(url)
+        store.close()
+
+        store = MediaStore(tmp_path / "media")
+        try:
+            assert store.lookup(url).size == 1000
+        finally:
+            store.close()
@@ -0,0 +1,57 @@
+import pickle
+
+import pytest
+
+from stepik_conspect_helper.stepa import Lesson, Step, codec
+
+
+class TestModels:
+    def test_models_have_no_instance_dict(self):
+        step = Step(1, 1, 1, "text", "<p>x</p>", "2025-01-01T00:00:00Z")
+
+        assert not hasattr(step, "__dict__")
+        with pytest.raises(AttributeError):
+            step.extra = 1
+
+    def test_from_api_ignores_unknown_fields(self):
+        lesson = Lesson.from_api(
+            {"id": 3, "title": "Lesson 3", "steps": [7, 8], "owner": 1, "is_public": True}
+        )
+
+        assert lesson.step_ids == [7, 8]
+        assert lesson.steps == []
+        assert lesson.update_date == ""
+
+    def test_models_are_picklable(self):
+        step = Step(1, 1, 1, "text", "<p>x</p>", "2025-01-01T00:00:00Z")
+        lesson = Lesson(1, "Lesson", [1], "", steps=[step])
+
+        assert pickle.loads(pickle.dumps(lesson)) == lesson
+
+    def test_unparseable_video_quality(self):
+        urls = [
+            {"quality": "hd", "url": "https://v/hd.mp4"},
+            {"quality": "1080p60", "url": "https://v/1080.mp4"},
+            {"quality": "auto", "url": "https://v/auto.mp4"},
+            {"quality": "720p", "url": "https://v/720.mp4"},
+            {"url": "https://v/default.mp4"},
+        ]
+
+        step = Step.from_api(
+            {"id": 1, "lesson": 1, "position": 1, "block": {"video": {"urls": urls}}}
+        )
+
+        assert step.video_url == "https://v/1080.mp4"
+
+
+class TestCodec:
+    def test_roundtrip(self):
+        obj = {"id": 1, "title": "Урок", "steps": [1, 2], "video": None}
+
+        data = codec.dumps(obj)
+
+        assert isinstance(data, bytes)
+        assert codec.loads(data) == obj
+
+    def test_loads_accepts_bytes(self):
+        assert codec.loads('{"steps": [{"id": 1}]}'.encode()) == {"steps": [{"id": 1}]}
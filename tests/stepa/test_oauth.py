@@ -7,11 +7,18 @@ from pytest_mock import MockerFixture
 
 from stepik_conspect_helper.constants import (
     OAUTH_AUTH_CODE_GRANT_TYPE,
+    OAUTH_CLIENT_CREDENTIALS_GRANT_TYPE,
+    OAUTH_REFRESH_TOKEN_GRANT_TYPE,
     STEPIK_OATH_REDIRECT_URI,
     STEPIK_OAUTH_APP_CLIENT_ID,
     STEPIK_TOKEN_ENDPOINT,
 )
-from stepik_conspect_helper.stepa import exchange_code_for_token
+from stepik_conspect_helper.stepa import (
+    OAuthToken,
+    exchange_code_for_token,
+    refresh_access_token,
+    request_client_credentials_token,
+)
 
 
 @pytest_asyncio.fixture
@@ -27,9 +34,11 @@ async def client_session_with_token(
     client_session,
     mocker: MockerFixture,
 ):
-    def wrapper(expected_token: str) -> aiohttp.ClientSession:
+    def wrapper(expected_token: str, **extra) -> aiohttp.ClientSession:
         resp = mocker.AsyncMock()
-        resp.json.return_value = {"access_token": expected_token}
+        # raise_for_status у aiohttp синхронный, у AsyncMock он вернул бы корутину
+        resp.raise_for_status = mocker.MagicMock()
+        resp.json.return_value = {"access_token": expected_token, **extra}
         resp_ctx = mocker.AsyncMock()
         resp_ctx.__aenter__.return_value = resp
         client_session.post.return_value = resp_ctx
@@ -81,7 +90,7 @@ class TestOauth:
             },
         )
 
-        assert token == expected_token
+        assert token.access_token == expected_token
 
     @pytest.mark.asyncio
     async def test_exchange_code_for_token_unexpected_errro(
@@ -97,3 +106,67 @@ class TestOauth:
                 code,
                 client_session,
             )
+
+    @pytest.mark.asyncio
+    async def test_exchange_code_for_token_expiry(
+        self,
+        client_session_with_token: Callable,
+    ) -> None:
+        client_session = client_session_with_token(
+            "SvbE7kWxHdj5dwlJNlTVCgW8Slsikc",
+            expires_in=36000,
+            refresh_token="0iEUTqElGyHzCRJtnsLLdy6wUTGq2a",
+        )
+
+        token = await exchange_code_for_token("HZGGlezgHpAgaJ4ByaUYrSiymxzwHQ", client_session)
+
+        assert token.refresh_token == "0iEUTqElGyHzCRJtnsLLdy6wUTGq2a"
+        assert not token.is_expired()
+        assert token.is_expired(leeway=36001)
+
+    @pytest.mark.asyncio
+    async def test_refresh_access_token(
+        self,
+        client_session_with_token: Callable,
+    ) -> None:
+        expected_token = "SvbE7kWxHdj5dwlJNlTVCgW8Slsikc"
+        client_session = client_session_with_token(expected_token, expires_in=36000)
+        old_token = OAuthToken("old", expires_at=0, refresh_token="refresh")
+
+        token = await refresh_access_token(old_token, client_session)
+
+        client_session.post.assert_called_with(
+            STEPIK_TOKEN_ENDPOINT,
+            data={
+                "client_id": STEPIK_OAUTH_APP_CLIENT_ID,
+                "grant_type": OAUTH_REFRESH_TOKEN_GRANT_TYPE,
+                "refresh_token": "refresh",
+            },
+        )
+        assert token.access_token == expected_token
+        assert token.refresh_token == "refresh"
+
+    @pytest.mark.asyncio
+    async def test_refresh_access_token_without_refresh_token(
+        self,
+        client_session: aiohttp.ClientSession,
+    ) -> None:
+        with pytest.raises(ValueError):
+            await refresh_access_token(OAuthToken("old"), client_session)
+
+    @pytest.mark.asyncio
+    async def test_request_client_credentials_token(
+        self,
+        client_session_with_token: Callable,
+    ) -> None:
+        expected_token = "SvbE7kWxHdj5dwlJNlTVCgW8Slsikc"
+        client_session = client_session_with_token(expected_token)
+
+        token = await request_client_credentials_token("id", "secret", client_session)
+
+        client_session.post.assert_called_with(
+            STEPIK_TOKEN_ENDPOINT,
+            data={"grant_type": OAUTH_CLIENT_CREDENTIALS_GRANT_TYPE},
+            headers={"Authorization": "Basic aWQ6c2VjcmV0"},
+        )
+        assert token.access_token == expected_token
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+
+import aiohttp
+import pytest
+
+from stepik_conspect_helper.stepa import StepikClient
+from stepik_conspect_helper.stepa.ratelimit import (
+    AdaptiveRateLimiter,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+
+@pytest.fixture
+def no_delay_policy():
+    return RetryPolicy(max_retries=3, base_delay=0)
+
+
+class TestRetryPolicy:
+    def test_parse_retry_after(self):
+        in_ten_seconds = format_datetime(datetime.now(UTC) + timedelta(seconds=10), usegmt=True)
+
+        assert parse_retry_after("3") == 3.0
+        assert 8 < parse_retry_after(in_ten_seconds) <= 10
+        assert parse_retry_after("garbage") is None
+        assert parse_retry_after(None) is None
+
+    def test_delay(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+
+        assert policy.delay(0, retry_after=7) == 7
+        assert all(0 <= policy.delay(attempt) <= 5 for attempt in range(10))
+
+
+class TestAdaptiveRateLimiter:
+    def test_aimd(self):
+        limiter = AdaptiveRateLimiter(rate=10, max_rate=20, concurrency=4)
+
+        for _ in range(10):
+            limiter.on_success()
+        assert 10.9 < limiter.rate < 11
+        assert limiter.concurrency > 5
+
+        limiter.on_throttle()
+        assert 5 < limiter.rate < 6
+        assert limiter.stats.throttled == 1
+
+    def test_limits_are_bounded(self):
+        limiter = AdaptiveRateLimiter(rate=2, min_rate=1, max_rate=3, concurrency=1)
+
+        for _ in range(100):
+            limiter.on_success()
+        assert limiter.rate == 3
+
+        for _ in range(100):
+            limiter.on_throttle()
+        assert limiter.rate == 1
+        assert limiter.concurrency == 1
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_paces_requests(self):
+        limiter = AdaptiveRateLimiter(rate=20, max_rate=20)
+
+        started_at = time.monotonic()
+        for _ in range(30):
+            async with limiter.slot():
+                pass
+
+        # 20 токенов есть сразу, остальные 10 капают со скоростью 20 в секунду
+        assert 0.4 < time.monotonic() - started_at < 1.0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        limiter = AdaptiveRateLimiter(rate=1000, max_rate=1000, concurrency=2)
+        in_flight = max_in_flight = 0
+
+        async def request():
+            nonlocal in_flight, max_in_flight
+            async with limiter.slot():
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*(request() for _ in range(10)))
+
+        assert max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_everyone(self):
+        limiter = AdaptiveRateLimiter(rate=1000, max_rate=1000)
+        limiter.on_throttle(retry_after=0.2)
+
+        started_at = time.monotonic()
+        async with limiter.slot():
+            pass
+
+        assert time.monotonic() - started_at >= 0.19
+
+
+class TestClientRetries:
+    @pytest.mark.asyncio
+    async def test_retries_server_errors(self, stepik_api, no_delay_policy):
+        stepik_api.failures = [(503, {}), (500, {})]
+
+        async with StepikClient(
+            "token", api_url=stepik_api.url, retry_policy=no_delay_policy
+        ) as client:
+            lessons = await client.get_lessons([1])
+
+        assert lessons[0]["id"] == 1
+        assert len(stepik_api.requests) == 3
+        assert client.rate_limiter.stats.retries == 2
+        assert client.rate_limiter.stats.throttled == 1
+
+    @pytest.mark.asyncio
+    async def test_honours_retry_after(self, stepik_api, no_delay_policy):
+        stepik_api.failures = [(429, {"Retry-After": "1"})]
+
+        async with StepikClient(
+            "token", api_url=stepik_api.url, retry_policy=no_delay_policy
+        ) as client:
+            started_at = time.monotonic()
+            await client.get_lessons([1])
+
+        assert time.monotonic() - started_at >= 0.99
+        assert client.rate_limiter.rate < 10
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, stepik_api, no_delay_policy):
+        stepik_api.failures = [(502, {})] * 4
+
+        async with StepikClient(
+            "token", api_url=stepik_api.url, retry_policy=no_delay_policy
+        ) as client:
+            with pytest.raises(aiohttp.ClientResponseError) as exc_info:
+                await client.get_lessons([1])
+
+        assert exc_info.value.status == 502
+        assert len(stepik_api.requests) == 4
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self, stepik_api, no_delay_policy):
+        stepik_api.failures = [(403, {})]
+
+        async with StepikClient(
+            "token", api_url=stepik_api.url, retry_policy=no_delay_policy
+        ) as client:
+            with pytest.raises(aiohttp.ClientResponseError):
+                await client.get_lessons([1])
+
+        assert len(stepik_api.requests) == 1
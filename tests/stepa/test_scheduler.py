@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from stepik_conspect_helper.stepa import FairScheduler
+
+
+class TestFairScheduler:
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        scheduler = FairScheduler(concurrency=2)
+        in_flight = max_in_flight = 0
+
+        async def request():
+            nonlocal in_flight, max_in_flight
+            async with scheduler.slot("course"):
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*(request() for _ in range(6)))
+
+        assert max_in_flight == 2
+        assert scheduler.in_flight == 0
+        assert scheduler.stats.granted == {"course": 6}
+
+    @pytest.mark.asyncio
+    async def test_flows_are_interleaved(self):
+        scheduler = FairScheduler(concurrency=1)
+        release = asyncio.Event()
+        order = []
+
+        async def request(flow):
+            async with scheduler.slot(flow):
+                order.append(flow)
+                await release.wait()
+
+        holder = asyncio.create_task(request("huge"))
+        await asyncio.sleep(0)
+        huge = [asyncio.create_task(request("huge")) for _ in range(5)]
+        await asyncio.sleep(0)
+        small = [asyncio.create_task(request("small")) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        release.set()
+        await asyncio.gather(holder, *huge, *small)
+
+        # маленький курс не ждет, пока большой выгребет всю свою очередь
+        assert order == ["huge", "huge", "small", "huge", "small", "huge", "huge", "huge"]
+        assert scheduler.stats.max_waiting == 7
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_queue(self):
+        scheduler = FairScheduler(concurrency=1)
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot("a"):
+                await release.wait()
+
+        holder_task = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await holder_task
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        async with scheduler.slot("b"):
+            assert scheduler.in_flight == 1
+        assert scheduler.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_holder_and_waiter_cancelled_together(self):
+        scheduler = FairScheduler(concurrency=1)
+
+        async def holder():
+            async with scheduler.slot("a"):
+                await asyncio.sleep(10)
+
+        holder_task = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+
+        # так отменяет задачи TaskGroup при падении одной из них
+        holder_task.cancel()
+        waiter.cancel()
+        results = await asyncio.gather(holder_task, waiter, return_exceptions=True)
+
+        assert [type(result) for result in results] == [
+            asyncio.CancelledError,
+            asyncio.CancelledError,
+        ]
+        assert scheduler.in_flight == 0
+        async with scheduler.slot("b"):
+            assert scheduler.in_flight == 1
+
+    def test_invalid_concurrency(self):
+        with pytest.raises(ValueError):
+            FairScheduler(concurrency=0)
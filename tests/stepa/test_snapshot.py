@@ -0,0 +1,130 @@
+import pytest
+import pytest_asyncio
+
+from stepik_conspect_helper.conspect import ConspectBuilder
+from stepik_conspect_helper.stepa import (
+    CourseCrawler,
+    CourseSnapshot,
+    SnapshotCrawler,
+    SnapshotFormatError,
+    StepikClient,
+    write_snapshot,
+)
+from stepik_conspect_helper.stepa.snapshot import SNAPSHOT_FORMAT_VERSION, SNAPSHOT_MAGIC
+
+
+@pytest_asyncio.fixture
+async def crawled_course(stepik_api):
+    stepik_api.objects["steps"][5]["block"]["text"] = "<p>Юникод и повторы</p>"
+    stepik_api.objects["steps"][6]["block"] = {
+        "name": "code",
+        "text": "<p>Сложите числа</p>",
+        "options": {"samples": [["1 2\n", "3\n"]]},
+        "video": {"urls": [{"quality": "360", "url": "https://v/360.mp4"}]},
+    }
+    async with StepikClient("token", api_url=stepik_api.url) as client:
+        return await CourseCrawler(client).crawl(1)
+
+
+class TestSnapshot:
+    @pytest.mark.asyncio
+    async def test_roundtrip(self, crawled_course, tmp_path):
+        path = tmp_path / "course.snapshot"
+
+        size = write_snapshot(crawled_course, path)
+
+        assert path.stat().st_size == size
+        with CourseSnapshot(path) as snapshot:
+            assert snapshot.step_count == 12
+            assert list(snapshot.iter_lessons()) == list(crawled_course.iter_lessons())
+
+            skeleton = snapshot.course
+            assert skeleton.title == crawled_course.title
+            assert skeleton.section_ids == crawled_course.section_ids
+            assert [s.unit_ids for s in skeleton.sections] == [
+                s.unit_ids for s in crawled_course.sections
+            ]
+            assert all(not lesson.steps for lesson in skeleton.iter_lessons())
+
+    @pytest.mark.asyncio
+    async def test_step_lookup(self, crawled_course, tmp_path):
+        path = tmp_path / "course.snapshot"
+        write_snapshot(crawled_course, path)
+        steps = {step.id: step for step in crawled_course.iter_steps()}
+
+        with CourseSnapshot(path) as snapshot:
+            for step_id, step in steps.items():
+                assert snapshot.step(step_id) == step
+            assert snapshot.step(0) is None
+            assert snapshot.step(100) is None
+
+    @pytest.mark.asyncio
+    async def test_strings_are_stored_once(self, crawled_course, tmp_path):
+        path = tmp_path / "course.snapshot"
+        write_snapshot(crawled_course, path)
+
+        # все шаги и уроки обновлены в одну дату
+        assert path.read_bytes().count(b"2025-01-01T00:00:00Z") == 1
+
+    @pytest.mark.asyncio
+    async def test_lessons_without_steps(self, stepik_api, tmp_path):
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            course = await CourseCrawler(client).crawl(1, fetch_steps=lambda _: False)
+        path = tmp_path / "course.snapshot"
+        write_snapshot(course, path)
+
+        with CourseSnapshot(path) as snapshot:
+            lessons = list(snapshot.iter_lessons())
+            assert [lesson.step_ids for lesson in lessons] == [
+                lesson.step_ids for lesson in course.iter_lessons()
+            ]
+            assert all(not lesson.steps for lesson in lessons)
+            assert snapshot.step(1) is None
+
+    def test_rejects_foreign_files(self, tmp_path):
+        empty = tmp_path / "empty"
+        empty.write_bytes(b"")
+        garbage = tmp_path / "garbage"
+        garbage.write_bytes(b"x" * 100)
+
+        for path in (empty, garbage):
+            with pytest.raises(SnapshotFormatError):
+                CourseSnapshot(path)
+
+    @pytest.mark.asyncio
+    async def test_rejects_other_version_and_truncated(self, crawled_course, tmp_path):
+        path = tmp_path / "course.snapshot"
+        write_snapshot(crawled_course, path)
+        data = path.read_bytes()
+
+        other_version = (SNAPSHOT_FORMAT_VERSION + 1).to_bytes(2, "little")
+        path.write_bytes(SNAPSHOT_MAGIC + other_version + data[len(SNAPSHOT_MAGIC) + 2 :])
+        with pytest.raises(SnapshotFormatError, match="version"):
+            CourseSnapshot(path)
+
+        path.write_bytes(data[:200])
+        with pytest.raises(SnapshotFormatError, match="truncated"):
+            CourseSnapshot(path)
+
+    @pytest.mark.asyncio
+    async def test_build_from_snapshot_matches_online_build(
+        self, stepik_api, crawled_course, tmp_path
+    ):
+        online_path = tmp_path / "online.md"
+        async with StepikClient("token", api_url=stepik_api.url) as client:
+            await ConspectBuilder(client).build(1, online_path)
+
+        snapshot_path = tmp_path / "course.snapshot"
+        write_snapshot(crawled_course, snapshot_path)
+        offline_path = tmp_path / "offline.md"
+        with CourseSnapshot(snapshot_path) as snapshot:
+            stats = await ConspectBuilder(None, crawler=SnapshotCrawler(snapshot)).build(
+                1, offline_path
+            )
+
+        assert stats.steps_rendered == 12
+        assert offline_path.read_bytes() == online_path.read_bytes()
+
+    def test_builder_needs_client_or_crawler(self):
+        with pytest.raises(ValueError):
+            ConspectBuilder(None)
@@ -0,0 +1,97 @@
+import stat
+import time
+
+import aiohttp
+import pytest
+from pytest_mock import MockerFixture
+
+from stepik_conspect_helper.stepa import OAuthToken, TokenStore, obtain_token
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TokenStore(tmp_path / "config" / "token.json")
+
+
+@pytest.fixture
+def interactive_login(mocker: MockerFixture):
+    return mocker.AsyncMock(return_value=OAuthToken("browser", refresh_token="r"))
+
+
+class TestTokenStore:
+    def test_save_and_load(self, store: TokenStore):
+        token = OAuthToken("access", expires_at=123.0, refresh_token="refresh")
+
+        store.save(token)
+
+        assert store.load() == token
+        assert stat.S_IMODE(store.path.stat().st_mode) == 0o600
+
+    def test_missing_and_broken(self, store: TokenStore):
+        assert store.load() is None
+
+        store.path.parent.mkdir(parents=True)
+        store.path.write_text("[]")
+        assert store.load() is None
+
+        store.clear()
+        assert not store.path.exists()
+
+
+class TestObtainToken:
+    @pytest.mark.asyncio
+    async def test_cached_token(self, store, interactive_login, mocker):
+        token = OAuthToken("cached", expires_at=time.time() + 3600)
+        store.save(token)
+
+        assert await obtain_token(store, mocker.Mock(), interactive_login) == token
+        interactive_login.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_expired_token_is_refreshed(self, store, interactive_login, mocker):
+        store.save(OAuthToken("old", expires_at=0, refresh_token="r"))
+        refresh_mock = mocker.patch(
+            "stepik_conspect_helper.stepa.tokens.refresh_access_token",
+            return_value=OAuthToken("refreshed", refresh_token="r"),
+        )
+
+        token = await obtain_token(store, mocker.Mock(), interactive_login)
+
+        assert token.access_token == "refreshed"
+        assert store.load() == token
+        refresh_mock.assert_called_once()
+        interactive_login.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_falls_back_to_browser(
+        self, store, interactive_login, mocker
+    ):
+        store.save(OAuthToken("old", expires_at=0, refresh_token="r"))
+        mocker.patch(
+            "stepik_conspect_helper.stepa.tokens.refresh_access_token",
+            side_effect=aiohttp.ClientResponseError(mocker.Mock(), (), status=400),
+        )
+
+        token = await obtain_token(store, mocker.Mock(), interactive_login)
+
+        assert token.access_token == "browser"
+        assert store.load() == token
+
+    @pytest.mark.asyncio
+    async def test_client_credentials(self, store, interactive_login, mocker):
+        cc_mock = mocker.patch(
+            "stepik_conspect_helper.stepa.tokens.request_client_credentials_token",
+            return_value=OAuthToken("app"),
+        )
+        session = mocker.Mock()
+
+        token = await obtain_token(
+            store,
+            session,
+            interactive_login,
+            client_credentials=("id", "secret"),
+        )
+
+        assert token.access_token == "app"
+        cc_mock.assert_called_once_with("id", "secret", session)
+        interactive_login.assert_not_called()
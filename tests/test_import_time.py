@@ -0,0 +1,91 @@
+"""Бюджет времени импорта CLI
+
+Время меряется через python -X importtime в чистом процессе. Список модулей
+проверяется строго, а бюджет по времени взят с большим запасом, чтобы тест не
+мигал на медленных машинах, но ловил возвращение aiohttp в импорт main
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_TIME_BUDGET_US = 150_000
+
+# то, что не должно грузиться, пока команде не понадобилась сеть или сервер
+HEAVY_MODULES = ("aiohttp", "asyncio", "webbrowser", "stepik_conspect_helper.token_exchanger")
+
+
+def import_times(*args: str, env: dict[str, str] | None = None) -> dict[str, int]:
+    """Запускает python -X importtime и возвращает модуль -> суммарное время, мкс"""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def heavy_imports(times: dict[str, int]) -> list[str]:
+    return [
+        name
+        for name in times
+        if any(name == heavy or name.startswith(f"{heavy}.") for heavy in HEAVY_MODULES)
+    ]
+
+
+class TestImportTime:
+    def test_main_import_is_light(self):
+        times = import_times("-c", "import stepik_conspect_helper.main")
+
+        assert heavy_imports(times) == []
+        assert times["stepik_conspect_helper.main"] < IMPORT_TIME_BUDGET_US
+
+    def test_cache_stats_does_not_load_network_stack(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        times = import_times(
+            "-m", "stepik_conspect_helper", "cache", "stats", env=dict(os.environ)
+        )
+
+        assert heavy_imports(times) == []
+        assert not (tmp_path / "stepik-conspect-helper").exists()
+
+    def test_models_do_not_load_client(self):
+        times = import_times(
+            "-c", "from stepik_conspect_helper.stepa import Course, ResponseCache"
+        )
+
+        assert "aiohttp" not in times
+        assert "stepik_conspect_helper.stepa.client" not in times
+
+
+@pytest.mark.parametrize(
+    "package",
+    [
+        "stepik_conspect_helper.conspect",
+        "stepik_conspect_helper.search",
+        "stepik_conspect_helper.stepa",
+        "stepik_conspect_helper.token_exchanger",
+    ],
+)
+def test_lazy_exports_resolve(package):
+    module = importlib.import_module(package)
+
+    assert module.__all__ == sorted(module.__all__)
+    for name in module.__all__:
+        assert getattr(module, name) is not None
+    assert set(module.__all__) <= set(dir(module))
+    with pytest.raises(AttributeError):
+        module.missing_name
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import pytest
+
+from stepik_conspect_helper.main import parse_args
+
+
+class TestParseArgs:
+    def test_subcommands(self):
+        assert parse_args([]).command == "login"
+        assert parse_args(["login", "--relogin"]).relogin
+        assert parse_args(["cache", "stats", "--json"]).json
+        assert parse_args(["search", "обход"]).query == "обход"
+
+        args = parse_args(["build", "7", "--full", "-o", "out.md"])
+        assert args.command == "build"
+        assert args.course_ids == [7]
+        assert args.output == Path("out.md")
+
+    def test_build_without_subcommand(self):
+        args = parse_args(["7", "8", "--output-dir", "out"])
+
+        assert args.command == "build"
+        assert args.course_ids == [7, 8]
+
+    def test_build_requires_course(self, capsys):
+        with pytest.raises(SystemExit):
+            parse_args(["build"])
+
+        assert "нужен id курса" in capsys.readouterr().err
+        assert parse_args(["build", "--from-snapshot", "c.snap"]).course_ids == []
+
+    def test_resume_is_for_single_course(self, capsys):
+        args = parse_args(["build", "7", "--resume", "--checkpoint-every", "10"])
+        assert args.resume
+        assert args.checkpoint_every == 10
+
+        with pytest.raises(SystemExit):
+            parse_args(["build", "7", "8", "--resume"])
+        assert "одного курса" in capsys.readouterr().err
+
+    @pytest.mark.parametrize("option", ["--parallel-courses", "--workers", "--checkpoint-every"])
+    def test_counts_must_be_positive(self, option, capsys):
+        with pytest.raises(SystemExit):
+            parse_args(["build", "7", option, "0"])
+
+        assert f"{option} должен быть положительным" in capsys.readouterr().err
+
+    def test_formats(self, capsys):
+        assert parse_args(["build", "7"]).formats == ["md"]
+        assert parse_args(["build", "7", "--formats", "md, epub,md"]).formats == ["md", "epub"]
+
+        with pytest.raises(SystemExit):
+            parse_args(["build", "7", "--formats", "md,docx"])
+        assert "docx" in capsys.readouterr().err
+
+        with pytest.raises(SystemExit):
+            parse_args(["build", "7", "8", "--formats", "html"])
+        assert "только один курс" in capsys.readouterr().err
+
+        with pytest.raises(SystemExit):
+            parse_args(["build", "7", "--formats", "html", "--workers", "4"])
+        assert "--workers" in capsys.readouterr().err
+        assert parse_args(["build", "7", "--workers", "4"]).workers == 4
+        assert parse_args(["build", "7", "--formats", "html"]).workers == 1
+
+    def test_help_lists_commands(self, capsys):
+        with pytest.raises(SystemExit) as exc_info:
+            parse_args(["--help"])
+
+        assert exc_info.value.code == 0
+        assert "cache" in capsys.readouterr().out
@@ -0,0 +1,107 @@
+import pytest
+
+from stepik_conspect_helper.conspect import ConspectBuilder
+from stepik_conspect_helper.metrics import (
+    CACHE_OBJECTS,
+    HTTP_BYTES,
+    HTTP_CONNECTIONS,
+    HTTP_REQUESTS,
+    HTTP_RETRIES,
+    HTTP_SECONDS,
+    STAGE_CALLS,
+    STAGE_SECONDS,
+    Histogram,
+    Metrics,
+)
+from stepik_conspect_helper.stepa import ResponseCache, RetryPolicy, StepikClient
+
+
+@pytest.fixture
+def metrics():
+    return Metrics()
+
+
+class TestHistogram:
+    def test_quantiles(self):
+        histogram = Histogram((0.1, 0.2, 0.4))
+        for value in (0.05, 0.15, 0.15, 0.3, 5.0):
+            histogram.observe(value)
+
+        assert histogram.counts == [1, 2, 1, 1]
+        assert histogram.count == 5
+        assert histogram.quantile(0.5) == pytest.approx(0.175)
+        assert histogram.quantile(0.99) == 0.4
+        assert Histogram((1.0,)).quantile(0.5) == 0.0
+
+
+class TestMetrics:
+    def test_render_prometheus(self, metrics):
+        metrics.inc(HTTP_REQUESTS, host="stepik.org", status="200")
+        metrics.inc(HTTP_REQUESTS, 2, host="stepik.org", status="200")
+        metrics.inc(STAGE_SECONDS, 0.5, stage='we"ird')
+        metrics.observe(HTTP_SECONDS, 0.02, phase="ttfb")
+
+        text = metrics.render_prometheus()
+
+        assert "# TYPE stepik_http_requests_total counter\n" in text
+        assert 'stepik_http_requests_total{host="stepik.org",status="200"} 3\n' in text
+        assert 'stepik_stage_seconds_total{stage="we\\"ird"} 0.5\n' in text
+        assert "# TYPE stepik_http_request_seconds histogram\n" in text
+        assert 'stepik_http_request_seconds_bucket{phase="ttfb",le="0.01"} 0\n' in text
+        assert 'stepik_http_request_seconds_bucket{phase="ttfb",le="0.025"} 1\n' in text
+        assert 'stepik_http_request_seconds_bucket{phase="ttfb",le="+Inf"} 1\n' in text
+        assert 'stepik_http_request_seconds_count{phase="ttfb"} 1\n' in text
+
+    def test_summary_and_stage(self, metrics):
+        with metrics.stage("render"):
+            pass
+        with metrics.stage("render"):
+            pass
+        metrics.observe(HTTP_SECONDS, 0.02, phase="total")
+
+        summary = metrics.summary()
+
+        assert summary[STAGE_CALLS] == {"render": 2}
+        assert summary[STAGE_SECONDS]["render"] >= 0
+        assert summary[HTTP_SECONDS]["total"]["count"] == 1
+        assert summary[HTTP_SECONDS]["total"]["mean"] == 0.02
+
+    @pytest.mark.asyncio
+    async def test_client_requests_are_traced(self, metrics, stepik_api, tmp_path):
+        stepik_api.failures = [(503, {})]
+        cache = ResponseCache(tmp_path / "api.sqlite3")
+        try:
+            async with StepikClient(
+                "token",
+                api_url=stepik_api.url,
+                cache=cache,
+                retry_policy=RetryPolicy(max_retries=1, base_delay=0),
+                metrics=metrics,
+            ) as client:
+                await client.get_lessons([1, 2])
+                await client.get_lessons([1, 2, 3])
+        finally:
+            cache.close()
+
+        host = "127.0.0.1"
+        assert metrics.value(HTTP_REQUESTS, host=host, status="503") == 1
+        assert metrics.value(HTTP_REQUESTS, host=host, status="200") == 2
+        assert metrics.value(HTTP_RETRIES) == 1
+        assert metrics.value(CACHE_OBJECTS, result="hit") == 2
+        assert metrics.value(CACHE_OBJECTS, result="miss") == 3
+        assert metrics.value(HTTP_BYTES, host=host, direction="in") > 0
+        assert metrics.value(HTTP_BYTES, host=host, direction="out") > 0
+        assert metrics.value(HTTP_CONNECTIONS, kind="new") >= 1
+        assert metrics.histogram(HTTP_SECONDS, phase="ttfb").count == 3
+        assert metrics.histogram(HTTP_SECONDS, phase="total").count == 2
+        assert metrics.histogram(HTTP_SECONDS, phase="connect").count >= 1
+
+    @pytest.mark.asyncio
+    async def test_build_stages(self, metrics, stepik_api, tmp_path):
+        async with StepikClient("token", api_url=stepik_api.url, metrics=metrics) as client:
+            await ConspectBuilder(client, metrics=metrics).build(1, tmp_path / "course.md")
+
+        # скелет курса и каждый из 4 уроков плюс последний пустой anext
+        assert metrics.value(STAGE_CALLS, stage="crawl") == 6
+        assert metrics.value(STAGE_CALLS, stage="write") == 5
+        assert metrics.value(STAGE_SECONDS, stage="render") > 0
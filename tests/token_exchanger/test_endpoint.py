@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from stepik_conspect_helper.token_exchanger import LocalHTTPEndpoint, TokenExchangeServer
+
+
+@pytest_asyncio.fixture
+async def keep_alive_server(unused_tcp_port: int):
+    server = TokenExchangeServer(
+        "127.0.0.1",
+        unused_tcp_port,
+        idle_timeout=0.2,
+        max_requests=3,
+    )
+    server_task = asyncio.create_task(server.listen())
+
+    await server.wait_listening()
+
+    try:
+        yield server
+    finally:
+        server_task.cancel()
+
+
+async def exchange(server: TokenExchangeServer, payload: bytes) -> bytes:
+    """Отправляет сырые байты и читает все до закрытия соединения сервером"""
+
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(payload)
+    await writer.drain()
+
+    response = await asyncio.wait_for(reader.read(), timeout=5)
+    writer.close()
+    await writer.wait_closed()
+    return response
+
+
+class TestEndpoint:
+    @pytest.mark.asyncio
+    async def test_pipelined_requests(self, keep_alive_server):
+        response = await exchange(
+            keep_alive_server,
+            b"GET /nope HTTP/1.1\r\n\r\n"
+            b"GET /error HTTP/1.1\r\n\r\n"
+            b"GET /nope HTTP/1.1\r\nConnection: close\r\n\r\n",
+        )
+
+        assert response.count(b"HTTP/1.1 404 ") == 2
+        assert response.count(b"HTTP/1.1 200 ") == 1
+        assert response.index(b" 404 ") < response.index(b" 200 ")
+        assert response.count(b"connection: keep-alive") == 2
+        assert response.rstrip().endswith(b"connection: close\r\ncontent-length: 0")
+
+    @pytest.mark.asyncio
+    async def test_connection_close(self, keep_alive_server):
+        response = await exchange(
+            keep_alive_server,
+            b"GET /nope HTTP/1.1\r\nConnection: close\r\n\r\nGET /nope HTTP/1.1\r\n\r\n",
+        )
+
+        assert response.count(b"HTTP/1.1 404 ") == 1
+
+    @pytest.mark.asyncio
+    async def test_http_1_0_closes_by_default(self, keep_alive_server):
+        response = await exchange(
+            keep_alive_server,
+            b"GET /nope HTTP/1.0\r\n\r\nGET /nope HTTP/1.0\r\n\r\n",
+        )
+
+        assert response.count(b" 404 ") == 1
+        assert b"connection: close" in response
+
+    @pytest.mark.asyncio
+    async def test_http_1_0_keep_alive(self, keep_alive_server):
+        response = await exchange(
+            keep_alive_server,
+            b"GET /nope HTTP/1.0\r\nConnection: keep-alive\r\n\r\n"
+            b"GET /nope HTTP/1.0\r\n\r\n",
+        )
+
+        assert response.count(b" 404 ") == 2
+
+    @pytest.mark.asyncio
+    async def test_max_requests(self, keep_alive_server):
+        response = await exchange(keep_alive_server, b"GET /nope HTTP/1.1\r\n\r\n" * 5)
+
+        assert response.count(b" 404 ") == 3
+        assert response.count(b"connection: close") == 1
+
+    @pytest.mark.asyncio
+    async def test_idle_timeout(self, keep_alive_server):
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+
+        response = await exchange(keep_alive_server, b"GET /nope HTTP/1.1\r\n\r\n")
+
+        assert response.count(b" 404 ") == 1
+        assert loop.time() - started_at >= 0.2
+
+    @pytest.mark.asyncio
+    async def test_body_is_drained(self, keep_alive_server):
+        response = await exchange(
+            keep_alive_server,
+            b"POST /auth HTTP/1.1\r\nContent-Length: 14\r\n\r\nGET / HTTP/1.1"
+            b"GET /nope HTTP/1.1\r\nConnection: close\r\n\r\n",
+        )
+
+        assert response.count(b" 400 ") == 1
+        assert response.count(b" 404 ") == 1
+
+    @pytest.mark.asyncio
+    async def test_chunked_body_is_rejected(self, keep_alive_server):
+        response = await exchange(
+            keep_alive_server,
+            b"POST /auth HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n0\r\n\r\n",
+        )
+
+        assert response.startswith(b"HTTP/1.1 501 ")
+
+    @pytest.mark.asyncio
+    async def test_stop_closes_idle_connections(self, unused_tcp_port):
+        server = TokenExchangeServer("127.0.0.1", unused_tcp_port, idle_timeout=60)
+        server_task = asyncio.create_task(server.listen())
+        await server.wait_listening()
+
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(b"GET /nope HTTP/1.1\r\n\r\n")
+        await writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+
+        server.stop()
+        await asyncio.wait_for(server_task, timeout=5)
+
+        assert await reader.read() == b""
+        writer.close()
+
+    def test_dispatch_must_be_overridden(self):
+        class Endpoint(LocalHTTPEndpoint):
+            pass
+
+        with pytest.raises(TypeError):
+            Endpoint("127.0.0.1", 0)
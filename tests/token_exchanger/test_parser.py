@@ -0,0 +1,123 @@
+from http import HTTPMethod, HTTPStatus
+
+import pytest
+
+from stepik_conspect_helper.token_exchanger.parser import (
+    HTTPParseError,
+    RequestParser,
+    parse_header_line,
+    parse_start_line,
+)
+
+REQUEST = b"GET /auth?code=123 HTTP/1.1\r\nHost: localhost\r\nAccept: */*\r\n\r\n"
+
+
+class TestParser:
+    def test_parse_request(self):
+        parser = RequestParser()
+        parser.feed(REQUEST)
+
+        request = parser.parse()
+
+        assert request is not None
+        assert request.start_line.method == HTTPMethod.GET
+        assert request.start_line.target == "/auth?code=123"
+        assert request.start_line.protocol == "HTTP/1.1"
+        assert request.headers == {"host": "localhost", "accept": "*/*"}
+        assert parser.buffered == 0
+
+    def test_parse_byte_by_byte(self):
+        parser = RequestParser()
+
+        for index in range(len(REQUEST) - 1):
+            parser.feed(REQUEST[index : index + 1])
+            assert parser.parse() is None
+
+        parser.feed(REQUEST[-1:])
+        request = parser.parse()
+
+        assert request is not None
+        assert request.headers["accept"] == "*/*"
+
+    def test_parse_pipelined_requests(self):
+        parser = RequestParser()
+        parser.feed(REQUEST + b"\r\n" + REQUEST.replace(b"/auth", b"/success"))
+
+        first = parser.parse()
+        second = parser.parse()
+
+        assert first is not None and second is not None
+        assert first.start_line.target.startswith("/auth")
+        assert second.start_line.target.startswith("/success")
+        assert parser.parse() is None
+
+    def test_body_stays_in_buffer(self):
+        parser = RequestParser()
+        parser.feed(b"POST /x HTTP/1.1\r\nContent-Length: 4\r\n\r\nbody")
+
+        request = parser.parse()
+
+        assert request is not None
+        assert parser.buffered == 4
+        assert parser.take(10) == b"body"
+        assert parser.buffered == 0
+
+    def test_duplicate_headers_are_joined(self):
+        parser = RequestParser()
+        parser.feed(b"GET / HTTP/1.1\r\nAccept: a\r\naccept: b\r\n\r\n")
+
+        request = parser.parse()
+
+        assert request is not None
+        assert request.headers["accept"] == "a, b"
+
+    def test_start_line_too_long(self):
+        parser = RequestParser(max_start_line_size=16)
+        parser.feed(b"GET /" + b"a" * 32)
+
+        with pytest.raises(HTTPParseError) as exc_info:
+            parser.parse()
+
+        assert exc_info.value.status == HTTPStatus.REQUEST_URI_TOO_LONG
+
+    def test_headers_too_large(self):
+        parser = RequestParser(max_headers_size=32)
+        parser.feed(b"GET / HTTP/1.1\r\nX-Long: " + b"a" * 64 + b"\r\n\r\n")
+
+        with pytest.raises(HTTPParseError) as exc_info:
+            parser.parse()
+
+        assert exc_info.value.status == HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+    def test_too_many_headers(self):
+        parser = RequestParser(max_header_count=2)
+        parser.feed(b"GET / HTTP/1.1\r\nA: 1\r\nB: 2\r\nC: 3\r\n\r\n")
+
+        with pytest.raises(HTTPParseError) as exc_info:
+            parser.parse()
+
+        assert exc_info.value.status == HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+    @pytest.mark.parametrize(
+        ("line", "status"),
+        [
+            (b"GET /", HTTPStatus.BAD_REQUEST),
+            (b"GET  / HTTP/1.1", HTTPStatus.BAD_REQUEST),
+            (b"GET / HTTP/1.1 extra", HTTPStatus.BAD_REQUEST),
+            (b"BREW / HTTP/1.1", HTTPStatus.NOT_IMPLEMENTED),
+            (b"GET / HTTP/2.0", HTTPStatus.HTTP_VERSION_NOT_SUPPORTED),
+        ],
+    )
+    def test_malformed_start_line(self, line, status):
+        with pytest.raises(HTTPParseError) as exc_info:
+            parse_start_line(line)
+
+        assert exc_info.value.status == status
+
+    @pytest.mark.parametrize("line", [b"no colon", b"Bad Name: x", b" folded: x"])
+    def test_malformed_header_line(self, line):
+        with pytest.raises(HTTPParseError):
+            parse_header_line(line)
+
+    def test_header_value_is_stripped(self):
+        assert parse_header_line(b"X-Name:  \tvalue \t") == ("x-name", "value")
@@ -0,0 +1,134 @@
+import gzip
+from http import HTTPMethod, HTTPStatus
+
+import pytest
+
+from stepik_conspect_helper.token_exchanger.parser import Request, RequestStartLine
+from stepik_conspect_helper.token_exchanger.responses import (
+    PreparedResponse,
+    choose_encoding,
+    error_response,
+    redirect_response,
+)
+from stepik_conspect_helper.token_exchanger.utils import reply_with_ok
+
+BODY = "<p>Успешная авторизация</p>".encode() * 32
+
+
+def split_response(data: bytes) -> tuple[dict[str, str], bytes]:
+    head, _, body = data.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")[1:]
+    return dict(line.split(": ", 1) for line in lines), body
+
+
+class TestResponses:
+    @pytest.mark.parametrize(
+        ("accept_encoding", "expected"),
+        [
+            (None, "identity"),
+            ("", "identity"),
+            ("gzip, deflate", "gzip"),
+            ("deflate", "identity"),
+            ("gzip;q=0", "identity"),
+            ("*", "br"),
+            ("br;q=0.5, gzip;q=0.8", "gzip"),
+            ("br, gzip", "br"),
+            ("gzip;q=bad", "identity"),
+        ],
+    )
+    def test_choose_encoding(self, accept_encoding, expected):
+        assert choose_encoding(accept_encoding, ["br", "gzip"]) == expected
+
+    @pytest.mark.parametrize(
+        ("accept_encoding", "expected"),
+        [
+            ("*", "gzip"),
+            ("gzip, identity", "gzip"),
+            ("identity, gzip", "gzip"),
+            ("gzip;q=0.5, identity;q=0.5", "gzip"),
+            ("gzip;q=0.5, identity", "identity"),
+            ("*;q=0", "identity"),
+        ],
+    )
+    def test_identity_loses_ties(self, accept_encoding, expected):
+        assert choose_encoding(accept_encoding, ["identity", "gzip"]) == expected
+        response = PreparedResponse(HTTPStatus.OK, body=BODY, compress=True)
+        headers, _ = split_response(response.serialize(accept_encoding=accept_encoding))
+        assert headers.get("content-encoding", "identity") in {expected, "br"}
+
+    def test_prepared_response_gzip_variant(self):
+        response = PreparedResponse(
+            HTTPStatus.OK,
+            [("content-type", "text/html")],
+            BODY,
+            compress=True,
+        )
+
+        headers, body = split_response(
+            response.serialize(keep_alive=True, accept_encoding="gzip")
+        )
+
+        assert gzip.decompress(body) == BODY
+        assert headers["content-encoding"] == "gzip"
+        assert headers["content-length"] == str(len(body))
+        assert headers["vary"] == "accept-encoding"
+        assert headers["connection"] == "keep-alive"
+
+    def test_prepared_response_identity_variant(self):
+        response = PreparedResponse(HTTPStatus.OK, [], BODY, compress=True)
+
+        data = response.serialize()
+        headers, body = split_response(data)
+
+        assert data.startswith(b"HTTP/1.1 200 OK\r\n")
+        assert body == BODY
+        assert "content-encoding" not in headers
+        assert headers["connection"] == "close"
+
+    def test_small_body_is_not_compressed(self):
+        response = PreparedResponse(HTTPStatus.OK, [], b"tiny", compress=True)
+
+        assert response.encodings == ["identity"]
+        assert "vary" not in split_response(response.serialize())[0]
+
+    def test_brotli_variant(self):
+        brotli = pytest.importorskip("brotli")
+        response = PreparedResponse(HTTPStatus.OK, [], BODY, compress=True)
+
+        headers, body = split_response(response.serialize(accept_encoding="br, gzip"))
+
+        assert headers["content-encoding"] == "br"
+        assert brotli.decompress(body) == BODY
+
+    def test_send_is_single_write(self, mocker):
+        writer = mocker.Mock()
+        request = Request(
+            RequestStartLine(HTTPMethod.GET, "/", "HTTP/1.1"),
+            {"accept-encoding": "gzip"},
+        )
+        response = PreparedResponse(HTTPStatus.OK, [], BODY, compress=True)
+
+        response.send(writer, request, keep_alive=True)
+
+        writer.write.assert_called_once_with(
+            response.serialize(keep_alive=True, accept_encoding="gzip")
+        )
+
+    def test_cached_responses(self):
+        assert error_response(HTTPStatus.NOT_FOUND) is error_response(HTTPStatus.NOT_FOUND)
+        assert redirect_response("/success") is redirect_response("/success")
+
+        headers, body = split_response(redirect_response("/success").serialize())
+        assert headers["location"] == "/success"
+        assert headers["content-length"] == "0"
+        assert body == b""
+
+    @pytest.mark.asyncio
+    async def test_reply_with_ok_does_not_copy_body(self, mocker):
+        writer = mocker.Mock()
+
+        await reply_with_ok(writer, "text/plain", BODY, keep_alive=True)
+
+        (head, body), = writer.writelines.call_args.args
+        assert body is BODY
+        assert split_response(head)[0]["content-length"] == str(len(BODY))
@@ -6,6 +6,9 @@ import pytest
 import pytest_asyncio
 from pytest_mock import MockerFixture
 
+from stepik_conspect_helper.metrics import Metrics
+from stepik_conspect_helper.search import SearchHit
+from stepik_conspect_helper.stepa import OAuthToken
 from stepik_conspect_helper.token_exchanger.server import TokenExchangeServer
 
 
@@ -16,7 +19,7 @@ async def exchange_server(unused_tcp_port: int):
     server = TokenExchangeServer(host, port)
     server_task = asyncio.create_task(server.listen())
 
-    await asyncio.sleep(0.1)
+    await server.wait_listening()
 
     try:
         yield server
@@ -44,7 +47,7 @@ class TestServer:
         stepik_mock = mocker.patch(
             "stepik_conspect_helper.token_exchanger.server.exchange_code_for_token"
         )
-        stepik_mock.return_value = expected_token
+        stepik_mock.return_value = OAuthToken(expected_token)
         host, port = exchange_server.host, exchange_server.port
 
         async with client_session.get(
@@ -136,3 +139,216 @@ class TestServer:
         ) as response:
             assert response.content_type == "text/html"
             assert "Проблемы с авторизацией" in await response.text()
+
+    @pytest.mark.asyncio
+    async def test_wait_for_token(
+        self,
+        exchange_server: TokenExchangeServer,
+        client_session: aiohttp.ClientSession,
+        mocker: MockerFixture,
+    ):
+        expected_token = OAuthToken("SvbE7kWxHdj5dwlJNlTVCgW8Slsikc")
+        stepik_mock = mocker.patch(
+            "stepik_conspect_helper.token_exchanger.server.exchange_code_for_token"
+        )
+        stepik_mock.return_value = expected_token
+        host, port = exchange_server.host, exchange_server.port
+        waiter = asyncio.create_task(exchange_server.wait_for_token(timeout=5))
+
+        async with client_session.get(
+            f"http://{host}:{port}/auth",
+            params={
+                "code": "HZGGlezgHpAgaJ4ByaUYrSiymxzwHQ",
+            },
+        ) as response:
+            assert response.status == HTTPStatus.OK
+
+        assert await waiter == expected_token
+
+    @pytest.mark.asyncio
+    async def test_wait_for_token_timeout(
+        self,
+        exchange_server: TokenExchangeServer,
+    ):
+        with pytest.raises(TimeoutError):
+            await exchange_server.wait_for_token(timeout=0.01)
+
+    @pytest.mark.asyncio
+    async def test_server_stops_after_success_page(
+        self,
+        unused_tcp_port: int,
+        client_session: aiohttp.ClientSession,
+        mocker: MockerFixture,
+    ):
+        stepik_mock = mocker.patch(
+            "stepik_conspect_helper.token_exchanger.server.exchange_code_for_token"
+        )
+        stepik_mock.return_value = OAuthToken("SvbE7kWxHdj5dwlJNlTVCgW8Slsikc")
+        server = TokenExchangeServer("127.0.0.1", unused_tcp_port)
+        server_task = asyncio.create_task(server.listen())
+        await server.wait_listening()
+
+        async with client_session.get(
+            f"http://127.0.0.1:{unused_tcp_port}/auth",
+            params={
+                "code": "HZGGlezgHpAgaJ4ByaUYrSiymxzwHQ",
+            },
+        ) as response:
+            assert "Успешная авторизация" in await response.text()
+
+        await asyncio.wait_for(server_task, timeout=5)
+
+        with pytest.raises(aiohttp.ClientConnectionError):
+            async with client_session.get(f"http://127.0.0.1:{unused_tcp_port}/success"):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_server_keeps_running_after_error_page(
+        self,
+        exchange_server: TokenExchangeServer,
+        client_session: aiohttp.ClientSession,
+    ):
+        host, port = exchange_server.host, exchange_server.port
+
+        for _ in range(2):
+            async with client_session.get(
+                f"http://{host}:{port}/auth",
+                params={"error": "access_denied"},
+            ) as response:
+                assert "Проблемы с авторизацией" in await response.text()
+
+    @pytest.mark.asyncio
+    async def test_malformed_request_line(
+        self,
+        exchange_server: TokenExchangeServer,
+    ):
+        reader, writer = await asyncio.open_connection(
+            exchange_server.host,
+            exchange_server.port,
+        )
+        writer.write(b"GET / HTTP/2.0\r\n\r\n")
+        await writer.drain()
+
+        response = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+
+        assert response.startswith(b"HTTP/1.1 505 ")
+
+    @pytest.mark.asyncio
+    async def test_preview_routes(
+        self,
+        unused_tcp_port: int,
+        client_session: aiohttp.ClientSession,
+        mocker: MockerFixture,
+    ):
+        preview = mocker.Mock()
+        preview.render_course = mocker.AsyncMock(return_value=b"<h1>course</h1>")
+        preview.render_lesson = mocker.AsyncMock(side_effect=LookupError)
+        server = TokenExchangeServer("127.0.0.1", unused_tcp_port, preview=preview)
+        server_task = asyncio.create_task(server.listen())
+        await server.wait_listening()
+        base_url = f"http://127.0.0.1:{unused_tcp_port}"
+
+        try:
+            async with client_session.get(f"{base_url}/course/7?x=1") as response:
+                assert response.status == HTTPStatus.OK
+                assert await response.text() == "<h1>course</h1>"
+
+            async with client_session.get(f"{base_url}/lesson/8") as response:
+                assert response.status == HTTPStatus.NOT_FOUND
+
+            async with client_session.get(f"{base_url}/lesson/abc") as response:
+                assert response.status == HTTPStatus.NOT_FOUND
+        finally:
+            server_task.cancel()
+
+        preview.render_course.assert_awaited_once_with(7)
+        preview.render_lesson.assert_awaited_once_with(8)
+
+    @pytest.mark.asyncio
+    async def test_preview_routes_disabled(
+        self,
+        exchange_server: TokenExchangeServer,
+        client_session: aiohttp.ClientSession,
+    ):
+        host, port = exchange_server.host, exchange_server.port
+
+        async with client_session.get(f"http://{host}:{port}/course/1") as response:
+            assert response.status == HTTPStatus.NOT_FOUND
+
+    @pytest.mark.asyncio
+    async def test_search_route(
+        self,
+        unused_tcp_port: int,
+        client_session: aiohttp.ClientSession,
+        mocker: MockerFixture,
+    ):
+        search = mocker.Mock()
+        search.search.return_value = [SearchHit(5, 3, 2, "Урок <3>", [1], 1.5)]
+        server = TokenExchangeServer("127.0.0.1", unused_tcp_port, search=search)
+        server_task = asyncio.create_task(server.listen())
+        await server.wait_listening()
+        base_url = f"http://127.0.0.1:{unused_tcp_port}"
+
+        try:
+            async with client_session.get(
+                f"{base_url}/search", params={"q": "обход дерева"}
+            ) as response:
+                assert response.status == HTTPStatus.OK
+                page = await response.text()
+
+            async with client_session.get(f"{base_url}/search") as response:
+                assert response.status == HTTPStatus.OK
+                assert "<form" in await response.text()
+        finally:
+            server_task.cancel()
+
+        search.search.assert_called_once_with("обход дерева")
+        assert 'href="https://stepik.org/lesson/3/step/2"' in page
+        assert "Урок &lt;3&gt;, шаг 2" in page
+        assert 'value="обход дерева"' in page
+
+    @pytest.mark.asyncio
+    async def test_search_route_disabled(
+        self,
+        exchange_server: TokenExchangeServer,
+        client_session: aiohttp.ClientSession,
+    ):
+        host, port = exchange_server.host, exchange_server.port
+
+        async with client_session.get(f"http://{host}:{port}/search?q=x") as response:
+            assert response.status == HTTPStatus.NOT_FOUND
+
+    @pytest.mark.asyncio
+    async def test_metrics_route(
+        self,
+        unused_tcp_port: int,
+        client_session: aiohttp.ClientSession,
+    ):
+        metrics = Metrics()
+        metrics.inc("stepik_http_retries_total", 2)
+        server = TokenExchangeServer("127.0.0.1", unused_tcp_port, metrics=metrics)
+        server_task = asyncio.create_task(server.listen())
+        await server.wait_listening()
+
+        try:
+            async with client_session.get(
+                f"http://127.0.0.1:{unused_tcp_port}/metrics"
+            ) as response:
+                assert response.status == HTTPStatus.OK
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert "stepik_http_retries_total 2\n" in await response.text()
+        finally:
+            server_task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_metrics_route_disabled(
+        self,
+        exchange_server: TokenExchangeServer,
+        client_session: aiohttp.ClientSession,
+    ):
+        host, port = exchange_server.host, exchange_server.port
+
+        async with client_session.get(f"http://{host}:{port}/metrics") as response:
+            assert response.status == HTTPStatus.NOT_FOUND
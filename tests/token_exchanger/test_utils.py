@@ -3,10 +3,12 @@ from http import HTTPMethod
 
 import pytest
 
+from stepik_conspect_helper.token_exchanger.parser import HTTPParseError
 from stepik_conspect_helper.token_exchanger.utils import (
     RequestStartLine,
     extract_request_headers,
     extract_request_query,
+    extract_request_query_lists,
 )
 
 
@@ -37,3 +39,39 @@ class TestUtils:
         assert "sdfss" in query_params
         assert query_params["sdfss"] == "www"
         assert "arr" not in query_params
+
+    def test_extract_request_query_decodes_values(self):
+        start_line = RequestStartLine(
+            method=HTTPMethod.GET,
+            target="/auth?code=a%2Fb%3D&state=hello+world&empty=",
+            protocol="HTTP/1.1",
+        )
+
+        query_params = extract_request_query(start_line)
+
+        assert query_params == {"code": "a/b=", "state": "hello world", "empty": ""}
+
+    def test_extract_request_query_without_query(self):
+        start_line = RequestStartLine(HTTPMethod.GET, "/auth", "HTTP/1.1")
+
+        assert extract_request_query(start_line) == {}
+
+    def test_extract_request_query_lists(self):
+        start_line = RequestStartLine(
+            method=HTTPMethod.GET,
+            target="/jopa?ids[]=1&ids[]=2&x=a&x=b",
+            protocol="HTTP/1.1",
+        )
+
+        query_params = extract_request_query_lists(start_line)
+
+        assert query_params == {"ids[]": ["1", "2"], "x": ["a", "b"]}
+        assert extract_request_query(start_line)["x"] == "a"
+
+    @pytest.mark.asyncio
+    async def test_extract_request_headers_malformed(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"no colon here\r\n\r\n")
+
+        with pytest.raises(HTTPParseError):
+            await extract_request_headers(reader)